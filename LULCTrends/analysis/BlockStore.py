@@ -0,0 +1,111 @@
+# File BlockStore.py
+#
+# Shared block data for batches of custom boundaries
+#
+# Boundaries such as the states or the LCCs overlap the same ecoregions, so
+#  a batch of them loads each ecoregion once.  The loaded ecoregion covers
+#  the union of the sample blocks any boundary in the batch needs from it,
+#  with one column per block in its change and multichange arrays.  The
+#  ecoregion for a single boundary is then made by selecting its blocks'
+#  columns from the shared arrays, instead of reading the change images
+#  again.  An interval is kept for a boundary when the image catalog has
+#  images for that boundary's blocks, the same test loadChangeImageData uses.
+#
+#       store = blockStore()
+#       store.load( ecoNum, resolution, blocks ) - load the union of blocks
+#       eco, dataFound = store.ecoregion( ecoNum, N, n, resolution, runType,
+#                                         strat_list ) - an EcoStats object
+#                                         with its change data loaded
+#       engine = store.domains( ecoNum, resolution, domains, totalBlocks ) -
+#                                         a DomainEstimation.domainEngine for
+#                                         many boundaries over the shared arrays
+#       store.release( ecoNum, resolution ) - free the shared arrays
+#
+#  Split (clipped) blocks are particular to a boundary, so ecoregions with
+#  split blocks are not loaded through the store.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import sys, traceback
+from ..trendutil import TrendsUtilities
+from . import createRegionStats
+from .ChangeImageCatalog import imageCatalog
+from .DomainEstimation import domainEngine
+
+class blockStore:
+
+    def __init__( self ):
+        #Loaded ecoregions, format = { (ecoNum, resolution): EcoStats object or None if no data }
+        self.ecoregions = {}
+
+    def load( self, ecoNum, resolution, blocks ):
+        try:
+            trlog = TrendsUtilities.trLogger()
+            blocks = sorted( set( blocks ))
+            trlog.trwrite("Loading " + str(len( blocks )) + " shared blocks for ecoregion " + str(ecoNum))
+            eco = createRegionStats.EcoStats( ecoNum, len( blocks ), len( blocks ), resolution,
+                                              "Partial stratified", blocks )
+            if eco.loadData():
+                self.ecoregions[( ecoNum, resolution )] = eco
+            else:
+                self.ecoregions[( ecoNum, resolution )] = None
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def ecoregion( self, ecoNum, N, n, resolution, runType, strat_list, boundary = "" ):
+        #A new ecoregion object for a subset of the loaded blocks
+        try:
+            trlog = TrendsUtilities.trLogger()
+            gp = TrendsUtilities.getGP()
+            source = self.ecoregions[( ecoNum, resolution )]
+            eco = createRegionStats.EcoStats( ecoNum, N, n, resolution, runType, strat_list, [], boundary )
+            if source is None:
+                return eco, False
+            columns = [ source.column[ block ] for block in eco.blocks ]
+
+            catalog = imageCatalog( gp, "ChangeImage" )
+            for interval in eco.ecoData.keys():
+                if interval in source.ecoData and catalog.getImages( ecoNum, interval, resolution, eco.stratBlocks ):
+                    eco.ecoData.data[ eco.ecoData.getPosition( interval ) ] = source.ecoData[ interval ][0][:, columns]
+                else:
+                    trlog.trwrite( "No data or analysis for ecoregion " + str(ecoNum) + \
+                                  " and interval " + interval )
+                    del eco.ecoData[ interval ]
+
+            if len( eco.ecoData ) > 0:
+                catalog = imageCatalog( gp, "MultiChangeImage" )
+                for interval in eco.ecoMulti.keys():
+                    if interval in source.ecoMulti and catalog.getImages( ecoNum, interval, resolution, eco.stratBlocks ):
+                        eco.ecoMulti.data[ eco.ecoMulti.getPosition( interval ) ] = source.ecoMulti[ interval ][0][:, columns]
+                    else:
+                        trlog.trwrite( "No multichange data or analysis for ecoregion " + str(ecoNum))
+                        del eco.ecoMulti[ interval ]
+
+            return eco, eco.trimToLoadedData()
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def domains( self, ecoNum, resolution, domains, totalBlocks ):
+        #Domain estimates for many boundaries at once from the loaded blocks,
+        # or None if the ecoregion had no data
+        source = self.ecoregions[( ecoNum, resolution )]
+        if source is None:
+            return None
+        return domainEngine( source, domains, totalBlocks )
+
+    def release( self, ecoNum, resolution ):
+        if ( ecoNum, resolution ) in self.ecoregions:
+            del self.ecoregions[( ecoNum, resolution )]
@@ -5,13 +5,13 @@
 # Out:  true or false, depending on if any data was loaded for this interval
 #
 # For a given ecoregion (or partial region) and change interval
-#  and resolution, extract the names of the
-#  change image files needed for this analysis from the ChangeImage
-#  table of the database and load the pixel counts for
+#  and resolution, look up the names of the
+#  change image files needed for this analysis in the catalog of the
+#  ChangeImage table of the database and load the pixel counts for
 #  each conversion into the conversion array for this ecoregion.
-#  Pixel counts are loaded by opening the attribute table for each
-#  selected change image and reading the conversion numbers and
-#  corresponding pixel counts.
+#  Pixel counts are loaded by reading the attribute table for each
+#  selected change image (see ChangeImageReader.py) and copying the
+#  conversion numbers and corresponding pixel counts into the array.
 #
 #  There could be two lists of sample blocks as input parameters to
 #  this function.  listOfSamples is the list containing the sample
@@ -21,8 +21,8 @@
 #  boundaries may be clipped and the pixel counts recalculated for the
 #  block portion within the region.  The list of these block numbers is
 #  in listOfSplits, and for these blocks, the conversion number and pixel
-#  count will be retrieved from a temporary table that contains
-#  the split counts.
+#  count are counted from the image pixels inside the boundary by
+#  loadSplitBlockData in SplitBlockData.py.
 #  Sliver blocks are contained within the change image of the corresponding
 #  sample block, so the pixel counts in the sample block change image already
 #  include the counts from any associated sliver blocks.
@@ -38,8 +38,10 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 #Import modules
-import arcgisscripting, os, sys, traceback
+import os, sys, traceback
 from ..trendutil import TrendsNames, TrendsUtilities
+from .ChangeImageReader import readBlockTables
+from .ChangeImageCatalog import imageCatalog
 
 def loadChangeImageData( eco, interval ):
     try:
@@ -47,32 +49,18 @@ def loadChangeImageData( eco, interval ):
         trlog = TrendsUtilities.trLogger()
         
         #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
 
         trlog.trwrite("Loading data for ecoregion " + str(eco.ecoNum) + " and interval " + interval)
 
-        #Make a query table from the database
-        #The table is the changeImage table, and
-        # only rows with the given ecoregion number, resolution, 
-        # and change interval are selected from ChangeImage for this table view
-        tableName = TrendsNames.dbLocation + "ChangeImage"
-        where_clause = "EcoLevel3ID = " + str(eco.ecoNum) + \
-                " and ChangePeriod = \'" + interval + "\'" + \
-                " and Resolution = \'" + eco.resolution + "\'"
-        sort_fields = "BlkLabel A"
-
-        #Step through all the rows and find the block numbers
-        # that are in the list of sample blocks
-        #For those blocks, get the filename and store in a dictionary
-        #  with the filename. format = {block:filename, block:filename, ...}
-        changeFiles = {}
-        rows = gp.SearchCursor( tableName, where_clause, "", "", sort_fields )
-        row = rows.Next()
-        while row:
-            if row.BlkLabel in eco.stratBlocks:
-                changeFiles[ row.BlkLabel ] = row.ImageLocation
-            row = rows.Next()
+        #Look up the images in the ChangeImage table catalog, which is read
+        # once per process.  Only images with the given ecoregion number, resolution,
+        # and change interval whose block numbers are in the list of sample blocks
+        # are returned, in a dictionary with the filename.
+        # format = {block:filename, block:filename, ...}
+        catalog = imageCatalog( gp, "ChangeImage" )
+        changeFiles = catalog.getImages( eco.ecoNum, interval, eco.resolution, eco.stratBlocks )
 
         if len( changeFiles ) > eco.sampleBlks:
             trlog.trwrite("Found " + str(len(changeFiles)) + " change files but expected only " + str(eco.sampleBlks))
@@ -82,19 +70,18 @@ def loadChangeImageData( eco, interval ):
         if (len( changeFiles ) < eco.sampleBlks) and (eco.runType == "Full stratified"):
             trlog.trwrite("WARNING: found only " + str(len(changeFiles)) + " images in the change image table")
             
-        #For each filename in the list, open its attribute table and read in the
-        # conversion number and count columns. Add this to the array
-        for block in changeFiles :
-            rows = gp.SearchCursor( changeFiles[ block ] )
-            row = rows.Next()
-            while row:
-                if row.Count > 0 and row.Value > 0 and row.Value <= eco.numCon:
-                    eco.ecoData[interval][0][ row.Value - 1, eco.column[ block ]] = int( row.Count )
-                row = rows.Next()
-        #For each block in the list of split blocks,
-        #  read the conversion numbers for each block from the table for this ecoregion and interval
-        #The split blocks have already been screened for interval and resolution
-        #  If there are blocks in the split list, then they are ready to load (TBD)
+        #Read the conversion number and count columns of the attribute table for
+        # every file in the list, then add each block's column to the array in one step.
+        # Blocks are placed by eco.column, so the result doesn't depend on read order.
+        #Intervals listed in pixelCountIntervals are counted from the raster pixels
+        tables = readBlockTables( gp, changeFiles,
+                                  fromPixels = interval in TrendsNames.pixelCountIntervals )
+        for block in sorted( tables ):
+            values, counts = tables[ block ]
+            valid = (counts > 0) & (values > 0) & (values <= eco.numCon)
+            eco.ecoData[interval][0][ values[valid] - 1, eco.column[ block ]] = counts[valid]
+        #The clipped counts for the blocks in the list of split blocks are
+        #  loaded for all intervals at once by loadSplitBlockData (SplitBlockData.py)
 
         #Send an acknowledgment back that there was data found for
         #  this interval at this resolution
@@ -102,7 +89,7 @@ def loadChangeImageData( eco, interval ):
         #  the value returned will be TRUE.  If they are both empty, FALSE is returned
         return (changeFiles or eco.splitBlocks)
     
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         trlog.trwrite(msgs)
@@ -116,11 +103,6 @@ def loadChangeImageData( eco, interval ):
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         trlog.trwrite(pymsg)
         raise
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
 
 
 def loadMultiChangeData( eco, multiInterval ):
@@ -131,54 +113,38 @@ def loadMultiChangeData( eco, multiInterval ):
                       " and interval " + multiInterval)
         
         #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
 
-        #Make a query from the database
-        #The table is the MultiChangeImage table, and
-        # only rows with the given ecoregion number and resolution 
-        # are selected from ChangeImage for this table view
-        tableName = TrendsNames.dbLocation + "MultiChangeImage"
-        where_clause = "EcoLevel3ID = " + str(eco.ecoNum) + \
-                " and ChangePeriod = \'" + multiInterval + "\'" + \
-                " and Resolution = \'" + eco.resolution + "\'"
-        sort_fields = "BlkLabel A"
-
-        #Step through all the rows and find the block numbers
-        # that are in the list of sample blocks
-        #For those blocks, get the filename and store in a dictionary
-        #  with the filename. format = {block:filename, block:filename, ...}
-        changeFiles = {}
-        rows = gp.SearchCursor( tableName, where_clause, "", "", sort_fields )
-        row = rows.Next()
-        while row:
-            if row.BlkLabel in eco.stratBlocks:
-                changeFiles[ row.BlkLabel ] = row.ImageLocation
-            row = rows.Next()
+        #Look up the images in the MultiChangeImage table catalog, which is read
+        # once per process.  Only images with the given ecoregion number, resolution,
+        # and interval whose block numbers are in the list of sample blocks
+        # are returned, in a dictionary with the filename.
+        # format = {block:filename, block:filename, ...}
+        catalog = imageCatalog( gp, "MultiChangeImage" )
+        changeFiles = catalog.getImages( eco.ecoNum, multiInterval, eco.resolution, eco.stratBlocks )
 
         #Find the number of change intervals for this interval
         changes = TrendsNames.MultiMap[ multiInterval ]
 
-        #For each filename in the list, open its attribute table and read in the
-        # multichange number and count columns. Add this to the array
-        for block in changeFiles :
-            rows = gp.SearchCursor( changeFiles[ block ] )
-            row = rows.Next()
-            while row:
-                if row.Count > 0 and row.Value >= 0 and row.Value <= changes:
-                    eco.ecoMulti[multiInterval][0][ row.Value, eco.column[ block ]] = int( row.Count )
-                row = rows.Next()
-        #For each block in the list of split blocks,
-        #  read the conversion numbers for each block from the table for this ecoregion and interval
-        #The split blocks have already been screened for interval and resolution
-        #  If there are blocks in the split list, then they are ready to load (TBD)
+        #Read the multichange number and count columns of the attribute table for
+        # every file in the list, then add each block's column to the array in one step.
+        # Blocks are placed by eco.column, so the result doesn't depend on read order.
+        tables = readBlockTables( gp, changeFiles,
+                                  fromPixels = multiInterval in TrendsNames.pixelCountIntervals )
+        for block in sorted( tables ):
+            values, counts = tables[ block ]
+            valid = (counts > 0) & (values >= 0) & (values <= changes)
+            eco.ecoMulti[multiInterval][0][ values[valid], eco.column[ block ]] = counts[valid]
+        #The clipped counts for the blocks in the list of split blocks are
+        #  loaded for all intervals at once by loadSplitBlockData (SplitBlockData.py)
 
         #Send an acknowledgment back that there was data found at this resolution
         # If changeFiles or eco.splitBlocks contain block numbers,
         #  the value returned will be TRUE.  If they are both empty, FALSE is returned
         return (changeFiles or eco.splitBlocks)
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         trlog.trwrite(msgs)
@@ -192,8 +158,3 @@ def loadMultiChangeData( eco, multiInterval ):
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         trlog.trwrite(pymsg)
         raise
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
@@ -0,0 +1,73 @@
+# File ChangeImageCatalog.py
+#
+# In-memory index of the ChangeImage and MultiChangeImage tables
+#
+# Each table is read once per process with a single cursor and stored as
+#  a dictionary keyed by (EcoLevel3ID, ChangePeriod, Resolution), with each
+#  entry holding {BlkLabel:ImageLocation} for that ecoregion, period and
+#  resolution.  Loaders ask the catalog for the images of a set of sample
+#  blocks instead of running a new query for every ecoregion and interval,
+#  which matters for batch jobs that analyze many boundaries in one process.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import sys, traceback
+from ..trendutil import TrendsNames, TrendsUtilities
+
+class imageCatalog:
+    #The indexes are shared by every catalog object in this process,
+    # format = { table name: { (eco, period, resolution): {block:filename, ...}, ...}, ...}
+    indexes = {}
+
+    def __init__( self, gp, tableName ):
+        try:
+            #Set up a log object
+            trlog = TrendsUtilities.trLogger()
+            self.tableName = TrendsNames.dbLocation + tableName
+            if self.tableName not in imageCatalog.indexes:
+                imageCatalog.indexes[ self.tableName ] = self.readTable( gp )
+            self.index = imageCatalog.indexes[ self.tableName ]
+        except TrendsUtilities.ExecuteError:
+            msgs = gp.GetMessage(0)
+            msgs += gp.GetMessages(2)
+            trlog.trwrite(msgs)
+            raise
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def readTable( self, gp ):
+        #Step through the whole table once and file every image under its key.
+        # Rows come back sorted by block, so if a block appears twice for the
+        # same key the later row wins, as it did with the per-interval queries.
+        index = {}
+        rows = gp.SearchCursor( self.tableName, "", "", "", "BlkLabel A" )
+        row = rows.Next()
+        while row:
+            key = ( int(row.EcoLevel3ID), str(row.ChangePeriod), str(row.Resolution) )
+            if key not in index:
+                index[ key ] = {}
+            index[ key ][ row.BlkLabel ] = row.ImageLocation
+            row = rows.Next()
+        del row, rows
+        return index
+
+    def getImages( self, ecoNum, interval, resolution, blocks ):
+        #Return {block:filename} for the given blocks that have an image
+        # for this ecoregion, interval and resolution
+        images = self.index.get( (int(ecoNum), str(interval), str(resolution)), {} )
+        wanted = set( blocks )
+        return dict( [ (block, images[ block ]) for block in images if block in wanted ] )
+
+    def refresh( self, gp ):
+        #Reread the table, e.g. after new images have been loaded into it
+        imageCatalog.indexes[ self.tableName ] = self.readTable( gp )
+        self.index = imageCatalog.indexes[ self.tableName ]
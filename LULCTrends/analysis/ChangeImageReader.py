@@ -0,0 +1,315 @@
+# File ChangeImageReader.py
+#
+# In:   the location of a change or multichange image (.img)
+# Out:  two integer numpy arrays, (values, counts), holding the
+#       raster attribute table of the image
+#
+# Reads the value and pixel count columns of a change image's raster
+#  attribute table without stepping through a geoprocessor cursor.
+#  The table is taken from the first source that is available:
+#       0) the persistent pixel count cache (see PixelCountCache.py), which
+#          keeps the attribute table and pixel counts of an image apart
+#       1) the .vat.dbf sidecar written next to the image when the
+#          attribute table is built, parsed directly as a dBASE file
+#       2) the attribute table stored inside the .img file, read through
+#          GDAL if the osgeo package is installed
+#       3) the geoprocessor SearchCursor on the image, as was always done
+#
+# Images without an attribute table, and intervals listed in
+#  TrendsNames.pixelCountIntervals, are counted directly from the raster
+#  band with numpy.bincount instead (computeValueCounts).  This needs GDAL.
+#  compareValueCounts checks an existing attribute table against the pixels.
+#
+# The returned arrays are used to fill a whole block column of the
+#  conversion or multichange array with a single indexed assignment.
+#  readBlockTables reads the tables for all blocks of an ecoregion and
+#  interval at once, using TrendsNames.loadThreads worker threads.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, sys, traceback, struct, threading, Queue
+import numpy
+from ..trendutil import TrendsNames, TrendsUtilities
+from .PixelCountCache import readCachedValueCounts, storeCachedValueCounts
+
+#GDAL is optional.  Without it, images that have no .vat.dbf sidecar
+# are read with the geoprocessor.
+try:
+    from osgeo import gdal
+except ImportError:
+    gdal = None
+
+#Number of raster rows to read at a time when counting pixels
+histogramChunkRows = 1024
+
+valueField = "VALUE"
+countField = "COUNT"
+
+def findSidecarTable( imageLocation ):
+    #Return the name of the dBASE attribute table for this image, or
+    # an empty string if there isn't one
+    for sidecar in (imageLocation + ".vat.dbf", os.path.splitext( imageLocation )[0] + ".vat.dbf"):
+        if os.path.isfile( sidecar ):
+            return sidecar
+    return ""
+
+def readDBFValueCounts( tableName ):
+    #Parse a dBASE III table and pull out the VALUE and COUNT columns.
+    # The records are fixed width, so the whole record block is viewed as a
+    # numpy record array and each column is converted in one step.
+    dbfFile = open( tableName, 'rb' )
+    try:
+        header = dbfFile.read( 32 )
+        numRecords, headerLen, recordLen = struct.unpack( '<xxxxLHH20x', header )
+
+        #Field descriptors are 32 bytes each and end with a 0x0D byte.
+        # The first byte of every record is the deletion flag.
+        names = ['deleted']
+        formats = ['S1']
+        descriptors = dbfFile.read( headerLen - 32 )
+        for start in range( 0, len( descriptors ) - 1, 32 ):
+            if descriptors[ start:start+1 ] == '\r':
+                break
+            fieldName = descriptors[ start:start+11 ].split( '\0' )[0].strip().upper()
+            fieldLen = ord( descriptors[ start+16 ] )
+            names.append( fieldName )
+            formats.append( 'S' + str( fieldLen ))
+
+        dbfFile.seek( headerLen )
+        records = dbfFile.read( numRecords * recordLen )
+    finally:
+        dbfFile.close()
+
+    if not (valueField in names and countField in names):
+        raise TrendsUtilities.TrendsErrors( "No VALUE and COUNT fields in attribute table " + tableName )
+
+    recordType = numpy.dtype({ 'names':names, 'formats':formats })
+    if recordType.itemsize != recordLen:
+        raise TrendsUtilities.TrendsErrors( "Unexpected record length in attribute table " + tableName )
+    table = numpy.frombuffer( records, dtype=recordType, count=numRecords )
+    table = table[ table['deleted'] != '*' ]
+
+    values = table[ valueField ].astype( float ).astype( int )
+    counts = table[ countField ].astype( float ).astype( int )
+    return values, counts
+
+def readGDALValueCounts( imageLocation ):
+    #Read the attribute table stored in the .img file itself.  Returns None
+    # if GDAL is not installed or the image has no attribute table.
+    if gdal is None:
+        return None
+    dataset = gdal.Open( imageLocation )
+    if dataset is None:
+        return None
+    rat = dataset.GetRasterBand( 1 ).GetDefaultRAT()
+    if rat is None:
+        return None
+    valueCol = -1
+    countCol = -1
+    for col in range( rat.GetColumnCount() ):
+        if rat.GetNameOfCol( col ).upper() == valueField or rat.GetUsageOfCol( col ) == gdal.GFU_MinMax:
+            valueCol = col
+        elif rat.GetNameOfCol( col ).upper() == countField or rat.GetUsageOfCol( col ) == gdal.GFU_PixelCount:
+            countCol = col
+    if countCol < 0:
+        return None
+    numRows = rat.GetRowCount()
+    counts = numpy.array( [ rat.GetValueAsDouble( row, countCol ) for row in range( numRows ) ] ).astype( int )
+    if valueCol >= 0:
+        values = numpy.array( [ rat.GetValueAsInt( row, valueCol ) for row in range( numRows ) ] )
+    else:
+        #Thematic .img tables are indexed directly by pixel value
+        values = numpy.arange( numRows )
+    return values, counts
+
+def computeValueCounts( imageLocation ):
+    #Count the pixels of each value directly from the raster band, for images
+    # whose attribute table is missing or can't be trusted.  The band is read
+    # in strips of whole raster blocks so memory stays bounded, and each strip
+    # is counted with numpy.bincount.  Zero is counted like any other value
+    # and is screened out by the caller, as with the attribute tables.
+    if gdal is None:
+        raise TrendsUtilities.TrendsErrors( "GDAL is needed to count pixels in " + imageLocation )
+    dataset = gdal.Open( imageLocation )
+    if dataset is None:
+        raise TrendsUtilities.TrendsErrors( "Unable to open change image " + imageLocation )
+    band = dataset.GetRasterBand( 1 )
+    noData = band.GetNoDataValue()
+    blockRows = band.GetBlockSize()[1]
+    stripRows = max( blockRows, (histogramChunkRows // blockRows) * blockRows )
+    totals = numpy.zeros( 0, int )
+    for startRow in range( 0, dataset.RasterYSize, stripRows ):
+        numRows = min( stripRows, dataset.RasterYSize - startRow )
+        strip = band.ReadAsArray( 0, startRow, dataset.RasterXSize, numRows ).ravel()
+        if noData is not None:
+            strip = strip[ strip != noData ]
+        if strip.size == 0:
+            continue
+        if strip.min() < 0:
+            raise TrendsUtilities.TrendsErrors( "Negative pixel values found in " + imageLocation )
+        stripCounts = numpy.bincount( strip.astype( int ))
+        if len( stripCounts ) > len( totals ):
+            stripCounts[ :len( totals ) ] += totals
+            totals = stripCounts
+        else:
+            totals[ :len( stripCounts ) ] += stripCounts
+    values = numpy.nonzero( totals )[0]
+    return values, totals[ values ]
+
+def compareValueCounts( imageLocation ):
+    #Check an image's attribute table against its true pixel counts.
+    # Returns a list of (value, table count, pixel count) for every value
+    # where they differ, so an empty list means the table is correct.
+    sidecar = findSidecarTable( imageLocation )
+    if sidecar:
+        table = readDBFValueCounts( sidecar )
+    else:
+        table = readGDALValueCounts( imageLocation )
+    if table is None:
+        table = ( numpy.zeros( 0, int ), numpy.zeros( 0, int ))
+    pixels = computeValueCounts( imageLocation )
+
+    size = max( [ 0 ] + [ int(x.max()) + 1 for x in (table[0], pixels[0]) if len( x ) ] )
+    tableCounts = numpy.zeros( size, int )
+    pixelCounts = numpy.zeros( size, int )
+    tableCounts[ table[0] ] = table[1]
+    pixelCounts[ pixels[0] ] = pixels[1]
+    return [ (value, tableCounts[value], pixelCounts[value])
+             for value in numpy.nonzero( tableCounts != pixelCounts )[0] ]
+
+def readCursorValueCounts( gp, imageLocation ):
+    #The original geoprocessor path, used when no faster reader applies
+    values = []
+    counts = []
+    rows = gp.SearchCursor( imageLocation )
+    row = rows.Next()
+    while row:
+        values.append( row.Value )
+        counts.append( row.Count )
+        row = rows.Next()
+    del row, rows
+    return numpy.array( values, int ), numpy.array( counts, int )
+
+def readNativeValueCounts( imageLocation, fromPixels = False ):
+    #Read the table without the geoprocessor.  Returns None if neither the
+    # pixel count cache, the sidecar nor GDAL can supply it.  When fromPixels
+    # is set, or the image has no attribute table at all, the counts are taken
+    # from the raster band itself.  This is safe to call from worker threads.
+    if fromPixels:
+        source = "pixels"
+    else:
+        source = "table"
+    result = readCachedValueCounts( imageLocation, source )
+    if result is not None:
+        return result
+    sidecar = findSidecarTable( imageLocation )
+    if fromPixels:
+        result = computeValueCounts( imageLocation )
+    elif sidecar:
+        result = readDBFValueCounts( sidecar )
+    else:
+        result = readGDALValueCounts( imageLocation )
+        if result is None and gdal is not None:
+            #No attribute table, so the counts are the band's own and are cached as such
+            source = "pixels"
+            result = readCachedValueCounts( imageLocation, source )
+            if result is not None:
+                return result
+            TrendsUtilities.trLogger().trwrite( "No attribute table for " + imageLocation + \
+                                                ", counting its pixels" )
+            result = computeValueCounts( imageLocation )
+    if result is not None:
+        storeCachedValueCounts( imageLocation, result[0], result[1], source )
+    return result
+
+def readValueCounts( gp, imageLocation, fromPixels = False ):
+    try:
+        #Set up a log object
+        trlog = TrendsUtilities.trLogger()
+
+        result = readNativeValueCounts( imageLocation, fromPixels )
+        if result is not None:
+            return result
+
+        values, counts = readCursorValueCounts( gp, imageLocation )
+        storeCachedValueCounts( imageLocation, values, counts, "table" )
+        return values, counts
+
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise
+
+def readBlockTables( gp, changeFiles, numThreads = None, fromPixels = False ):
+    #
+    # In:   gp - geoprocessor, used only for images that need the cursor fallback
+    #       changeFiles - dictionary of {block:image location}
+    #       numThreads - number of worker threads, defaults to TrendsNames.loadThreads
+    #       fromPixels - count the raster pixels instead of reading the attribute tables
+    # Out:  dictionary of {block:(values, counts)}
+    #
+    # The attribute tables of all blocks are independent reads against the
+    #  image share, so they are fetched by a pool of worker threads to overlap
+    #  the network latency.  The geoprocessor is not shared across threads, so
+    #  any image that can only be read with a cursor is left for the calling
+    #  thread to read after the pool finishes.
+    try:
+        #Set up a log object
+        trlog = TrendsUtilities.trLogger()
+        if numThreads is None:
+            numThreads = TrendsNames.loadThreads
+        blocks = sorted( changeFiles )
+        tables = {}
+
+        if numThreads > 1 and len( blocks ) > 1:
+            work = Queue.Queue()
+            for block in blocks:
+                work.put( block )
+            errors = []
+
+            def worker():
+                while True:
+                    try:
+                        block = work.get_nowait()
+                    except Queue.Empty:
+                        return
+                    try:
+                        tables[ block ] = readNativeValueCounts( changeFiles[ block ], fromPixels )
+                    except Exception:
+                        errors.append( traceback.format_exc() )
+                        return
+
+            threads = [ threading.Thread( target=worker ) for x in range( min( numThreads, len( blocks ))) ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            if errors:
+                raise TrendsUtilities.TrendsErrors( "Unable to read block attribute tables:\n" + errors[0] )
+
+        #Anything the pool didn't handle (or everything, when running serially)
+        # is read here with the full reader
+        for block in blocks:
+            if tables.get( block ) is None:
+                tables[ block ] = readValueCounts( gp, changeFiles[ block ], fromPixels )
+        return tables
+
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise
@@ -7,9 +7,12 @@
 # Out:  lists of ecoregions and sample blocks in study area
 #       shapefiles in result folder
 #
-# Note: the splits list was initially meant for blocks that were
-#       split by custom boundary, but only stratified analysis is
-#       currently used.
+# Note: the splits list holds the sample blocks that are crossed by
+#       the custom boundary.  It is only filled when clipBlocks is set
+#       (defaults to TrendsNames.clipSplitBlocks); otherwise all blocks are
+#       used whole (stratified analysis).  Split blocks are clipped to the
+#       boundary when their data is loaded, so the same boundary must be
+#       passed on to testStudyAreaStats.
 #
 #
 # Release date:    Mar 2012
@@ -21,13 +24,15 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
-import arcgisscripting, os, sys, traceback
-from ..trendutil import TrendsNames
+import os, sys, traceback
+from ..trendutil import TrendsNames, TrendsUtilities
 
-def accessCustomData( custom_boundary, resolution, nameForFile, outFolder ):
+def accessCustomData( custom_boundary, resolution, nameForFile, outFolder, clipBlocks = None ):
     try:
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverWriteOutput = True
+        if clipBlocks is None:
+            clipBlocks = TrendsNames.clipSplitBlocks
         #Go through the block shapefiles attribute table and pick
         #  up the ecoregion numbers used in this analysis,
         #  Initialize a dictionary with eco# as the key and a
@@ -123,6 +128,20 @@ def accessCustomData( custom_boundary, resolution, nameForFile, outFolder ):
         gp.MakeFeatureLayer_management( new10kland, lyrfile10k )
         gp.MakeFeatureLayer_management( new20kland, lyrfile20k )
         
+        #If the blocks are to be clipped, find the sample blocks crossed by the
+        # boundary line.  These go in the splits list instead of the sample list.
+        crossed = set()
+        if clipBlocks:
+            lyrcross = 'lyrcross'
+            gp.MakeFeatureLayer_management( TrendsNames.dbLocation + "samples_all_us", lyrcross )
+            gp.SelectLayerByLocation_management( lyrcross, 'CROSSED_BY_THE_OUTLINE_OF', custom_boundary )
+            rows = gp.SearchCursor( lyrcross )
+            row = rows.Next()
+            while row:
+                crossed.add( ('10K', int(row.ECOREG_10K), int(row.SAMPLE_10K)) )
+                crossed.add( ('20K', int(row.ECOREG_20K), int(row.SAMPLE_10K)) )
+                row = rows.Next()
+
         logfile = False
         try:
             logfile = open( os.path.join( outFolder, "ecoregions_totals_samples.txt"), 'w')
@@ -139,16 +158,29 @@ def accessCustomData( custom_boundary, resolution, nameForFile, outFolder ):
                     sampleblocks[ eco ].append( row.SampleBlock )
                 row = rows.Next()
 
+            if clipBlocks:
+                if eco in TrendsNames.Ecos_20k:
+                    blockType = '20K'
+                else:
+                    blockType = '10K'
+                splits[ eco ] = [ block for block in sampleblocks[ eco ] if (blockType, eco, block) in crossed ]
+                sampleblocks[ eco ] = [ block for block in sampleblocks[ eco ] if block not in splits[ eco ] ]
+            else:
+                splits[ eco ] = []
+
             msg = "Ecoregion " + str(eco) + ": Total blocks = " + str(len(totalblocks[eco])) + \
-                          "  Sample blocks = " + str(len(sampleblocks[eco]))
+                          "  Sample blocks = " + str(len(sampleblocks[eco]) + len(splits[eco]))
+            if splits[ eco ]:
+                msg += "  Split blocks = " + str(len(splits[eco]))
             gp.AddMessage(msg)
             if logfile:
                 logfile.write( msg + "\n" )
 
             #Make selections of all total blocks whose ecoregions contain at least
             # one sample block and then copy these into the resulting shapefile.
-            if len( sampleblocks[eco]) > 0:
-                ecoregions[ eco ] = (len(totalblocks[eco]), len(sampleblocks[eco]), resolution, "Partial stratified")
+            if len( sampleblocks[eco]) + len( splits[eco]) > 0:
+                ecoregions[ eco ] = (len(totalblocks[eco]), len(sampleblocks[eco]) + len(splits[eco]),
+                                     resolution, "Partial stratified")
                 if eco in TrendsNames.Ecos_20k:
                     where_block = "ECOREG = " + str( eco )
                     gp.SelectLayerByAttribute_management( lyrfile20k,"ADD_TO_SELECTION",where_block )
@@ -157,6 +189,7 @@ def accessCustomData( custom_boundary, resolution, nameForFile, outFolder ):
                     gp.SelectLayerByAttribute_management( lyrfile10k,"ADD_TO_SELECTION",where_block )
             else:
                 del sampleblocks[eco]
+                del splits[eco]
 
         #only create the output total block file(s) if there's any total blocks in the study area
         count10k = gp.GetCount_management( lyrfile10k )
@@ -173,7 +206,7 @@ def accessCustomData( custom_boundary, resolution, nameForFile, outFolder ):
             lyrsamples = 'lyrsamp'
             gp.MakeFeatureLayer_management( All_samples, lyrsamples )
             for eco in sampleblocks:
-                for block in sampleblocks[eco]:
+                for block in sampleblocks[eco] + splits[eco]:
                     if eco in TrendsNames.Ecos_20k:
                         where_block = "SAMPLE_10K = " + str( block ) + " and ECOREG_20K = " + str(eco) 
                         gp.SelectLayerByAttribute_management( lyrsamples,"ADD_TO_SELECTION",where_block )
@@ -194,7 +227,7 @@ def accessCustomData( custom_boundary, resolution, nameForFile, outFolder ):
 
         return ecoregions, sampleblocks, splits
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddMessage(msgs)
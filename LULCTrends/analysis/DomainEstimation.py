@@ -0,0 +1,210 @@
+# File DomainEstimation.py
+#
+# Partial stratified statistics for many custom boundaries (domains) of one
+#  ecoregion at once
+#
+# The estimate for a custom boundary only uses the ecoregion's sample blocks
+#  inside it, so each boundary is a subset of the block columns of the
+#  ecoregion's data arrays.  With a membership matrix holding a row for each
+#  boundary and a column for each block (1 where the block is in the boundary),
+#  the block count, sum and sum of squares of every boundary are sparse matrix
+#  products with the block data, and the mean, sample variance, estimated
+#  change and variance, and confidence bounds follow for all boundaries
+#  together (basicStatistics.momentStats).  The data can be a whole interval
+#  cube (interval x row x block), so every boundary, interval and row is
+#  calculated in a handful of array operations.
+#
+#       engine = domainEngine( eco, domains, totalBlocks )
+#           eco - an EcoStats object with its change data loaded for (at least)
+#                 all the blocks used by the domains, e.g. from BlockStore
+#           domains - { name: [ sample blocks ], ...} as accessCustomData returns
+#                 them for each boundary
+#           totalBlocks - { name: N, ...} the total blocks of the ecoregion in
+#                 each boundary
+#       intervals, stats = engine.estimateCube( eco.ecoData )
+#           stats[ domain, interval, row, statistic ], domains in engine.names order
+#       stats = engine.estimate( data ) - any array whose last axis is the block
+#
+#  Every interval of the cube is estimated for every domain, so a domain
+#  whose blocks have no images for an interval gets statistics of zero data
+#  there; BlockStore.ecoregion drops such intervals for a single boundary.
+#  buildBatchStudyAreaStats (testStudyAreaStats) runs the engine once for all
+#  the boundaries of a batch that share an ecoregion.
+#
+# The membership matrix is sparse, so its size grows with the blocks the
+#  boundaries hold rather than boundaries x blocks: a scipy.sparse matrix
+#  where scipy is installed, otherwise a blockMembership, which keeps the
+#  block columns of each boundary and sums the gathered columns per
+#  boundary.  Any matrix with sum and dot methods, a dense numpy one too,
+#  can be used with domainMoments and domainStats.  The sums of squares are taken about each row's mean over
+#  all the blocks, so the variances keep their precision for large pixel
+#  counts.  tests/benchDomainEstimation.py times the engine against one
+#  statsKernel call per boundary.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import sys, traceback
+import numpy
+from ..trendutil import TrendsUtilities
+from ..trendutil.StudentT import studentTValues
+from .basicStatistics import momentStats
+
+#scipy's sparse matrix products are used where scipy is installed
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+class blockMembership:
+    #A sparse (domain, block) matrix of 0's and 1's, kept as the block columns
+    # of each domain one after the other
+
+    def __init__( self, columns, sizes, numBlocks ):
+        self.columns = numpy.asarray( columns, int )
+        self.sizes = numpy.asarray( sizes, int )
+        self.shape = ( len( self.sizes ), numBlocks )
+        #Start of each domain's columns, for the domains with any blocks
+        starts = numpy.concatenate(( [0], numpy.cumsum( self.sizes )[:-1] ))
+        self.filled = self.sizes > 0
+        self.starts = starts[ self.filled ]
+
+    def sum( self, axis = 1 ):
+        #Block count of each domain
+        return self.sizes.astype( float )
+
+    def dot( self, values ):
+        #membership x values, for values with a row per block
+        values = numpy.asarray( values, float )
+        result = numpy.zeros(( self.shape[0], ) + values.shape[1:], float)
+        if len( self.starts ) > 0:
+            result[ self.filled ] = numpy.add.reduceat( values[ self.columns ], self.starts, axis=0 )
+        return result
+
+    def toarray( self ):
+        matrix = numpy.zeros( self.shape, float)
+        matrix[ numpy.repeat( numpy.arange( self.shape[0] ), self.sizes ), self.columns ] = 1.0
+        return matrix
+
+def membershipMatrix( domains, column ):
+    #The membership of each domain's sample blocks, with the blocks placed by
+    # column, i.e. eco.column = { block: array column }
+    columns = []
+    sizes = []
+    for blocks in domains:
+        for block in blocks:
+            if block not in column:
+                raise TrendsUtilities.TrendsErrors("Sample block " + str(block) + \
+                                                   " was not loaded for the domain estimates")
+        domainColumns = sorted( set([ column[ block ] for block in blocks ]))
+        columns.extend( domainColumns )
+        sizes.append( len( domainColumns ))
+    if sparse is not None:
+        pointers = numpy.concatenate(( [0], numpy.cumsum( sizes ))).astype( int )
+        return sparse.csr_matrix(( numpy.ones( len( columns ), float ), numpy.asarray( columns, int ), pointers ),
+                                 shape = ( len( domains ), len( column )))
+    return blockMembership( columns, sizes, len( column ))
+
+def domainMoments( membership, data ):
+    #
+    # In:   membership - (domain, block) matrix
+    #       data - data array whose last axis is the block
+    # Out:  sample block count (domain,), and the mean and sample variance
+    #       (ddof=1) arrays of shape (domain,) + data.shape[:-1]
+    #
+    # Domains with no blocks get a mean and variance of 0.0, and domains with one
+    #  block a variance of 0.0, as for a custom ecoregion with n = 1.
+    data = numpy.asarray( data, float )
+    lead = data.shape[:-1]
+    numBlocks = data.shape[-1]
+    sampleBlks = numpy.asarray( membership.sum( axis=1 ), float ).ravel()
+
+    #Center each row on its mean over all the blocks before squaring
+    centered = data - numpy.mean( data, axis=-1 )[..., numpy.newaxis]
+    blockFirst = centered.reshape( -1, numBlocks ).T
+    sums = numpy.asarray( membership.dot( blockFirst ), float )
+    squares = numpy.asarray( membership.dot( blockFirst**2 ), float )
+
+    counts = numpy.maximum( sampleBlks, 1.0 )[:, numpy.newaxis]
+    centeredMean = sums / counts
+    sSquared = ( squares - sums * centeredMean ) / numpy.maximum( counts - 1.0, 1.0 )
+    sSquared[ sampleBlks < 2 ] = 0.0
+    sSquared = numpy.maximum( sSquared, 0.0 )
+
+    shift = numpy.mean( data, axis=-1 ).reshape( 1, -1 )
+    mean = centeredMean + shift
+    mean[ sampleBlks < 1 ] = 0.0
+    shape = ( len( sampleBlks ), ) + lead
+    return sampleBlks, mean.reshape( shape ), sSquared.reshape( shape )
+
+def domainStats( membership, data, totalBlks, totalEstPixels, studentT ):
+    #
+    # In:   membership - (domain, block) matrix
+    #       data - data array whose last axis is the block, e.g. (interval, row, block)
+    #       totalBlks, totalEstPixels - (domain,) arrays of N and the total estimated pixels
+    #       studentT - (domain, 4) array of t values
+    # Out:  statistics array of shape (domain,) + data.shape[:-1] + (statistic,)
+    sampleBlks, mean, sSquared = domainMoments( membership, data )
+    #Shape the per domain values to broadcast over the other axes
+    spread = ( len( sampleBlks ), ) + ( 1, ) * ( mean.ndim - 1 )
+    return momentStats( mean, sSquared,
+                        numpy.asarray( totalBlks, float ).reshape( spread ),
+                        numpy.maximum( sampleBlks, 1.0 ).reshape( spread ),
+                        numpy.asarray( totalEstPixels, float ).reshape( spread ),
+                        numpy.asarray( studentT, float ).reshape( spread + ( 4, )) )
+
+class domainEngine:
+
+    def __init__( self, eco, domains, totalBlocks ):
+        try:
+            trlog = TrendsUtilities.trLogger()
+            self.names = sorted( domains )
+            self.membership = membershipMatrix( [ domains[ name ] for name in self.names ], eco.column )
+            self.sampleBlks = numpy.asarray( self.membership.sum( axis=1 ), float ).ravel()
+            self.totalBlks = numpy.asarray( [ totalBlocks[ name ] for name in self.names ], float )
+            if numpy.any( self.totalBlks <= 0 ):
+                raise TrendsUtilities.TrendsErrors("Invalid total block counts, domain statistics aborted for ecoregion " + \
+                                                   str(eco.ecoNum))
+
+            #t values for each domain's degrees of freedom, with the same stand-in
+            # as EcoStats when there is only one sample block
+            self.studentT = numpy.zeros(( len( self.names ), 4 ), float)
+            for ptr in range( len( self.names )):
+                if self.sampleBlks[ ptr ] > 1:
+                    self.studentT[ ptr ] = studentTValues( int( self.sampleBlks[ ptr ]) - 1 )
+                else:
+                    self.studentT[ ptr ] = -9999.99
+
+            #Total estimated pixels of each domain from the first interval's conversion
+            # data, as findTotalEstimatedPixels does for an ecoregion
+            firstInterval = TrendsUtilities.getFirstInterval( eco )
+            blockTotals = numpy.sum( eco.ecoData[ firstInterval ][0], axis=0 )
+            self.totalEstPixels = numpy.asarray( self.membership.dot( blockTotals ), float ).ravel() * \
+                                  ( self.totalBlks / numpy.maximum( self.sampleBlks, 1.0 ))
+            trlog.trwrite("Domain estimates set up for " + str(len( self.names )) + \
+                          " boundaries in ecoregion " + str(eco.ecoNum))
+
+        except TrendsUtilities.TrendsErrors, Terr:
+            trlog.trwrite( Terr.message )
+            raise
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def estimate( self, data, totalEstPixels = None ):
+        #Statistics for every domain, shape (domain,) + data.shape[:-1] + (statistic,)
+        if totalEstPixels is None:
+            totalEstPixels = self.totalEstPixels
+        return domainStats( self.membership, data, self.totalBlks, totalEstPixels, self.studentT )
+
+    def estimateCube( self, cube ):
+        #Statistics for every valid interval (or year) of an intervalCube
+        intervals = cube.keys()
+        return intervals, self.estimate( cube.stack( intervals ))
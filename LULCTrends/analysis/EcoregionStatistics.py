@@ -14,7 +14,7 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 #Import modules
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time
 from ..trendutil import TrendsNames, TrendsUtilities
 from ..database import databaseWriteClass
@@ -74,7 +74,7 @@ def calculateEcoStatistics( eco, interval ):
 
 def storeEcoStatistics( eco, interval, analysisNum ):
     try:
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
         #Set up a log object
         trlog = TrendsUtilities.trLogger()        
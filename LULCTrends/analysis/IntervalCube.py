@@ -0,0 +1,85 @@
+# File IntervalCube.py
+#
+# Contiguous storage for the per-interval (data array, stats array) pairs
+#  of an ecoregion, such as the conversion, composition and multichange
+#  arrays.
+#
+# All the data arrays live in one 3-D integer array (interval x row x block)
+#  and all the statistics arrays in one 3-D float array (interval x row x
+#  statistic).  The intervals (or years) are kept sorted and mapped to their
+#  position along the first axis, and a validity mask marks the intervals
+#  that still hold data.  The cube behaves like the dictionary it replaces:
+#       cube[ interval ] - (data array, stats array) views into the cube, so
+#                          cube[ interval ][0][ row, column ] = x writes through
+#       del cube[ interval ] - marks the interval as having no data
+#       for interval in cube, cube.keys(), len( cube ), interval in cube -
+#                          only the valid intervals
+#  stack( intervals ) returns the data arrays for a list of intervals as one
+#  3-D array, so sums across intervals are a single reduction over axis 0,
+#  and stackStats( intervals ) does the same for the statistics arrays.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import numpy
+
+class intervalCube:
+    def __init__( self, intervals, numRows, numBlocks, numStats ):
+        self.intervals = sorted( intervals )
+        self.position = dict( zip( self.intervals, range( len( self.intervals ))))
+        self.data = numpy.zeros(( len( self.intervals ), numRows, numBlocks ), int)
+        self.stats = numpy.zeros(( len( self.intervals ), numRows, numStats ), float)
+        self.valid = numpy.ones( len( self.intervals ), bool )
+
+    def getPosition( self, interval ):
+        #Position of a valid interval along the first axis
+        if interval not in self.position or not self.valid[ self.position[ interval ]]:
+            raise KeyError( interval )
+        return self.position[ interval ]
+
+    def __getitem__( self, interval ):
+        ptr = self.getPosition( interval )
+        return ( self.data[ ptr ], self.stats[ ptr ] )
+
+    def __setitem__( self, interval, arrays ):
+        #Only intervals the cube was built with can be set
+        ptr = self.position[ interval ]
+        self.data[ ptr ] = arrays[0]
+        self.stats[ ptr ] = arrays[1]
+        self.valid[ ptr ] = True
+
+    def __delitem__( self, interval ):
+        self.valid[ self.getPosition( interval ) ] = False
+
+    def __contains__( self, interval ):
+        return interval in self.position and bool( self.valid[ self.position[ interval ]] )
+
+    def has_key( self, interval ):
+        return interval in self
+
+    def keys( self ):
+        return [ interval for interval in self.intervals if self.valid[ self.position[ interval ]] ]
+
+    def __iter__( self ):
+        return iter( self.keys() )
+
+    def __len__( self ):
+        return int( numpy.sum( self.valid ))
+
+    def items( self ):
+        return [ ( interval, self[ interval ] ) for interval in self.keys() ]
+
+    def values( self ):
+        return [ self[ interval ] for interval in self.keys() ]
+
+    def stack( self, intervals ):
+        #Data arrays of the given intervals as one (interval, row, block) array
+        return self.data[ [ self.getPosition( interval ) for interval in intervals ] ]
+
+    def stackStats( self, intervals ):
+        #Statistics arrays of the given intervals as one (interval, row, statistic) array
+        return self.stats[ [ self.getPosition( interval ) for interval in intervals ] ]
@@ -0,0 +1,109 @@
+# File PixelCountCache.py
+#
+# Persistent cache of the (values, counts) attribute tables read from the
+#  change and multichange images.
+#
+# The images almost never change, so once a table has been read it is saved
+#  as a small .npz file in TrendsNames.pixelCountCache.  The cache file name
+#  is a hash of the image location and of the source of the counts, either
+#  "table" for the attribute table or "pixels" for counts taken from the
+#  raster band, so counts from one source are never served for the other.
+#  The file also holds the source and a stamp made from the size and
+#  modification time of the image and of its .vat.dbf sidecar.  When the
+#  stamp no longer matches, the entry is ignored and rewritten on the next
+#  read, so rebuilt images or attribute tables are picked up automatically.
+#  Files are written under a temporary name and then renamed, so several
+#  processes can share one cache folder.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, sys, traceback, tempfile
+import numpy
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
+from ..trendutil import TrendsNames, TrendsUtilities
+
+def getCacheFolder():
+    #Return the cache folder, creating it if needed.  An empty string turns
+    # the cache off, either by setting or because the folder can't be made.
+    folder = TrendsNames.pixelCountCache
+    if folder and not os.path.isdir( folder ):
+        try:
+            os.makedirs( folder )
+        except OSError:
+            if not os.path.isdir( folder ):
+                folder = ""
+    return folder
+
+def getCacheName( folder, imageLocation, source ):
+    key = os.path.normcase( os.path.normpath( imageLocation )) + "|" + source
+    return os.path.join( folder, md5( key ).hexdigest() + ".npz" )
+
+def getImageStamp( imageLocation ):
+    #Size and modification time of the image and of its attribute table sidecar
+    stamp = []
+    for name in (imageLocation, imageLocation + ".vat.dbf",
+                 os.path.splitext( imageLocation )[0] + ".vat.dbf"):
+        try:
+            info = os.stat( name )
+            stamp.extend( [ info.st_size, info.st_mtime ] )
+        except OSError:
+            stamp.extend( [ -1, -1 ] )
+    return numpy.array( stamp, float )
+
+def readCachedValueCounts( imageLocation, source ):
+    #Return the cached (values, counts) for this image and source, or None if
+    # there is no entry or the image has changed since the entry was written
+    try:
+        folder = getCacheFolder()
+        if not folder:
+            return None
+        cacheName = getCacheName( folder, imageLocation, source )
+        if not os.path.isfile( cacheName ):
+            return None
+        cached = numpy.load( cacheName )
+        try:
+            if str( cached['source'] ) != source:
+                return None
+            if not numpy.array_equal( cached['stamp'], getImageStamp( imageLocation )):
+                return None
+            return cached['values'], cached['counts']
+        finally:
+            cached.close()
+    except Exception:
+        #A damaged or half-written entry is treated as a miss
+        return None
+
+def storeCachedValueCounts( imageLocation, values, counts, source ):
+    try:
+        folder = getCacheFolder()
+        if not folder:
+            return
+        cacheName = getCacheName( folder, imageLocation, source )
+        handle, tempName = tempfile.mkstemp( suffix=".npz", dir=folder )
+        tempFile = os.fdopen( handle, 'wb' )
+        try:
+            numpy.savez( tempFile, values=values, counts=counts, source=numpy.array( source ),
+                         stamp=getImageStamp( imageLocation ))
+        finally:
+            tempFile.close()
+        #Windows won't rename over an existing file
+        if os.path.exists( cacheName ):
+            os.remove( cacheName )
+        os.rename( tempName, cacheName )
+    except Exception:
+        #Another process may have written the same entry first, and a cache
+        # write failure shouldn't stop an analysis, so just log and go on
+        trlog = TrendsUtilities.trLogger()
+        trlog.trwrite( "Unable to cache pixel counts for " + imageLocation + ": " + str(sys.exc_value) )
+        try:
+            os.remove( tempName )
+        except Exception:
+            pass
@@ -0,0 +1,141 @@
+# File SplitBlockData.py
+#
+# In:   the ecoregion object to load data into
+# Out:  the split block columns of the conversion and multichange arrays
+#
+# Loads clipped pixel counts for sample blocks that straddle the custom
+#  study region boundary (eco.splitBlocks).  For each split block, the
+#  boundary in eco.boundary is rasterized onto the grid of the block's
+#  change images to make a mask of the pixels inside the study region.
+#  The images for every change and multichange interval of the block are
+#  then read in turn, and only the masked pixels are counted with
+#  numpy.bincount.  Blocks are handled one at a time, so only one block's
+#  images are held in memory no matter how large the boundary is.
+#
+#  Needs GDAL/OGR to read the images and rasterize the boundary.  A boundary
+#  OGR can't open, such as the in_memory selections of the batch tools or a
+#  geodatabase feature class, is first copied through the geoprocessor to a
+#  shapefile in a temporary folder, which is removed once the split blocks
+#  are loaded.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, sys, traceback, tempfile, shutil
+import numpy
+from ..trendutil import TrendsNames, TrendsUtilities
+from .ChangeImageCatalog import imageCatalog
+
+try:
+    from osgeo import gdal, ogr
+except ImportError:
+    gdal = None
+    ogr = None
+
+def rasterizeBoundary( boundaryLayer, dataset ):
+    #Burn the boundary polygons into an in-memory raster that matches the
+    # image grid.  Pixels whose centers fall inside the boundary are set.
+    memDriver = gdal.GetDriverByName( 'MEM' )
+    maskSet = memDriver.Create( '', dataset.RasterXSize, dataset.RasterYSize, 1, gdal.GDT_Byte )
+    maskSet.SetGeoTransform( dataset.GetGeoTransform() )
+    maskSet.SetProjection( dataset.GetProjection() )
+    gdal.RasterizeLayer( maskSet, [1], boundaryLayer, burn_values=[1] )
+    return maskSet.GetRasterBand( 1 ).ReadAsArray() > 0
+
+def countMaskedPixels( imageLocation, boundaryLayer, masks, numValues ):
+    #Count the pixels of each value inside the boundary for one image.
+    # Masks are kept by grid, so images of a block that share a grid
+    # only rasterize the boundary once.
+    dataset = gdal.Open( imageLocation )
+    if dataset is None:
+        raise TrendsUtilities.TrendsErrors( "Unable to open change image " + imageLocation )
+    grid = ( dataset.RasterXSize, dataset.RasterYSize, tuple( dataset.GetGeoTransform() ))
+    if grid not in masks:
+        masks[ grid ] = rasterizeBoundary( boundaryLayer, dataset )
+    pixels = dataset.GetRasterBand( 1 ).ReadAsArray()[ masks[ grid ] ].astype( int )
+    pixels = pixels[ (pixels >= 0) & (pixels < numValues) ]
+    return numpy.bincount( pixels, minlength = numValues )
+
+def openBoundary( gp, boundary ):
+    #The boundary as an OGR data source, and the temporary folder of its
+    # shapefile copy (None if OGR opened the boundary itself)
+    boundarySource = ogr.Open( boundary )
+    if boundarySource is not None:
+        return boundarySource, None
+    folder = tempfile.mkdtemp( prefix="trendsBoundary" )
+    try:
+        shapefile = os.path.join( folder, "boundary.shp" )
+        gp.CopyFeatures_management( boundary, shapefile )
+        boundarySource = ogr.Open( shapefile )
+        if boundarySource is None:
+            raise TrendsUtilities.TrendsErrors( "Unable to open study region boundary " + boundary )
+    except Exception:
+        shutil.rmtree( folder, True )
+        raise
+    return boundarySource, folder
+
+def closeBoundary( folder ):
+    #Remove the shapefile copy of a boundary, once its data source is released
+    if folder is not None:
+        shutil.rmtree( folder, True )
+
+def loadSplitBlockData( eco ):
+    try:
+        #Set up a log object
+        trlog = TrendsUtilities.trLogger()
+        if not eco.splitBlocks:
+            return
+        if gdal is None:
+            raise TrendsUtilities.TrendsErrors( "GDAL is needed to load split blocks for ecoregion " + str(eco.ecoNum))
+        if not eco.boundary:
+            raise TrendsUtilities.TrendsErrors( "No study region boundary given for the split blocks of ecoregion " + \
+                                                str(eco.ecoNum))
+        gp = TrendsUtilities.getGP()
+        trlog.trwrite("Loading clipped split block data for ecoregion " + str(eco.ecoNum))
+
+        boundarySource, copyFolder = openBoundary( gp, eco.boundary )
+        try:
+            boundaryLayer = boundarySource.GetLayer( 0 )
+            changeCatalog = imageCatalog( gp, "ChangeImage" )
+            multiCatalog = imageCatalog( gp, "MultiChangeImage" )
+
+            for block in sorted( eco.splitBlocks ):
+                column = eco.column[ block ]
+                masks = {}
+                for interval in eco.ecoData:
+                    images = changeCatalog.getImages( eco.ecoNum, interval, eco.resolution, [block] )
+                    if block in images:
+                        counts = countMaskedPixels( images[ block ], boundaryLayer, masks, eco.numCon + 1 )
+                        eco.ecoData[ interval ][0][ :, column ] = counts[ 1:eco.numCon + 1 ]
+                for interval in eco.ecoMulti:
+                    images = multiCatalog.getImages( eco.ecoNum, interval, eco.resolution, [block] )
+                    if block in images:
+                        changes = TrendsNames.MultiMap[ interval ]
+                        counts = countMaskedPixels( images[ block ], boundaryLayer, masks, changes + 1 )
+                        eco.ecoMulti[ interval ][0][ :changes + 1, column ] = counts
+                #Let go of this block's masks before starting the next one
+                del masks
+        finally:
+            #OGR keeps the shapefile open until the data source is released
+            boundaryLayer = None
+            boundarySource = None
+            closeBoundary( copyFolder )
+
+    except TrendsUtilities.ExecuteError:
+        msgs = gp.GetMessage(0)
+        msgs += gp.GetMessages(2)
+        trlog.trwrite(msgs)
+        raise
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise
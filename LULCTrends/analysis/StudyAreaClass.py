@@ -12,7 +12,7 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback
 from ..trendutil import TrendsNames, TrendsUtilities
 from . import summaryStatistics
@@ -44,6 +44,9 @@ class studyArea:
             self.sumallchange = {}
             self.sumaggregate = {}
             self.sumaggglgn = {}
+            #Running totals for streaming runs, see summaryStatistics.foldEcoregion
+            self.running = {}
+            self.runningEcos = 0
 
         except Exception:
             tb = sys.exc_info()[2]
@@ -53,9 +56,40 @@ class studyArea:
             raise
 
     def generateSummary( self ):
+        #Streaming runs (see foldEcoregion) summarize the running totals instead of the ecoregions
         try:
             trlog = TrendsUtilities.trLogger()
-            summaryStatistics.genSummaryStats( self, self.analysisNum )
+            if self.runningEcos:
+                summaryStatistics.genStreamedSummaryStats( self, self.analysisNum )
+            else:
+                summaryStatistics.genSummaryStats( self, self.analysisNum )
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise     #push the error up to exit
+
+    def foldEcoregion( self, eco ):
+        #Streaming mode: add the ecoregion to the running summary totals
+        summaryStatistics.foldEcoregion( self, eco )
+
+    def updateEcoregion( self, eco ):
+        #Incremental mode: replace one ecoregion of the generated summary with a
+        # recalculated ecoregion object (same ecoregion number), without touching
+        # the other ecoregions.  Only the summary rows that change are rewritten;
+        # the ecoregion's own tables are stored by its storeStatistics, after this.
+        # Streamed summaries keep no ecoregions, and summaries loaded with
+        # restoreSummaryFromDB.loadStoredSummary keep only their estimates, so the
+        # old ecoregion's estimates are read back from the database as needed.
+        try:
+            trlog = TrendsUtilities.trLogger()
+            if eco.ecoNum not in self.study and self.runningEcos:
+                from .restoreSummaryFromDB import getEcoregionRows, loadStoredEcoregion
+                rows = getEcoregionRows( TrendsUtilities.getGP(), self.analysisNum, eco.ecoNum )
+                if rows:
+                    loadStoredEcoregion( self, rows[0] )
+            return summaryStatistics.updateSummaryStats( self, eco )
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
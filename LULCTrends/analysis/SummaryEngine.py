@@ -0,0 +1,264 @@
+# File SummaryEngine.py
+#
+# In-memory summaries of any set of Trends ecoregions
+#
+# A summary over Trends (full stratified) ecoregions only needs each
+#  ecoregion's estimated change and estimated variance, which the Trends run
+#  already stored.  summaryEngine reads them for every ecoregion once per
+#  process and resolution, one cursor per Trends*Stats table, into an
+#  array per summary family (see summaryStatistics.summaryTables):
+#       estimates[ family ] - (ecoregion, interval[, tabType], row, 2) array of
+#                             EstChange and EstVar
+#       present[ family ] - (ecoregion, interval) mask of the stored intervals
+#  along with the sample blocks, total blocks, total estimated pixels and
+#  Student t values from the Ecoregions table.
+#
+# summarize( ecoList ) sums the selected ecoregions with a membership vector
+#  (a masked matrix reduction over the ecoregion axis), calculates the rest of
+#  the statistics, and returns a studyArea object filled in the same way as
+#  genSummaryStats and restoreSummaryFromDB fill it, so the workbook writers
+#  can use it directly (see SummaryWorkbook's summary argument).  Nothing is
+#  written to the database and no analysis name is registered.  The study
+#  area also has ecoData, the per-ecoregion parameters in the layout of the
+#  SummaryEcoregions table.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import sys, traceback, time
+import numpy
+from ..trendutil import TrendsNames, TrendsUtilities
+from ..database import StorageBackend
+from . import StudyAreaClass, summaryStatistics
+from .setUpCalcStructures import setUpSummaryArrays, smallEco
+
+#Rows in the statistics arrays of each family
+familyRows = { 'conversion': TrendsNames.numConversions, 'glgn': TrendsNames.numLCtypes,
+               'allchange': 1, 'comp': TrendsNames.numLCtypes, 'addgross': 1,
+               'aggregate': TrendsNames.numConversions, 'aggglgn': TrendsNames.numLCtypes,
+               'multi': TrendsNames.numMulti, 'multichange': 1 }
+glgnFamilies = ('glgn','aggglgn')
+estimateStats = ('EstChange','EstVar')
+
+class summaryEngine:
+    #The Trends estimates are shared by every engine object in this process,
+    # format = { resolution: { attribute name: value, ...}, ...}
+    tables = {}
+
+    def __init__( self, resolution ):
+        try:
+            #Set up a log object
+            trlog = TrendsUtilities.trLogger()
+            self.resolution = resolution
+            if resolution not in summaryEngine.tables:
+                summaryEngine.tables[ resolution ] = self.readTrends( resolution )
+            for name in summaryEngine.tables[ resolution ]:
+                setattr( self, name, summaryEngine.tables[ resolution ][ name ] )
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def readTrends( self, resolution ):
+        #Read the ecoregion parameters and the estimated change and variance of
+        # every Trends ecoregion
+        try:
+            trlog = TrendsUtilities.trLogger()
+            trlog.trwrite("Loading Trends estimates for summaries at " + resolution + "   " + time.asctime())
+            gp = TrendsUtilities.getGP()
+            loaded = {}
+
+            store = StorageBackend.getBackend()
+            ecoParams = {}
+            rows = store.selectRows( gp, TrendsNames.dbLocation + "Ecoregions", {},
+                                     [ "Ecoregion", "Total_Blocks", "num_samples", "TotalPixels",
+                                       "StudentT_85", "StudentT_90", "StudentT_95", "StudentT_99" ] )
+            for row in rows:
+                ecoParams[ row[0] ] = tuple( row[1:] )
+            ecoNums = sorted( ecoParams )
+            loaded['ecoNums'] = ecoNums
+            loaded['ecoIndex'] = dict([( ecoNum, ptr ) for ptr, ecoNum in enumerate( ecoNums )])
+            loaded['ecoParams'] = ecoParams
+            loaded['totalBlocks'] = numpy.array([ ecoParams[ ecoNum ][0] for ecoNum in ecoNums ], float)
+            loaded['samples'] = numpy.array([ ecoParams[ ecoNum ][1] for ecoNum in ecoNums ], float)
+            loaded['totalPixels'] = numpy.array([ ecoParams[ ecoNum ][2] for ecoNum in ecoNums ], float)
+
+            #Collect the rows of each table by family and period first, since the
+            # periods are only known once the tables are read.
+            # format = { family: { period: { ecoNum: (row[, tabType], 2) array }}}
+            found = dict([( family, {} ) for family in familyRows ])
+            families = {}
+            for family in familyRows:
+                tableName, periodField, source = summaryStatistics.summaryTables[ family ]
+                tableName = "Trends" + tableName[ len("Summary"): ]
+                families.setdefault(( tableName, periodField ), {} )[ source ] = family
+
+            for ( tableName, periodField ), sources in families.items():
+                tableLoc = TrendsNames.dbLocation + tableName
+                fields = store.describeFields( gp, tableLoc )
+                for ptr, field in enumerate( fields ):
+                    if field.Name == "Statistic":
+                        offset = ptr + 1
+                names = [ field.Name for field in fields[ offset: ]]
+                fieldNames = [ field.Name for field in fields ]
+                #Key columns first, then the values, with Source and Glgn only where
+                # the table has them
+                keyColumns = [ "EcoLevel3ID", periodField, "Statistic", "Source", "Glgn" ]
+                keyColumns = [ name for name in keyColumns if name in fieldNames ]
+                keyValues = { 'AnalysisNum': TrendsNames.TrendsNum,
+                              'Resolution': resolution,
+                              'Statistic': list( estimateStats ) }
+                for record in store.selectRows( gp, tableLoc, keyValues, keyColumns + names ):
+                    row = dict( zip( keyColumns, record[ :len( keyColumns ) ] ))
+                    if None in sources:
+                        family = sources[ None ]
+                    else:
+                        family = sources.get( row['Source'] )
+                    if family is not None:
+                        period = str( row[ periodField ] )
+                        byEco = found[ family ].setdefault( period, {} )
+                        if family in glgnFamilies:
+                            shape = ( len( TrendsNames.glgnTabTypes ), familyRows[ family ], 2 )
+                        else:
+                            shape = ( familyRows[ family ], 2 )
+                        ecoNum = row['EcoLevel3ID']
+                        if ecoNum not in byEco:
+                            byEco[ ecoNum ] = numpy.zeros( shape, float )
+                        values = list( record[ len( keyColumns ): len( keyColumns ) + familyRows[ family ]] )
+                        col = estimateStats.index( row['Statistic'] )
+                        if family in glgnFamilies:
+                            byEco[ ecoNum ][ TrendsNames.glgnTabTypes.index( row['Glgn'] ), :, col ] = values
+                        else:
+                            byEco[ ecoNum ][ :, col ] = values
+
+            #Pack each family into one array with the ecoregions along the first axis
+            loaded['periods'] = {}
+            loaded['estimates'] = {}
+            loaded['present'] = {}
+            for family in familyRows:
+                periods = sorted( found[ family ] )
+                if family in glgnFamilies:
+                    shape = ( len( ecoNums ), len( periods ), len( TrendsNames.glgnTabTypes ), familyRows[ family ], 2 )
+                else:
+                    shape = ( len( ecoNums ), len( periods ), familyRows[ family ], 2 )
+                estimates = numpy.zeros( shape, float )
+                present = numpy.zeros(( len( ecoNums ), len( periods )), bool )
+                for pptr, period in enumerate( periods ):
+                    for ecoNum, values in found[ family ][ period ].items():
+                        if ecoNum in loaded['ecoIndex']:
+                            estimates[ loaded['ecoIndex'][ ecoNum ], pptr ] = values
+                            present[ loaded['ecoIndex'][ ecoNum ], pptr ] = True
+                loaded['periods'][ family ] = periods
+                loaded['estimates'][ family ] = estimates
+                loaded['present'][ family ] = present
+            trlog.trwrite("Trends estimates loaded for " + str(len( ecoNums )) + " ecoregions   " + time.asctime())
+            return loaded
+        except TrendsUtilities.ExecuteError:
+            msgs = gp.GetMessage(0)
+            msgs += gp.GetMessages(2)
+            trlog.trwrite(msgs)
+            raise
+
+    def refresh( self ):
+        #Reread the Trends tables, e.g. after an ecoregion is rerun
+        summaryEngine.tables[ self.resolution ] = self.readTrends( self.resolution )
+        for name in summaryEngine.tables[ self.resolution ]:
+            setattr( self, name, summaryEngine.tables[ self.resolution ][ name ] )
+
+    def membership( self, ecoList ):
+        #1 for each ecoregion in the list, 0 for the rest
+        weights = numpy.zeros( len( self.ecoNums ), float )
+        for ecoNum in ecoList:
+            if ecoNum not in self.ecoIndex:
+                raise TrendsUtilities.TrendsErrors( "No Trends data for ecoregion " + str(ecoNum) )
+            weights[ self.ecoIndex[ ecoNum ]] = 1.0
+        return weights
+
+    def commonPeriods( self, family, weights, within = None ):
+        #Periods of a family stored for every selected ecoregion
+        selected = weights > 0.0
+        periods = [ period for ptr, period in enumerate( self.periods[ family ] )
+                    if numpy.all( self.present[ family ][ selected, ptr ] ) ]
+        if within is not None:
+            periods = [ period for period in periods if period in within ]
+        return periods
+
+    def familyEstimates( self, family, periods ):
+        #(ecoregion, period, ...) estimates for the given periods of a family
+        missing = [ period for period in periods if period not in self.periods[ family ]]
+        if missing:
+            raise TrendsUtilities.TrendsErrors( "No Trends " + family + " data for " + ", ".join( missing ))
+        return self.estimates[ family ][ :, [ self.periods[ family ].index( period ) for period in periods ]]
+
+    def summarize( self, ecoList, analysisName = "", analysisNum = 0 ):
+        #Summary statistics for the ecoregions in ecoList, as a studyArea object
+        try:
+            trlog = TrendsUtilities.trLogger()
+            gp = TrendsUtilities.getGP()
+            weights = self.membership( ecoList )
+
+            sa = StudyAreaClass.studyArea( gp, analysisName, analysisNum )
+            sa.resolution = self.resolution
+            sa.intervals = self.commonPeriods( 'conversion', weights )
+            sa.years = TrendsUtilities.getYearsFromIntervals( gp, sa.intervals )
+            sa.multiIntervals = self.commonPeriods( 'multi', weights, sa.intervals )
+            sa.aggIntervals = self.commonPeriods( 'aggregate', weights, TrendsNames.aggregate_gross_interval )
+            sa.summarySamples = int( numpy.dot( weights, self.samples ))
+            sa.totalBlocks = int( numpy.dot( weights, self.totalBlocks ))
+            sa.sumEstPixels = numpy.dot( weights, self.totalPixels )
+            summaryStatistics.setSummaryStudentT( sa )
+            setUpSummaryArrays( sa )
+
+            #Total change and total variance are the membership-weighted sums
+            # of the ecoregions' estimated change and variance
+            sumColumns = [ TrendsNames.sumStatsNames.index('TotalChng'), TrendsNames.sumStatsNames.index('TotalVar') ]
+            for family in sa.summaryStacks:
+                stack = sa.summaryStacks[ family ]
+                if stack.size:
+                    stack[..., sumColumns] = numpy.tensordot( weights,
+                                        self.familyEstimates( family, summaryStatistics.familyPeriods( sa, family )), 1 )
+            summaryStatistics.calcAllSummaryStats( sa )
+
+            for ecoNum in sorted( ecoList ):
+                sa.study[ ecoNum ] = self.shortEco( sa, ecoNum )
+            sa.ecoData = [ ( ecoNum, ) + self.ecoParams[ ecoNum ] + ( self.resolution, "Full stratified" )
+                           for ecoNum in sorted( ecoList ) ]
+            return sa
+        except TrendsUtilities.TrendsErrors, Terr:
+            trlog.trwrite( Terr.message )
+            raise
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def shortEco( self, sa, ecoNum ):
+        #The ecoregion's EstChange/EstVar arrays, laid out like setUpShortEcoArrays
+        eco = smallEco( ecoNum )
+        region = self.ecoIndex[ ecoNum ]
+        def estimate( family, period ):
+            return self.estimates[ family ][ region, self.periods[ family ].index( period ) ]
+        for interval in sa.intervals:
+            eco.conv[ interval ] = estimate( 'conversion', interval )
+            eco.glgn[ interval ] = dict([( tabType, estimate( 'glgn', interval )[ ptr ] )
+                                         for ptr, tabType in enumerate( TrendsNames.glgnTabTypes )])
+            eco.allchg[ interval ] = { 'conversion': estimate( 'allchange', interval ) }
+        for year in sa.years:
+            eco.comp[ year ] = estimate( 'comp', year )
+        for key in sa.aggIntervals:
+            eco.allchg.setdefault( key, {} )['addgross'] = estimate( 'addgross', key )
+            eco.aggregate[ key ] = { 'gross': estimate( 'aggregate', key ) }
+            eco.aggGlgn[ key ] = { 'gross': dict([( tabType, estimate( 'aggglgn', key )[ ptr ] )
+                                                 for ptr, tabType in enumerate( TrendsNames.glgnTabTypes )]) }
+        for interval in sa.multiIntervals:
+            eco.multi[ interval ] = estimate( 'multi', interval )
+            eco.allchg[ interval ]['multichange'] = estimate( 'multichange', interval )
+        return eco
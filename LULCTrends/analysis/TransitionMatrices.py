@@ -0,0 +1,89 @@
+# File TransitionMatrices.py
+#
+# In-memory incidence matrices built from the ClassTransition table
+#
+# The table is read once per process with a single cursor.  Each matrix
+#  has a row for each land cover type (1-11) and a column for each
+#  conversion (TransitionID 1-121), holding 1 where the conversion is
+#  counted for that land cover type:
+#       gain - conversions to the type, without the 'no change' conversion
+#       loss - conversions from the type, without the 'no change' conversion
+#       compFrom - conversions from the type, including 'no change'
+#       compTo - conversions to the type, including 'no change'
+#  and change is a vector with 1 for every conversion that is a change
+#  (IsNotChanged = 0).  Gains, losses, composition and all change are then
+#  a single numpy.dot of a matrix with a conversion array, which has a row
+#  for each conversion and a column for each block.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import sys, traceback
+import numpy
+from ..trendutil import TrendsNames, TrendsUtilities
+
+class transitionMatrices:
+    #The matrices are shared by every object in this process,
+    # format = { matrix name: numpy array, ...}
+    matrices = {}
+
+    def __init__( self ):
+        try:
+            #Set up a log object
+            trlog = TrendsUtilities.trLogger()
+            if not transitionMatrices.matrices:
+                transitionMatrices.matrices = self.readTable()
+            for name in transitionMatrices.matrices:
+                setattr( self, name, transitionMatrices.matrices[ name ] )
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def readTable( self ):
+        #Step through the ClassTransition table once and mark each conversion
+        # in the matrices of its from and to land cover types
+        try:
+            trlog = TrendsUtilities.trLogger()
+            gp = TrendsUtilities.getGP()
+            shape = ( TrendsNames.LCTypecntr, TrendsNames.numConversions )
+            matrices = { 'gain': numpy.zeros( shape, int ),
+                         'loss': numpy.zeros( shape, int ),
+                         'compFrom': numpy.zeros( shape, int ),
+                         'compTo': numpy.zeros( shape, int ),
+                         'change': numpy.zeros( TrendsNames.numConversions, int ) }
+
+            rows = gp.SearchCursor( TrendsNames.dbLocation + "ClassTransition" )
+            row = rows.Next()
+            while row:
+                if row.TransitionID > 0 and row.TransitionID <= TrendsNames.numConversions:
+                    conv = row.TransitionID - 1
+                    fromLC = row.FromClassNum - 1
+                    toLC = row.ToClassNum - 1
+                    matrices['compFrom'][ fromLC, conv ] = 1
+                    matrices['compTo'][ toLC, conv ] = 1
+                    if fromLC != toLC:
+                        matrices['gain'][ toLC, conv ] = 1
+                        matrices['loss'][ fromLC, conv ] = 1
+                    if row.IsNotChanged == 0:
+                        matrices['change'][ conv ] = 1
+                row = rows.Next()
+            del row, rows
+            return matrices
+        except TrendsUtilities.ExecuteError:
+            msgs = gp.GetMessage(0)
+            msgs += gp.GetMessages(2)
+            trlog.trwrite(msgs)
+            raise
+
+    def refresh( self ):
+        #Reread the table, e.g. after the ClassTransition table is rebuilt
+        transitionMatrices.matrices = self.readTable()
+        for name in transitionMatrices.matrices:
+            setattr( self, name, transitionMatrices.matrices[ name ] )
@@ -17,12 +17,12 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
-import arcgisscripting, os, sys, traceback
-from ..trendutil import TrendsNames
+import os, sys, traceback
+from ..trendutil import TrendsNames, TrendsUtilities
 
 def accessTrendsData( eco_list, runNum, resolution ):
     try:
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverWriteOutput = True
         #  Initialize a dictionary with eco# as the key and a
         #  placeholder for total block count and sample block count
@@ -58,7 +58,7 @@ def accessTrendsData( eco_list, runNum, resolution ):
 
         return ecoregions, strats, splits
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddError(msgs)
@@ -10,67 +10,56 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 from ..trendutil import TrendsUtilities, TrendsNames
+from ..database import StorageBackend
 
 def updateParameters( tableName, analysisNum, ecoNum, sampleblks, totalblks,
-                      totalPix, T85, T90, T95, T99, resolution="", runType = "" ):
+                      totalPix, T85, T90, T95, T99, resolution="", runType = "", replace = False ):
+    #replace - update the existing summary or ecoregion row instead of inserting one
     try:
-        gp = arcgisscripting.create(9.3)    
+        gp = TrendsUtilities.getGP()    
         trlog = TrendsUtilities.trLogger()
         trlog.trwrite("Writing analysis parameters to " + tableName + " table    " + time.asctime())  
             
         tableLoc = TrendsNames.dbLocation + tableName
+        store = StorageBackend.getBackend()
+        studentT = { 'StudentT_85': T85, 'StudentT_90': T90, 'StudentT_95': T95, 'StudentT_99': T99 }
         if analysisNum == TrendsNames.TrendsNum:
             #Update existing rows in table
-            where_clause = "Ecoregion = " + str(ecoNum)
-
-            rows = gp.UpdateCursor( tableLoc, where_clause )
-            row = rows.Next()  #Get the row
-            if row:
-                row.num_samples = sampleblks
-                row.Total_Blocks = totalblks
-                row.TotalPixels = totalPix
-                row.StudentT_85 = T85
-                row.StudentT_90 = T90
-                row.StudentT_95 = T95
-                row.StudentT_99 = T99
-                rows.UpdateRow( row )
-            else:  #trenderror
-                pass
+            record = { 'num_samples': sampleblks, 'Total_Blocks': totalblks, 'TotalPixels': totalPix }
+            record.update( studentT )
+            store.updateRecords( gp, tableLoc, { 'Ecoregion': ecoNum }, record )
         elif ecoNum > 0:
-            #insert new rows for custom ecoregion
-            rows = gp.InsertCursor( tableLoc )
-            row = rows.NewRow()
-            row.AnalysisNum = analysisNum
-            row.Ecoregion = ecoNum
-            row.SampleBlks = sampleblks
-            row.TotalBlks = totalblks
-            row.Resolution = resolution
-            row.RunType = runType
-            row.TotalPixels = totalPix
-            row.StudentT_85 = T85
-            row.StudentT_90 = T90
-            row.StudentT_95 = T95
-            row.StudentT_99 = T99
-            rows.InsertRow( row )
+            #insert new rows for custom ecoregion, or update the existing row when
+            # the ecoregion of a summary is replaced
+            record = { 'SampleBlks': sampleblks, 'TotalBlks': totalblks, 'RunType': runType,
+                       'TotalPixels': totalPix }
+            record.update( studentT )
+            updated = 0
+            if replace:
+                updated = store.updateRecords( gp, tableLoc, { 'AnalysisNum': analysisNum, 'Ecoregion': ecoNum,
+                                                               'Resolution': resolution }, record )
+            if not updated:
+                record['AnalysisNum'] = analysisNum
+                record['Ecoregion'] = ecoNum
+                record['Resolution'] = resolution
+                store.insertRecords( gp, tableLoc, [ record ] )
         else:
-            #Insert new rows for summary
-            rows = gp.InsertCursor( tableLoc )
-            row = rows.NewRow()
-            row.AnalysisNum = analysisNum
-            row.num_samples = sampleblks
-            row.Resolution = resolution
-            row.Total_Blocks = totalblks
-            row.TotalPixels = totalPix
-            row.StudentT_85 = T85
-            row.StudentT_90 = T90
-            row.StudentT_95 = T95
-            row.StudentT_99 = T99
-            rows.InsertRow( row )
+            #Insert new rows for summary, or update the existing row when the
+            # summary is being recalculated in place
+            record = { 'num_samples': sampleblks, 'Total_Blocks': totalblks, 'TotalPixels': totalPix }
+            record.update( studentT )
+            updated = 0
+            if replace:
+                updated = store.updateRecords( gp, tableLoc, { 'AnalysisNum': analysisNum,
+                                                               'Resolution': resolution }, record )
+            if not updated:
+                record['AnalysisNum'] = analysisNum
+                record['Resolution'] = resolution
+                store.insertRecords( gp, tableLoc, [ record ] )
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         trlog.trwrite(msgs)
@@ -84,8 +73,3 @@ def updateParameters( tableName, analysisNum, ecoNum, sampleblks, totalblks,
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         trlog.trwrite(pymsg)
         raise  #push the error up to exit
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
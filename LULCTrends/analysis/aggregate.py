@@ -12,7 +12,7 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
+import numpy
 import os, sys, traceback, time
 from ..database import databaseWriteClass
 from . import basicStatistics
@@ -49,14 +49,13 @@ def calcAddGross( eco ):
         trlog.trwrite("Starting aggregate gross calculations   " + time.asctime())
 
         source = 'gross'
-        add_keys = eco.aggregate_gross_keys
+        add_keys = list( eco.aggregate_gross_keys )
         for interval in add_keys:
             sumyears = findAggregateYears( eco, interval )
 
             if sumyears:
-                for years in sumyears:
-                    #add each conversion interval together to get the sum over all intervals
-                    eco.aggregate[ interval ][source][0][:,:] += eco.ecoData[ years ][0][:,:]
+                #add each conversion interval together to get the sum over all intervals
+                eco.aggregate[ interval ][source][0][:,:] += numpy.sum( eco.ecoData.stack( sumyears ), axis=0 )
 
                 #change pixel count for aggregate
                 findTotalEstimatedPixels( eco, eco.aggregate[interval][source][0] )
@@ -66,7 +65,7 @@ def calcAddGross( eco ):
                                            eco.aggregate[ interval ][source][0],
                                            eco.aggregate[ interval ][source][1] )
             else:
-                del eco.aggregate_gross_keys[interval]
+                eco.aggregate_gross_keys.remove( interval )
                 
         #reset pixel count
         firstInterval = TrendsUtilities.getFirstInterval( eco )
@@ -83,7 +82,7 @@ def calcAddGross( eco ):
 def storeAddGross( eco, analysisNum ):
     try:
         #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
@@ -97,21 +96,25 @@ def storeAddGross( eco, analysisNum ):
         else:
             tableName = TrendsNames.dbLocation + "CustomAggregateData"
         dbWriter = databaseWriteClass.aggregateWrite( gp, tableName)
+        dbWriter.startBulk()
             
         for interval in add_keys:
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                     eco.aggregate[interval][source][0], "data", "" )
+        dbWriter.finishBulk( gp )
 
         if analysisNum == TrendsNames.TrendsNum:        
             tableName = TrendsNames.dbLocation + "TrendsAggregateStats"
         else:
             tableName = TrendsNames.dbLocation + "CustomAggregateStats"
         dbWriter = databaseWriteClass.aggregateWrite( gp, tableName)
+        dbWriter.startBulk()
             
         for interval in add_keys:
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                     eco.aggregate[interval][source][1], "stats",
                                     TrendsNames.statisticsNames )
+        dbWriter.finishBulk( gp )
 
         #Write data and stats for gains/losses to db
         if analysisNum == TrendsNames.TrendsNum:        
@@ -120,9 +123,11 @@ def storeAddGross( eco, analysisNum ):
             tableName = TrendsNames.dbLocation + "CustomAggGlgnData"
             
         dbWriter = databaseWriteClass.aggGlgnWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in add_keys:
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                 eco.aggGlgn[interval][source], "data", "" )
+        dbWriter.finishBulk( gp )
 
         if analysisNum == TrendsNames.TrendsNum:        
             tableName = TrendsNames.dbLocation + "TrendsAggGlgnStats"
@@ -130,10 +135,12 @@ def storeAddGross( eco, analysisNum ):
             tableName = TrendsNames.dbLocation + "CustomAggGlgnStats"
             
         dbWriter = databaseWriteClass.aggGlgnWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in add_keys:
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                 eco.aggGlgn[interval][source], "stats",
                                 TrendsNames.statisticsNames )
+        dbWriter.finishBulk( gp )
                         
     except Exception:
         #print out the system error traceback
@@ -16,73 +16,28 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time, numpy
 from ..database import databaseWriteClass
 from . import basicStatistics
 from .EcoregionStatistics import findTotalEstimatedPixels
 from ..trendutil import TrendsNames, TrendsUtilities
-
-def findChangeNumbers():
-    #Return a list with the transition numbers for change only
-    try:
-        #Set up a log object
-        trlog = TrendsUtilities.trLogger()
-        
-        #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3) 
-        gp.OverwriteOutput = True
-        transTable = TrendsNames.dbLocation + "ClassTransition"
-        where_clause = "IsNotChanged = 0"
-        changeList = []
-
-        #read in the class transition table screened for only change
-        #Step through all the rows to read transition number
-        rows = gp.SearchCursor( transTable, where_clause )
-        row = rows.Next()
-        while row:
-            changeList.append( row.TransitionID )
-            row = rows.Next()
-
-        return changeList
-    except arcgisscripting.ExecuteError:
-        msgs = gp.GetMessage(0)
-        msgs += gp.GetMessages(2)
-        trlog.trwrite(msgs)
-        raise
-    except Exception:
-        tb = sys.exc_info()[2]
-        tbinfo = traceback.format_tb(tb)[0]
-        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
-        trlog.trwrite(pymsg)
-        raise     #push the error up to exit
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
+from .TransitionMatrices import transitionMatrices
 
 def calcAllChange( eco ):
     try:
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
         trlog.trwrite("Starting all change calculations   " + time.asctime())
-        #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3) 
-        gp.OverwriteOutput = True
-
-        toFromList = findChangeNumbers()
-        temp = numpy.zeros(( TrendsNames.numConversions, eco.sampleBlks ), int)
-
-        for interval in eco.ecoData:
-            #Calculate All Change for conversion arrays
-            for index in range( TrendsNames.numConversions ):
-                #Copy just change conversions into all change array
-                if index+1 in toFromList:
-                    temp[index,:] = eco.ecoData[ interval ][0][index,:]
-
-            #Sum all the pixel values for each block and do statistics only on block totals
-            eco.allChange[ interval ]['conversion'][0][:] = numpy.sum( temp, axis=0 )
+        #The change vector has a 1 for each change conversion, so its product with a
+        # conversion array is the block totals of just the change conversions
+        change = transitionMatrices().change
+
+        #Sum all the change pixel values for each block, for all intervals at once over the
+        # (interval, conversion, block) cube, and do statistics only on block totals
+        intervals = eco.ecoData.keys()
+        totals = numpy.dot( change, eco.ecoData.stack( intervals ))
+        for ptr, interval in enumerate( intervals ):
+            eco.allChange[ interval ]['conversion'][0][:] = totals[ ptr ]
             #Do the statistics
             basicStatistics.dataStats( eco,1,
                                         eco.allChange[ interval ]['conversion'][0],
@@ -93,13 +48,8 @@ def calcAllChange( eco ):
         if add_keys:  #only calculate if an aggregate interval is defined for this data
             findTotalEstimatedPixels( eco, eco.aggregate[add_keys[0]]['gross'][0] )
             for key in add_keys:
-                for index in range( TrendsNames.numConversions ):
-                    #Copy just aggregate change into all change array
-                    if index+1 in toFromList:
-                        temp[index,:] = eco.aggregate[ key ]['gross'][0][index,:]
-
-                #Sum all the pixel values for each block and do statistics only on block totals
-                eco.allChange[ key ]['addgross'][0][:] = numpy.sum( temp, axis=0 )
+                #Sum all the aggregate change pixel values for each block and do statistics only on block totals
+                eco.allChange[ key ]['addgross'][0][:] = numpy.dot( change, eco.aggregate[ key ]['gross'][0] )
                 #Do the statistics
                 basicStatistics.dataStats( eco,1,
                                             eco.allChange[ key ]['addgross'][0],
@@ -112,10 +62,7 @@ def calcAllChange( eco ):
         #calculate AllChange for multichange
         for key in eco.ecoMulti:
             changes = TrendsNames.MultiMap[ key ]
-            temp = numpy.zeros(( changes-1, eco.sampleBlks ), int)
-            for index in range( 1, changes):
-                temp[index-1,:] = eco.ecoMulti[key][0][index,:]
-            eco.allChange[key]['multichange'][0][:] = numpy.sum( temp, axis=0 )
+            eco.allChange[key]['multichange'][0][:] = numpy.sum( eco.ecoMulti[key][0][1:changes,:], axis=0 )
             basicStatistics.dataStats( eco,1,
                                         eco.allChange[ key ]['multichange'][0],
                                         eco.allChange[ key ]['multichange'][1] )                
@@ -132,7 +79,7 @@ def calcAllChange( eco ):
 def storeAllChange( eco, analysisNum ):
     try:
         #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
@@ -145,6 +92,7 @@ def storeAllChange( eco, analysisNum ):
             
         source = 'conversion'
         dbWriter = databaseWriteClass.allChangeWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in eco.ecoData:
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                 eco.allChange[interval][source][0], "data", "" )
@@ -157,6 +105,7 @@ def storeAllChange( eco, analysisNum ):
         for interval in eco.ecoMulti:
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                 eco.allChange[interval][source][0], "data", "" )
+        dbWriter.finishBulk( gp )
 
         if analysisNum == TrendsNames.TrendsNum:        
             tableName = TrendsNames.dbLocation + "TrendsAllChangeStats"
@@ -165,6 +114,7 @@ def storeAllChange( eco, analysisNum ):
             
         source = 'conversion'
         dbWriter = databaseWriteClass.allChangeWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in eco.ecoData:
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                 eco.allChange[interval][source][1], "stats",
@@ -180,6 +130,7 @@ def storeAllChange( eco, analysisNum ):
             dbWriter.databaseWrite( gp, analysisNum, eco, interval, eco.resolution, source,
                                 eco.allChange[interval][source][1], "stats",
                                 TrendsNames.statisticsNames )
+        dbWriter.finishBulk( gp )
                         
     except Exception:
         #print out the system error traceback
@@ -23,83 +23,97 @@
 
 #Import modules
 import os, sys, traceback
-import rpy2.robjects as robjects
-import rpy2.robjects.numpy2ri
 import numpy
-from ..trendutil import TrendsUtilities
+from ..trendutil import TrendsNames, TrendsUtilities
 
-def dataStats( eco, numRow, data, stat ):
-    try:
-        #Set up a log object
-        trlog = TrendsUtilities.trLogger()
-        
-        #Define the necessary R functions.  Use numpy's version of mean
-        #since it may be faster, but can't use var and std since they
-        #are defined for population instead of sample in version 2.5
-        r_var = robjects.r['var']
+#Column positions in the statistics array, looked up once
+statColumn = dict( [ (name, ptr) for (ptr, name) in enumerate( TrendsNames.statisticsNames ) ] )
+loConfColumns = [ statColumn[ name ] for name in ('Lo85Conf','Lo90Conf','Lo95Conf','Lo99Conf') ]
+hiConfColumns = [ statColumn[ name ] for name in ('Hi85Conf','Hi90Conf','Hi95Conf','Hi99Conf') ]
+
+def statsKernel( data, totalBlks, sampleBlks, totalEstPixels, studentT ):
+    #
+    # In:   data - data array, one row per conversion/class and one column per block
+    #       totalBlks, sampleBlks - N and n for the ecoregion
+    #       totalEstPixels - total estimated pixels, the base for the percent columns
+    #       studentT - t values for the 85, 90, 95 and 99% confidence intervals
+    # Out:  statistics array with a row for each data row and a column for each
+    #       name in TrendsNames.statisticsNames
+    #
+    # All rows are calculated at once.  The sample variance uses n-1 in the
+    #  denominator (ddof=1), as R's var does.
+    data = numpy.asarray( data, float )
+    numRow = data.shape[0]
 
-        #First, do calculations that are based on all the rows in the data array
-        #If only one block in this eco (custom boundary case), then the mean just equals the value
-        #  for that block and the variance is set to 0.0
-        #Calculate mean, variance
-        for row in range( numRow ):
-            if eco.sampleBlks > 1:
-                #mean   (pixels)
-                stat[row, eco.statName.index('Mean')] = numpy.mean( data[ row, : ])
-                #s_squared   (pixels)
-                stat[row, eco.statName.index('S_Squared')] = TrendsUtilities.makeAtomic( r_var( data[ row, : ]))
-            else:
-                #mean   (pixels)
-                stat[row, eco.statName.index('Mean')] = data[ row, : ]
-                #s_squared   (pixels)
-                stat[row, eco.statName.index('S_Squared')] = 0.0                
+    #If only one block in this eco (custom boundary case), then the mean just equals the value
+    #  for that block and the variance is set to 0.0
+    mean = numpy.mean( data, axis=1 )
+    if sampleBlks > 1:
+        sSquared = numpy.var( data, axis=1, ddof=1 )
+    else:
+        sSquared = numpy.zeros( numRow, float )
+    return momentStats( mean, sSquared, totalBlks, sampleBlks, totalEstPixels, studentT )
 
-        #Now do the calculations that are based on other columns in the statistics array
-        #estimated change = mean * N  (pixels)
-        stat[:, eco.statName.index('EstChange')] = stat[ :, eco.statName.index('Mean') ] * eco.totalBlks
-        
-        #estimated change % = (estimated change (per row) / sum of estimated change column) * 100  (percent)
-        #  and screen for division by zero
-        sumChgColumn = eco.totalEstPixels
-        if sumChgColumn > 0.0:
-            stat[:,eco.statName.index('ChgPercent')] = ( stat[:,eco.statName.index('EstChange')] / sumChgColumn ) * 100.0
-        #else, do nothing since column was initialized to 0.0
+def momentStats( mean, sSquared, totalBlks, sampleBlks, totalEstPixels, studentT ):
+    #
+    # In:   mean, sSquared - sample mean and variance arrays, shape (..., row)
+    #       totalBlks, sampleBlks, totalEstPixels - scalars, or arrays that broadcast
+    #               against mean, e.g. shape (domain, 1, 1) for (domain, interval, row)
+    #       studentT - the four t values, broadcast against shape (..., row, 4)
+    # Out:  statistics array of shape (..., row, statistic)
+    #
+    # The statistics that follow from the sample moments.  statsKernel calls this for
+    #  one data array, and DomainEstimation for many sample block subsets at once.
+    mean = numpy.asarray( mean, float )
+    stat = numpy.zeros( mean.shape + ( TrendsNames.numStatisticsNames, ), float)
+    totalBlks = numpy.asarray( totalBlks, float )
+    sampleBlks = numpy.asarray( sampleBlks, float )
+    stat[..., statColumn['Mean']] = mean
+    stat[..., statColumn['S_Squared']] = sSquared
 
-        #estimated variance = ((total blocks^2)*(1-(n/N))*(s_squared))/n    (pixels)
-        stat[:,eco.statName.index('EstVar')] = \
-            ((eco.totalBlks**2)*(1.0 - float(eco.sampleBlks)/float(eco.totalBlks))*stat[:,eco.statName.index('S_Squared')])/float(eco.sampleBlks)
+    #estimated change = mean * N  (pixels)
+    estChange = mean * totalBlks
+    stat[..., statColumn['EstChange']] = estChange
 
-        #standard error = sqrt( estimated variance )   (pixels)
-        stat[:, eco.statName.index('StdError')] = numpy.sqrt( stat[:, eco.statName.index('EstVar')] )
+    #estimated variance = ((total blocks^2)*(1-(n/N))*(s_squared))/n    (pixels)
+    estVar = ((totalBlks**2)*(1.0 - sampleBlks/totalBlks)*sSquared)/sampleBlks
+    stat[..., statColumn['EstVar']] = estVar
 
-        #standard error % = (standard error (per row) / sum of estimated change column) * 100,
-        #  and screen for division by zero
-        if sumChgColumn > 0.0:
-            stat[:,eco.statName.index('PerStdErr')] = ( stat[:,eco.statName.index('StdError')] / sumChgColumn ) * 100.0
-        #else, do nothing since column was initialized to 0.0
+    #standard error = sqrt( estimated variance )   (pixels)
+    stdError = numpy.sqrt( estVar )
+    stat[..., statColumn['StdError']] = stdError
 
-        #relative error = standard error % / estimated change %, and screen for division by zero
-        for row in range( numRow ):
-            if stat[row, eco.statName.index('ChgPercent')] != 0.0:
-                stat[row,eco.statName.index('RelError')] = (stat[row,eco.statName.index('PerStdErr')] / stat[row,eco.statName.index('ChgPercent')]) * 100.0
-            #else, do nothing since column was initialized to 0.0
+    #estimated change % and standard error % are based on the total estimated pixels,
+    #  and stay 0.0 if there are none
+    totalEstPixels = numpy.asarray( totalEstPixels, float ) + numpy.zeros( mean.shape, float )
+    counted = totalEstPixels > 0.0
+    chgPercent = numpy.zeros( mean.shape, float )
+    perStdErr = numpy.zeros( mean.shape, float )
+    chgPercent[counted] = ( estChange[counted] / totalEstPixels[counted] ) * 100.0
+    perStdErr[counted] = ( stdError[counted] / totalEstPixels[counted] ) * 100.0
+    stat[..., statColumn['ChgPercent']] = chgPercent
+    stat[..., statColumn['PerStdErr']] = perStdErr
 
-        #low or high confidence = percent change - or + (percent standard error * student T)
-        #85% confidence interval
-        stat[:,eco.statName.index('Lo85Conf')] = stat[:,eco.statName.index('ChgPercent')] - (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[0])
-        stat[:,eco.statName.index('Hi85Conf')] = stat[:,eco.statName.index('ChgPercent')] + (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[0])
+    #relative error = standard error % / estimated change %, only where change % is nonzero
+    changed = chgPercent != 0.0
+    relError = numpy.zeros( mean.shape, float )
+    relError[changed] = ( perStdErr[changed] / chgPercent[changed] ) * 100.0
+    stat[..., statColumn['RelError']] = relError
 
-        #90% confidence interval
-        stat[:,eco.statName.index('Lo90Conf')] = stat[:,eco.statName.index('ChgPercent')] - (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[1])
-        stat[:,eco.statName.index('Hi90Conf')] = stat[:,eco.statName.index('ChgPercent')] + (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[1])
-        
-        #95% confidence interval
-        stat[:,eco.statName.index('Lo95Conf')] = stat[:,eco.statName.index('ChgPercent')] - (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[2])
-        stat[:,eco.statName.index('Hi95Conf')] = stat[:,eco.statName.index('ChgPercent')] + (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[2])
+    #low or high confidence = percent change - or + (percent standard error * student T)
+    # for all four confidence levels at once
+    margin = perStdErr[..., numpy.newaxis] * numpy.asarray( studentT, float )[..., :4]
+    stat[..., loConfColumns] = chgPercent[..., numpy.newaxis] - margin
+    stat[..., hiConfColumns] = chgPercent[..., numpy.newaxis] + margin
+    return stat
+
+def dataStats( eco, numRow, data, stat ):
+    try:
+        #Set up a log object
+        trlog = TrendsUtilities.trLogger()
 
-        #99% confidence interval
-        stat[:,eco.statName.index('Lo99Conf')] = stat[:,eco.statName.index('ChgPercent')] - (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[3])
-        stat[:,eco.statName.index('Hi99Conf')] = stat[:,eco.statName.index('ChgPercent')] + (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[3])
+        stat[ :numRow, : ] = statsKernel( data[ :numRow, : ], eco.totalBlks, eco.sampleBlks,
+                                          eco.totalEstPixels, eco.studentT )
 
     except Exception:
         #print out the system error traceback
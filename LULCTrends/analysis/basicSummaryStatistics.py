@@ -14,11 +14,20 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
-import arcgisscripting, os, sys, traceback, time
+import os, sys, traceback, time
 import numpy
 from ..trendutil import TrendsNames, TrendsUtilities
 
+#Column positions in the summary statistics arrays
+sumColumn = dict( [( name, ptr ) for ptr, name in enumerate( TrendsNames.sumStatsNames )] )
+loConfColumns = [ sumColumn[ name ] for name in ('Lo85Conf','Lo90Conf','Lo95Conf','Lo99Conf') ]
+hiConfColumns = [ sumColumn[ name ] for name in ('Hi85Conf','Hi90Conf','Hi95Conf','Hi99Conf') ]
+
 def basicSummaryStats( numberRow, stat, studentT, changeSum ):
+    #The statistics are the last axis of stat, so a stack of summary arrays
+    # (interval x row x statistic, or interval x tabType x row x statistic)
+    # sharing the same pixel total is filled in with one call.
+    # numberRow is kept for existing callers; every row of stat is filled in.
     try:
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
@@ -32,52 +41,31 @@ def basicSummaryStats( numberRow, stat, studentT, changeSum ):
         if changeSum <= 0.0:
             raise TrendsUtilities.TrendsErrors( "Unable to process summary statistics. Total pixel count found: " + str(changeSum) )
 
-        stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] = \
-                                            ( stat[:,TrendsNames.sumStatsNames.index('TotalChng')] / changeSum ) * 100.0
+        stat[..., sumColumn['ChgPercent']] = ( stat[..., sumColumn['TotalChng']] / changeSum ) * 100.0
 
         #Fourth column is standard error (pixels)
         #standard error = sqrt( total variance ) for each row
-        stat[:,TrendsNames.sumStatsNames.index('StdError')] = numpy.sqrt( stat[:,TrendsNames.sumStatsNames.index('TotalVar')] )
+        stat[..., sumColumn['StdError']] = numpy.sqrt( stat[..., sumColumn['TotalVar']] )
 
         #Fifth column is standard error percent (percent)
         #std error % = (standard error (per row) / sum of total change column) * 100
-        stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] = \
-                                            ( stat[:,TrendsNames.sumStatsNames.index('StdError')] / changeSum ) * 100.0
+        stat[..., sumColumn['PerStdErr']] = ( stat[..., sumColumn['StdError']] / changeSum ) * 100.0
 
         #Sixth column is relative error (percent)
         #Relative error % =  ( standard error % / estimated change % ), and screen for division by zero
-        for row in range( numberRow ):
-            if stat[row,TrendsNames.sumStatsNames.index('ChgPercent')] != 0.0:
-                stat[row,TrendsNames.sumStatsNames.index('RelError')] = \
-                        ( stat[row,TrendsNames.sumStatsNames.index('PerStdErr')] / stat[row,TrendsNames.sumStatsNames.index('ChgPercent')] ) * 100.0
-
-        #Seventh through fourteenth columns are the confidence intervals.  They are using student T
-        # values calculated from the sum of the sample block counts for all ecoregions in the study area
+        #Rows with no change are zero, as in a new table, since updates recalculate the array in place
+        stat[..., sumColumn['RelError']] = 0.0
+        nonzero = stat[..., sumColumn['ChgPercent']] != 0.0
+        stat[..., sumColumn['RelError']][ nonzero ] = \
+                ( stat[..., sumColumn['PerStdErr']][ nonzero ] / stat[..., sumColumn['ChgPercent']][ nonzero ] ) * 100.0
 
+        #Seventh through fourteenth columns are the 85, 90, 95 and 99% confidence intervals.  They are
+        # using student T values calculated from the sum of the sample block counts for all ecoregions
+        # in the study area
         #Intervals = estimated change % - or + (standard error % * student T)
-        #85% confidence interval
-        stat[:,TrendsNames.sumStatsNames.index('Lo85Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] - \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[0])
-        stat[:,TrendsNames.sumStatsNames.index('Hi85Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] + \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[0])
-
-        #90% confidence interval
-        stat[:,TrendsNames.sumStatsNames.index('Lo90Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] - \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[1])
-        stat[:,TrendsNames.sumStatsNames.index('Hi90Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] + \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[1])
-        
-        #95% confidence interval
-        stat[:,TrendsNames.sumStatsNames.index('Lo95Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] - \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[2])
-        stat[:,TrendsNames.sumStatsNames.index('Hi95Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] + \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[2])
-
-        #99% confidence interval
-        stat[:,TrendsNames.sumStatsNames.index('Lo99Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] - \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[3])
-        stat[:,TrendsNames.sumStatsNames.index('Hi99Conf')] = stat[:,TrendsNames.sumStatsNames.index('ChgPercent')] + \
-                                                              (stat[:,TrendsNames.sumStatsNames.index('PerStdErr')] * studentT[3])
+        margin = stat[..., sumColumn['PerStdErr'], numpy.newaxis] * numpy.asarray( studentT[:4], float )
+        stat[..., loConfColumns] = stat[..., sumColumn['ChgPercent'], numpy.newaxis] - margin
+        stat[..., hiConfColumns] = stat[..., sumColumn['ChgPercent'], numpy.newaxis] + margin
     except TrendsUtilities.TrendsErrors, Terr:
         trlog.trwrite( Terr.message )
         raise
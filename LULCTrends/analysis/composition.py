@@ -16,12 +16,12 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time
 from ..database import databaseWriteClass
 from . import basicStatistics
 from ..trendutil import TrendsNames, TrendsUtilities
-from .gainsLosses import createToFromList, getToFromNumbers
+from .TransitionMatrices import transitionMatrices
 
 
 def calcComposition( eco, interval ):
@@ -30,8 +30,7 @@ def calcComposition( eco, interval ):
         trlog = TrendsUtilities.trLogger()
         trlog.trwrite("Starting composition calculations   " + time.asctime())
 
-        toFromList = []
-        createToFromList( toFromList )
+        matrices = transitionMatrices()
         years = eco.ecoComp.keys()
         years.sort()
 
@@ -39,29 +38,18 @@ def calcComposition( eco, interval ):
         if (years.index(dates[1]) - years.index(dates[0])) != 1:  #skip multiple change years - already counted
             raise TrendsUtilities.JustExit()
         thisYear = dates[0]
-        fromTo = 'from'
 
         #Fill in the data array according to its calculation.  Composition for each LC is the sum of pixels for
         # all conversion ids where this LC is the 'from LC' type, unless the last or most recent year in the
         # composition set is reached.  For this year, the composition is the sum of pixels for the 'to LC' type.
-        # The [0] in ecoComp[thisYear][0][lc-1,:] points to the data array
-        # and the next [lc-1,:] selects a whole column from its numpy array, item by item.
-
-        for lc in sorted( TrendsNames.LCtype):
-            gainLossList = getToFromNumbers( toFromList, lc, fromTo, 'comp' )
-            for glIndex in gainLossList:
-                eco.ecoComp[ thisYear ][0][lc-1,:] = eco.ecoComp[ thisYear ][0][lc-1,:] + \
-                                                     eco.ecoData[ interval ][0][ glIndex-1,:]
+        # The [0] in ecoComp[thisYear][0] points to the data array, and each row of the compFrom and
+        # compTo matrices picks out the conversions to add for one LC.
+        eco.ecoComp[ thisYear ][0][:,:] += numpy.dot( matrices.compFrom, eco.ecoData[ interval ][0] )
 
         #If on the most recent interval, also calculate the 'to LC' values for the most recent year
         if dates[1] == years[-1]:
             thisYear = dates[1]
-            fromTo = 'to'
-            for lc in sorted( TrendsNames.LCtype):
-                gainLossList = getToFromNumbers( toFromList, lc, fromTo, 'comp' )
-                for glIndex in gainLossList:
-                    eco.ecoComp[ thisYear ][0][lc-1,:] = eco.ecoComp[ thisYear ][0][lc-1,:] + \
-                                                         eco.ecoData[ interval ][0][ glIndex-1,:]
+            eco.ecoComp[ thisYear ][0][:,:] += numpy.dot( matrices.compTo, eco.ecoData[ interval ][0] )
             
     except TrendsUtilities.JustExit:
         pass
@@ -95,7 +83,7 @@ def calcCompStats( eco, year ):
 def storeComposition( eco, year, analysisNum ):
     try:
         #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
@@ -26,12 +26,13 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 #Import modules
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, re
-import rpy2.robjects as robjects
-import rpy2.robjects.numpy2ri
 from ..trendutil import TrendsUtilities, TrendsNames
+from ..trendutil.StudentT import studentTValues
 from .ChangeData import loadChangeImageData, loadMultiChangeData
+from .SplitBlockData import loadSplitBlockData
+from .IntervalCube import intervalCube
 from .EcoregionStatistics import calculateEcoStatistics, storeEcoStatistics, findTotalEstimatedPixels
 from .setUpCalcStructures import setUpArrays
 from .gainsLosses import calcGainsLosses, calcGlgnStats, storeGainsLosses
@@ -50,9 +51,9 @@ class EcoStats :
     statName = TrendsNames.statisticsNames
     numStats = len(statName)          #number of columns in stats array
 
-    def __init__(self, ecoNum, N, n, res, runType, strat_list, split_list = []):
+    def __init__(self, ecoNum, N, n, res, runType, strat_list, split_list = [], boundary = ""):
         try:            
-            gp = arcgisscripting.create(9.3)
+            gp = TrendsUtilities.getGP()
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
             #Set up statistics parameters for this ecoregion
@@ -64,6 +65,8 @@ class EcoStats :
             self.degreesf = n - 1
             self.stratBlocks = strat_list
             self.splitBlocks = split_list
+            #Custom boundary used to clip the split blocks
+            self.boundary = boundary
 
             #This value is needed during statistics for gain, loss, etc., multichg, and summaries
             #It is calculated during the statistics runs on the change images and they fill in the
@@ -83,14 +86,15 @@ class EcoStats :
             if len(temp) == 0:
                 raise TrendsUtilities.TrendsErrors("No sample blocks found for ecoregion " + str(self.ecoNum))
             self.column = dict( zip( temp, [x for x in range( len(temp))]))
+            #All the sample block numbers, in array column order
+            self.blocks = temp
 
             #Get the student's T values for 15%, 10%, 5%, and 1% quantiles
-            # Values are contained in studentT[0] - [3].  R returns a one-tailed t
-            # value, so use 7.5%, 5%, 2.5%, and .5% for 2-tailed.
+            # Values are contained in studentT[0] - [3].  The quantiles are one-tailed,
+            # so studentTValues uses 7.5%, 5%, 2.5%, and .5% for 2-tailed.
             
             if self.degreesf > 0:
-                r_qt = robjects.r['qt']
-                self.studentT = r_qt(robjects.FloatVector([.925, .95, .975, .995]), self.degreesf)
+                self.studentT = studentTValues( self.degreesf )
             else:       #if n = 1 for a custom ecoregion, don't get student T since df = 0
                 self.studentT = [-9999.99, -9999.99, -9999.99, -9999.99]
 
@@ -98,7 +102,9 @@ class EcoStats :
             trlog.trwrite( tempstr )
 
             #Create the conversion arrays holder, which is loaded when loadConversions is called.
-            # To access elements in the dictionary, the first subscript is
+            # The holder is an intervalCube, which keeps the arrays for all intervals in one
+            # 3-D data array and one 3-D stats array, and is used like a dictionary.
+            # To access elements in the holder, the first subscript is
             # the change interval, and this points to a tuple holding the two
             # arrays for that interval, i.e. self.ecoData['1973to1980'] points to
             # (data array, stats array).  The second subscript selects
@@ -111,23 +117,19 @@ class EcoStats :
             # The data array is an integer array with 121 rows and number of columns
             # equal to the number of blocks used in this analysis for this ecoregion.
             # The statistics array is a floating pt. array with 121 rows and number of
-            # columns equal to the number of statistics generated.
-            
-            self.ecoData = {}
+            # columns equal to the number of statistics generated.  The arrays are views
+            # into self.ecoData.data[ interval position ] and self.ecoData.stats[ interval position ].
+            # The holders for ecoData, ecoComp, and ecoMulti are created below, once the
+            # intervals are known.
 
             #Create arrays holder for gain, loss, gross, and net data.  These tables are
             # filled from the conversion data in the ecoData arrays.
 
             self.ecoGlgn = {}
 
-            #Create arrays to hold composition data and statistics.  These tables are currently
+            #Arrays to hold composition data and statistics (ecoComp) are currently
             # calculated from the conversion data in the ecoData arrays.
 
-            self.ecoComp = {}
-
-            #multichange arrays
-            self.ecoMulti = {}
-
             #Create arrays for "all change", which is just the conversion data minus the no-change
             # conversions.
 
@@ -137,7 +139,7 @@ class EcoStats :
 
             self.aggregate = {}
             self.aggGlgn = {}
-            self.aggregate_gross_keys = TrendsNames.aggregate_gross_interval
+            self.aggregate_gross_keys = list( TrendsNames.aggregate_gross_interval )
 
             #Get the names of the change interval folders holding the change images
             #Check for the correct folder names ( they should have year1'to'year2 ) in order
@@ -149,15 +151,11 @@ class EcoStats :
                                                         folder)
 
             #Create the conversion data and stats arrays
-            for folder in folderList:
-                self.ecoData[ folder ] = ( numpy.zeros(( EcoStats.numCon, self.sampleBlks ), int),
-                                        numpy.zeros(( EcoStats.numCon, EcoStats.numStats ), float))
+            self.ecoData = intervalCube( folderList, EcoStats.numCon, self.sampleBlks, EcoStats.numStats )
 
             #Create the composition arrays.  This is currently calculated from gain/loss.
             years = TrendsUtilities.getYearsFromIntervals( gp, folderList )
-            for date in years:
-                self.ecoComp[ date ] = ( numpy.zeros(( TrendsNames.LCTypecntr, self.sampleBlks ), int),
-                                        numpy.zeros(( TrendsNames.LCTypecntr, self.numStats ), float))
+            self.ecoComp = intervalCube( years, TrendsNames.LCTypecntr, self.sampleBlks, self.numStats )
 
 
             #Create arrays holder for multi-change data.  This is read in from the multi-change
@@ -167,11 +165,9 @@ class EcoStats :
                 if not re.match( r'\d\d\d\dto\d\d\d\d', folder):
                     raise TrendsUtilities.TrendsErrors( "Unexpected interval folder found in Multichange_Images folder: " + \
                                                         folder)
-            for interval in multiList:
-                self.ecoMulti[ interval ] = ( numpy.zeros(( TrendsNames.numMulti, self.sampleBlks ), int),
-                                            numpy.zeros(( TrendsNames.numMulti, EcoStats.numStats ), float))
+            self.ecoMulti = intervalCube( multiList, TrendsNames.numMulti, self.sampleBlks, EcoStats.numStats )
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             raise            
         except TrendsUtilities.TrendsErrors, Terr:
             trlog.trwrite( Terr.message )
@@ -185,10 +181,13 @@ class EcoStats :
 
     def loadData( self ):
         try:            
-            gp = arcgisscripting.create(9.3)
+            gp = TrendsUtilities.getGP()
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
             
+            #Load the clipped counts for any split blocks for all intervals at once
+            loadSplitBlockData( self )
+
             nointervals = []
             #For each change interval, get the conversion data into the array
             # if no data found for the interval, delete the data structures
@@ -205,7 +204,6 @@ class EcoStats :
 
             #Now load the multichange images, but first check that there was change data
             if len(self.ecoData) > 0:
-                dataFound = True
                 nomultiIntervals = []
                 for interval in self.ecoMulti:
                     loadComplete = loadMultiChangeData( self, interval )
@@ -217,7 +215,30 @@ class EcoStats :
                 #delete data arrays for intervals where there's no data
                 for interval in nomultiIntervals:
                     del self.ecoMulti[ interval ]
-                        
+
+            return self.trimToLoadedData()
+                
+        except TrendsUtilities.ExecuteError:
+            raise            
+        except TrendsUtilities.TrendsErrors, Terr:
+            trlog.trwrite( Terr.message )
+            raise
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def trimToLoadedData( self ):
+        #Once the change data is loaded, drop the composition years and aggregate
+        # intervals that the loaded change intervals don't cover.  Returns True
+        # if any change data was found.
+        try:
+            gp = TrendsUtilities.getGP()
+            trlog = TrendsUtilities.trLogger()
+            if len(self.ecoData) > 0:
+                dataFound = True
                 #Now update the arrays for composition based on the intervals found.
                 # This will eventually be where composition is loaded
                 folderList = self.ecoData.keys()            
@@ -228,7 +249,7 @@ class EcoStats :
                         del self.ecoComp[ date ]
 
                 #Now check if any aggregate data needed
-                keylist = self.aggregate_gross_keys
+                keylist = list( self.aggregate_gross_keys )
                 compyears = self.ecoComp.keys()
                 for interval in keylist:
                     ptr = self.aggregate_gross_keys.index(interval)
@@ -241,12 +262,6 @@ class EcoStats :
             else:
                 dataFound = False
             return dataFound
-                
-        except arcgisscripting.ExecuteError:
-            raise            
-        except TrendsUtilities.TrendsErrors, Terr:
-            trlog.trwrite( Terr.message )
-            raise
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
@@ -254,7 +269,17 @@ class EcoStats :
             trlog.trwrite(pymsg)
             raise
 
-    def performStatistics( self, analysisNum ):
+    def performStatistics( self, analysisNum, conversionStats = None ):
+        #Calculate all the statistics, then write them to the database
+        self.calculateStatistics( conversionStats )
+        self.storeStatistics( analysisNum )
+
+    def calculateStatistics( self, conversionStats = None ):
+        #All the calculations, with no database writes, so an ecoregion can be
+        # calculated in a worker process and stored later by a single writer.
+        # conversionStats = { interval: stats array } holds conversion statistics
+        # already calculated for this ecoregion's blocks (DomainEstimation), which
+        # are used for those intervals instead of being calculated again.
         try:            
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
@@ -265,19 +290,18 @@ class EcoStats :
             setUpArrays( self )
                 
             for interval in self.ecoData:
-                calculateEcoStatistics( self, interval )
-                storeEcoStatistics( self, interval, analysisNum )
+                if conversionStats is not None and interval in conversionStats:
+                    self.ecoData[interval][1][:] = conversionStats[interval]
+                else:
+                    calculateEcoStatistics( self, interval )
                 calcGainsLosses( self.ecoData[interval], self.ecoGlgn[interval] )
                 calcGlgnStats( self, self.ecoGlgn[interval] )
-                storeGainsLosses( self, interval, analysisNum )
                 calcComposition( self, interval )
             for year in self.ecoComp:
                 calcCompStats( self, year )
-                storeComposition( self, year, analysisNum )
 
             for interval in self.ecoMulti:
                 calcMultichangeStats( self, interval ) 
-                storeMultichange( self, interval, analysisNum )
 
             if self.aggregate_gross_keys:  #are there any aggregates needed for this data?
                 calcAddGross( self )
@@ -286,12 +310,41 @@ class EcoStats :
                 for interval in self.aggregate_gross_keys:
                     calcGainsLosses( self.aggregate[interval]['gross'],self.aggGlgn[interval]['gross'] )
                     calcGlgnStats( self, self.aggGlgn[interval]['gross'] )
-                storeAddGross( self, analysisNum )
 
                 firstInterval = TrendsUtilities.getFirstInterval( self )
                 findTotalEstimatedPixels( self, self.ecoData[firstInterval][0] )
                 
             calcAllChange( self )
+        except TrendsUtilities.ExecuteError:
+            raise            
+        except TrendsUtilities.TrendsErrors, Terr:
+            trlog.trwrite( Terr.message )
+            raise
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def storeStatistics( self, analysisNum ):
+        #Write the data and statistics from calculateStatistics to the database
+        try:            
+            #Set up a log object
+            trlog = TrendsUtilities.trLogger()
+
+            for interval in self.ecoData:
+                storeEcoStatistics( self, interval, analysisNum )
+                storeGainsLosses( self, interval, analysisNum )
+            for year in self.ecoComp:
+                storeComposition( self, year, analysisNum )
+
+            for interval in self.ecoMulti:
+                storeMultichange( self, interval, analysisNum )
+
+            if self.aggregate_gross_keys:
+                storeAddGross( self, analysisNum )
+                
             storeAllChange( self, analysisNum )
 
             if self.runType == "Full stratified":
@@ -302,7 +355,7 @@ class EcoStats :
                              self.totalBlks, self.totalEstPixels,
                              self.studentT[0],self.studentT[1],self.studentT[2],self.studentT[3],
                              self.resolution, self.runType)
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             raise            
         except TrendsUtilities.TrendsErrors, Terr:
             trlog.trwrite( Terr.message )
@@ -338,7 +391,7 @@ class EcoStats :
                              self.studentT[0],self.studentT[1],self.studentT[2],self.studentT[3],
                              self.resolution, self.runType)
             return dataFound
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             raise            
         except TrendsUtilities.TrendsErrors, Terr:
             trlog.trwrite( Terr.message )
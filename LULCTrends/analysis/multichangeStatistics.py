@@ -14,7 +14,6 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 #Import modules
-import arcgisscripting
 import os, sys, traceback, time
 from ..database import databaseWriteClass
 from . import basicStatistics
@@ -49,7 +48,7 @@ def calcMultichangeStats( eco, interval ):
 def storeMultichange( eco, interval, analysisNum ):
     try:
         #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
@@ -13,29 +13,44 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 from ..database import databaseReadClass
 from ..trendutil import TrendsNames, TrendsUtilities
 from .setUpCalcStructures import setUpArrays
 
 def loadEcoregion( eco ):
+    #Each table is read once for all the ecoregion's intervals (and sources
+    # and gain/loss/gross/net types), see TrendsDBaccess.bulkRead
     try:
-        gp = arcgisscripting.create(9.3)    
+        gp = TrendsUtilities.getGP()    
         gp.OverwriteOutput = True
         trlog = TrendsUtilities.trLogger()
         dataAvailable = True
         if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsChangeData"
+            tableType = "Trends"
         else:
-            sourceName = "CustomChangeData"
+            tableType = "Custom"
+
+        def readTable( readClass, sourceName, keys, splitFields, targets, content ):
+            dbReader = readClass( gp, TrendsNames.dbLocation + tableType + sourceName )
+            if content == "data":
+                statNames = ""
+            else:
+                statNames = TrendsNames.statisticsNames
+            return dbReader.bulkRead( gp, eco.analysisNum, eco, eco.resolution, keys, splitFields,
+                                      targets, content, statNames )
+
+        def glgnTargets( arrays, intervals, ptr ):
+            #The data (ptr 0) or stats (ptr 1) array of each interval and tabType
+            return dict([(( interval, tabType ), arrays( interval )[ tabType ][ ptr ] )
+                         for interval in intervals for tabType in TrendsNames.glgnTabTypes ])
+
+        targets = dict([(( interval, ), eco.ecoData[interval][0] ) for interval in eco.ecoData ])
+        found = readTable( databaseReadClass.changeRead, "ChangeData", {}, [ "ChangePeriod" ],
+                           targets, "data" )
         nointervals = []
-        dbReader = databaseReadClass.changeRead( gp, TrendsNames.dbLocation + sourceName)
         for interval in eco.ecoData:
-            dataFound = dbReader.databaseRead( gp, eco.analysisNum, eco, interval,
-                                                   eco.resolution, eco.ecoData[interval][0],
-                                                   "data", TrendsNames.statisticsNames)
-            if not dataFound:
+            if ( interval, ) not in found:
                 nointervals.append( interval )
                 dataAvailable = False
                 trlog.trwrite("No data found for ecoregion " + str(eco.ecoNum) + " and interval " +\
@@ -49,15 +64,8 @@ def loadEcoregion( eco ):
         if len(eco.ecoData) > 0:
             dataAvailable = True
 
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsChangeStats"
-        else:
-            sourceName = "CustomChangeStats"
-        dbReader = databaseReadClass.changeRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.ecoData:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval,
-                                        eco.resolution, eco.ecoData[interval][1],
-                                       "stats", TrendsNames.statisticsNames)
+        targets = dict([(( interval, ), eco.ecoData[interval][1] ) for interval in eco.ecoData ])
+        readTable( databaseReadClass.changeRead, "ChangeStats", {}, [ "ChangePeriod" ], targets, "stats" )
                 
         #Now update the arrays for composition based on the intervals found
         folderList = eco.ecoData.keys()            
@@ -67,35 +75,18 @@ def loadEcoregion( eco ):
             if not (date in currentyears):
                 del eco.ecoComp[ date ]
 
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsCompData"
-        else:
-            sourceName = "CustomCompData"
-        dbReader = databaseReadClass.compositionRead( gp, TrendsNames.dbLocation + sourceName)
-        for year in eco.ecoComp:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, year, eco.resolution,
-                                             eco.ecoComp[year][0], "data", "")
-                
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsCompStats"
-        else:
-            sourceName = "CustomCompStats"
-        dbReader = databaseReadClass.compositionRead( gp, TrendsNames.dbLocation + sourceName)
-        for year in eco.ecoComp:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, year, eco.resolution,
-                                             eco.ecoComp[year][1], "stats", TrendsNames.statisticsNames)
+        targets = dict([(( year, ), eco.ecoComp[year][0] ) for year in eco.ecoComp ])
+        readTable( databaseReadClass.compositionRead, "CompData", {}, [ "CompYear" ], targets, "data" )
+        targets = dict([(( year, ), eco.ecoComp[year][1] ) for year in eco.ecoComp ])
+        readTable( databaseReadClass.compositionRead, "CompStats", {}, [ "CompYear" ], targets, "stats" )
 
         #Load multichange data where found.
+        targets = dict([(( interval, ), eco.ecoMulti[interval][0] ) for interval in eco.ecoMulti ])
+        found = readTable( databaseReadClass.multichangeRead, "MultichangeData", {}, [ "ChangePeriod" ],
+                           targets, "data" )
         nointervals = []
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsMultichangeData"
-        else:
-            sourceName = "CustomMultichangeData"
-        dbReader = databaseReadClass.multichangeRead( gp, TrendsNames.dbLocation + sourceName)
         for interval in eco.ecoMulti:
-            dataFound = dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                       eco.ecoMulti[interval][0],"data", "")
-            if not dataFound:
+            if ( interval, ) not in found:
                 nointervals.append( interval )
                 trlog.trwrite("No multichange data found for ecoregion " + str(eco.ecoNum) + " and interval " +\
                           str(interval))
@@ -106,7 +97,7 @@ def loadEcoregion( eco ):
             del eco.ecoMulti[ interval ]
 
         #Remove aggregate intervals if this eco isn't within the data boundaries
-        keylist = eco.aggregate_gross_keys
+        keylist = list( eco.aggregate_gross_keys )
         compyears = eco.ecoComp.keys()
         for interval in keylist:
             ptr = eco.aggregate_gross_keys.index(interval)
@@ -116,120 +107,46 @@ def loadEcoregion( eco ):
             if not (start in compyears) or not (end in compyears):
                 del eco.aggregate_gross_keys[ptr]
 
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsMultichangeStats"
-        else:
-            sourceName = "CustomMultichangeStats"
-        dbReader = databaseReadClass.multichangeRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.ecoMulti:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                   eco.ecoMulti[interval][1],"stats", TrendsNames.statisticsNames)
+        targets = dict([(( interval, ), eco.ecoMulti[interval][1] ) for interval in eco.ecoMulti ])
+        readTable( databaseReadClass.multichangeRead, "MultichangeStats", {}, [ "ChangePeriod" ],
+                   targets, "stats" )
 
         #Load the calculated data for glgn, all change and aggregate
         setUpArrays( eco )
-                
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsGlgnData"
-        else:
-            sourceName = "CustomGlgnData"
-        dbReader = databaseReadClass.glgnRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.ecoGlgn:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                             eco.ecoGlgn[interval],"data", "")
-                
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsGlgnStats"
-        else:
-            sourceName = "CustomGlgnStats"
-        dbReader = databaseReadClass.glgnRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.ecoGlgn:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                             eco.ecoGlgn[interval],
-                                       "stats", TrendsNames.statisticsNames)
+
+        readTable( databaseReadClass.glgnRead, "GlgnData", {}, [ "ChangePeriod", "Glgn" ],
+                   glgnTargets( lambda interval: eco.ecoGlgn[interval], eco.ecoGlgn, 0 ), "data" )
+        readTable( databaseReadClass.glgnRead, "GlgnStats", {}, [ "ChangePeriod", "Glgn" ],
+                   glgnTargets( lambda interval: eco.ecoGlgn[interval], eco.ecoGlgn, 1 ), "stats" )
 
         source = 'gross'
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsAggregateData"
-        else:
-            sourceName = "CustomAggregateData"
-        dbReader = databaseReadClass.aggregateRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.aggregate_gross_keys:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,source,
-                                             eco.aggregate[interval][source][0],"data", "")
-                    
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsAggregateStats"
-        else:
-            sourceName = "CustomAggregateStats"
-        dbReader = databaseReadClass.aggregateRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.aggregate_gross_keys:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution, source,
-                                             eco.aggregate[interval][source][1],
-                                           "stats", TrendsNames.statisticsNames)
+        for ( ptr, content ) in enumerate(( "data", "stats" )):
+            targets = dict([(( interval, ), eco.aggregate[interval][source][ptr] )
+                            for interval in eco.aggregate_gross_keys ])
+            readTable( databaseReadClass.aggregateRead, "Aggregate" + content.capitalize(),
+                       { 'Source': source }, [ "ChangePeriod" ], targets, content )
 
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsAggGlgnData"
-        else:
-            sourceName = "CustomAggGlgnData"
-        dbReader = databaseReadClass.aggGlgnRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.aggregate_gross_keys:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,source,
-                                             eco.aggGlgn[interval][source],
-                                       "data", "")
-                    
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsAggGlgnStats"
-        else:
-            sourceName = "CustomAggGlgnStats"
-        dbReader = databaseReadClass.aggGlgnRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.aggregate_gross_keys:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution, source,
-                                             eco.aggGlgn[interval][source],
-                                       "stats", TrendsNames.statisticsNames)
+        for ( ptr, content ) in enumerate(( "data", "stats" )):
+            readTable( databaseReadClass.aggGlgnRead, "AggGlgn" + content.capitalize(),
+                       { 'Source': source }, [ "ChangePeriod", "Glgn" ],
+                       glgnTargets( lambda interval: eco.aggGlgn[interval][source],
+                                    eco.aggregate_gross_keys, ptr ), content )
 
+        #All three sources of the all change tables come from one query
         sourceC = 'conversion'
         sourceA = 'addgross'
         sourceM = 'multichange'
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsAllChangeData"
-        else:
-            sourceName = "CustomAllChangeData"
-        dbReader = databaseReadClass.allChangeRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.ecoData:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                       sourceC,
-                                        eco.allChange[interval][sourceC][0],
-                                       "data", "")
-        for interval in eco.aggregate_gross_keys:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                       sourceA,
-                                        eco.allChange[interval][sourceA][0],
-                                       "data", "")
-        for interval in eco.ecoMulti:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                   sourceM,
-                                    eco.allChange[interval][sourceM][0],
-                                   "data", "")
-                    
-        if eco.analysisNum == TrendsNames.TrendsNum:
-            sourceName = "TrendsAllChangeStats"
-        else:
-            sourceName = "CustomAllChangeStats"
-        dbReader = databaseReadClass.allChangeRead( gp, TrendsNames.dbLocation + sourceName)
-        for interval in eco.ecoData:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                       sourceC, eco.allChange[interval][sourceC][1],
-                                       "stats", TrendsNames.statisticsNames)
-        for interval in eco.aggregate_gross_keys:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                       sourceA, eco.allChange[interval][sourceA][1],
-                                       "stats", TrendsNames.statisticsNames)
-        for interval in eco.ecoMulti:
-            dbReader.databaseRead( gp, eco.analysisNum, eco, interval, eco.resolution,
-                                    sourceM, eco.allChange[interval][sourceM][1],
-                                   "stats", TrendsNames.statisticsNames)
+        for ( ptr, content ) in enumerate(( "data", "stats" )):
+            targets = {}
+            for ( intervals, allSource ) in (( eco.ecoData, sourceC ),
+                                            ( eco.aggregate_gross_keys, sourceA ),
+                                            ( eco.ecoMulti, sourceM )):
+                for interval in intervals:
+                    targets[( interval, allSource )] = eco.allChange[interval][allSource][ptr]
+            readTable( databaseReadClass.allChangeRead, "AllChange" + content.capitalize(), {},
+                       [ "ChangePeriod", "Source" ], targets, content )
         return dataAvailable
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         # Get the geoprocessing error messages
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
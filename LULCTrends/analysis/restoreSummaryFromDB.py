@@ -4,6 +4,14 @@
 # and stores in the summary object.  The
 # empty arrays have already been created
 #
+# loadStoredSummary builds the whole summary object from the database: the
+#  Summary*Stats tables fill the summary arrays, and the estimated change and
+#  variance of each ecoregion are read back as small ecoregion objects, so an
+#  ecoregion can be replaced with studyArea.updateEcoregion after the run that
+#  made the summary has ended.  loadStoredEcoregion reads back one ecoregion,
+#  e.g. for a streamed summary, which keeps no ecoregions.  Both must be read
+#  before the recalculated ecoregion is stored over the old one.
+#
 # Written:         Aug 2011
 # Release date:    Mar 2012
 # Written by: Jeanne Jones, USGS, jmjones@usgs.gov
@@ -14,15 +22,19 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
-from ..database import databaseReadClass
+from ..database import databaseReadClass, StorageBackend
 from ..trendutil import TrendsNames, TrendsUtilities
-from .setUpCalcStructures import setUpShortEcoArrays
+from .setUpCalcStructures import setUpShortEcoArrays, setUpSummaryArrays
+from . import StudyAreaClass
+
+#Columns of the SummaryEcoregions rows, in the order the workbooks use
+ecoregionFields = [ "Ecoregion", "TotalBlks", "SampleBlks", "TotalPixels", "StudentT_85", "StudentT_90",
+                    "StudentT_95", "StudentT_99", "Resolution", "RunType" ]
 
 def loadSummary( sa ):
     try:
-        gp = arcgisscripting.create(9.3)    
+        gp = TrendsUtilities.getGP()    
         gp.OverwriteOutput = True
         trlog = TrendsUtilities.trLogger()
         where_clause = "AnalysisNum = " + str(sa.analysisNum) + \
@@ -88,7 +100,7 @@ def loadSummary( sa ):
                                     sourceM, sa.sumallchange[interval][sourceM][1],
                                    "stats", TrendsNames.sumStatsNames)
             
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         # Get the geoprocessing error messages
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
@@ -108,30 +120,28 @@ def loadSummary( sa ):
 
 def loadEcosForSummary( sa, ecoData ):
     try:
-        gp = arcgisscripting.create(9.3)    
+        gp = TrendsUtilities.getGP()    
         gp.OverwriteOutput = True
         trlog = TrendsUtilities.trLogger()
         statList = ('EstChange','EstVar')
+        store = StorageBackend.getBackend()
 
         def getoffset( source ):
             try:
-                desc = gp.Describe( source )
-                newfields = desc.Fields
+                newfields = store.describeFields( gp, source )
                 for ptr, field in enumerate(newfields):
                     if field.Name == "Statistic":
                         newoffset = ptr + 1
                 return newfields, newoffset
             except Exception:
                 raise
-        def getrows( tabname, clause, fields, offset, data ):
+        def getrows( tabname, keyValues, fields, offset, data ):
             try:
-                rows = gp.SearchCursor( tabname, clause )
-                row = rows.Next()
-                while row:
-                    ctr = statList.index( row.Statistic )
-                    for (ptr, field) in enumerate( fields[offset:]):
-                        data[ ptr, ctr ] = row.GetValue( field.Name )
-                    row = rows.Next()
+                names = [ field.Name for field in fields[offset:]]
+                for row in store.selectRows( gp, tabname, keyValues, [ "Statistic" ] + names ):
+                    ctr = statList.index( row[0] )
+                    for (ptr, value) in enumerate( row[1:] ):
+                        data[ ptr, ctr ] = value
             except Exception:
                 raise
 
@@ -145,10 +155,10 @@ def loadEcosForSummary( sa, ecoData ):
         ecoList = [x[0] for x in ecoData]        
         for ecoNum in ecoList:
             setUpShortEcoArrays( sa, ecoNum )
-            where_clause = "AnalysisNum = " + str(analysisNum) + \
-                        " and EcoLevel3ID = " + str(ecoNum) + \
-                       " and Resolution = '" + str(sa.resolution) + "'" + \
-                       " and (Statistic = 'EstChange' or Statistic = 'EstVar')"
+            keyValues = { 'AnalysisNum': analysisNum,
+                          'EcoLevel3ID': ecoNum,
+                          'Resolution': str(sa.resolution),
+                          'Statistic': list( statList ) }
 
             if tableType == "Trends":
                 sourceName = TrendsNames.dbLocation + "TrendsChangeStats"
@@ -156,7 +166,7 @@ def loadEcosForSummary( sa, ecoData ):
                 sourceName = TrendsNames.dbLocation + "CustomChangeStats"
             fields, offset = getoffset( sourceName )
             for interval in sa.intervals:
-                clause = where_clause + " and ChangePeriod = '" + interval + "'"
+                clause = dict( keyValues, ChangePeriod = interval )
                 getrows( sourceName, clause, fields, offset, sa.study[ecoNum].conv[interval] )
 
             if tableType == "Trends":
@@ -165,7 +175,7 @@ def loadEcosForSummary( sa, ecoData ):
                 sourceName = TrendsNames.dbLocation + "CustomCompStats"
             fields, offset = getoffset( sourceName )
             for year in sa.years:
-                clause = where_clause + " and CompYear = '" + year + "'"
+                clause = dict( keyValues, CompYear = year )
                 getrows( sourceName, clause, fields, offset, sa.study[ecoNum].comp[year] )
 
             if tableType == "Trends":
@@ -174,7 +184,7 @@ def loadEcosForSummary( sa, ecoData ):
                 sourceName = TrendsNames.dbLocation + "CustomMultichangeStats"
             fields, offset = getoffset( sourceName )
             for interval in sa.multiIntervals:
-                getrows( sourceName, where_clause, fields, offset, sa.study[ecoNum].multi[interval] )
+                getrows( sourceName, keyValues, fields, offset, sa.study[ecoNum].multi[interval] )
 
             if tableType == "Trends":
                 sourceName = TrendsNames.dbLocation + "TrendsGlgnStats"
@@ -183,8 +193,7 @@ def loadEcosForSummary( sa, ecoData ):
             fields, offset = getoffset( sourceName )
             for interval in sa.intervals:
                 for tab in TrendsNames.glgnTabTypes:
-                    clause = where_clause + " and ChangePeriod = '" + interval + "'" + \
-                             " and Glgn = \'" + tab + "\'" 
+                    clause = dict( keyValues, ChangePeriod = interval, Glgn = tab )
                     getrows( sourceName, clause, fields, offset, sa.study[ecoNum].glgn[interval][tab] )
 
             source = 'gross'                    
@@ -194,8 +203,7 @@ def loadEcosForSummary( sa, ecoData ):
                 sourceName = TrendsNames.dbLocation + "CustomAggregateStats"
             fields, offset = getoffset( sourceName )
             for interval in sa.aggIntervals:
-                clause = where_clause + " and ChangePeriod = '" + interval + "'" + \
-                        " and Source = '" + source + "'"
+                clause = dict( keyValues, ChangePeriod = interval, Source = source )
                 getrows( sourceName, clause, fields, offset, sa.study[ecoNum].aggregate[interval][source] )
 
             if tableType == "Trends":
@@ -205,8 +213,7 @@ def loadEcosForSummary( sa, ecoData ):
             fields, offset = getoffset( sourceName )
             for interval in sa.aggIntervals:
                 for tab in TrendsNames.glgnTabTypes:
-                    clause = where_clause + " and ChangePeriod = '" + interval + "'" + \
-                             " and Source = '" + source + "'" + " and Glgn = \'" + tab + "\'" 
+                    clause = dict( keyValues, ChangePeriod = interval, Source = source, Glgn = tab )
                     getrows( sourceName, clause, fields, offset, sa.study[ecoNum].aggGlgn[interval][source][tab] )
 
             sourceC = 'conversion'
@@ -218,21 +225,18 @@ def loadEcosForSummary( sa, ecoData ):
                 sourceName = TrendsNames.dbLocation + "CustomAllChangeStats"
             fields, offset = getoffset( sourceName )
             for interval in sa.intervals:
-                clause = where_clause + " and ChangePeriod = '" + interval + "'" + \
-                        " and Source = '" + sourceC + "'"
+                clause = dict( keyValues, ChangePeriod = interval, Source = sourceC )
                 getrows( sourceName, clause, fields, offset, sa.study[ecoNum].allchg[interval][sourceC] )
 
             for interval in sa.aggIntervals:
-                clause = where_clause + " and ChangePeriod = '" + interval + "'" + \
-                        " and Source = '" + sourceA + "'"
+                clause = dict( keyValues, ChangePeriod = interval, Source = sourceA )
                 getrows( sourceName, clause, fields, offset, sa.study[ecoNum].allchg[interval][sourceA] )
 
             for interval in sa.multiIntervals:
-                clause = where_clause + " and ChangePeriod = '" + interval + "'" + \
-                        " and Source = '" + sourceM + "'"
+                clause = dict( keyValues, ChangePeriod = interval, Source = sourceM )
                 getrows( sourceName, clause, fields, offset, sa.study[ecoNum].allchg[interval][sourceM] )
             
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         # Get the geoprocessing error messages
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
@@ -249,3 +253,78 @@ def loadEcosForSummary( sa, ecoData ):
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         trlog.trwrite(pymsg)
         raise  #push the error up to exit
+
+def loadStoredEcoregion( sa, ecoRow ):
+    #Read one ecoregion of the summary back from its statistics tables, with the
+    # parameters of its SummaryEcoregions row ( see ecoregionFields )
+    loadEcosForSummary( sa, [ ecoRow ] )
+    eco = sa.study[ ecoRow[0] ]
+    eco.totalBlks = ecoRow[1]
+    eco.sampleBlks = ecoRow[2]
+    eco.totalEstPixels = ecoRow[3]
+    eco.studentT = list( ecoRow[4:8] )
+    eco.resolution = str( ecoRow[8] )
+    eco.runType = str( ecoRow[9] )
+    return eco
+
+def getEcoregionRows( gp, analysisNum, ecoNum = None ):
+    #The SummaryEcoregions rows of an analysis, or of one of its ecoregions
+    keyValues = { 'AnalysisNum': analysisNum }
+    if ecoNum is not None:
+        keyValues['Ecoregion'] = ecoNum
+    rows = StorageBackend.getBackend().selectRows( gp, TrendsNames.dbLocation + "SummaryEcoregions",
+                                                   keyValues, ecoregionFields )
+    return [ tuple( row ) for row in rows ]
+
+def loadStoredSummary( analysisName, analysisNum ):
+    #A study area object for a stored summary, with its summary arrays and
+    # ecoregions read from the database
+    try:
+        gp = TrendsUtilities.getGP()
+        trlog = TrendsUtilities.trLogger()
+        trlog.trwrite("Loading stored summary " + analysisName + "   " + time.asctime())
+        store = StorageBackend.getBackend()
+
+        rows = store.selectRows( gp, TrendsNames.dbLocation + "SummaryAnalysisParams", { 'AnalysisNum': analysisNum },
+                                 [ "Total_Blocks", "num_samples", "TotalPixels", "Resolution",
+                                   "StudentT_85", "StudentT_90", "StudentT_95", "StudentT_99" ] )
+        if not rows:
+            raise TrendsUtilities.TrendsErrors( "No summary statistics stored for " + analysisName )
+        params = rows[0]
+
+        sa = StudyAreaClass.studyArea( gp, analysisName, analysisNum )
+        sa.totalBlocks = params[0]
+        sa.summarySamples = params[1]
+        sa.sumEstPixels = params[2]
+        sa.resolution = str( params[3] )
+        sa.studentT = list( params[4:8] )
+
+        keyValues = { 'AnalysisNum': analysisNum, 'Resolution': sa.resolution }
+        sa.intervals, sa.years = TrendsUtilities.getIntervalList( gp, TrendsNames.dbLocation + "SummaryChangeStats",
+                                                                  keyValues, "ChangePeriod" )
+        sa.multiIntervals, noyears = TrendsUtilities.getIntervalList( gp, TrendsNames.dbLocation + "SummaryMultichangeStats",
+                                                                      keyValues, "ChangePeriod" )
+        sa.aggIntervals, noyears = TrendsUtilities.getIntervalList( gp, TrendsNames.dbLocation + "SummaryAggregateStats",
+                                                                    dict( keyValues, Source = 'gross' ), "ChangePeriod" )
+        setUpSummaryArrays( sa )
+        loadSummary( sa )
+
+        sa.ecoData = getEcoregionRows( gp, analysisNum )
+        for ecoRow in sa.ecoData:
+            loadStoredEcoregion( sa, ecoRow )
+        return sa
+
+    except TrendsUtilities.ExecuteError:
+        msgs = gp.GetMessage(0)
+        msgs += gp.GetMessages(2)
+        trlog.trwrite(msgs)
+        raise
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise
@@ -12,7 +12,6 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 import numpy
 from ..trendutil import TrendsNames, TrendsUtilities
@@ -69,46 +68,61 @@ def setUpArrays( eco ):
         raise     #push the error up to exit
 
 def setUpSummaryArrays( sa ):
+    #The summary tables of each family are stacked into one array, e.g. the conversion
+    # summaries for all intervals are sa.summaryStacks['conversion'][ interval position ],
+    # and the glgn summaries are sa.summaryStacks['glgn'][ interval position, tabType position ].
+    # The dictionaries (sa.summary, sa.sumglgn, ...) hold views into these stacks, so
+    # each family can be added up and calculated in a single step.
     try:
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
 
-        add_keys = TrendsNames.aggregate_gross_interval
-
-        for interval in sa.intervals:
-            sa.summary[ interval ] = (0, numpy.zeros(( TrendsNames.numConversions, TrendsNames.numSumStatsNames ), float))
+        add_keys = sa.aggIntervals
+        numTabTypes = len( TrendsNames.glgnTabTypes )
+        numStats = TrendsNames.numSumStatsNames
+
+        sa.summaryStacks = {}
+        sa.summaryStacks['conversion'] = numpy.zeros(( len(sa.intervals), TrendsNames.numConversions, numStats ), float)
+        sa.summaryStacks['glgn'] = numpy.zeros(( len(sa.intervals), numTabTypes, TrendsNames.numLCtypes, numStats ), float)
+        sa.summaryStacks['allchange'] = numpy.zeros(( len(sa.intervals), 1, numStats ), float)
+        sa.summaryStacks['comp'] = numpy.zeros(( len(sa.years), TrendsNames.numLCtypes, numStats ), float)
+        sa.summaryStacks['addgross'] = numpy.zeros(( len(add_keys), 1, numStats ), float)
+        sa.summaryStacks['aggregate'] = numpy.zeros(( len(add_keys), TrendsNames.numConversions, numStats ), float)
+        sa.summaryStacks['aggglgn'] = numpy.zeros(( len(add_keys), numTabTypes, TrendsNames.numLCtypes, numStats ), float)
+        sa.summaryStacks['multi'] = numpy.zeros(( len(sa.multiIntervals), TrendsNames.numMulti, numStats ), float)
+        sa.summaryStacks['multichange'] = numpy.zeros(( len(sa.multiIntervals), 1, numStats ), float)
+
+        for ptr, interval in enumerate( sa.intervals ):
+            sa.summary[ interval ] = (0, sa.summaryStacks['conversion'][ ptr ])
             sa.sumglgn[ interval ] = {}
-            for tabType in TrendsNames.glgnTabTypes:
-                sa.sumglgn[ interval ][ tabType ] = (0, numpy.zeros(( TrendsNames.numLCtypes, TrendsNames.numSumStatsNames ), float))
+            for tabPtr, tabType in enumerate( TrendsNames.glgnTabTypes ):
+                sa.sumglgn[ interval ][ tabType ] = (0, sa.summaryStacks['glgn'][ ptr, tabPtr ])
 
             #Create the allChange arrays
             sa.sumallchange[ interval ] = {}
-            sa.sumallchange[ interval ]['conversion'] = ( 0,
-                                        numpy.zeros(( 1, TrendsNames.numSumStatsNames ), float))
+            sa.sumallchange[ interval ]['conversion'] = ( 0, sa.summaryStacks['allchange'][ ptr ])
             
-        for year in sa.years:
-            sa.sumcomp[ year ] = (0, numpy.zeros(( TrendsNames.numLCtypes, TrendsNames.numSumStatsNames ), float))
+        for ptr, year in enumerate( sa.years ):
+            sa.sumcomp[ year ] = (0, sa.summaryStacks['comp'][ ptr ])
 
         #Create the arrays for the aggregated gross change data
-        for key in add_keys:
-            sa.sumallchange[key]['addgross'] = ( 0,
-                                        numpy.zeros(( 1, TrendsNames.numSumStatsNames ), float))
+        for ptr, key in enumerate( add_keys ):
+            if key not in sa.sumallchange:
+                sa.sumallchange[ key ] = {}
+            sa.sumallchange[key]['addgross'] = ( 0, sa.summaryStacks['addgross'][ ptr ])
             #Create the aggregate change arrays for specified intervals
             sa.sumaggregate[ key ] = {}
-            sa.sumaggregate[ key ]['gross'] = ( 0,
-                                        numpy.zeros(( TrendsNames.numConversions, TrendsNames.numSumStatsNames ), float))
+            sa.sumaggregate[ key ]['gross'] = ( 0, sa.summaryStacks['aggregate'][ ptr ])
             sa.sumaggglgn[ key ] = {}
             sa.sumaggglgn[ key ]['gross'] = {}
-            for tabType in TrendsNames.glgnTabTypes:
-                sa.sumaggglgn[ key ]['gross'][ tabType ] = (0,
-                                        numpy.zeros(( TrendsNames.numLCtypes, TrendsNames.numSumStatsNames ), float))
+            for tabPtr, tabType in enumerate( TrendsNames.glgnTabTypes ):
+                sa.sumaggglgn[ key ]['gross'][ tabType ] = (0, sa.summaryStacks['aggglgn'][ ptr, tabPtr ])
 
         #Throw in a multichange 'allchange' at a fixed interval for now. Eventually multichange should have dates
         # associated with it
-        for interval in sa.multiIntervals:
-            sa.summulti[interval] = (0, numpy.zeros(( TrendsNames.numMulti, TrendsNames.numSumStatsNames ), float))
-            sa.sumallchange[interval]['multichange'] = ( 0,
-                                        numpy.zeros(( 1, TrendsNames.numSumStatsNames ), float))
+        for ptr, interval in enumerate( sa.multiIntervals ):
+            sa.summulti[interval] = (0, sa.summaryStacks['multi'][ ptr ])
+            sa.sumallchange[interval]['multichange'] = ( 0, sa.summaryStacks['multichange'][ ptr ])
         
     except Exception:
         tb = sys.exc_info()[2]
@@ -13,6 +13,15 @@
 #  These columns are added together and form the basis for the
 #  rest of the sa.summary statistics in the sa.summary table.
 #
+# updateSummaryStats replaces one ecoregion of an existing summary:
+#  its old estimated change and variance are subtracted from the totals
+#  and the new ones added, the derived columns are recalculated for the
+#  intervals that moved, and only the changed statistic rows are
+#  rewritten in the Summary*Stats tables.  The old ecoregion can be the
+#  ecoregion object from the run, or the small ecoregion object read back
+#  from the database (restoreSummaryFromDB), which holds only the estimated
+#  change and variance.
+#
 # Written:         Sep 2010
 # Release date:    Mar 2012
 # Written by: Jeanne Jones, USGS, jmjones@usgs.gov
@@ -24,16 +33,58 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 #Import modules
-import arcgisscripting, os, sys, traceback, time
-import rpy2.robjects as robjects
-import rpy2.robjects.numpy2ri
+import os, sys, traceback, time
 import numpy
 from ..trendutil import TrendsNames, TrendsUtilities
+from ..trendutil.StudentT import studentTValues
 from . import UpdateAnalysisParams
 from ..database import databaseWriteClass
 from . import basicSummaryStatistics
 from .setUpCalcStructures import setUpSummaryArrays
 
+#Summary families that use the total estimated pixels of the study area, and
+# those that use the total aggregated gross change
+sumPixelFamilies = ('conversion','glgn','allchange','comp','multi','multichange')
+aggPixelFamilies = ('addgross','aggregate','aggglgn')
+
+#Summary table, first key field, and Source of each family's rows in the database
+summaryTables = { 'conversion': ('SummaryChangeStats', 'ChangePeriod', None),
+                  'glgn': ('SummaryGlgnStats', 'ChangePeriod', None),
+                  'allchange': ('SummaryAllChangeStats', 'ChangePeriod', 'conversion'),
+                  'comp': ('SummaryCompStats', 'CompYear', None),
+                  'addgross': ('SummaryAllChangeStats', 'ChangePeriod', 'addgross'),
+                  'aggregate': ('SummaryAggregateStats', 'ChangePeriod', 'gross'),
+                  'aggglgn': ('SummaryAggGlgnStats', 'ChangePeriod', 'gross'),
+                  'multi': ('SummaryMultichangeStats', 'ChangePeriod', None),
+                  'multichange': ('SummaryAllChangeStats', 'ChangePeriod', 'multichange') }
+
+def setSummaryStudentT( sa ):
+    #Get the student's T values for 15%, 10%, 5%, and 1% quantiles
+    # Values are contained in studentT[0] - [3].  The quantiles are one-tailed,
+    # so studentTValues uses 7.5%, 5%, 2.5%, and .5% for 2-tailed.
+    degreesFreedom = sa.summarySamples - 1
+    if sa.summarySamples > 1:
+        sa.studentT = studentTValues( degreesFreedom )
+    else:
+        sa.studentT = [-9999.99, -9999.99, -9999.99, -9999.99]
+
+def familyPeriods( sa, family ):
+    #Intervals (or years) along the first axis of a family's summary stack
+    if family == 'comp':
+        return sa.years
+    if family in aggPixelFamilies:
+        return sa.aggIntervals
+    if family in ('multi','multichange'):
+        return sa.multiIntervals
+    return sa.intervals
+
+def aggregatePixelCount( sa ):
+    #Aggregated gross change uses the total change of the first aggregate interval
+    if not sa.aggIntervals:
+        return 0.0
+    interval = sa.aggIntervals[0]
+    return numpy.sum(sa.sumaggregate[ interval ]['gross'][1][:,TrendsNames.sumStatsNames.index('TotalChng')])
+
 #Calculate the sa.summary statistics for all ecoregions in the study area.
 #Get the estimated change and estimated variance from the statistics arrays
 # for each ecoregion and add together.  Calculate other columns in the
@@ -42,7 +93,7 @@ from .setUpCalcStructures import setUpSummaryArrays
 def genSummaryStats( sa, analysisNum ):
     try:
         #Create the geoprocessor object
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
         #Set up a log object
         trlog = TrendsUtilities.trLogger()
@@ -53,15 +104,7 @@ def genSummaryStats( sa, analysisNum ):
             sa.totalBlocks += sa.study[ eco ].totalBlks
         trlog.trwrite("Total sample blocks in summary statistics: " + str(sa.summarySamples))
         
-        #Get the student's T values for 15%, 10%, 5%, and 1% quantiles
-        # Values are contained in studentT[0] - [3].  R returns a one-tailed t
-        # value, so use 7.5%, 5%, 2.5%, and .5% for 2-tailed.
-        degreesFreedom = sa.summarySamples - 1
-        r_qt = robjects.r['qt']
-        if sa.summarySamples > 1:
-            sa.studentT = r_qt(robjects.FloatVector([.925, .95, .975, .995]), degreesFreedom)
-        else:
-            sa.studentT = [-9999.99, -9999.99, -9999.99, -9999.99]
+        setSummaryStudentT( sa )
         tempstr = "Student T values for study area: %0.3f  %0.3f  %0.3f  %0.3f" %(sa.studentT[0],sa.studentT[1],sa.studentT[2],sa.studentT[3])
         trlog.trwrite( tempstr )
         
@@ -90,6 +133,11 @@ def genSummaryStats( sa, analysisNum ):
         for eco in ecos:
             tempList.extend( [x for x in tempintervals if x not in sa.study[eco].ecoMulti.keys()] )
         sa.multiIntervals = [ x for x in tempintervals if x not in tempList ]
+
+        #Aggregate intervals are dropped by ecoregions outside their years, so only
+        # the ones every ecoregion kept are summarized
+        sa.aggIntervals = [ x for x in TrendsNames.aggregate_gross_interval
+                            if not [ eco for eco in ecos if x not in sa.study[eco].aggregate_gross_keys ]]
             
         #create and initialize arrays for the stats, multichange array is currently initialized in studyareaclass
         setUpSummaryArrays( sa )
@@ -103,16 +151,7 @@ def genSummaryStats( sa, analysisNum ):
         #get all the summary stats added up
         addAllSummaryStats( sa )
 
-        #calculate the statistics
-        calcAllSummaryStats( sa )
-
-        #store the tables to the database
-        storeAllSummaryStats( gp, sa )
-        
-        #Write general analysis parameters to supplemental table
-        tableName = "SummaryAnalysisParams"
-        UpdateAnalysisParams.updateParameters( tableName, analysisNum, 0, sa.summarySamples, sa.totalBlocks, sa.sumEstPixels,
-                                               sa.studentT[0],sa.studentT[1],sa.studentT[2],sa.studentT[3], sa.resolution)
+        finishSummaryStats( gp, sa, analysisNum )
         
     except Exception:
         #print out the system error traceback
@@ -122,78 +161,49 @@ def genSummaryStats( sa, analysisNum ):
         trlog.trwrite(pymsg)
         raise     #push the error up to exit
 
-def addAllSummaryStats( sa ):
+def finishSummaryStats( gp, sa, analysisNum ):
+    #Calculate the statistics from the added up total change and total variance,
+    # then store the tables and the analysis parameters
+    calcAllSummaryStats( sa )
+
+    #store the tables to the database
+    storeAllSummaryStats( gp, sa )
+
+    #Write general analysis parameters to supplemental table
+    tableName = "SummaryAnalysisParams"
+    UpdateAnalysisParams.updateParameters( tableName, analysisNum, 0, sa.summarySamples, sa.totalBlocks, sa.sumEstPixels,
+                                           sa.studentT[0],sa.studentT[1],sa.studentT[2],sa.studentT[3], sa.resolution)
+
+def foldEcoregion( sa, eco ):
+    #Streaming mode: add an ecoregion's counts and estimated change and variance to
+    # the running totals of the study area, so the ecoregion object can be released.
+    # format of sa.running = { family: { interval or year: [ number of ecoregions,
+    #                                                         (..., row, 2) totals ]}}
     try:
         trlog = TrendsUtilities.trLogger()
-        for eco in sa.study:
-            for interval in sa.intervals:
-            
-                #for each interval, add the estimated change column and estimated
-                #variance columns.  Est change is in the 2nd
-                #column of reach ecoregion's statistics array and est variance is in the
-                #5th column.  See statName definition in createRegionStats.py.
-                #The [1] in region[folder][1][:,1] is pointing to the statistics array.
-                #The notation ':' with a numpy array performs the operation item by
-                #item in the column.
-                #First column is total change
-                #Total change = sum (est. change columns for each ecoregion) (pixels)
-                #Second column is total variance
-                #Total variance = sum (est. variance columns for each ecoregion) (pixels)
-                
-                sa.summary[ interval ][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                         sa.study[ eco ].ecoData[ interval ][1][:,sa.study[eco].statName.index('EstChange')]
-                sa.summary[ interval ][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                         sa.study[ eco ].ecoData[ interval ][1][:,sa.study[eco].statName.index('EstVar')]
-
-                for tabType in TrendsNames.glgnTabTypes:
-                    sa.sumglgn[ interval ][ tabType ][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                             sa.study[eco].ecoGlgn[ interval ][ tabType ][1][:,sa.study[eco].statName.index('EstChange')]
-                    
-                    sa.sumglgn[ interval ][ tabType ][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                             sa.study[eco].ecoGlgn[ interval ][ tabType ][1][:,sa.study[eco].statName.index('EstVar')]
-
-                sa.sumallchange[ interval ]['conversion'][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                         sa.study[ eco ].allChange[ interval ]['conversion'][1][:,sa.study[eco].statName.index('EstChange')]
-                sa.sumallchange[ interval ]['conversion'][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                         sa.study[ eco ].allChange[ interval ]['conversion'][1][:,sa.study[eco].statName.index('EstVar')]
-   
-            for year in sa.years:
-                # Now sum est change( really composition ) and variance for composition data
-                sa.sumcomp[ year ][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                         sa.study[ eco ].ecoComp[ year ][1][:,sa.study[eco].statName.index('EstChange')]
-                sa.sumcomp[ year ][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                         sa.study[ eco ].ecoComp[ year ][1][:,sa.study[eco].statName.index('EstVar')]
-
-            #Sum est change and variance for aggregated gross change
-            for key in TrendsNames.aggregate_gross_interval:
-                sa.sumallchange[ key ]['addgross'][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                         sa.study[ eco ].allChange[ key ]['addgross'][1][:,sa.study[eco].statName.index('EstChange')]
-                sa.sumallchange[ key ]['addgross'][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                         sa.study[ eco ].allChange[ key ]['addgross'][1][:,sa.study[eco].statName.index('EstVar')]
-
-                sa.sumaggregate[ key ]['gross'][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                         sa.study[ eco ].aggregate[ key ]['gross'][1][:,sa.study[eco].statName.index('EstChange')]
-                sa.sumaggregate[ key ]['gross'][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                         sa.study[ eco ].aggregate[ key ]['gross'][1][:,sa.study[eco].statName.index('EstVar')]
-
-                for tabType in TrendsNames.glgnTabTypes:
-                    sa.sumaggglgn[ key ]['gross'][ tabType ][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                             sa.study[eco].aggGlgn[ key ]['gross'][ tabType ][1][:,sa.study[eco].statName.index('EstChange')]
-                    
-                    sa.sumaggglgn[ key ]['gross'][ tabType ][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                             sa.study[eco].aggGlgn[ key ]['gross'][ tabType ][1][:,sa.study[eco].statName.index('EstVar')]
-
-
-            #Now sum est change and variance for multichange data
-            for key in sa.multiIntervals:
-                sa.summulti[key][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                                            sa.study[eco].ecoMulti[key][1][:,sa.study[eco].statName.index('EstChange')]
-                sa.summulti[key][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                                            sa.study[eco].ecoMulti[key][1][:,sa.study[eco].statName.index('EstVar')]
-                sa.sumallchange[ key ]['multichange'][1][:,TrendsNames.sumStatsNames.index('TotalChng')] += \
-                         sa.study[ eco ].allChange[ key ]['multichange'][1][:,sa.study[eco].statName.index('EstChange')]
-                sa.sumallchange[ key ]['multichange'][1][:,TrendsNames.sumStatsNames.index('TotalVar')] += \
-                         sa.study[ eco ].allChange[ key ]['multichange'][1][:,sa.study[eco].statName.index('EstVar')]
+        sa.runningEcos += 1
+        sa.summarySamples += eco.sampleBlks
+        sa.totalBlocks += eco.totalBlks
+        sa.sumEstPixels += eco.totalEstPixels
+
+        #The resolution for the summary is the max of any eco in study
+        if eco.resolution != TrendsNames.minResolution or sa.resolution == TrendsNames.maxResolution:
+            sa.resolution = TrendsNames.maxResolution
+        else:
+            sa.resolution = TrendsNames.minResolution
+
+        for family in summaryTables:
+            periods = ecoPeriods( eco, family )
+            if not periods:
+                continue
+            estimates = ecoEstimates( eco, family, periods )
+            totals = sa.running.setdefault( family, {} )
+            for ptr, period in enumerate( periods ):
+                if period in totals:
+                    totals[ period ][0] += 1
+                    totals[ period ][1] += estimates[ ptr ]
+                else:
+                    totals[ period ] = [ 1, estimates[ ptr ].copy() ]
     except Exception:
         #print out the system error traceback
         tb = sys.exc_info()[2]
@@ -202,51 +212,175 @@ def addAllSummaryStats( sa ):
         trlog.trwrite(pymsg)
         raise     #push the error up to exit
 
-def calcAllSummaryStats( sa ):
+def genStreamedSummaryStats( sa, analysisNum ):
+    #Same as genSummaryStats, but from the running totals built up by foldEcoregion
+    # instead of from the ecoregion objects
     try:
+        gp = TrendsUtilities.getGP()
+        gp.OverwriteOutput = True
         trlog = TrendsUtilities.trLogger()
+        trlog.trwrite("starting streamed summary statistics for " + str(sa.runningEcos) + " ecoregions   " + time.asctime())
+        trlog.trwrite("Total sample blocks in summary statistics: " + str(sa.summarySamples))
+
+        setSummaryStudentT( sa )
+        tempstr = "Student T values for study area: %0.3f  %0.3f  %0.3f  %0.3f" %(sa.studentT[0],sa.studentT[1],sa.studentT[2],sa.studentT[3])
+        trlog.trwrite( tempstr )
+        trlog.trwrite("Total estimated pixels in summary statistics: " + str(sa.sumEstPixels))
+
+        #An interval is in the summary when every ecoregion added to the totals had it
+        def common( family, periods ):
+            totals = sa.running.get( family, {} )
+            return [ x for x in periods if x in totals and totals[ x ][0] == sa.runningEcos ]
+        sa.intervals = common( 'conversion', os.listdir( TrendsNames.changeImageFolders ))
         for interval in sa.intervals:
-            #Calculate sa.summary statistics on conversions
-            basicSummaryStatistics.basicSummaryStats( TrendsNames.numConversions, sa.summary[ interval ][1],
-                                                      sa.studentT, sa.sumEstPixels )
-
-            #Calculate sa.summary statistics on gain, loss, gross, net
-            for tabType in TrendsNames.glgnTabTypes:
-                basicSummaryStatistics.basicSummaryStats( TrendsNames.numLCtypes, sa.sumglgn[ interval ][ tabType ][1],
-                                                          sa.studentT, sa.sumEstPixels )
-
-            #Calculate sa.summary statistics on all change (only 1 row)
-            basicSummaryStatistics.basicSummaryStats( 1, sa.sumallchange[ interval ]['conversion'][1],
-                                                            sa.studentT, sa.sumEstPixels )
-
-        for year in sa.years:
-            #Calculate sa.summary statistics on composition years
-            basicSummaryStatistics.basicSummaryStats( TrendsNames.numLCtypes, sa.sumcomp[ year ][1],
-                                                       sa.studentT, sa.sumEstPixels )
-
-        #Calculate sa.summary statistics on aggregated gross change
-        interval = TrendsNames.aggregate_gross_interval[0]
-        aggPixelCount = numpy.sum(sa.sumaggregate[ interval ]['gross'][1][:,TrendsNames.sumStatsNames.index('TotalChng')])
-        
+            trlog.trwrite("summary interval: " + interval)
+        sa.years = TrendsUtilities.getYearsFromIntervals( gp, sa.intervals )
+        sa.multiIntervals = common( 'multi', sa.intervals )
+        sa.aggIntervals = common( 'aggregate', TrendsNames.aggregate_gross_interval )
+        setUpSummaryArrays( sa )
 
-        for key in TrendsNames.aggregate_gross_interval:
-            basicSummaryStatistics.basicSummaryStats( 1, sa.sumallchange[ key ]['addgross'][1],
-                                                            sa.studentT, aggPixelCount )
-            basicSummaryStatistics.basicSummaryStats( TrendsNames.numConversions, sa.sumaggregate[ key ]['gross'][1],
-                                                        sa.studentT, aggPixelCount )
-            #Calculate sa.summary statistics on aggregate gain, loss, gross, net
-            for tabType in TrendsNames.glgnTabTypes:
-                basicSummaryStatistics.basicSummaryStats( TrendsNames.numLCtypes, sa.sumaggglgn[ key ]['gross'][ tabType ][1],
-                                                          sa.studentT, aggPixelCount )
+        sumColumns = [ TrendsNames.sumStatsNames.index('TotalChng'), TrendsNames.sumStatsNames.index('TotalVar') ]
+        for family in sa.summaryStacks:
+            periods = familyPeriods( sa, family )
+            found = common( family, periods )
+            missing = [ x for x in periods if x not in found ]
+            if missing:
+                raise TrendsUtilities.TrendsErrors( "Summary " + family + " data is missing for " + ", ".join( missing ))
+            for ptr, period in enumerate( periods ):
+                sa.summaryStacks[ family ][ ptr ][..., sumColumns] = sa.running[ family ][ period ][1]
+
+        finishSummaryStats( gp, sa, analysisNum )
+
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        #print out the system error traceback
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise     #push the error up to exit
 
-                
-        #Calculate sa.summary statistics on multichange images
-        for key in sa.multiIntervals:
-            basicSummaryStatistics.basicSummaryStats( TrendsNames.numMulti, sa.summulti[key][1],
-                                                    sa.studentT, sa.sumEstPixels )
-            basicSummaryStatistics.basicSummaryStats( 1, sa.sumallchange[ key ]['multichange'][1],
-                                                        sa.studentT, sa.sumEstPixels )
+def ecoFamilyStats( region, family, periods ):
+    #The statistics arrays of one ecoregion object for a summary family and list of
+    # intervals (or years), stacked in the same order as a family summary stack
+    glgnTypes = TrendsNames.glgnTabTypes
+    if family == 'conversion':
+        return region.ecoData.stackStats( periods )
+    if family == 'glgn':
+        return numpy.array([[ region.ecoGlgn[ interval ][ tabType ][1] for tabType in glgnTypes ]
+                                                                       for interval in periods ])
+    if family == 'allchange':
+        return numpy.array([ region.allChange[ interval ]['conversion'][1] for interval in periods ])
+    if family == 'comp':
+        return region.ecoComp.stackStats( periods )
+    if family == 'addgross':
+        return numpy.array([ region.allChange[ key ]['addgross'][1] for key in periods ])
+    if family == 'aggregate':
+        return numpy.array([ region.aggregate[ key ]['gross'][1] for key in periods ])
+    if family == 'aggglgn':
+        return numpy.array([[ region.aggGlgn[ key ]['gross'][ tabType ][1] for tabType in glgnTypes ]
+                                                                           for key in periods ])
+    if family == 'multi':
+        return region.ecoMulti.stackStats( periods )
+    if family == 'multichange':
+        return numpy.array([ region.allChange[ key ]['multichange'][1] for key in periods ])
+    raise TrendsUtilities.TrendsErrors( "Unknown summary family: " + str( family ))
+
+def ecoPeriods( region, family ):
+    #Intervals (or years) an ecoregion object has data for in a summary family
+    if family == 'comp':
+        return region.ecoComp.keys()
+    if family in ('multi','multichange'):
+        return region.ecoMulti.keys()
+    if family in aggPixelFamilies:
+        return [ key for key in region.aggregate_gross_keys if key in region.aggregate ]
+    return region.ecoData.keys()
+
+def ecoEstimates( region, family, periods ):
+    #Estimated change and estimated variance columns of an ecoregion for a family
+    if not hasattr( region, 'statName' ):
+        return shortEstimates( region, family, periods )
+    estColumns = [ region.statName.index('EstChange'), region.statName.index('EstVar') ]
+    return ecoFamilyStats( region, family, periods )[..., estColumns]
+
+def shortEstimates( region, family, periods ):
+    #The same for a small ecoregion object (setUpCalcStructures.smallEco), whose
+    # arrays hold only the estimated change and estimated variance
+    glgnTypes = TrendsNames.glgnTabTypes
+    if family == 'conversion':
+        return numpy.array([ region.conv[ interval ] for interval in periods ])
+    if family == 'glgn':
+        return numpy.array([[ region.glgn[ interval ][ tabType ] for tabType in glgnTypes ] for interval in periods ])
+    if family == 'allchange':
+        return numpy.array([ region.allchg[ interval ]['conversion'] for interval in periods ])
+    if family == 'comp':
+        return numpy.array([ region.comp[ year ] for year in periods ])
+    if family == 'addgross':
+        return numpy.array([ region.allchg[ key ]['addgross'] for key in periods ])
+    if family == 'aggregate':
+        return numpy.array([ region.aggregate[ key ]['gross'] for key in periods ])
+    if family == 'aggglgn':
+        return numpy.array([[ region.aggGlgn[ key ]['gross'][ tabType ] for tabType in glgnTypes ] for key in periods ])
+    if family == 'multi':
+        return numpy.array([ region.multi[ interval ] for interval in periods ])
+    if family == 'multichange':
+        return numpy.array([ region.allchg[ key ]['multichange'] for key in periods ])
+    raise TrendsUtilities.TrendsErrors( "Unknown summary family: " + str( family ))
+
+def addAllSummaryStats( sa ):
+    #For each family of summary tables (conversion, glgn, composition, ...), stack the
+    # estimated change and estimated variance columns of every ecoregion and add them
+    # up in one reduction over the ecoregion axis.
+    #First column of the summary is total change
+    #Total change = sum (est. change columns for each ecoregion) (pixels)
+    #Second column is total variance
+    #Total variance = sum (est. variance columns for each ecoregion) (pixels)
+    try:
+        trlog = TrendsUtilities.trLogger()
+        sumColumns = [ TrendsNames.sumStatsNames.index('TotalChng'), TrendsNames.sumStatsNames.index('TotalVar') ]
+        for family in sa.summaryStacks:
+            stack = sa.summaryStacks[ family ]
+            if not stack.size or not sa.study:
+                continue
+            ecoColumns = [ ecoEstimates( sa.study[ eco ], family, familyPeriods( sa, family )) for eco in sa.study ]
+            stack[..., sumColumns] += numpy.sum( ecoColumns, axis=0 )
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        #print out the system error traceback
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise     #push the error up to exit
+
+def calcFamilyStats( sa, family, positions = None ):
+    #Calculate the statistics of a family stack, or only of the given positions
+    # along its first axis.  The stack holds summaries sharing the same pixel total.
+    stack = sa.summaryStacks[ family ]
+    if not stack.size:
+        return
+    if family in aggPixelFamilies:
+        pixelCount = aggregatePixelCount( sa )
+    else:
+        pixelCount = sa.sumEstPixels
+    if positions is None:
+        basicSummaryStatistics.basicSummaryStats( stack.shape[-2], stack, sa.studentT, pixelCount )
+    else:
+        for ptr in positions:
+            basicSummaryStatistics.basicSummaryStats( stack.shape[-2], stack[ ptr ], sa.studentT, pixelCount )
 
+def calcAllSummaryStats( sa ):
+    #Conversions, gain/loss/gross/net, all change (only 1 row), composition years,
+    # multichange images and multichange all change use the total estimated pixels.
+    #Aggregated gross change uses the total change of the first aggregate interval.
+    try:
+        trlog = TrendsUtilities.trLogger()
+        for family in sumPixelFamilies + aggPixelFamilies:
+            calcFamilyStats( sa, family )
     except Exception:
         #print out the system error traceback
         tb = sys.exc_info()[2]
@@ -260,53 +394,191 @@ def storeAllSummaryStats( gp, sa ):
         trlog = TrendsUtilities.trLogger()
         tableName = TrendsNames.dbLocation + "SummaryChangeStats"
         dbWriter = databaseWriteClass.changeWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in sa.summary:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution,
                                         sa.summary[interval][1], "stats", TrendsNames.sumStatsNames )
+        dbWriter.finishBulk( gp )
 
         tableName = TrendsNames.dbLocation + "SummaryGlgnStats"
         dbWriter = databaseWriteClass.glgnWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in sa.sumglgn:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution,
                                         sa.sumglgn[interval], "stats", TrendsNames.sumStatsNames )
+        dbWriter.finishBulk( gp )
 
         tableName = TrendsNames.dbLocation + "SummaryCompStats"
         dbWriter = databaseWriteClass.compositionWrite( gp, tableName)
+        dbWriter.startBulk()
         for year in sa.sumcomp:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, year, sa.resolution,
                                         sa.sumcomp[year][1], "stats", TrendsNames.sumStatsNames )
+        dbWriter.finishBulk( gp )
 
         tableName = TrendsNames.dbLocation + "SummaryMultichangeStats"
         dbWriter = databaseWriteClass.multichangeWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in sa.multiIntervals:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution,
                                     sa.summulti[interval][1], "stats", TrendsNames.sumStatsNames )
+        dbWriter.finishBulk( gp )
 
         tableName = TrendsNames.dbLocation + "SummaryAllChangeStats"
         dbWriter = databaseWriteClass.allChangeWrite( gp, tableName)
+        dbWriter.startBulk()
         for interval in sa.intervals:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution, 'conversion',
                                         sa.sumallchange[interval]['conversion'][1], "stats", TrendsNames.sumStatsNames )
 
-        for interval in TrendsNames.aggregate_gross_interval:
+        for interval in sa.aggIntervals:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution, 'addgross',
                                         sa.sumallchange[interval]['addgross'][1], "stats", TrendsNames.sumStatsNames )
 
         for interval in sa.multiIntervals:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution, 'multichange',
                                         sa.sumallchange[interval]['multichange'][1], "stats", TrendsNames.sumStatsNames )
+        dbWriter.finishBulk( gp )
 
         tableName = TrendsNames.dbLocation + "SummaryAggregateStats"
         dbWriter = databaseWriteClass.aggregateWrite( gp, tableName)
-        for interval in TrendsNames.aggregate_gross_interval:
+        dbWriter.startBulk()
+        for interval in sa.aggIntervals:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution, 'gross',
                                         sa.sumaggregate[interval]['gross'][1], "stats", TrendsNames.sumStatsNames )
+        dbWriter.finishBulk( gp )
 
         tableName = TrendsNames.dbLocation + "SummaryAggGlgnStats"
         dbWriter = databaseWriteClass.aggGlgnWrite( gp, tableName)
-        for interval in TrendsNames.aggregate_gross_interval:
+        dbWriter.startBulk()
+        for interval in sa.aggIntervals:
             dbWriter.databaseWrite( gp, sa.analysisNum, sa.study, interval, sa.resolution, 'gross',
                                         sa.sumaggglgn[interval]['gross'], "stats", TrendsNames.sumStatsNames )
+        dbWriter.finishBulk( gp )
+    except Exception:
+        #print out the system error traceback
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise     #push the error up to exit
+
+def updateSummaryStats( sa, eco ):
+    #Replace the ecoregion eco.ecoNum in an existing summary with the recalculated
+    # ecoregion object eco.  Returns the number of statistic rows rewritten.
+    try:
+        gp = TrendsUtilities.getGP()
+        gp.OverwriteOutput = True
+        trlog = TrendsUtilities.trLogger()
+        trlog.trwrite("Updating summary statistics for ecoregion " + str(eco.ecoNum) + "   " + time.asctime())
+
+        if not hasattr( sa, 'summaryStacks' ):
+            raise TrendsUtilities.TrendsErrors( "No summary statistics to update for analysis " + str(sa.analysisNum) )
+        if eco.ecoNum not in sa.study:
+            raise TrendsUtilities.TrendsErrors( "Ecoregion " + str(eco.ecoNum) + " is not in the study area" )
+        old = sa.study[ eco.ecoNum ]
+        if eco.resolution != old.resolution:
+            raise TrendsUtilities.TrendsErrors( "Resolution of ecoregion " + str(eco.ecoNum) + \
+                                                " changed. The summary must be regenerated" )
+        try:
+            delta = {}
+            for family in sa.summaryStacks:
+                if sa.summaryStacks[ family ].size:
+                    delta[ family ] = ecoEstimates( eco, family, familyPeriods( sa, family )) - \
+                                      ecoEstimates( old, family, familyPeriods( sa, family ))
+        except KeyError, key:
+            raise TrendsUtilities.TrendsErrors( "Ecoregion " + str(eco.ecoNum) + " has no data for summary interval " + \
+                                                str(key) + ". The summary must be regenerated" )
+
+        previous = dict([( family, sa.summaryStacks[ family ].copy() ) for family in sa.summaryStacks ])
+        previousT = list( sa.studentT )
+        previousPixels = sa.sumEstPixels
+        previousAggPixels = aggregatePixelCount( sa )
+
+        #Swap the ecoregion's contribution to the study area totals
+        sa.summarySamples += eco.sampleBlks - old.sampleBlks
+        sa.totalBlocks += eco.totalBlks - old.totalBlks
+        sa.sumEstPixels += eco.totalEstPixels - old.totalEstPixels
+        setSummaryStudentT( sa )
+        sumColumns = [ TrendsNames.sumStatsNames.index('TotalChng'), TrendsNames.sumStatsNames.index('TotalVar') ]
+        for family in delta:
+            sa.summaryStacks[ family ][..., sumColumns] += delta[ family ]
+        sa.study[ eco.ecoNum ] = eco
+
+        #Recalculate the derived columns.  A new pixel total or new student T values
+        # change every row of the families using them, otherwise only the intervals
+        # with a nonzero difference are recalculated.
+        newT = list( sa.studentT ) != previousT
+        for family in delta:
+            if family in aggPixelFamilies:
+                allRows = newT or aggregatePixelCount( sa ) != previousAggPixels
+            else:
+                allRows = newT or sa.sumEstPixels != previousPixels
+            if allRows:
+                calcFamilyStats( sa, family )
+            else:
+                moved = numpy.any( delta[ family ].reshape(( delta[ family ].shape[0], -1 )) != 0.0, axis=1 )
+                calcFamilyStats( sa, family, numpy.nonzero( moved )[0] )
+
+        #A statistic row in the tables holds one statistic for every row of a summary array
+        changed = {}
+        for family in delta:
+            changed[ family ] = numpy.any( sa.summaryStacks[ family ] != previous[ family ], axis=-2 )
+        rowCount = storeChangedSummaryStats( gp, sa, changed )
+
+        #Keep the summary parameters in step with the new totals
+        if eco.sampleBlks != old.sampleBlks or eco.totalBlks != old.totalBlks or sa.sumEstPixels != previousPixels:
+            UpdateAnalysisParams.updateParameters( "SummaryAnalysisParams", sa.analysisNum, 0, sa.summarySamples,
+                                                   sa.totalBlocks, sa.sumEstPixels, sa.studentT[0], sa.studentT[1],
+                                                   sa.studentT[2], sa.studentT[3], sa.resolution, replace = True )
+            UpdateAnalysisParams.updateParameters( "SummaryEcoregions", sa.analysisNum, eco.ecoNum, eco.sampleBlks,
+                                                   eco.totalBlks, eco.totalEstPixels, eco.studentT[0], eco.studentT[1],
+                                                   eco.studentT[2], eco.studentT[3], eco.resolution, eco.runType,
+                                                   replace = True )
+        trlog.trwrite("Rewrote " + str(rowCount) + " summary statistic rows   " + time.asctime())
+        return rowCount
+
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        #print out the system error traceback
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise     #push the error up to exit
+
+def storeChangedSummaryStats( gp, sa, changed ):
+    #Rewrite the statistic rows flagged in changed, format = { family: boolean array
+    # (interval[, tabType], statistic) }.  Returns the number of rows rewritten.
+    try:
+        trlog = TrendsUtilities.trLogger()
+        rowCount = 0
+        writers = {}
+        for family in changed:
+            if not numpy.any( changed[ family ] ):
+                continue
+            tableName, periodField, source = summaryTables[ family ]
+            if tableName not in writers:
+                writers[ tableName ] = databaseWriteClass.summaryStatsWrite( gp, TrendsNames.dbLocation + tableName )
+            for ptr, period in enumerate( familyPeriods( sa, family )):
+                keyValues = { 'AnalysisNum': sa.analysisNum, 'Resolution': sa.resolution, periodField: period }
+                if source is not None:
+                    keyValues['Source'] = source
+                if changed[ family ].ndim == 3:
+                    #gain, loss, gross, and net tables have a row set for each tabType
+                    for tabPtr, tabType in enumerate( TrendsNames.glgnTabTypes ):
+                        if numpy.any( changed[ family ][ ptr, tabPtr ] ):
+                            keyValues['Glgn'] = tabType
+                            rowCount += writers[ tableName ].updateStatistics( gp, keyValues,
+                                                 sa.summaryStacks[ family ][ ptr, tabPtr ], TrendsNames.sumStatsNames,
+                                                 [ TrendsNames.sumStatsNames[ x ] for x in numpy.nonzero( changed[ family ][ ptr, tabPtr ] )[0] ] )
+                elif numpy.any( changed[ family ][ ptr ] ):
+                    rowCount += writers[ tableName ].updateStatistics( gp, keyValues,
+                                         sa.summaryStacks[ family ][ ptr ], TrendsNames.sumStatsNames,
+                                         [ TrendsNames.sumStatsNames[ x ] for x in numpy.nonzero( changed[ family ][ ptr ] )[0] ] )
+        return rowCount
     except Exception:
         #print out the system error traceback
         tb = sys.exc_info()[2]
@@ -4,7 +4,49 @@
 #       tables stored in the database for the current run.  Some tables
 #       have already been generated and are stored in the database.
 #
-#   Out: analysis data in the database
+#       If the sample blocks along a custom boundary were split (see
+#       CustomDataAccess), the boundary is passed in so those blocks
+#       can be clipped to it.
+#
+#       numProcesses - number of worker processes for the ecoregions,
+#       defaults to TrendsNames.ecoProcesses.  With more than one, the
+#       ecoregions that are calculated from the change images are loaded
+#       and calculated in a process pool, and the main process writes each
+#       one to the database as it comes back, so there is only ever one
+#       database writer.  The workers send their log messages back with
+#       their ecoregions instead of writing to the log file.  Inside ArcGIS
+#       the workers need TrendsNames.workerExecutable; without it the
+#       ecoregions are run one at a time.  The summary is run once all
+#       ecoregions are in.
+#
+#       streaming - defaults to TrendsNames.streamEcoregions.  When set, each
+#       ecoregion is stored and then folded into running summary totals
+#       (StudyAreaClass.foldEcoregion) instead of being kept in the study
+#       area, so only one ecoregion's block arrays are in memory at a time.
+#       Ecoregions without data are left out of a streamed summary.
+#
+#   buildBatchStudyAreaStats runs a list of custom boundaries, such as the
+#       states or the LCCs, in one pass.  Each study in the list is
+#       (analysisName, analysisNum, ecos, strats, splits, boundary).  The
+#       boundaries share ecoregions, so each ecoregion's sample blocks are
+#       loaded once for all the boundaries that need them (BlockStore), each
+#       boundary's ecoregion is taken from the shared arrays, and the shared
+#       arrays are released after the last boundary that uses them.  The
+#       conversion statistics of all the boundaries sharing an ecoregion are
+#       calculated together when it is loaded (DomainEstimation), and each
+#       boundary's ecoregion takes its rows from them.
+#       Ecoregions with split blocks are loaded for each boundary as before,
+#       and clipped to that boundary.  If a run journal (RunJournal) is
+#       passed, the statistics stage of each boundary is recorded in it as
+#       soon as its summary is stored.  Each study area is released once it
+#       is stored, so only the names and numbers of the analyses are returned.
+#       If a finish function is passed, it is called with the analysis name
+#       and number of each boundary once it is stored, before the next
+#       boundary is run, so a tool can build its workbooks and clean up its
+#       results one boundary at a time.
+#
+#   Out: analysis data in the database, and the study area object
+#       (buildBatchStudyAreaStats: a list of (analysisName, analysisNum))
 #
 #  This is the main module for the Trends statistics calculations.
 #
@@ -19,15 +61,47 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 #Import modules
-import arcgisscripting, os, sys, traceback, time
+import os, sys, traceback, time, StringIO
+import multiprocessing
 from . import createRegionStats
 from . import StudyAreaClass
+from .BlockStore import blockStore
 from ..trendutil import TrendsNames, TrendsUtilities, AnalysisNames
 
-def buildStudyAreaStats( analysisName, analysisNum, ecos, strats, splits ):
+def processEcoregion( job ):
+    #Worker process: set up, load, and calculate one ecoregion without writing
+    # to the database.  The ecoregion object is sent back to the main process,
+    # along with the worker's log messages, which the main process writes to
+    # its own log so the workers never share the log file.
+    region, total, sample, res, runType, strat_list, split_list, boundary = job
+    workerLog = StringIO.StringIO()
+    TrendsUtilities.trLogger.trLogfile = workerLog
+    eco = createRegionStats.EcoStats( region, total, sample, res, runType, strat_list,
+                                      split_list, boundary )
+    dataFound = eco.loadData()
+    if dataFound:
+        eco.calculateStatistics()
+    return region, dataFound, eco, workerLog.getvalue()
+
+def startEcoregionPool( numProcesses ):
+    #Inside ArcGIS, sys.executable is the ArcGIS application rather than python,
+    # so the workers are started with the interpreter in TrendsNames.workerExecutable.
+    # Returns None if there is no python to start them with.
+    if not os.path.basename( sys.executable ).lower().startswith( 'python' ):
+        if not os.path.isfile( TrendsNames.workerExecutable ):
+            return None
+        multiprocessing.set_executable( TrendsNames.workerExecutable )
+    #Forked workers replace the log file they inherit, so nothing buffered in it
+    # may be written again when they drop it
+    if TrendsUtilities.trLogger.trLogfile:
+        TrendsUtilities.trLogger.trLogfile.flush()
+    return multiprocessing.Pool( numProcesses )
+
+def buildStudyAreaStats( analysisName, analysisNum, ecos, strats, splits, boundary = "", numProcesses = None,
+                         streaming = None ):
     try:
         #Create the geoprocessor object for setting up workspaces and parameters
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
 
         #identify potential workspaces for this tool
@@ -43,15 +117,67 @@ def buildStudyAreaStats( analysisName, analysisNum, ecos, strats, splits ):
         #  Hold on to all the ecoregion info in order to create summary statistics
         sa = StudyAreaClass.studyArea( gp, analysisName, analysisNum )
         dataFound = False
+        if numProcesses is None:
+            numProcesses = TrendsNames.ecoProcesses
+        if streaming is None:
+            streaming = TrendsNames.streamEcoregions
+
+        def keepEcoregion( region, eco, regionFound ):
+            #Streaming runs only keep the ecoregion's share of the summary totals,
+            # so its block arrays are released before the next ecoregion is loaded
+            if not streaming:
+                sa.study[ region ] = eco
+            elif regionFound:
+                sa.foldEcoregion( eco )
+
+        #Ecoregions calculated from the change images can run in parallel, since they
+        # are independent until the summary.  Each result is written to the database
+        # here as it arrives.
+        calculated = [ region for region in ecos
+                       if analysisNum == TrendsNames.TrendsNum or ecos[ region ][3] == "Partial stratified" ]
+        found = {}
+        pool = None
+        if numProcesses > 1 and len( calculated ) > 1:
+            pool = startEcoregionPool( min( numProcesses, len( calculated )))
+            if pool is None:
+                trlog.trwrite("No python interpreter found for the worker processes " + \
+                              "(TrendsNames.workerExecutable), calculating the ecoregions one at a time")
+        if pool is not None:
+            trlog.trwrite("Calculating " + str(len( calculated )) + " ecoregions with " + \
+                          str(min( numProcesses, len( calculated ))) + " processes")
+            jobs = [ (region,) + tuple( ecos[ region ] ) + (strats[ region ], splits.get( region, [] ), boundary)
+                     for region in calculated ]
+            try:
+                for region, regionFound, eco, messages in pool.imap_unordered( processEcoregion, jobs ):
+                    if messages:
+                        trlog.trwrite( messages.rstrip( "\n" ))
+                    found[ region ] = regionFound
+                    if regionFound:
+                        eco.storeStatistics( analysisNum )
+                    keepEcoregion( region, eco, regionFound )
+                    del eco
+                    trlog.trwrite("Ecoregion " + str(region) + " complete  " + time.asctime())
+                pool.close()
+            except Exception:
+                pool.terminate()
+                raise
+            pool.join()
+
         for region in ecos:
+            if region in found:
+                dataFound = found[ region ]
+                continue
             total, sample, res, runType  = ecos[ region ]
-            sa.study[ region ] = createRegionStats.EcoStats( region, total, sample, res, runType, strats[ region ] )
+            eco = createRegionStats.EcoStats( region, total, sample, res, runType, strats[ region ],
+                                              splits.get( region, [] ), boundary )
             if analysisNum == TrendsNames.TrendsNum or runType == "Partial stratified":
-                dataFound = sa.study[ region ].loadData()
+                dataFound = eco.loadData()
                 if dataFound:
-                    sa.study[ region ].performStatistics( analysisNum )
+                    eco.performStatistics( analysisNum )
             else:   #load data from tables
-                dataFound = sa.study[ region ].loadDataAndStatisticsTables( analysisNum )
+                dataFound = eco.loadDataAndStatisticsTables( analysisNum )
+            keepEcoregion( region, eco, dataFound )
+            del eco
 
         #Create summary statistics and write to database - only do if not Trends run
         if (analysisNum != TrendsNames.TrendsNum) and dataFound:
@@ -59,8 +185,10 @@ def buildStudyAreaStats( analysisName, analysisNum, ecos, strats, splits ):
             #summaryStatistics.genSummaryStats( sa.study, analysisNum )
 
         trlog.trwrite("Analysis complete for " + analysisName + "  " + time.asctime())
+        #The study area can be kept to update single ecoregions later (studyArea.updateEcoregion)
+        return sa
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         # Get the geoprocessing error messages
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
@@ -83,3 +211,128 @@ def buildStudyAreaStats( analysisName, analysisNum, ecos, strats, splits ):
         except Exception:
             pass
 
+def sharedConversionStats( store, ecoNum, resolution, domains, totalBlocks ):
+    #Conversion statistics for every boundary sharing a loaded ecoregion, from one
+    # pass of the domain engine over the shared arrays.
+    # format = { study: (first interval, { interval: stats array }), ...}
+    engine = store.domains( ecoNum, resolution, domains, totalBlocks )
+    if engine is None:
+        return {}
+    source = store.ecoregions[( ecoNum, resolution )]
+    firstInterval = TrendsUtilities.getFirstInterval( source )
+    intervals, stats = engine.estimateCube( source.ecoData )
+    estimates = {}
+    for ptr in range( len( engine.names )):
+        estimates[ engine.names[ ptr ]] = ( firstInterval, dict( zip( intervals, stats[ ptr ] )) )
+    return estimates
+
+def buildBatchStudyAreaStats( studies, streaming = None, journal = None, finish = None ):
+    try:
+        gp = TrendsUtilities.getGP()
+        gp.OverwriteOutput = True
+
+        trlog = TrendsUtilities.trLogger()
+        trlog.trwrite("Starting batch analysis of " + str(len( studies )) + " boundaries: " + time.asctime())
+        trlog.trwrite("Database in use: " + TrendsNames.dbLocation)
+        if streaming is None:
+            streaming = TrendsNames.streamEcoregions
+
+        #Find the ecoregions to share: those calculated from the change images
+        # without split blocks.  Collect the union of each one's sample blocks,
+        # each study's blocks and total blocks in it, and the last study that uses it.
+        # format = { (ecoNum, resolution): [ blocks ], ...}
+        shared = {}
+        domains = {}
+        totalBlocks = {}
+        lastStudy = {}
+        for ptr in range( len( studies )):
+            analysisName, analysisNum, ecos, strats, splits, boundary = studies[ ptr ]
+            for region in ecos:
+                total, sample, res, runType = ecos[ region ]
+                if splits.get( region, [] ):
+                    continue
+                if analysisNum == TrendsNames.TrendsNum or runType == "Partial stratified":
+                    key = ( region, res )
+                    shared.setdefault( key, [] ).extend( strats[ region ] )
+                    domains.setdefault( key, {} )[ ptr ] = strats[ region ]
+                    totalBlocks.setdefault( key, {} )[ ptr ] = total
+                    lastStudy[ key ] = ptr
+
+        store = blockStore()
+        #Conversion statistics of the loaded shared ecoregions
+        # format = { (ecoNum, resolution): { study: (first interval, { interval: stats })}}
+        estimates = {}
+        completed = []
+        for ptr in range( len( studies )):
+            analysisName, analysisNum, ecos, strats, splits, boundary = studies[ ptr ]
+            trlog.trwrite("Starting analysis: " + analysisName + "  " + time.asctime())
+            sa = StudyAreaClass.studyArea( gp, analysisName, analysisNum )
+            dataFound = False
+            for region in ecos:
+                total, sample, res, runType = ecos[ region ]
+                key = ( region, res )
+                if key in shared:
+                    if key not in store.ecoregions:
+                        store.load( region, res, shared[ key ] )
+                        estimates[ key ] = sharedConversionStats( store, region, res, domains[ key ],
+                                                                  totalBlocks[ key ] )
+                    eco, dataFound = store.ecoregion( region, total, sample, res, runType, strats[ region ], boundary )
+                    #The shared statistics are only used when the boundary's first interval
+                    # matches, since the total estimated pixels are taken from it
+                    firstInterval, conversionStats = estimates[ key ].get( ptr, ( None, None ))
+                    if lastStudy[ key ] == ptr:
+                        store.release( region, res )
+                        del estimates[ key ]
+                    if dataFound:
+                        if conversionStats is not None and \
+                           firstInterval != TrendsUtilities.getFirstInterval( eco ):
+                            conversionStats = None
+                        eco.performStatistics( analysisNum, conversionStats )
+                else:
+                    eco = createRegionStats.EcoStats( region, total, sample, res, runType, strats[ region ],
+                                                      splits.get( region, [] ), boundary )
+                    if analysisNum == TrendsNames.TrendsNum or runType == "Partial stratified":
+                        dataFound = eco.loadData()
+                        if dataFound:
+                            eco.performStatistics( analysisNum )
+                    else:   #load data from tables
+                        dataFound = eco.loadDataAndStatisticsTables( analysisNum )
+                if not streaming:
+                    sa.study[ region ] = eco
+                elif dataFound:
+                    sa.foldEcoregion( eco )
+                del eco
+
+            if (analysisNum != TrendsNames.TrendsNum) and dataFound:
+                sa.generateSummary()
+            trlog.trwrite("Analysis complete for " + analysisName + "  " + time.asctime())
+            if journal is not None:
+                journal.markDone( analysisName, "statistics", { 'analysisNum': analysisNum } )
+            #The results are in the database, so the ecoregions of this boundary
+            # are not held while the next one is run
+            del sa
+            completed.append(( analysisName, analysisNum ))
+            if finish is not None:
+                finish( analysisName, analysisNum )
+
+        return completed
+
+    except TrendsUtilities.ExecuteError:
+        msgs = gp.GetMessage(0)
+        msgs += gp.GetMessages(2)
+        trlog.trwrite(msgs)
+        raise
+    except TrendsUtilities.TrendsErrors, Terr:
+        trlog.trwrite( Terr.message )
+        raise
+    except Exception:
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        trlog.trwrite(pymsg)
+        raise
+    finally:
+        try:
+            trlog.trclose()
+        except Exception:
+            pass
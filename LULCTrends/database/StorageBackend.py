@@ -0,0 +1,712 @@
+#Trends statistics table storage backends
+#
+# TrendsDBaccess and the read/write classes reach the data and statistics
+#  tables through a backend, and the analysis names and parameters tables
+#  (TrendsSchema.recordTables) go through the same one, so all the tables an
+#  analysis writes are kept either in the ArcSDE database through
+#  geoprocessor cursors or in a local SQLite database through the python
+#  DB-API.  TrendsNames.dbBackend selects the backend.  With SQLite the
+#  statistics, summaries and restores run on a worker without ArcGIS; the
+#  change images, their catalog tables and the sample block lists are still
+#  read through ArcGIS (or GDAL, see ChangeImageReader), and the Excel
+#  workbooks need Windows.  Every backend has the same methods:
+#
+#       fields = describeFields( gp, table ) - objects with Name and Type
+#       rows = selectRows( gp, table, keyValues, fields, orderBy ) - a list of
+#                  tuples of the fields of the rows selected by the key values,
+#                  format = { field: value or list of values, ...}
+#       keys, values = readBlock( gp, table, keyValues, keyFields, valueFields,
+#                  orderBy ) - the same rows as a sequence of values for each
+#                  key field and a (field, record) array of the value fields
+#       labels, values = readRows( gp, table, keyValues, labelField, valueFields,
+#                                  orderBy ) - the rows selected by the key
+#                  values, as a list of BlkLabel or Statistic labels and a
+#                  (record, field) array of the value fields
+#       writeRows( gp, table, recordSets, valueFields, update ) - insert the
+#                  record sets (see databaseAccessClass); with update, rows
+#                  that already exist are replaced (an upsert)
+#       updated = updateRows( gp, table, keyValues, labelField, labels, values,
+#                  valueFields ) - rewrite the values of existing rows only
+#       deleted = deleteAnalysis( gp, table, analysisNum )
+#
+#  and for single records, e.g. of the names and parameters tables, with the
+#  record given as { field: value, ...}:
+#
+#       insertRecords( gp, table, records )
+#       updated = updateRecords( gp, table, keyValues, record )
+#       deleted = deleteRecords( gp, table, keyValues )
+#
+#  Key values are passed separately from the queries, so the SQLite backend
+#  binds them as parameters; the geoprocessor backend builds a where clause.
+#  readBlock is columnar with SQLite, and through ArcGIS when arcpy is
+#  installed (ArcGIS 10.1 on), where arcpy.da.TableToNumPyArray returns the
+#  rows as one numpy array.  The 9.3/10.0 geoprocessor only has row cursors,
+#  so there the values are still read one field at a time with GetValue.
+#  The table can be given with its TrendsNames.dbLocation path, which the
+#  SQLite backend drops.  The gp argument is only used by the geoprocessor
+#  backend.
+#
+#       store = getBackend() - the backend for the whole process
+#
+# The SQLite backend keeps a pool of open connections to the database file
+#  (TrendsNames.sqliteDatabase), so the loader threads and the writers don't
+#  open a connection for every query.  The tables in TrendsSchema are
+#  created on first use, the statistics tables each with a unique index on
+#  its key and label fields.  Each writeRows call is one transaction.
+#
+# With TrendsNames.sqliteFormat = "blobs" the SQLite database holds each
+#  record set as one row of a key table (TrendsSchema.blobTable) with the
+#  labels and values stored as zlib compressed .npy arrays, so an ecoregion
+#  interval is a single row to read or write instead of one row per block
+#  or statistic.  The blob backend has the same methods, so the read/write
+#  classes, the restores and the store functions use it unchanged.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+import itertools, re, threading, zlib
+import sqlite3
+from cStringIO import StringIO
+import numpy
+from ..trendutil import TrendsNames, TrendsUtilities
+from . import TrendsSchema
+
+def keyClause( keyValues ):
+    #Where clause selecting the rows with the given key values.  A list of
+    # values selects the rows with any of them.
+    clauses = []
+    for field in sorted( keyValues ):
+        if isinstance( keyValues[ field ], ( list, tuple )):
+            clauses.append( "(" + " or ".join([ valueClause( field, value ) for value in keyValues[ field ]]) + ")" )
+        else:
+            clauses.append( valueClause( field, keyValues[ field ] ))
+    return " and ".join( clauses )
+
+def valueClause( field, value ):
+    if isinstance( value, basestring ):
+        return field + " = \'" + value + "\'"
+    else:
+        return field + " = " + str( value )
+
+class fieldInfo:
+    #The part of a geoprocessor field description the table classes use
+    def __init__( self, name, fieldType ):
+        self.Name = name
+        self.Type = fieldType
+
+class storageBackend:
+    #The reads every backend shares, from its selectRows
+
+    def readBlock( self, gp, table, keyValues, keyFields, valueFields, orderBy = None ):
+        #The key fields come back as columns, and the numeric value fields of
+        # all the fetched rows go straight into one array without a python
+        # loop over the fields
+        numKeys = len( keyFields )
+        rows = self.selectRows( gp, table, keyValues, list( keyFields ) + list( valueFields ), orderBy )
+        if not rows:
+            return [ () for field in keyFields ], numpy.zeros(( len( valueFields ), 0 ), float)
+        keys = zip( *[ row[ :numKeys ] for row in rows ])
+        values = numpy.fromiter( itertools.chain.from_iterable([ row[ numKeys: ] for row in rows ]),
+                                 float, len( rows ) * len( valueFields ))
+        return keys, values.reshape( len( rows ), len( valueFields )).T
+
+    def readRows( self, gp, table, keyValues, labelField, valueFields, orderBy = None ):
+        keys, values = self.readBlock( gp, table, keyValues, [ labelField ], valueFields, orderBy )
+        return list( keys[0] ), values.T
+
+class gpBackend( storageBackend ):
+    #The ArcSDE tables through geoprocessor cursors
+
+    def __init__( self ):
+        #The arcpy data access module for bulk reads, if this ArcGIS has it
+        try:
+            from arcpy import da
+            self.dataAccess = da
+        except ImportError:
+            self.dataAccess = None
+
+    def describeFields( self, gp, table ):
+        return TrendsUtilities.describeFields( gp, table )
+
+    def selectRows( self, gp, table, keyValues, fields, orderBy = None ):
+        row = None
+        rows = None
+        try:
+            sortFields = ";".join([ field + " A" for field in ( orderBy or [] )])
+            records = []
+            rows = gp.SearchCursor( table, keyClause( keyValues ), "", "", sortFields )
+            row = rows.Next()
+            while row:
+                records.append( tuple([ row.GetValue( name ) for name in fields ]))
+                row = rows.Next()
+            return records
+        finally:
+            del row, rows
+
+    def readBlock( self, gp, table, keyValues, keyFields, valueFields, orderBy = None ):
+        #One TableToNumPyArray call for the selected rows, each field a column of
+        # the record array, sorted here since the call has no sort order
+        if self.dataAccess is None:
+            return storageBackend.readBlock( self, gp, table, keyValues, keyFields, valueFields, orderBy )
+        array = self.dataAccess.TableToNumPyArray( table, list( keyFields ) + list( valueFields ), keyClause( keyValues ))
+        if not len( array ):
+            return [ () for field in keyFields ], numpy.zeros(( len( valueFields ), 0 ), float)
+        if orderBy:
+            array = array[ numpy.lexsort([ array[ field ] for field in reversed( orderBy )]) ]
+        keys = [ tuple( array[ field ].tolist() ) for field in keyFields ]
+        values = numpy.array([ array[ field ] for field in valueFields ], float )
+        return keys, values
+
+    def writeRows( self, gp, table, recordSets, valueFields, update = False ):
+        #With update (refreshing the Trends tables), a set whose rows already
+        # exist is rewritten in place; all the other sets are inserted through
+        # one insert cursor.
+        row = None
+        rows = None
+        try:
+            inserts = []
+            for ( keyValues, labelField, labels, values ) in recordSets:
+                #One conversion of the whole array to python values
+                records = numpy.asarray( values )[ :, :len( valueFields ) ].tolist()
+                found = False
+                if update:
+                    if labelField == "BlkLabel":
+                        sortFields = "BlkLabel A"
+                    else:
+                        sortFields = ""
+                    position = dict( zip( labels, range( len( labels ))))
+                    rows = gp.UpdateCursor( table, keyClause( keyValues ), "", "", sortFields )
+                    row = rows.Next()
+                    while row:
+                        found = True
+                        record = records[ position[ row.GetValue( labelField ) ]]
+                        for ( ptr, name ) in enumerate( valueFields ):
+                            row.SetValue( name, record[ ptr ] )
+                        rows.UpdateRow( row )
+                        row = rows.Next()
+                    #Release the update cursor before the next set
+                    row = None
+                    rows = None
+                if not found:
+                    inserts.append(( keyValues, labelField, labels, records ))
+
+            if inserts:
+                rows = gp.InsertCursor( table )
+                for ( keyValues, labelField, labels, records ) in inserts:
+                    for ( label, record ) in zip( labels, records ):
+                        row = rows.NewRow()
+                        for name in keyValues:
+                            row.SetValue( name, keyValues[ name ] )
+                        row.SetValue( labelField, label )
+                        for ( ptr, name ) in enumerate( valueFields ):
+                            row.SetValue( name, record[ ptr ] )
+                        rows.InsertRow( row )
+        finally:
+            del row, rows
+
+    def updateRows( self, gp, table, keyValues, labelField, labels, values, valueFields ):
+        row = None
+        rows = None
+        try:
+            records = numpy.asarray( values )[ :, :len( valueFields ) ].tolist()
+            position = dict( zip( labels, range( len( labels ))))
+            updated = 0
+            rows = gp.UpdateCursor( table, keyClause( keyValues ))
+            row = rows.Next()
+            while row:
+                label = row.GetValue( labelField )
+                if label in position:
+                    record = records[ position[ label ]]
+                    for ( ptr, name ) in enumerate( valueFields ):
+                        row.SetValue( name, record[ ptr ] )
+                    rows.UpdateRow( row )
+                    updated += 1
+                row = rows.Next()
+            return updated
+        finally:
+            del row, rows
+
+    def deleteAnalysis( self, gp, table, analysisNum ):
+        return self.deleteRecords( gp, table, { 'AnalysisNum': analysisNum } )
+
+    def insertRecords( self, gp, table, records ):
+        row = None
+        rows = None
+        try:
+            rows = gp.InsertCursor( table )
+            for record in records:
+                row = rows.NewRow()
+                for name in record:
+                    row.SetValue( name, record[ name ] )
+                rows.InsertRow( row )
+        finally:
+            del row, rows
+
+    def updateRecords( self, gp, table, keyValues, record ):
+        row = None
+        rows = None
+        try:
+            updated = 0
+            rows = gp.UpdateCursor( table, keyClause( keyValues ))
+            row = rows.Next()
+            while row:
+                for name in record:
+                    row.SetValue( name, record[ name ] )
+                rows.UpdateRow( row )
+                updated += 1
+                row = rows.Next()
+            return updated
+        finally:
+            del row, rows
+
+    def deleteRecords( self, gp, table, keyValues ):
+        row = None
+        rows = None
+        try:
+            deleted = 0
+            rows = gp.UpdateCursor( table, keyClause( keyValues ))
+            row = rows.Next()
+            while row:
+                rows.DeleteRow( row )
+                deleted += 1
+                row = rows.Next()
+            return deleted
+        finally:
+            del row, rows
+
+class connectionPool:
+    #Open connections to one SQLite database, shared by the threads of the process
+
+    def __init__( self, database, size ):
+        self.database = database
+        self.size = size
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire( self ):
+        self.lock.acquire()
+        try:
+            if self.idle:
+                return self.idle.pop()
+        finally:
+            self.lock.release()
+        #A connection from the pool can be used by any thread, one at a time
+        return sqlite3.connect( self.database, timeout = 60, check_same_thread = False )
+
+    def release( self, connection ):
+        self.lock.acquire()
+        try:
+            if len( self.idle ) < self.size:
+                self.idle.append( connection )
+                return
+        finally:
+            self.lock.release()
+        connection.close()
+
+    def closeAll( self ):
+        self.lock.acquire()
+        try:
+            for connection in self.idle:
+                connection.close()
+            self.idle = []
+        finally:
+            self.lock.release()
+
+sqlTypes = { "long": "INTEGER", "double": "REAL", "text": "TEXT", "blob": "BLOB" }
+
+def tableName( table ):
+    #The bare table name from a database path such as TrendsNames.dbLocation + name
+    return re.split( r"[/\\.]", table )[-1]
+
+def createTables( connection, tables = None ):
+    #Create any missing tables, with the indexes of the statistics tables
+    if tables is None:
+        tables = TrendsSchema.tableNames() + sorted( TrendsSchema.recordTables )
+    for table in tables:
+        fields = TrendsSchema.tableFields( table )
+        columns = ", ".join([ name + " " + sqlTypes[ fieldType ] for ( name, fieldType, length ) in fields ])
+        connection.execute( "CREATE TABLE IF NOT EXISTS " + table + " ( " + columns + " )" )
+        if TrendsSchema.isStatisticsTable( table ):
+            #The key fields, Source and Glgn, and the label identify a row
+            searched = [ name for ( name, fieldType, length ) in fields[ :indexEnd( fields ) ]]
+            connection.execute( "CREATE UNIQUE INDEX IF NOT EXISTS " + table + "_fullsearch ON " + \
+                                table + " ( " + ", ".join( searched ) + " )" )
+        elif table == "AnalysisNames":
+            #The Trends analysis is always registered, as by CreateAnalysisNamesTable
+            connection.execute( "INSERT INTO AnalysisNames ( AnalysisNum, AnalysisName ) SELECT ?, ? " + \
+                                "WHERE NOT EXISTS ( SELECT * FROM AnalysisNames )",
+                                ( TrendsNames.TrendsNum, TrendsNames.name ))
+    connection.commit()
+
+def createBlobTable( connection ):
+    #Create the key table of the array blob format if it's missing
+    table = TrendsSchema.blobTable
+    columns = ", ".join([ name + " " + sqlTypes[ fieldType ] for ( name, fieldType, length ) in TrendsSchema.blobFields ])
+    connection.execute( "CREATE TABLE IF NOT EXISTS " + table + " ( " + columns + " )" )
+    connection.execute( "CREATE UNIQUE INDEX IF NOT EXISTS " + table + "_fullsearch ON " + \
+                        table + " ( " + ", ".join( TrendsSchema.blobKeys ) + " )" )
+    connection.commit()
+
+def indexEnd( fields ):
+    for ( ptr, ( name, fieldType, length )) in enumerate( fields ):
+        if name == "BlkLabel" or name == "Statistic":
+            return ptr + 1
+    return len( fields )
+
+class sqliteBackend( storageBackend ):
+    #The statistics tables in a local SQLite database through the DB-API
+
+    def __init__( self, database, poolSize ):
+        if not database:
+            raise TrendsUtilities.TrendsErrors( "No SQLite database set in TrendsNames.sqliteDatabase" )
+        self.pool = connectionPool( database, poolSize )
+        connection = self.pool.acquire()
+        try:
+            #Readers in other processes aren't blocked by a write in progress
+            connection.execute( "PRAGMA journal_mode = WAL" )
+            self.createSchema( connection )
+        finally:
+            self.pool.release( connection )
+
+    def createSchema( self, connection ):
+        createTables( connection )
+
+    def query( self, sql, parameters = () ):
+        connection = self.pool.acquire()
+        try:
+            return connection.execute( sql, parameters ).fetchall()
+        finally:
+            self.pool.release( connection )
+
+    def change( self, sql, parameterRows ):
+        #Run a statement for each parameter row in one transaction and return
+        # the number of rows changed
+        connection = self.pool.acquire()
+        try:
+            try:
+                before = connection.total_changes
+                connection.executemany( sql, parameterRows )
+                connection.commit()
+                return connection.total_changes - before
+            except Exception:
+                connection.rollback()
+                raise
+        finally:
+            self.pool.release( connection )
+
+    def whereParameters( self, keyValues ):
+        #The where clause with a placeholder for each value, and the values
+        clauses = []
+        parameters = []
+        for name in sorted( keyValues ):
+            if isinstance( keyValues[ name ], ( list, tuple )):
+                clauses.append( name + " IN ( " + ", ".join([ "?" ] * len( keyValues[ name ] )) + " )" )
+                parameters.extend( keyValues[ name ] )
+            else:
+                clauses.append( name + " = ?" )
+                parameters.append( keyValues[ name ] )
+        if not clauses:
+            #Every row
+            clauses.append( "1 = 1" )
+        return " AND ".join( clauses ), parameters
+
+    def describeFields( self, gp, table ):
+        table = tableName( table )
+        fields = [ fieldInfo( row[1], row[2] ) for row in self.query( "PRAGMA table_info( " + table + " )" )]
+        if not fields:
+            raise TrendsUtilities.TrendsErrors( "Table " + table + " not found in " + self.pool.database )
+        return fields
+
+    def selectRows( self, gp, table, keyValues, fields, orderBy = None ):
+        where, parameters = self.whereParameters( keyValues )
+        sql = "SELECT " + ", ".join( fields ) + " FROM " + tableName( table ) + " WHERE " + where
+        if orderBy:
+            sql += " ORDER BY " + ", ".join( orderBy )
+        return self.query( sql, parameters )
+
+    def writeRows( self, gp, table, recordSets, valueFields, update = False ):
+        #All the record sets in one transaction; with update a row with the same
+        # key values and label replaces the old one through the unique index
+        if update:
+            verb = "INSERT OR REPLACE INTO "
+        else:
+            verb = "INSERT INTO "
+        connection = self.pool.acquire()
+        try:
+            try:
+                for ( keyValues, labelField, labels, values ) in recordSets:
+                    names = sorted( keyValues )
+                    columns = names + [ labelField ] + list( valueFields )
+                    sql = verb + tableName( table ) + " ( " + ", ".join( columns ) + " ) VALUES ( " + \
+                          ", ".join([ "?" ] * len( columns )) + " )"
+                    keys = [ keyValues[ name ] for name in names ]
+                    records = numpy.asarray( values )[ :, :len( valueFields ) ].tolist()
+                    connection.executemany( sql, [ keys + [ label ] + record
+                                                   for ( label, record ) in zip( labels, records ) ])
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        finally:
+            self.pool.release( connection )
+
+    def updateRows( self, gp, table, keyValues, labelField, labels, values, valueFields ):
+        where, parameters = self.whereParameters( keyValues )
+        sql = "UPDATE " + tableName( table ) + " SET " + \
+              ", ".join([ name + " = ?" for name in valueFields ]) + \
+              " WHERE " + where + " AND " + labelField + " = ?"
+        records = numpy.asarray( values )[ :, :len( valueFields ) ].tolist()
+        return self.change( sql, [ record + parameters + [ label ]
+                                   for ( label, record ) in zip( labels, records ) ])
+
+    def deleteAnalysis( self, gp, table, analysisNum ):
+        return self.deleteRecords( gp, table, { 'AnalysisNum': analysisNum } )
+
+    def insertRecords( self, gp, table, records ):
+        connection = self.pool.acquire()
+        try:
+            try:
+                for record in records:
+                    names = sorted( record )
+                    connection.execute( "INSERT INTO " + tableName( table ) + " ( " + ", ".join( names ) + \
+                                        " ) VALUES ( " + ", ".join([ "?" ] * len( names )) + " )",
+                                        [ record[ name ] for name in names ] )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        finally:
+            self.pool.release( connection )
+
+    def updateRecords( self, gp, table, keyValues, record ):
+        where, parameters = self.whereParameters( keyValues )
+        names = sorted( record )
+        sql = "UPDATE " + tableName( table ) + " SET " + ", ".join([ name + " = ?" for name in names ]) + \
+              " WHERE " + where
+        return self.change( sql, [[ record[ name ] for name in names ] + parameters ] )
+
+    def deleteRecords( self, gp, table, keyValues ):
+        where, parameters = self.whereParameters( keyValues )
+        return self.change( "DELETE FROM " + tableName( table ) + " WHERE " + where, [ parameters ] )
+
+def packArray( array ):
+    #An array as compressed .npy bytes for a blob field
+    buffer = StringIO()
+    numpy.save( buffer, numpy.ascontiguousarray( array ))
+    return sqlite3.Binary( zlib.compress( buffer.getvalue() ))
+
+def unpackArray( blob ):
+    return numpy.load( StringIO( zlib.decompress( str( blob ))))
+
+#The period fields of the statistics tables are one field of the key table
+blobPeriods = ( "ChangePeriod", "CompYear" )
+
+class blobBackend( sqliteBackend ):
+    #The statistics tables in a local SQLite database, with each record set
+    # of a table stored as one row of compressed label and value arrays
+
+    def createSchema( self, connection ):
+        createBlobTable( connection )
+        createTables( connection, sorted( TrendsSchema.recordTables ))
+
+    def blobKeyValues( self, table, keyValues ):
+        #The key table values for the key values of a statistics table, and any
+        # BlkLabel or Statistic values, which select records within the sets
+        keys = { 'TableName': tableName( table ) }
+        labelValues = None
+        for field in keyValues:
+            if field in blobPeriods:
+                keys['Period'] = keyValues[ field ]
+            elif field == "BlkLabel" or field == "Statistic":
+                labelValues = keyValues[ field ]
+                if not isinstance( labelValues, ( list, tuple )):
+                    labelValues = [ labelValues ]
+            else:
+                keys[ field ] = keyValues[ field ]
+        return keys, labelValues
+
+    def setKey( self, table, keyValues ):
+        #Every key table value of one record set; the summary tables have no
+        # ecoregion and most tables no Source or Glgn
+        keys = { 'EcoLevel3ID': 0, 'Source': "", 'Glgn': "" }
+        keys.update( self.blobKeyValues( table, keyValues )[0] )
+        return [ keys[ name ] for name in TrendsSchema.blobKeys ]
+
+    def valueNames( self, table ):
+        fields = TrendsSchema.tableFields( tableName( table ))
+        return [ name for ( name, fieldType, length ) in fields[ indexEnd( fields ): ]]
+
+    def readSets( self, table, keyValues, orderBy = None, connection = None ):
+        #The record sets selected by the key values, format =
+        # [ ( { key table field: value }, labels, (record, field) values ), ...]
+        keys, labelValues = self.blobKeyValues( table, keyValues )
+        where, parameters = self.whereParameters( keys )
+        sql = "SELECT " + ", ".join( TrendsSchema.blobKeys ) + ", Labels, Vals FROM " + \
+              TrendsSchema.blobTable + " WHERE " + where
+        sortLabels = False
+        setOrder = []
+        for field in ( orderBy or [] ):
+            if field in blobPeriods:
+                setOrder.append( "Period" )
+            elif field == "BlkLabel" or field == "Statistic":
+                sortLabels = True
+            else:
+                setOrder.append( field )
+        if setOrder:
+            sql += " ORDER BY " + ", ".join( setOrder )
+        if connection is None:
+            rows = self.query( sql, parameters )
+        else:
+            rows = connection.execute( sql, parameters ).fetchall()
+
+        numKeys = len( TrendsSchema.blobKeys )
+        sets = []
+        for row in rows:
+            labels = unpackArray( row[ numKeys ] )
+            values = unpackArray( row[ numKeys+1 ] )
+            if labelValues is not None:
+                selected = numpy.array([ label in labelValues for label in labels.tolist() ], bool )
+                labels = labels[ selected ]
+                values = values[ selected ]
+            if sortLabels:
+                order = numpy.argsort( labels, kind = 'mergesort' )
+                labels = labels[ order ]
+                values = values[ order ]
+            sets.append(( dict( zip( TrendsSchema.blobKeys, row[ :numKeys ] )), labels, values ))
+        return sets
+
+    def describeFields( self, gp, table ):
+        if not TrendsSchema.isStatisticsTable( tableName( table )):
+            return sqliteBackend.describeFields( self, gp, table )
+        return [ fieldInfo( name, fieldType ) for ( name, fieldType, length )
+                 in TrendsSchema.tableFields( tableName( table )) ]
+
+    def readBlock( self, gp, table, keyValues, keyFields, valueFields, orderBy = None ):
+        #The value arrays of the sets are stacked as they are, with no loop
+        # over the records
+        names = self.valueNames( table )
+        valueColumns = [ names.index( name ) for name in valueFields ]
+        keyColumns = [ [] for field in keyFields ]
+        blocks = []
+        for ( keys, labels, values ) in self.readSets( table, keyValues, orderBy ):
+            for ( ptr, field ) in enumerate( keyFields ):
+                if field == "BlkLabel" or field == "Statistic":
+                    keyColumns[ ptr ].extend( labels.tolist() )
+                elif field in blobPeriods:
+                    keyColumns[ ptr ].extend([ keys['Period'] ] * len( labels ))
+                else:
+                    keyColumns[ ptr ].extend([ keys[ field ] ] * len( labels ))
+            blocks.append( numpy.asarray( values, float )[ :, valueColumns ] )
+        if not blocks:
+            return [ () for field in keyFields ], numpy.zeros(( len( valueFields ), 0 ), float)
+        return [ tuple( column ) for column in keyColumns ], numpy.concatenate( blocks ).T
+
+    def selectRows( self, gp, table, keyValues, fields, orderBy = None ):
+        #The names and parameters tables are kept as rows
+        if not TrendsSchema.isStatisticsTable( tableName( table )):
+            return sqliteBackend.selectRows( self, gp, table, keyValues, fields, orderBy )
+        names = self.valueNames( table )
+        keyFields = [ field for field in fields if field not in names ]
+        valueFields = [ field for field in fields if field in names ]
+        keys, values = self.readBlock( gp, table, keyValues, keyFields, valueFields, orderBy )
+        columns = []
+        for field in fields:
+            if field in names:
+                columns.append( values[ valueFields.index( field ) ].tolist() )
+            else:
+                columns.append( keys[ keyFields.index( field ) ] )
+        return zip( *columns )
+
+    def writeSet( self, connection, verb, table, keyValues, labels, values ):
+        sql = verb + TrendsSchema.blobTable + " ( " + ", ".join( TrendsSchema.blobKeys ) + ", Labels, Vals ) VALUES ( " + \
+              ", ".join([ "?" ] * ( len( TrendsSchema.blobKeys ) + 2 )) + " )"
+        connection.execute( sql, self.setKey( table, keyValues ) + [ packArray( labels ), packArray( values ) ] )
+
+    def writeRows( self, gp, table, recordSets, valueFields, update = False ):
+        #One row per record set, all in one transaction.  With update, the
+        # records of a set already stored are replaced and the others kept.
+        if list( valueFields ) != self.valueNames( table ):
+            raise TrendsUtilities.TrendsErrors( "The array blob format stores every value field of " + tableName( table ))
+        if update:
+            verb = "INSERT OR REPLACE INTO "
+        else:
+            verb = "INSERT INTO "
+        connection = self.pool.acquire()
+        try:
+            try:
+                for ( keyValues, labelField, labels, values ) in recordSets:
+                    labels = numpy.asarray( labels )
+                    if labels.dtype.kind == 'S':
+                        #The statistic names come back as unicode, as from the other backends
+                        labels = labels.astype( unicode )
+                    values = numpy.asarray( values )[ :, :len( valueFields ) ]
+                    if update:
+                        stored = self.readSets( table, keyValues, connection = connection )
+                        if stored:
+                            ( keys, storedLabels, storedValues ) = stored[0]
+                            newLabels = set( labels.tolist() )
+                            kept = numpy.array([ label not in newLabels for label in storedLabels.tolist() ], bool )
+                            labels = numpy.concatenate(( storedLabels[ kept ], labels ))
+                            values = numpy.concatenate(( storedValues[ kept ], values ))
+                    self.writeSet( connection, verb, table, keyValues, labels, values )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        finally:
+            self.pool.release( connection )
+
+    def updateRows( self, gp, table, keyValues, labelField, labels, values, valueFields ):
+        #Rewrite the given labels' values in the stored set and return how many
+        # were found
+        names = self.valueNames( table )
+        valueColumns = [ names.index( name ) for name in valueFields ]
+        records = numpy.asarray( values )[ :, :len( valueFields ) ]
+        connection = self.pool.acquire()
+        try:
+            try:
+                stored = self.readSets( table, keyValues, connection = connection )
+                if not stored:
+                    return 0
+                ( keys, storedLabels, storedValues ) = stored[0]
+                storedValues = storedValues.copy()
+                position = dict( zip( storedLabels.tolist(), range( len( storedLabels ))))
+                updated = 0
+                for ( label, record ) in zip( labels, records ):
+                    if label in position:
+                        storedValues[ position[ label ], valueColumns ] = record
+                        updated += 1
+                if updated:
+                    self.writeSet( connection, "INSERT OR REPLACE INTO ", table, keyValues, storedLabels, storedValues )
+                    connection.commit()
+                return updated
+            except Exception:
+                connection.rollback()
+                raise
+        finally:
+            self.pool.release( connection )
+
+    def deleteAnalysis( self, gp, table, analysisNum ):
+        if not TrendsSchema.isStatisticsTable( tableName( table )):
+            return sqliteBackend.deleteAnalysis( self, gp, table, analysisNum )
+        return self.change( "DELETE FROM " + TrendsSchema.blobTable + " WHERE TableName = ? AND AnalysisNum = ?",
+                            [ ( tableName( table ), analysisNum ) ] )
+
+#One backend for the whole process, made on first use
+class backendContext:
+    backend = None
+
+def getBackend():
+    if backendContext.backend is None:
+        if TrendsNames.dbBackend == "sqlite" and TrendsNames.sqliteFormat == "blobs":
+            backendContext.backend = blobBackend( TrendsNames.sqliteDatabase, TrendsNames.sqlitePoolSize )
+        elif TrendsNames.dbBackend == "sqlite":
+            backendContext.backend = sqliteBackend( TrendsNames.sqliteDatabase, TrendsNames.sqlitePoolSize )
+        elif TrendsNames.dbBackend == "arcgis":
+            backendContext.backend = gpBackend()
+        else:
+            raise TrendsUtilities.TrendsErrors( "Unknown database backend: " + str( TrendsNames.dbBackend ))
+    return backendContext.backend
@@ -0,0 +1,149 @@
+#Trends statistics table definitions
+#
+# The data and statistics tables made by the scripts in dbcreate
+#  (CreateTrendsTables, CreateCustomTables, CreateSummaryTables,
+#  CreateAllChangeTables, CreateAggregateTables and CreateAggGlgnTables)
+#  all follow one pattern, so their fields are built here from the table
+#  name.  A table name is a prefix (Trends, Custom or Summary), a family
+#  (Change, Glgn, Comp, ...) and a content (Data or Stats), e.g.
+#  CustomGlgnStats.  The summary tables only hold statistics and have no
+#  ecoregion field.
+#
+#       tableFields( "TrendsChangeData" ) - [ (name, type, length), ...] in
+#                                           the same order as the dbcreate scripts
+#       isStatisticsTable( "AnalysisNames" ) - False, not one of these tables
+#       tableNames() - every statistics table
+#
+# The analysis names and parameters tables (recordTables) are kept by the
+#  same storage backend, so tableFields also gives their fields.
+#
+# Field types are the geoprocessor's: "long", "double", "text" and "blob".
+#
+# In the array blob storage format each record set of these tables (the
+#  rows of one ecoregion, period, resolution, source and glgn type) is one
+#  row of blobTable instead, holding the labels and the (record, field)
+#  values as compressed .npy arrays.  The summary tables have an
+#  EcoLevel3ID of 0 there, and tables without Source or Glgn a blank one.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+from ..trendutil import TrendsNames
+
+prefixes = ( "Trends", "Custom", "Summary" )
+
+#Family fields, format = { family: ( period field, has Source, has Glgn, value field names ) }
+families = {
+    "Change":      ( "ChangePeriod", False, False, [ "CT_" + str(trans+1) for trans in range( TrendsNames.numConversions ) ] ),
+    "Glgn":        ( "ChangePeriod", False, True,  [ "LC_" + str(trans+1) for trans in range( TrendsNames.numLCtypes ) ] ),
+    "Comp":        ( "CompYear",     False, False, [ "LC_" + str(trans+1) for trans in range( TrendsNames.numLCtypes ) ] ),
+    "Multichange": ( "ChangePeriod", False, False, [ "Xchg_" + str(trans) for trans in range( TrendsNames.numMulti ) ] ),
+    "AllChange":   ( "ChangePeriod", True,  False, [ "Total" ] ),
+    "Aggregate":   ( "ChangePeriod", True,  False, [ "CT_" + str(trans+1) for trans in range( TrendsNames.numConversions ) ] ),
+    "AggGlgn":     ( "ChangePeriod", True,  True,  [ "LC_" + str(trans+1) for trans in range( TrendsNames.numLCtypes ) ] ),
+    }
+
+periodLengths = { "ChangePeriod": "15", "CompYear": "10" }
+
+def splitName( tableName ):
+    #( prefix, family, content ) of a statistics table name
+    for prefix in prefixes:
+        if tableName.startswith( prefix ):
+            for content in ( "Data", "Stats" ):
+                if tableName.endswith( content ):
+                    family = tableName[ len( prefix ):-len( content ) ]
+                    if family in families and not ( prefix == "Summary" and content == "Data" ):
+                        return prefix, family, content
+    raise KeyError( "Not a Trends statistics table: " + tableName )
+
+def tableNames():
+    names = []
+    for prefix in prefixes:
+        for family in sorted( families ):
+            for content in ( "Data", "Stats" ):
+                if not ( prefix == "Summary" and content == "Data" ):
+                    names.append( prefix + family + content )
+    return names
+
+def isStatisticsTable( tableName ):
+    try:
+        splitName( tableName )
+        return True
+    except KeyError:
+        return False
+
+def tableFields( tableName ):
+    if tableName in recordTables:
+        return list( recordTables[ tableName ] )
+    prefix, family, content = splitName( tableName )
+    period, hasSource, hasGlgn, values = families[ family ]
+    fields = [ ( "AnalysisNum", "long", "" ) ]
+    if prefix != "Summary":
+        fields.append(( "EcoLevel3ID", "long", "" ))
+    fields.append(( period, "text", periodLengths[ period ] ))
+    fields.append(( "Resolution", "text", "10" ))
+    if hasSource:
+        fields.append(( "Source", "text", "20" ))
+    if hasGlgn:
+        fields.append(( "Glgn", "text", "10" ))
+    if content == "Data":
+        fields.append(( "BlkLabel", "long", "" ))
+        valueType = "long"
+    else:
+        fields.append(( "Statistic", "text", "20" ))
+        valueType = "double"
+    for name in values:
+        fields.append(( name, valueType, "" ))
+    return fields
+
+#The analysis names and parameters tables, as made by CreateAnalysisNamesTable,
+# CreateSummaryAnalysisParamsTable and CreateSummaryEcoregionsTable.  Only the
+# fields of Ecoregions that the statistics use are listed.
+recordTables = {
+    "AnalysisNames": [ ( "AnalysisNum", "long", "" ),
+                       ( "AnalysisName", "text", "50" ) ],
+    "SummaryAnalysisParams": [ ( "AnalysisNum", "long", "" ),
+                               ( "Total_Blocks", "long", "" ),
+                               ( "num_samples", "long", "" ),
+                               ( "Resolution", "text", "10" ),
+                               ( "TotalPixels", "double", "" ),
+                               ( "StudentT_85", "double", "" ),
+                               ( "StudentT_90", "double", "" ),
+                               ( "StudentT_95", "double", "" ),
+                               ( "StudentT_99", "double", "" ) ],
+    "SummaryEcoregions": [ ( "AnalysisNum", "long", "" ),
+                           ( "Ecoregion", "long", "" ),
+                           ( "TotalBlks", "long", "" ),
+                           ( "SampleBlks", "long", "" ),
+                           ( "Resolution", "text", "10" ),
+                           ( "RunType", "text", "20" ),
+                           ( "TotalPixels", "double", "" ),
+                           ( "StudentT_85", "double", "" ),
+                           ( "StudentT_90", "double", "" ),
+                           ( "StudentT_95", "double", "" ),
+                           ( "StudentT_99", "double", "" ) ],
+    "Ecoregions": [ ( "Ecoregion", "long", "" ),
+                    ( "Total_Blocks", "long", "" ),
+                    ( "num_samples", "long", "" ),
+                    ( "TotalPixels", "double", "" ),
+                    ( "StudentT_85", "double", "" ),
+                    ( "StudentT_90", "double", "" ),
+                    ( "StudentT_95", "double", "" ),
+                    ( "StudentT_99", "double", "" ) ],
+    }
+
+blobTable = "TrendsArrayBlobs"
+blobFields = [ ( "TableName", "text", "30" ),
+               ( "AnalysisNum", "long", "" ),
+               ( "EcoLevel3ID", "long", "" ),
+               ( "Period", "text", "15" ),
+               ( "Resolution", "text", "10" ),
+               ( "Source", "text", "20" ),
+               ( "Glgn", "text", "10" ),
+               ( "Labels", "blob", "" ),
+               ( "Vals", "blob", "" ) ]
+#The fields that identify a record set
+blobKeys = [ name for ( name, fieldType, length ) in blobFields[ :7 ]]
@@ -1,5 +1,23 @@
 #Trends database access class
 #
+# Writes go through writeRows, which takes whole arrays rather than single
+#  values.  Each record set is
+#       ( keyValues, labelField, labels, values )
+#  where keyValues holds the key fields shared by the set, e.g.
+#  { 'AnalysisNum': 1, 'Resolution': '60m', 'ChangePeriod': '1973to1980' },
+#  labelField is "BlkLabel" or "Statistic" with one label per record, and
+#  values is a (record, field) array for the value fields after the label
+#  field.  recordSet builds one from a data or statistics array.  When a
+#  writer is between startBulk and finishBulk, writes are queued and all of
+#  them go to the table in one write at finishBulk.
+#
+# The rows are read and written through the storage backend chosen in
+#  TrendsNames.dbBackend (see StorageBackend), either the database through
+#  geoprocessor cursors or a local SQLite database.  Reads select rows by a
+#  dictionary of key values, which setTrendsQueryValues builds.  bulkRead
+#  fetches every interval (and Source/Glgn) of an ecoregion from a table in
+#  one query, sorted by the key fields, and fills many arrays at once.
+#
 # Release date:    Mar 2012
 # Written by: Jeanne Jones, USGS, jmjones@usgs.gov
 # 
@@ -9,9 +27,10 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
+import numpy
 import os, sys, traceback, time
 from ..trendutil import TrendsNames, TrendsUtilities
+from . import StorageBackend
 
 class TrendsDBaccess:
 
@@ -21,18 +40,28 @@ class TrendsDBaccess:
             trlog = TrendsUtilities.trLogger()
             #Get a list of the new field names so they can be iterated through
             self.localTable = localTable
-            desc = gp.Describe( localTable )
-            self.fields = desc.Fields
+            #Record sets queued between startBulk and finishBulk
+            self.pending = None
+            #Label lookups, format = { content: ( blocks or statistic names, lookup arrays ) }
+            self.lookups = {}
+            self.store = StorageBackend.getBackend()
+            #The field list is described once per table for the whole process
+            self.fields = self.store.describeFields( gp, localTable )
             self.isNotSummary = True in [ field.Name == "EcoLevel3ID" for field in self.fields ]
             
             for ptr, field in enumerate(self.fields):
                 if field.Name == "BlkLabel" or field.Name == "Statistic":
                     self.offset = ptr + 1
-        except arcgisscripting.ExecuteError:
+                    self.labelField = field.Name
+            self.valueFields = [ field.Name for field in self.fields[ self.offset: ]]
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             trlog.trwrite(msgs)
             raise
+        except TrendsUtilities.TrendsErrors, Terr:
+            trlog.trwrite( Terr.message )
+            raise
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
@@ -44,40 +73,68 @@ class TrendsDBaccess:
         #This is defined to work for change/conversion data and stats, should be
         #  overwritten in subclasses for other table types
         try:
+            keyValues = { 'AnalysisNum': self.analysisNum,
+                          'ChangePeriod': self.interval,
+                          'Resolution': self.resolution }
             if self.isNotSummary:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and EcoLevel3ID = " + str(self.eco.ecoNum) + \
-                        " and ChangePeriod = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'"
-            else:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and ChangePeriod = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'"
-            sortFields = ""
-            return where_clause, sortFields
+                keyValues['EcoLevel3ID'] = self.eco.ecoNum
+            sortFields = []
+            return keyValues, sortFields
         except Exception:
             raise
 
-    def getTheRows( self, gp, where_clause, sortFields ):
+    def labelColumns( self, labels ):
+        #Array columns of the block or statistic labels.  The lookup arrays are
+        # made once for the ecoregion's blocks or the statistic names.
+        if self.content == 'data':
+            source = self.eco.column
+        else:
+            source = self.statNames
+        if self.content not in self.lookups or self.lookups[ self.content ][0] is not source:
+            if self.content == 'data':
+                #Column of each block number, -1 where the block isn't in the ecoregion
+                blocks = numpy.asarray( source.keys(), int )
+                lookup = -numpy.ones( blocks.max() + 1, int )
+                lookup[ blocks ] = numpy.asarray( source.values(), int )
+                self.lookups[ self.content ] = ( source, lookup )
+            else:
+                #Statistic names sorted for searching, and their positions
+                names = numpy.asarray( source, unicode )
+                order = numpy.argsort( names )
+                self.lookups[ self.content ] = ( source, ( names[ order ], order ))
+
+        if self.content == 'data':
+            lookup = self.lookups[ self.content ][1]
+            labels = numpy.asarray( labels, int )
+            inRange = ( labels >= 0 ) & ( labels < len( lookup ))
+            columns = numpy.where( inRange, lookup[ numpy.where( inRange, labels, 0 )], -1 )
+        else:
+            names, order = self.lookups[ self.content ][1]
+            labels = numpy.asarray( labels, unicode )
+            position = numpy.minimum( numpy.searchsorted( names, labels ), len( names ) - 1 )
+            columns = numpy.where( names[ position ] == labels, order[ position ], -1 )
+        if numpy.any( columns < 0 ):
+            raise TrendsUtilities.TrendsErrors( "Unknown " + self.labelField + " " + \
+                                                str( labels[ numpy.flatnonzero( columns < 0 )[0]] ) + \
+                                                " in " + self.localTable )
+        return columns
+
+    def fillBlock( self, labels, values, localData ):
+        #Put the (field, record) values read by readBlock in the array columns
+        # of their blocks or statistics, all in one assignment
+        if len( labels ) == 0:
+            return False
+        localData[ :len( self.valueFields ), self.labelColumns( labels ) ] = values
+        return True
+
+    def getTheRows( self, gp, keyValues, sortFields ):
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
-            rows = gp.SearchCursor( self.localTable, where_clause, "", "", sortFields )
-            row = rows.Next()
-            if row is not None:
-                dataFound = True
-                while row:
-                    if self.content == 'data':
-                        ctr = self.eco.column[ row.BlkLabel ]
-                    else:
-                        ctr = self.statNames.index( row.Statistic )
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        self.data[ ptr, ctr ] = row.GetValue( field.Name )
-                    row = rows.Next()
-            else:
-                dataFound = False
-            return dataFound
-        except arcgisscripting.ExecuteError:
+            keys, values = self.store.readBlock( gp, self.localTable, keyValues, [ self.labelField ],
+                                                 self.valueFields, sortFields )
+            return self.fillBlock( keys[0], values, self.data )
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             trlog.trwrite(msgs)
@@ -91,11 +148,6 @@ class TrendsDBaccess:
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
     def databaseRead( self, gp, analysisNum, eco, interval, resolution, data, content, statNames):
         try:
@@ -108,8 +160,65 @@ class TrendsDBaccess:
             self.data = data             #2-dim array for table values
             self.content = content       #indicator of data or stats array
             self.statNames = statNames
-            where_clause, sortFields = self.setTrendsQueryValues()
-            return self.getTheRows( gp, where_clause, sortFields )
+            keyValues, sortFields = self.setTrendsQueryValues()
+            return self.getTheRows( gp, keyValues, sortFields )
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def bulkRead( self, gp, analysisNum, eco, resolution, keys, splitFields, targets, content, statNames ):
+        #Read the rows for many periods (and Source/Glgn values) in one query.
+        # keys holds any other fixed key fields, e.g. { 'Source': 'gross' }.
+        # targets holds the 2-dim array for each combination of the split
+        # fields, format = { ( interval[, source][, tabType] ): array }, and
+        # rows for other combinations are skipped.  Returns the set of target
+        # keys that had rows.
+        try:
+            #Set up a log object
+            trlog = TrendsUtilities.trLogger()
+            self.eco = eco
+            self.content = content
+            self.statNames = statNames
+            keyValues = { 'AnalysisNum': analysisNum, 'Resolution': resolution }
+            keyValues.update( keys )
+            if self.isNotSummary:
+                keyValues['EcoLevel3ID'] = eco.ecoNum
+            #Only the wanted values of each split field
+            for ( ptr, field ) in enumerate( splitFields ):
+                keyValues[ field ] = sorted( set([ target[ ptr ] for target in targets ]))
+            if not targets:
+                return set()
+
+            orderBy = list( splitFields ) + [ self.labelField ]
+            keys, values = self.store.readBlock( gp, self.localTable, keyValues, orderBy,
+                                                 self.valueFields, orderBy )
+            numSplit = len( splitFields )
+            found = set()
+            if len( keys[0] ) == 0:
+                return found
+            labelColumns = self.labelColumns( keys[ numSplit ] )
+
+            #The rows come sorted by the split fields, so each target's rows are
+            # a run that goes into its array in one assignment
+            splits = [ numpy.asarray( column, unicode ) for column in keys[ :numSplit ]]
+            changed = numpy.zeros( len( keys[0] ) - 1, bool )
+            for split in splits:
+                changed |= split[1:] != split[:-1]
+            starts = [ 0 ] + list( numpy.flatnonzero( changed ) + 1 ) + [ len( keys[0] ) ]
+            for ( start, end ) in zip( starts[:-1], starts[1:] ):
+                target = tuple([ str( split[ start ] ) for split in splits ])
+                if target in targets:
+                    targets[ target ][ :len( self.valueFields ), labelColumns[ start:end ]] = values[ :, start:end ]
+                    found.add( target )
+            return found
+        except TrendsUtilities.ExecuteError:
+            msgs = gp.GetMessage(0)
+            msgs += gp.GetMessages(2)
+            trlog.trwrite(msgs)
+            raise
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
@@ -122,56 +231,65 @@ class TrendsDBaccess:
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
-            row = None
-            if analysisNum == TrendsNames.TrendsNum:
-                #Check for existing rows in table
-                where_clause = "AnalysisNum = " + str(analysisNum) + \
-                        " and EcoLevel3ID = " + str(eco.ecoNum) + \
-                        " and ChangePeriod = \'" + interval + "\'" + \
-                        " and Resolution = \'" + resolution + "\'"
-                if content == "data":
-                    sortFields = "BlkLabel A"
-                else:
-                    sortFields = ""
-
-                rows = gp.UpdateCursor( self.localTable, where_clause, "", "", sortFields )
-                row = rows.Next()  #Get the first row
-                
-            if row is not None:  #found rows so update existing rows
-                while row:
-                    if content == 'data':
-                        ctr = eco.column[ row.BlkLabel ]
-                    else:
-                        ctr = statNames.index( row.Statistic )
-                    
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.UpdateRow( row )
-                    row = rows.Next()
-            else:
-                #Insert new rows in Trends - always insert for custom and summary table
-                #This writes to trends, custom, and summary tables, but the summary table doesn't
-                #  have ecoregion field.  The var isNotSummary gets around this.
-                rows = gp.InsertCursor( self.localTable )
-                if content == 'data':
-                    numVals = eco.sampleBlks
-                else:
-                    numVals = len( statNames)
-                for ctr in range( numVals ):
-                    row = rows.NewRow()
-                    row.AnalysisNum = analysisNum
-                    row.Resolution = resolution
-                    if self.isNotSummary:
-                        row.EcoLevel3ID = eco.ecoNum
-                    row.ChangePeriod = interval
-                    if content == "data":
-                        row.BlkLabel = eco.stratBlocks[ ctr ]
-                    else:
-                        row.Statistic = statNames[ ctr ]
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.InsertRow( row )
-        except arcgisscripting.ExecuteError:
+            self.writeRows( gp, [ self.recordSet( analysisNum, eco, resolution, { 'ChangePeriod': interval },
+                                                  data, content, statNames ) ],
+                            analysisNum == TrendsNames.TrendsNum )
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def keyClause( self, keyValues ):
+        #Where clause selecting the rows with the given key values
+        return StorageBackend.keyClause( keyValues )
+
+    def recordSet( self, analysisNum, eco, resolution, keys, data, content, statNames ):
+        #A record set for a data array (one record per sample block) or a statistics
+        # array (one record per statistic).  keys holds the table's own key fields,
+        # e.g. { 'CompYear': year } or { 'ChangePeriod': interval, 'Glgn': 'gain' }.
+        #The summary tables don't have the ecoregion field, which isNotSummary gets around.
+        keyValues = { 'AnalysisNum': analysisNum, 'Resolution': resolution }
+        keyValues.update( keys )
+        if self.isNotSummary:
+            keyValues['EcoLevel3ID'] = eco.ecoNum
+        if content == 'data':
+            labelField = "BlkLabel"
+            labels = eco.blocks[ :eco.sampleBlks ]
+        else:
+            labelField = "Statistic"
+            labels = list( statNames )
+        return ( keyValues, labelField, labels, numpy.asarray( data )[ :, :len( labels ) ].T )
+
+    def startBulk( self ):
+        #Queue the writes until finishBulk
+        self.pending = []
+
+    def finishBulk( self, gp ):
+        #Write everything queued since startBulk
+        pending = self.pending
+        self.pending = None
+        for update in ( True, False ):
+            recordSets = []
+            for ( sets, setUpdate ) in pending:
+                if setUpdate == update:
+                    recordSets.extend( sets )
+            if recordSets:
+                self.writeRows( gp, recordSets, update )
+
+    def writeRows( self, gp, recordSets, update = False ):
+        #Write the record sets to the table.  With update (refreshing the Trends
+        # tables), rows that already exist are rewritten; all the other records
+        # are inserted in one write.
+        try:
+            #Set up a log object
+            trlog = TrendsUtilities.trLogger()
+            if self.pending is not None:
+                self.pending.append(( recordSets, update ))
+                return
+            self.store.writeRows( gp, self.localTable, recordSets, self.valueFields, update )
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             trlog.trwrite(msgs)
@@ -182,8 +300,3 @@ class TrendsDBaccess:
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
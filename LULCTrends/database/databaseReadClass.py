@@ -9,7 +9,6 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 from LULCTrends.database.databaseAccessClass import TrendsDBaccess
 from ..trendutil import TrendsNames, TrendsUtilities
@@ -24,46 +23,34 @@ class compositionRead ( TrendsDBaccess ):
 
     def setTrendsQueryValues( self ):
         try:
+            keyValues = { 'AnalysisNum': self.analysisNum,
+                          'CompYear': self.interval,
+                          'Resolution': self.resolution }
             if self.isNotSummary:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and EcoLevel3ID = " + str(self.eco.ecoNum) + \
-                        " and CompYear = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'"
-            else:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and CompYear = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'"                
-            sortFields = ""
-            return where_clause, sortFields
+                keyValues['EcoLevel3ID'] = self.eco.ecoNum
+            sortFields = []
+            return keyValues, sortFields
         except Exception:
             raise
 
 class glgnRead ( TrendsDBaccess ):
 
-    def getTheRows( self, gp, where_clause, sortFields ):
+    def getTheRows( self, gp, keyValues, sortFields ):
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
             for tabType in TrendsNames.glgnTabTypes:
-                temp_clause = where_clause + " and Glgn = \'" + tabType + "\'"
-                rows = gp.SearchCursor( self.localTable, temp_clause, "", "", sortFields )
-                row = rows.Next()
-                if row is not None:
-                    dataFound = True
-                    while row:
-                        if self.content == 'data':
-                            ctr = self.eco.column[ row.BlkLabel ]
-                            localData = self.data[ tabType ][0]
-                        else:
-                            ctr = self.statNames.index( row.Statistic )
-                            localData = self.data[ tabType ][1]
-                        for (ptr, field) in enumerate( self.fields[self.offset:]):
-                            localData[ ptr, ctr ] = row.GetValue( field.Name )
-                        row = rows.Next()
+                tempValues = dict( keyValues )
+                tempValues['Glgn'] = tabType
+                keys, values = self.store.readBlock( gp, self.localTable, tempValues, [ self.labelField ],
+                                                     self.valueFields, sortFields )
+                if self.content == 'data':
+                    localData = self.data[ tabType ][0]
                 else:
-                    dataFound = False
+                    localData = self.data[ tabType ][1]
+                dataFound = self.fillBlock( keys[0], values, localData )
             return dataFound
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             trlog.trwrite(msgs)
@@ -77,11 +64,6 @@ class glgnRead ( TrendsDBaccess ):
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
 class multichangeRead ( TrendsDBaccess ):
     pass  #use TrendsDBaccess class as is
@@ -100,8 +82,8 @@ class aggregateRead ( TrendsDBaccess ):  #same as allchange read
             self.data = data             #2-dim array for table values
             self.content = content       #indicator of data or stats array
             self.statNames = statNames
-            where_clause, sortFields = self.setTrendsQueryValues( source )
-            return self.getTheRows( gp, where_clause, sortFields )
+            keyValues, sortFields = self.setTrendsQueryValues( source )
+            return self.getTheRows( gp, keyValues, sortFields )
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
@@ -111,20 +93,14 @@ class aggregateRead ( TrendsDBaccess ):  #same as allchange read
 
     def setTrendsQueryValues( self, source ):
         try:
+            keyValues = { 'AnalysisNum': self.analysisNum,
+                          'ChangePeriod': self.interval,
+                          'Resolution': self.resolution,
+                          'Source': source }
             if self.isNotSummary:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and EcoLevel3ID = " + str(self.eco.ecoNum) + \
-                        " and ChangePeriod = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'" + \
-                        " and Source = \'" + source + "\'"
-            else:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and ChangePeriod = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'" + \
-                        " and Source = \'" + source + "\'"
-
-            sortFields = ""
-            return where_clause, sortFields
+                keyValues['EcoLevel3ID'] = self.eco.ecoNum
+            sortFields = []
+            return keyValues, sortFields
         except Exception:
             raise
 
@@ -149,8 +125,8 @@ class aggGlgnRead ( glgnRead ): #use glgnRead getTheRows and add below methods
             self.data = data             #2-dim array for table values
             self.content = content       #indicator of data or stats array
             self.statNames = statNames
-            where_clause, sortFields = self.setTrendsQueryValues( source )
-            return self.getTheRows( gp, where_clause, sortFields )
+            keyValues, sortFields = self.setTrendsQueryValues( source )
+            return self.getTheRows( gp, keyValues, sortFields )
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
@@ -160,18 +136,13 @@ class aggGlgnRead ( glgnRead ): #use glgnRead getTheRows and add below methods
 
     def setTrendsQueryValues( self, source ):
         try:
+            keyValues = { 'AnalysisNum': self.analysisNum,
+                          'ChangePeriod': self.interval,
+                          'Resolution': self.resolution,
+                          'Source': source }
             if self.isNotSummary:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and EcoLevel3ID = " + str(self.eco.ecoNum) + \
-                        " and ChangePeriod = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'" + \
-                        " and Source = \'" + source + "\'"
-            else:
-                where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                        " and ChangePeriod = \'" + self.interval + "\'" + \
-                        " and Resolution = \'" + self.resolution + "\'" + \
-                        " and Source = \'" + source + "\'"
-            sortFields = ""
-            return where_clause, sortFields
+                keyValues['EcoLevel3ID'] = self.eco.ecoNum
+            sortFields = []
+            return keyValues, sortFields
         except Exception:
             raise
@@ -9,7 +9,7 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
+import numpy
 import os, sys, traceback, time
 from LULCTrends.database.databaseAccessClass import TrendsDBaccess
 from ..trendutil import TrendsNames, TrendsUtilities
@@ -20,155 +20,41 @@ class changeWrite ( TrendsDBaccess ):
 class compositionWrite ( TrendsDBaccess ):
 
     def databaseWrite( self, gp, analysisNum, eco, interval, resolution, data, content, statNames ):
-        #defined for change/conversion table.  Overwritten for other tables.
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
-            row = None
-            if analysisNum == TrendsNames.TrendsNum:
-                #Check for existing rows in table
-                where_clause = "AnalysisNum = " + str(analysisNum) + \
-                        " and EcoLevel3ID = " + str(eco.ecoNum) + \
-                        " and CompYear = \'" + interval + "\'" + \
-                        " and Resolution = \'" + resolution + "\'"
-                if content == "data":
-                    sortFields = "BlkLabel A"
-                else:
-                    sortFields = ""
-
-                rows = gp.UpdateCursor( self.localTable, where_clause, "", "", sortFields )
-                row = rows.Next()  #Get the first row
-                
-            if row is not None:  #found rows so update existing rows
-                while row:
-                    if content == 'data':
-                        ctr = eco.column[ row.BlkLabel ]
-                    else:
-                        ctr = statNames.index( row.Statistic )
-                    
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.UpdateRow( row )
-                    row = rows.Next()
-            else:
-                #Insert new rows in Trends - always insert for custom and summary table
-                #This writes to trends, custom, and summary tables, but the summary table doesn't
-                #  have ecoregion field.  The var isNotSummary gets around this.
-                rows = gp.InsertCursor( self.localTable )
-                if content == 'data':
-                    numVals = eco.sampleBlks
-                else:
-                    numVals = len( statNames)
-                for ctr in range( numVals ):
-                    row = rows.NewRow()
-                    row.AnalysisNum = analysisNum
-                    row.Resolution = resolution
-                    if self.isNotSummary:
-                        row.EcoLevel3ID = eco.ecoNum
-                    row.CompYear = interval
-                    if content == "data":
-                        row.BlkLabel = eco.stratBlocks[ ctr ]
-                    else:
-                        row.Statistic = statNames[ ctr ]
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.InsertRow( row )
-        except arcgisscripting.ExecuteError:
-            msgs = gp.GetMessage(0)
-            msgs += gp.GetMessages(2)
-            trlog.trwrite(msgs)
-            raise
+            self.writeRows( gp, [ self.recordSet( analysisNum, eco, resolution, { 'CompYear': interval },
+                                                  data, content, statNames ) ],
+                            analysisNum == TrendsNames.TrendsNum )
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
 class glgnWrite ( TrendsDBaccess ):
 
     def databaseWrite( self, gp, analysisNum, eco, interval, resolution, data, content, statNames ):
-        #defined for change/conversion table.  Overwritten for other tables.
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
-            for tabType in TrendsNames.glgnTabTypes:
-                row = None
-                if analysisNum == TrendsNames.TrendsNum:
-                    #Check for existing rows in table
-                    where_clause = "AnalysisNum = " + str(analysisNum) + \
-                            " and EcoLevel3ID = " + str(eco.ecoNum) + \
-                            " and ChangePeriod = \'" + interval + "\'" + \
-                            " and Resolution = \'" + resolution + "\'" + \
-                            " and Glgn = \'" + tabType + "\'"
-                    if content == "data":
-                        sortFields = "BlkLabel A"
-                    else:
-                        sortFields = ""
-
-                    rows = gp.UpdateCursor( self.localTable, where_clause, "", "", sortFields )
-                    row = rows.Next()  #Get the first row
-                    
-                if row is not None:  #found rows so update existing rows
-                    while row:
-                        if content == 'data':
-                            ctr = eco.column[ row.BlkLabel ]
-                            dataTable = data[tabType][0]
-                        else:
-                            ctr = statNames.index( row.Statistic )
-                            dataTable = data[tabType][1]
-                        
-                        for (ptr, field) in enumerate( self.fields[self.offset:]):
-                            row.SetValue( field.Name, dataTable[ ptr, ctr ] )
-                        rows.UpdateRow( row )
-                        row = rows.Next()
-                else:
-                    #Insert new rows in Trends - always insert for custom and summary table
-                    #This writes to trends, custom, and summary tables, but the summary table doesn't
-                    #  have ecoregion field.  The var isNotSummary gets around this.
-                    rows = gp.InsertCursor( self.localTable )
-                    if content == 'data':
-                        numVals = eco.sampleBlks
-                    else:
-                        numVals = len( statNames)
-                    for ctr in range( numVals ):
-                        row = rows.NewRow()
-                        row.AnalysisNum = analysisNum
-                        row.Glgn = tabType
-                        row.Resolution = resolution
-                        if self.isNotSummary:
-                            row.EcoLevel3ID = eco.ecoNum
-                        row.ChangePeriod = interval
-                        if content == "data":
-                            row.BlkLabel = eco.stratBlocks[ ctr ]
-                            dataTable = data[tabType][0]
-                        else:
-                            row.Statistic = statNames[ ctr ]
-                            dataTable = data[tabType][1]
-                        for (ptr, field) in enumerate( self.fields[self.offset:]):
-                            row.SetValue( field.Name, dataTable[ ptr, ctr ] )
-                        rows.InsertRow( row )
-        except arcgisscripting.ExecuteError:
-            msgs = gp.GetMessage(0)
-            msgs += gp.GetMessages(2)
-            trlog.trwrite(msgs)
-            raise
+            #All the gain/loss/gross/net tables go through one cursor
+            if content == 'data':
+                ptr = 0
+            else:
+                ptr = 1
+            self.writeRows( gp, [ self.recordSet( analysisNum, eco, resolution,
+                                                  { 'ChangePeriod': interval, 'Glgn': tabType },
+                                                  data[ tabType ][ ptr ], content, statNames )
+                                  for tabType in TrendsNames.glgnTabTypes ],
+                            analysisNum == TrendsNames.TrendsNum )
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
 class multichangeWrite ( TrendsDBaccess ):
     pass  #use TrendsDBaccess class as is
@@ -180,73 +66,16 @@ class aggregateWrite ( TrendsDBaccess ):
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
-            row = None
-            if analysisNum == TrendsNames.TrendsNum:
-                #Check for existing rows in table
-                where_clause = "AnalysisNum = " + str(analysisNum) + \
-                        " and EcoLevel3ID = " + str(eco.ecoNum) + \
-                        " and ChangePeriod = \'" + interval + "\'" + \
-                        " and Resolution = \'" + resolution + "\'" + \
-                        " and Source = \'" + source + "\'"
-                if content == "data":
-                    sortFields = "BlkLabel A"
-                else:
-                    sortFields = ""
-                
-                rows = gp.UpdateCursor( self.localTable, where_clause, "", "", sortFields )
-                row = rows.Next()  #Get the first row
-                
-            if row is not None:  #found rows so update existing rows
-                while row:
-                    if content == 'data':
-                        ctr = eco.column[ row.BlkLabel ]
-                    else:
-                        ctr = statNames.index( row.Statistic )
-                    
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.UpdateRow( row )
-                    row = rows.Next()
-            else:
-                #Insert new rows in Trends - always insert for custom and summary table
-                #This writes to trends, custom, and summary tables, but the summary table doesn't
-                #  have ecoregion and resolution fields.  The var isNotSummary gets around this.
-                rows = gp.InsertCursor( self.localTable )
-                if content == 'data':
-                    numVals = eco.sampleBlks
-                else:
-                    numVals = len( statNames)
-                for ctr in range( numVals ):
-                    row = rows.NewRow()
-                    row.AnalysisNum = analysisNum
-                    row.Resolution = resolution
-                    row.Source = source
-                    if self.isNotSummary:
-                        row.EcoLevel3ID = eco.ecoNum
-                    row.ChangePeriod = interval
-                    if content == "data":
-                        row.BlkLabel = eco.stratBlocks[ ctr ]
-                    else:
-                        row.Statistic = statNames[ ctr ]
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.InsertRow( row )
-        except arcgisscripting.ExecuteError:
-            msgs = gp.GetMessage(0)
-            msgs += gp.GetMessages(2)
-            trlog.trwrite(msgs)
-            raise
+            self.writeRows( gp, [ self.recordSet( analysisNum, eco, resolution,
+                                                  { 'ChangePeriod': interval, 'Source': source },
+                                                  data, content, statNames ) ],
+                            analysisNum == TrendsNames.TrendsNum )
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
 class allChangeWrite ( TrendsDBaccess ):
 
@@ -255,154 +84,70 @@ class allChangeWrite ( TrendsDBaccess ):
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
-            row = None
-            if analysisNum == TrendsNames.TrendsNum:
-                #Check for existing rows in table
-                where_clause = "AnalysisNum = " + str(analysisNum) + \
-                        " and EcoLevel3ID = " + str(eco.ecoNum) + \
-                        " and ChangePeriod = \'" + interval + "\'" + \
-                        " and Resolution = \'" + resolution + "\'" + \
-                        " and Source = \'" + source + "\'"
-                if content == "data":
-                    sortFields = "BlkLabel A"
-                else:
-                    sortFields = ""
-                
-                rows = gp.UpdateCursor( self.localTable, where_clause, "", "", sortFields )
-                row = rows.Next()  #Get the first row
-                
-            if row is not None:  #found rows so update existing rows
-                while row:
-                    if content == 'data':
-                        ctr = eco.column[ row.BlkLabel ]
-                    else:
-                        ctr = statNames.index( row.Statistic )
-                    
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.UpdateRow( row )
-                    row = rows.Next()
-            else:
-                #Insert new rows in Trends - always insert for custom and summary table
-                #This writes to trends, custom, and summary tables, but the summary table doesn't
-                #  have ecoregion and resolution fields.  The var isNotSummary gets around this.
-                rows = gp.InsertCursor( self.localTable )
-                if content == 'data':
-                    numVals = eco.sampleBlks
-                else:
-                    numVals = len( statNames)
-                for ctr in range( numVals ):
-                    row = rows.NewRow()
-                    row.AnalysisNum = analysisNum
-                    row.Resolution = resolution
-                    row.Source = source
-                    if self.isNotSummary:
-                        row.EcoLevel3ID = eco.ecoNum
-                    row.ChangePeriod = interval
-                    if content == "data":
-                        row.BlkLabel = eco.stratBlocks[ ctr ]
-                    else:
-                        row.Statistic = statNames[ ctr ]
-
-                    for (ptr, field) in enumerate( self.fields[self.offset:]):
-                        row.SetValue( field.Name, data[ ptr, ctr ] )
-                    rows.InsertRow( row )
-        except arcgisscripting.ExecuteError:
-            msgs = gp.GetMessage(0)
-            msgs += gp.GetMessages(2)
-            trlog.trwrite(msgs)
-            raise
+            self.writeRows( gp, [ self.recordSet( analysisNum, eco, resolution,
+                                                  { 'ChangePeriod': interval, 'Source': source },
+                                                  data, content, statNames ) ],
+                            analysisNum == TrendsNames.TrendsNum )
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
 class aggGlgnWrite ( TrendsDBaccess ):
 
     def databaseWrite( self, gp, analysisNum, eco, interval, resolution, source,
                        data, content, statNames ):
-        #defined for change/conversion table.  Overwritten for other tables.
         try:
             #Set up a log object
             trlog = TrendsUtilities.trLogger()
-            for tabType in TrendsNames.glgnTabTypes:
-                row = None
-                if analysisNum == TrendsNames.TrendsNum:
-                    #Check for existing rows in table
-                    where_clause = "AnalysisNum = " + str(analysisNum) + \
-                            " and EcoLevel3ID = " + str(eco.ecoNum) + \
-                            " and ChangePeriod = \'" + interval + "\'" + \
-                            " and Resolution = \'" + resolution + "\'" + \
-                            " and Source = \'" + source + "\'" + \
-                            " and Glgn = \'" + tabType + "\'"
-                    if content == "data":
-                        sortFields = "BlkLabel A"
-                    else:
-                        sortFields = ""
+            if content == 'data':
+                ptr = 0
+            else:
+                ptr = 1
+            self.writeRows( gp, [ self.recordSet( analysisNum, eco, resolution,
+                                                  { 'ChangePeriod': interval, 'Source': source, 'Glgn': tabType },
+                                                  data[ tabType ][ ptr ], content, statNames )
+                                  for tabType in TrendsNames.glgnTabTypes ],
+                            analysisNum == TrendsNames.TrendsNum )
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+class summaryStatsWrite ( TrendsDBaccess ):
 
-                    rows = gp.UpdateCursor( self.localTable, where_clause, "", "", sortFields )
-                    row = rows.Next()  #Get the first row
-                    
-                if row is not None:  #found rows so update existing rows
-                    while row:
-                        if content == 'data':
-                            ctr = eco.column[ row.BlkLabel ]
-                            dataTable = data[tabType][0]
-                        else:
-                            ctr = statNames.index( row.Statistic )
-                            dataTable = data[tabType][1]
-                        
-                        for (ptr, field) in enumerate( self.fields[self.offset:]):
-                            row.SetValue( field.Name, dataTable[ ptr, ctr ] )
-                        rows.UpdateRow( row )
-                        row = rows.Next()
-                else:
-                    #Insert new rows in Trends - always insert for custom and summary table
-                    #This writes to trends, custom, and summary tables, but the summary table doesn't
-                    #  have ecoregion and resolution fields.  The var isNotSummary gets around this.
-                    rows = gp.InsertCursor( self.localTable )
-                    if content == 'data':
-                        numVals = eco.sampleBlks
-                    else:
-                        numVals = len( statNames)
-                    for ctr in range( numVals ):
-                        row = rows.NewRow()
-                        row.AnalysisNum = analysisNum
-                        row.Glgn = tabType
-                        row.Resolution = resolution
-                        row.Source = source
-                        if self.isNotSummary:
-                            row.EcoLevel3ID = eco.ecoNum
-                        row.ChangePeriod = interval
-                        if content == "data":
-                            row.BlkLabel = eco.stratBlocks[ ctr ]
-                            dataTable = data[tabType][0]
-                        else:
-                            row.Statistic = statNames[ ctr ]
-                            dataTable = data[tabType][1]
-                        for (ptr, field) in enumerate( self.fields[self.offset:]):
-                            row.SetValue( field.Name, dataTable[ ptr, ctr ] )
-                        rows.InsertRow( row )
-        except arcgisscripting.ExecuteError:
+    def updateStatistics( self, gp, keyValues, data, statNames, changedStats ):
+        #Rewrite existing statistic rows of a summary table in place.  keyValues
+        # selects the row set, format = { field name: value, ...}, and only the
+        # rows whose Statistic is in changedStats are updated.  Returns the
+        # number of rows updated.
+        try:
+            #Set up a log object
+            trlog = TrendsUtilities.trLogger()
+            where_clause = self.keyClause( keyValues )
+            changedStats = [ stat for stat in statNames if stat in changedStats ]
+            columns = [ statNames.index( stat ) for stat in changedStats ]
+            updated = self.store.updateRows( gp, self.localTable, keyValues, "Statistic", changedStats,
+                                             numpy.asarray( data )[ :, columns ].T, self.valueFields )
+            if updated < len( changedStats ):
+                raise TrendsUtilities.TrendsErrors( "Missing summary statistic rows in " + self.localTable + \
+                                                    " for " + where_clause )
+            return updated
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             trlog.trwrite(msgs)
             raise
+        except TrendsUtilities.TrendsErrors, Terr:
+            trlog.trwrite( Terr.message )
+            raise
         except Exception:
             tb = sys.exc_info()[2]
             tbinfo = traceback.format_tb(tb)[0]
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             trlog.trwrite(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
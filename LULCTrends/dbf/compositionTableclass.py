@@ -10,9 +10,9 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time, copy
-from ..trendutil import TrendsNames
+from ..trendutil import TrendsNames, TrendsUtilities
 from . import TrendsStatCodes
 
 from dbfclass import dBASEtable
@@ -28,7 +28,7 @@ class compdBASEtable( dBASEtable ):
             self.localTable = "localComp"
             self.extractDBStatistics( gp, "TrendsCompStats", self.localTable, where_clause )
             
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -65,7 +65,7 @@ class compdBASEtable( dBASEtable ):
                 statReshaped = numpy.reshape( stats, [ numRows * numCols ])
                 self.statSquared[eco-1,:] = statReshaped[:]
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
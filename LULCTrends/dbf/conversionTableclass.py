@@ -10,9 +10,9 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time, copy
-from ..trendutil import TrendsNames
+from ..trendutil import TrendsNames, TrendsUtilities
 from . import TrendsStatCodes
 from .dbfclass import dBASEtable
 
@@ -26,7 +26,7 @@ class changedBASEtable( dBASEtable ):
             self.localTable = "localChange"
             self.extractDBStatistics( gp, "TrendsChangeStats", self.localTable, where_clause )
             
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -55,7 +55,7 @@ class changedBASEtable( dBASEtable ):
                 statReshaped = numpy.reshape( stats, [ numRows * numCols ])
                 self.statSquared[eco-1,:] = statReshaped[:]
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -119,7 +119,7 @@ class errordBASEtable( dBASEtable ):
             self.localTable = "localError"
             self.extractDBStatistics( gp, "TrendsChangeStats", self.localTable, where_clause )
             
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -148,7 +148,7 @@ class errordBASEtable( dBASEtable ):
                 statReshaped = numpy.reshape( stats, [ numRows * numCols ])
                 self.statSquared[eco-1,:] = statReshaped[:]
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
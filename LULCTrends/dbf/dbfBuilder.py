@@ -9,9 +9,8 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback
-from ..trendutil import TrendsNames
+from ..trendutil import TrendsNames, TrendsUtilities
 from . import TrendsStatCodes
 from .dbfclass import dBASEtable
 from .glgnTableclass import glgndBASEtable, gaindBASEtable, lossdBASEtable, grossdBASEtable, netdBASEtable
@@ -21,7 +20,7 @@ from .conversionTableclass import changedBASEtable, errordBASEtable
 
 def createDBFtables( tableList, resolution, folderForTables ):
     try:
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         
         if "ConversionChange" in tableList:
             changeTable = changedBASEtable( gp,
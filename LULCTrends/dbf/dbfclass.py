@@ -10,9 +10,9 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time
-from ..trendutil import TrendsNames
+from ..trendutil import TrendsNames, TrendsUtilities
 from . import TrendsStatCodes
 
 class dBASEtable:
@@ -48,7 +48,7 @@ class dBASEtable:
 
     def getEcoregionInfo(self):
         try:
-            gp = arcgisscripting.create(9.3)
+            gp = TrendsUtilities.getGP()
             gp.OverwriteOutput = True
 
             #read in the general values from the Ecoregion table
@@ -63,7 +63,7 @@ class dBASEtable:
                 row = rows.Next()
             return ecoList
             
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -119,7 +119,7 @@ class dBASEtable:
                     
             return tableLoc, dbffields, dbfoffset
         
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -133,8 +133,7 @@ class dBASEtable:
 
     def extractStatistics(self, gp, sourceTable, where_clause, stats, ptr, ctrOffset ):
         try:
-            desc = gp.Describe( sourceTable )
-            sourcefields = desc.Fields
+            sourcefields = TrendsUtilities.describeFields( gp, sourceTable )
             for counter, field in enumerate(sourcefields):
                 if field.Name == "Statistic":
                     sourceoffset = counter + 1
@@ -145,7 +144,7 @@ class dBASEtable:
                 for (ctr, field) in enumerate( sourcefields[sourceoffset:]):
                     stats[ ctr + ctrOffset, ptr ] = row.GetValue( field.Name )
                 row = rows.Next()
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -170,7 +169,7 @@ class dBASEtable:
             gp.Overwriteoutput = True
             gp.MakeQueryTable_management( sourceTable, localName,"USE_KEY_FIELDS","","",where_clause )
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -194,7 +193,7 @@ class dBASEtable:
                         row.SetValue( field.Name, self.statSquared[eco-1, ctr-dbfoffset] )
                 rows.InsertRow( row )
         
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -11,9 +11,9 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time, copy
-from ..trendutil import TrendsNames
+from ..trendutil import TrendsNames, TrendsUtilities
 from . import TrendsStatCodes
 
 from dbfclass import dBASEtable
@@ -29,7 +29,7 @@ class glgndBASEtable( dBASEtable ):
             self.localTable = "local" + glgn
             self.extractDBStatistics( gp, "TrendsGlgnStats", self.localTable, where_clause )
             
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -64,7 +64,7 @@ class glgndBASEtable( dBASEtable ):
                 statReshaped = numpy.reshape( stats, [ numRows * numCols ])
                 self.statSquared[eco-1,:] = statReshaped[:]
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -199,7 +199,7 @@ class grossdBASEtable( glgndBASEtable ):
                 statReshaped = numpy.reshape( stats, [ numRows * numCols ])
                 self.statSquared[eco-1,:] = statReshaped[:]
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
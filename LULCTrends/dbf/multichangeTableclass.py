@@ -11,9 +11,9 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time, copy
-from ..trendutil import TrendsNames
+from ..trendutil import TrendsNames, TrendsUtilities
 from . import TrendsStatCodes
 
 from dbfclass import dBASEtable
@@ -29,7 +29,7 @@ class multidBASEtable( dBASEtable ):
             self.localTable = "localMulti"
             self.extractDBStatistics( gp, "TrendsMultichangeStats", self.localTable, where_clause )
             
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -88,7 +88,7 @@ class multidBASEtable( dBASEtable ):
                 statReshaped = numpy.reshape( stats, [ numRows * numCols ])
                 self.statSquared[eco-1,:] = statReshaped[:]
 
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
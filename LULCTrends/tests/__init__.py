@@ -0,0 +1,15 @@
+# Tests for the LULCTrends package
+#
+# Run from the folder holding LULCTrends with
+#       python -m unittest discover -s LULCTrends/tests -t .
+#
+# The tests do not need ArcGIS or the Trends database; the storage backend
+# tests write a temporary SQLite database.  R's output for the statistics
+# is stored in the tests, and the comparison with R itself runs only when
+# rpy2 is installed.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
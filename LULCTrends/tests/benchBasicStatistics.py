@@ -0,0 +1,39 @@
+# File benchBasicStatistics.py
+#
+# Times the ecoregion statistics kernel against the row by row calculation
+#  with R's var (testBasicStatistics.baselineStats).  Needs rpy2.
+#
+#       python -m LULCTrends.tests.benchBasicStatistics
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import timeit
+import numpy
+from LULCTrends.trendutil import TrendsNames
+from LULCTrends.analysis import basicStatistics
+from .testBasicStatistics import testEco, baselineStats, sampleData
+
+if __name__ == '__main__':
+    eco = testEco()
+    eco.totalBlks = 458
+    eco.sampleBlks = 40
+    data = sampleData( eco )
+    eco.totalEstPixels = numpy.sum( data ) * ( float( eco.totalBlks ) / float( eco.sampleBlks ))
+
+    baseStat = numpy.zeros(( TrendsNames.numConversions, TrendsNames.numStatisticsNames ), float)
+    baselineStats( eco, TrendsNames.numConversions, data, baseStat )
+    kernelStat = basicStatistics.statsKernel( data, eco.totalBlks, eco.sampleBlks, eco.totalEstPixels, eco.studentT )
+    print "Largest relative difference: %g" % numpy.max( numpy.abs( baseStat - kernelStat ) /
+                                                         numpy.maximum( numpy.abs( baseStat ), 1.0 ))
+
+    repeats = 200
+    baseTime = timeit.Timer( lambda: baselineStats( eco, TrendsNames.numConversions, data, baseStat )).timeit( repeats )
+    kernelTime = timeit.Timer( lambda: basicStatistics.statsKernel( data, eco.totalBlks, eco.sampleBlks,
+                                                                    eco.totalEstPixels, eco.studentT )).timeit( repeats )
+    print "Row by row with R: %.3f ms   kernel: %.3f ms   speedup: %.1fx" % \
+          ( 1000.0*baseTime/repeats, 1000.0*kernelTime/repeats, baseTime/kernelTime )
@@ -0,0 +1,55 @@
+# File benchDomainEstimation.py
+#
+# Times the domain estimates of many boundaries (DomainEstimation.domainStats)
+#  against one statsKernel call per boundary and interval, and reports the
+#  largest difference between them.
+#
+#       python -m LULCTrends.tests.benchDomainEstimation
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import time
+import numpy
+from LULCTrends.trendutil import TrendsNames
+from LULCTrends.trendutil.StudentT import studentTValues
+from LULCTrends.analysis.basicStatistics import statsKernel
+from LULCTrends.analysis.DomainEstimation import membershipMatrix, domainStats
+
+if __name__ == '__main__':
+    random = numpy.random.RandomState( 0 )
+    numIntervals = 5
+    numBlocks = 60
+    numDomains = 500
+    data = random.poisson( 500, ( numIntervals, TrendsNames.numConversions, numBlocks ))
+    data[ :, 5:60, : ] = 0
+    domains = [ sorted( random.permutation( numBlocks )[ :random.randint( 1, 25 )] )
+                for ptr in range( numDomains ) ]
+    membership = membershipMatrix( domains, dict( zip( range( numBlocks ), range( numBlocks ))) )
+    sampleBlks = numpy.asarray( membership.sum( axis=1 ), float ).ravel()
+    totalBlks = sampleBlks * 10.0
+    totalEstPixels = numpy.asarray( membership.dot( numpy.sum( data[0], axis=0 )), float ).ravel() * 10.0
+    studentT = numpy.asarray( [ studentTValues( max( int( n ) - 1, 1 )) for n in sampleBlks ], float )
+    studentT[ sampleBlks < 2 ] = -9999.99
+
+    start = time.time()
+    loopStat = numpy.zeros(( numDomains, numIntervals, TrendsNames.numConversions,
+                             TrendsNames.numStatisticsNames ), float)
+    for ptr in range( numDomains ):
+        for interval in range( numIntervals ):
+            loopStat[ ptr, interval ] = statsKernel( data[ interval ][ :, domains[ ptr ]], totalBlks[ ptr ],
+                                                     int( sampleBlks[ ptr ]), totalEstPixels[ ptr ], studentT[ ptr ] )
+    loopTime = time.time() - start
+
+    start = time.time()
+    domainStat = domainStats( membership, data, totalBlks, totalEstPixels, studentT )
+    domainTime = time.time() - start
+
+    print "Largest relative difference: %g" % numpy.max( numpy.abs( loopStat - domainStat ) /
+                                                         numpy.maximum( numpy.abs( loopStat ), 1.0 ))
+    print "%d boundaries x %d intervals   per boundary: %.3f s   engine: %.3f s   speedup: %.1fx" % \
+          ( numDomains, numIntervals, loopTime, domainTime, loopTime / domainTime )
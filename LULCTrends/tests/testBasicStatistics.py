@@ -0,0 +1,108 @@
+# File testBasicStatistics.py
+#
+# Checks the ecoregion statistics kernel (basicStatistics.statsKernel) against
+#  the original row by row calculation, which took the sample variance from
+#  R's var.  The R baseline runs only when rpy2 is installed; the stored
+#  values below are R's output for small arrays and are always checked.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import unittest
+import numpy
+from LULCTrends.trendutil import TrendsNames
+from LULCTrends.analysis import basicStatistics
+
+try:
+    import rpy2.robjects as robjects
+except ImportError:
+    robjects = None
+
+class testEco:
+    statName = TrendsNames.statisticsNames
+    totalBlks = 20
+    sampleBlks = 4
+    totalEstPixels = 100.0
+    studentT = [1.5, 1.7, 2.0, 2.8]
+
+def baselineStats( eco, numRow, data, stat ):
+    #The row by row calculation as released, with the sample variance from R
+    r_var = robjects.r['var']
+    for row in range( numRow ):
+        if eco.sampleBlks > 1:
+            stat[row, eco.statName.index('Mean')] = numpy.mean( data[ row, : ])
+            stat[row, eco.statName.index('S_Squared')] = r_var( robjects.FloatVector( data[ row, : ]))[0]
+        else:
+            stat[row, eco.statName.index('Mean')] = data[ row, : ]
+            stat[row, eco.statName.index('S_Squared')] = 0.0
+    stat[:, eco.statName.index('EstChange')] = stat[ :, eco.statName.index('Mean') ] * eco.totalBlks
+    sumChgColumn = eco.totalEstPixels
+    if sumChgColumn > 0.0:
+        stat[:,eco.statName.index('ChgPercent')] = ( stat[:,eco.statName.index('EstChange')] / sumChgColumn ) * 100.0
+    stat[:,eco.statName.index('EstVar')] = \
+        ((eco.totalBlks**2)*(1.0 - float(eco.sampleBlks)/float(eco.totalBlks))*stat[:,eco.statName.index('S_Squared')])/float(eco.sampleBlks)
+    stat[:, eco.statName.index('StdError')] = numpy.sqrt( stat[:, eco.statName.index('EstVar')] )
+    if sumChgColumn > 0.0:
+        stat[:,eco.statName.index('PerStdErr')] = ( stat[:,eco.statName.index('StdError')] / sumChgColumn ) * 100.0
+    for row in range( numRow ):
+        if stat[row, eco.statName.index('ChgPercent')] != 0.0:
+            stat[row,eco.statName.index('RelError')] = (stat[row,eco.statName.index('PerStdErr')] / stat[row,eco.statName.index('ChgPercent')]) * 100.0
+    for ptr, level in enumerate( ('85','90','95','99') ):
+        stat[:,eco.statName.index('Lo'+level+'Conf')] = stat[:,eco.statName.index('ChgPercent')] - (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[ptr])
+        stat[:,eco.statName.index('Hi'+level+'Conf')] = stat[:,eco.statName.index('ChgPercent')] + (stat[:,eco.statName.index('PerStdErr')] * eco.studentT[ptr])
+
+def sampleData( eco ):
+    #Conversion counts shaped like an ecoregion's, with unused conversions
+    data = numpy.random.RandomState( 0 ).poisson( 500, ( TrendsNames.numConversions, eco.sampleBlks )).astype( float )
+    data[ 5:60, : ] = 0.0
+    return data
+
+class statsKernelTest( unittest.TestCase ):
+
+    def column( self, stat, name ):
+        return stat[ :, TrendsNames.statisticsNames.index( name ) ]
+
+    def testStoredROutput( self ):
+        #var(c(1,2,3,4)) = 1.666667, var(c(0,0,0,6)) = 9 and var(c(5,5,5,5)) = 0 in R
+        eco = testEco()
+        data = numpy.array([[1,2,3,4],[0,0,0,6],[5,5,5,5]], float )
+        stat = basicStatistics.statsKernel( data, eco.totalBlks, eco.sampleBlks, eco.totalEstPixels, eco.studentT )
+        self.assertTrue( numpy.allclose( self.column( stat, 'S_Squared' ), [ 5.0/3.0, 9.0, 0.0 ] ))
+        self.assertTrue( numpy.allclose( self.column( stat, 'EstChange' ), [ 50.0, 30.0, 100.0 ] ))
+        #((N^2)*(1-n/N)*s_squared)/n = 80 * s_squared
+        self.assertTrue( numpy.allclose( self.column( stat, 'EstVar' ), [ 400.0/3.0, 720.0, 0.0 ] ))
+        self.assertTrue( numpy.allclose( self.column( stat, 'RelError' ),
+                                         [ numpy.sqrt( 400.0/3.0 ) / 50.0 * 100.0, numpy.sqrt( 720.0 ) / 30.0 * 100.0, 0.0 ] ))
+
+    def testSingleBlock( self ):
+        #One sample block: the mean is the block's value and there is no variance
+        stat = basicStatistics.statsKernel( numpy.array([[7.0],[0.0]]), 3, 1, 10.0, testEco.studentT )
+        self.assertTrue( numpy.allclose( self.column( stat, 'Mean' ), [ 7.0, 0.0 ] ))
+        self.assertTrue( numpy.allclose( self.column( stat, 'S_Squared' ), [ 0.0, 0.0 ] ))
+
+    def testNoPixels( self ):
+        #The percent columns stay 0.0 when there are no estimated pixels
+        stat = basicStatistics.statsKernel( numpy.array([[1.0, 3.0]]), 10, 2, 0.0, testEco.studentT )
+        self.assertEqual( self.column( stat, 'ChgPercent' )[0], 0.0 )
+        self.assertEqual( self.column( stat, 'RelError' )[0], 0.0 )
+
+    def testRBaseline( self ):
+        if robjects is None:
+            return      #rpy2 is not installed
+        eco = testEco()
+        eco.totalBlks = 458
+        eco.sampleBlks = 40
+        data = sampleData( eco )
+        eco.totalEstPixels = numpy.sum( data ) * ( float( eco.totalBlks ) / float( eco.sampleBlks ))
+        expected = numpy.zeros(( TrendsNames.numConversions, TrendsNames.numStatisticsNames ), float )
+        baselineStats( eco, TrendsNames.numConversions, data, expected )
+        stat = numpy.zeros(( TrendsNames.numConversions, TrendsNames.numStatisticsNames ), float )
+        basicStatistics.dataStats( eco, TrendsNames.numConversions, data, stat )
+        self.assertTrue( numpy.allclose( stat, expected, rtol=1e-12, atol=1e-9 ))
+
+if __name__ == '__main__':
+    unittest.main()
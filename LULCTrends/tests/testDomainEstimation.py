@@ -0,0 +1,113 @@
+# File testDomainEstimation.py
+#
+# Checks the statistics of many custom boundaries at once (analysis.
+#  DomainEstimation) against the ecoregion statistics kernel run on each
+#  boundary's blocks by themselves, as EcoStats does for a single boundary.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import unittest
+import numpy
+from LULCTrends.trendutil import TrendsNames, TrendsUtilities
+from LULCTrends.trendutil.StudentT import studentTValues
+from LULCTrends.analysis import DomainEstimation
+from LULCTrends.analysis.basicStatistics import statsKernel
+from LULCTrends.analysis.IntervalCube import intervalCube
+
+intervals = [ '1973to1980', '1980to1986', '1986to1992' ]
+blocks = [ 3, 7, 12, 20, 31, 44, 58 ]
+
+class sharedEco:
+    #The loaded blocks of an ecoregion, as BlockStore keeps them
+    def __init__( self ):
+        self.ecoNum = 9
+        self.blocks = blocks
+        self.column = dict( zip( blocks, range( len( blocks ))))
+        self.ecoData = intervalCube( intervals, TrendsNames.numConversions, len( blocks ),
+                                     TrendsNames.numStatisticsNames )
+        random = numpy.random.RandomState( 3 )
+        for interval in intervals:
+            data = random.poisson( 800, ( TrendsNames.numConversions, len( blocks )))
+            data[ 5:60, : ] = 0
+            self.ecoData[ interval ][0][:] = data
+
+#Three boundaries: several blocks, one block, and all of them
+domains = { 'east': [ 7, 20, 44 ], 'north': [ 58 ], 'whole': blocks }
+totalBlocks = { 'east': 30, 'north': 4, 'whole': 70 }
+
+class domainEngineTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.eco = sharedEco()
+        self.engine = DomainEstimation.domainEngine( self.eco, domains, totalBlocks )
+
+    def boundaryStats( self, name, interval ):
+        #statsKernel on the boundary's own columns, with its total estimated pixels
+        # from the first interval
+        columns = [ self.eco.column[ block ] for block in domains[ name ]]
+        sampleBlks = len( columns )
+        first = TrendsUtilities.getFirstInterval( self.eco )
+        totalEstPixels = numpy.sum( self.eco.ecoData[ first ][0][:, columns] ) * \
+                         ( float( totalBlocks[ name ] ) / sampleBlks )
+        if sampleBlks > 1:
+            studentT = studentTValues( sampleBlks - 1 )
+        else:
+            studentT = [ -9999.99 ] * 4
+        return statsKernel( self.eco.ecoData[ interval ][0][:, columns], totalBlocks[ name ], sampleBlks,
+                            totalEstPixels, studentT )
+
+    def testMatchesKernel( self ):
+        names, stats = self.engine.estimateCube( self.eco.ecoData )
+        self.assertEqual( names, intervals )
+        self.assertEqual( self.engine.names, sorted( domains ))
+        self.assertEqual( stats.shape, ( len( domains ), len( intervals ), TrendsNames.numConversions,
+                                         TrendsNames.numStatisticsNames ))
+        for ( ptr, name ) in enumerate( self.engine.names ):
+            for ( position, interval ) in enumerate( intervals ):
+                self.assertTrue( numpy.allclose( stats[ ptr, position ], self.boundaryStats( name, interval ),
+                                                 rtol=1e-10, atol=1e-8 ))
+
+    def testSingleBlock( self ):
+        #One block has no variance and no t values, as a custom ecoregion with n = 1
+        ptr = self.engine.names.index( 'north' )
+        self.assertEqual( list( self.engine.studentT[ ptr ] ), [ -9999.99 ] * 4 )
+        stats = self.engine.estimate( self.eco.ecoData[ intervals[0] ][0] )
+        self.assertTrue( numpy.all( stats[ ptr, :, TrendsNames.statisticsNames.index( 'S_Squared' )] == 0.0 ))
+
+    def testMoments( self ):
+        sampleBlks, mean, sSquared = DomainEstimation.domainMoments( self.engine.membership,
+                                                                     self.eco.ecoData[ intervals[1] ][0] )
+        columns = [ self.eco.column[ block ] for block in domains[ 'east' ]]
+        data = self.eco.ecoData[ intervals[1] ][0][:, columns].astype( float )
+        ptr = self.engine.names.index( 'east' )
+        self.assertEqual( sampleBlks[ ptr ], 3 )
+        self.assertTrue( numpy.allclose( mean[ ptr ], numpy.mean( data, axis=1 )))
+        self.assertTrue( numpy.allclose( sSquared[ ptr ], numpy.var( data, axis=1, ddof=1 )))
+
+    def testBlockMembership( self ):
+        #The sparse products match the dense matrix, with a domain of no blocks
+        membership = DomainEstimation.blockMembership( [ 1, 4, 0, 2, 4 ], [ 2, 0, 3 ], 6 )
+        dense = membership.toarray()
+        self.assertEqual( dense.tolist(), [ [ 0, 1, 0, 0, 1, 0 ], [ 0 ] * 6, [ 1, 0, 1, 0, 1, 0 ] ] )
+        values = numpy.random.RandomState( 1 ).rand( 6, 4 )
+        self.assertTrue( numpy.allclose( membership.dot( values ), numpy.dot( dense, values )))
+        self.assertTrue( numpy.allclose( membership.dot( values[:, 0] ), numpy.dot( dense, values[:, 0] )))
+        self.assertEqual( list( membership.sum( axis=1 )), [ 2.0, 0.0, 3.0 ] )
+
+    def testMissingBlock( self ):
+        self.assertRaises( TrendsUtilities.TrendsErrors, DomainEstimation.membershipMatrix,
+                           [ [ 3, 99 ] ], self.eco.column )
+
+    def testInvalidTotal( self ):
+        totals = dict( totalBlocks )
+        totals['east'] = 0
+        self.assertRaises( TrendsUtilities.TrendsErrors, DomainEstimation.domainEngine,
+                           self.eco, domains, totals )
+
+if __name__ == '__main__':
+    unittest.main()
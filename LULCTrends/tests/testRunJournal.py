@@ -0,0 +1,71 @@
+# File testRunJournal.py
+#
+# Checks that a run journal (trendutil.RunJournal) picks a failed run up
+#  again, including after a record cut off in the middle of its write, and
+#  that changed settings start a new journal.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, shutil, tempfile
+import unittest
+from LULCTrends.trendutil import RunJournal
+
+settings = { 'states': [ 'Utah', 'Iowa' ], 'resolution': '60m' }
+ecos = { 3: ( 10, 4, '60m', 'Partial stratified' ), 7: ( 25, 2, '60m', 'Full stratified' ) }
+strats = { 3: [ 1, 2, 3, 4 ], 7: [ 11, 12 ] }
+splits = { 3: [], 7: [] }
+
+class runJournalTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown( self ):
+        shutil.rmtree( self.folder )
+
+    def failedRun( self ):
+        #A run that stored one state and was cut off writing the next record
+        journal = RunJournal.runJournal( self.folder, "startAllStates", settings )
+        journal.markDone( 'usa_Utah', "access", RunJournal.saveBlocks( ecos, strats, splits ))
+        journal.markDone( 'usa_Utah', "statistics", { 'analysisNum': 12 } )
+        journal.journal.write( '{"boundary": "usa_Iowa", "sta' )
+        journal.close()
+
+    def testResumeAfterTruncatedLine( self ):
+        self.failedRun()
+        journal = RunJournal.runJournal( self.folder, "startAllStates", settings )
+        self.assertTrue( journal.resumed )
+        self.assertTrue( journal.isDone( 'usa_Utah', "statistics" ))
+        self.assertFalse( journal.isDone( 'usa_Iowa', "access" ))
+        self.assertEqual( journal.getInfo( 'usa_Utah', "statistics" ), { 'analysisNum': 12 } )
+        self.assertEqual( RunJournal.restoreBlocks( journal.getInfo( 'usa_Utah', "access" )),
+                          ( ecos, strats, splits ))
+
+        #Records written after the cut off line are read by the next rerun
+        journal.markDone( 'usa_Iowa', "access", RunJournal.saveBlocks( {}, {}, {} ))
+        journal.close()
+        journal = RunJournal.runJournal( self.folder, "startAllStates", settings )
+        self.assertTrue( journal.isDone( 'usa_Iowa', "access" ))
+        self.assertTrue( journal.isDone( 'usa_Utah', "statistics" ))
+        journal.close( complete = True )
+        self.assertEqual( os.listdir( self.folder ), [] )
+
+    def testChangedSettings( self ):
+        self.failedRun()
+        changed = dict( settings )
+        changed['resolution'] = '250m'
+        journal = RunJournal.runJournal( self.folder, "startAllStates", changed )
+        self.assertFalse( journal.resumed )
+        self.assertFalse( journal.isDone( 'usa_Utah', "statistics" ))
+        journal.close()
+        self.assertEqual( sorted( os.listdir( self.folder )),
+                          sorted([ os.path.basename( journal.filename ),
+                                   os.path.basename( journal.filename ) + ".old" ]))
+
+if __name__ == '__main__':
+    unittest.main()
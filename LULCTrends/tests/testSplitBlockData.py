@@ -0,0 +1,110 @@
+# File testSplitBlockData.py
+#
+# Checks how the split block clipping (analysis.SplitBlockData) opens the
+#  study region boundary.  Boundaries OGR can't open, such as the in_memory
+#  selections of the batch tools, are copied to a temporary shapefile
+#  through the geoprocessor, and the copy is removed afterwards.  The
+#  rasterizing test runs only when GDAL is installed; the others stand in
+#  for OGR and the geoprocessor.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, shutil, tempfile
+import unittest
+from LULCTrends.trendutil import TrendsUtilities
+from LULCTrends.analysis import SplitBlockData
+
+class fakeOGR:
+    #Opens only files that exist, as OGR does, so in_memory paths fail
+    def Open( self, path ):
+        if os.path.isfile( path ):
+            return ( "source", path )
+        return None
+
+class copyingGP:
+    #Records the copies the geoprocessor is asked to make
+    def __init__( self ):
+        self.copies = []
+
+    def CopyFeatures_management( self, source, target ):
+        self.copies.append(( source, target ))
+        open( target, 'w' ).close()
+
+class openBoundaryTest( unittest.TestCase ):
+
+    def setUp( self ):
+        self.folder = tempfile.mkdtemp()
+        self.tempdir = tempfile.tempdir
+        tempfile.tempdir = self.folder
+        self.ogr = SplitBlockData.ogr
+
+    def tearDown( self ):
+        SplitBlockData.ogr = self.ogr
+        tempfile.tempdir = self.tempdir
+        shutil.rmtree( self.folder )
+
+    def testOGRBoundary( self ):
+        SplitBlockData.ogr = fakeOGR()
+        shapefile = os.path.join( self.folder, "state.shp" )
+        open( shapefile, 'w' ).close()
+        gp = copyingGP()
+        source, copyFolder = SplitBlockData.openBoundary( gp, shapefile )
+        self.assertEqual( source, ( "source", shapefile ))
+        self.assertEqual( copyFolder, None )
+        self.assertEqual( gp.copies, [] )
+
+    def testInMemoryBoundary( self ):
+        SplitBlockData.ogr = fakeOGR()
+        gp = copyingGP()
+        source, copyFolder = SplitBlockData.openBoundary( gp, 'in_memory\\usa_Utah' )
+        self.assertEqual( gp.copies, [ ( 'in_memory\\usa_Utah', os.path.join( copyFolder, "boundary.shp" )) ] )
+        self.assertEqual( source, ( "source", os.path.join( copyFolder, "boundary.shp" )))
+        SplitBlockData.closeBoundary( copyFolder )
+        self.assertFalse( os.path.exists( copyFolder ))
+
+    def testFailedCopy( self ):
+        #Without ArcGIS the copy fails, and no temporary folder is left behind
+        SplitBlockData.ogr = fakeOGR()
+        self.assertRaises( TrendsUtilities.TrendsErrors, SplitBlockData.openBoundary,
+                           TrendsUtilities.messageGP(), 'C:\\Trends\\custom.gdb\\boundary' )
+        self.assertEqual( os.listdir( self.folder ), [] )
+
+    def testRasterizeCopiedBoundary( self ):
+        #A square boundary copied from an in_memory path masks the pixels inside it
+        if SplitBlockData.gdal is None:
+            return
+        from osgeo import gdal, ogr, osr
+        original = os.path.join( self.folder, "square.shp" )
+        driver = ogr.GetDriverByName( 'ESRI Shapefile' )
+        source = driver.CreateDataSource( original )
+        reference = osr.SpatialReference()
+        reference.ImportFromEPSG( 5070 )
+        layer = source.CreateLayer( "square", reference, ogr.wkbPolygon )
+        feature = ogr.Feature( layer.GetLayerDefn() )
+        feature.SetGeometry( ogr.CreateGeometryFromWkt( "POLYGON ((0 0, 0 120, 120 120, 120 0, 0 0))" ))
+        layer.CreateFeature( feature )
+        feature = None
+        source = None
+
+        class shapefileGP:
+            def CopyFeatures_management( self, boundary, target ):
+                driver.CopyDataSource( ogr.Open( original ), target )
+
+        boundarySource, copyFolder = SplitBlockData.openBoundary( shapefileGP(), 'in_memory\\square' )
+        dataset = gdal.GetDriverByName( 'MEM' ).Create( '', 8, 8, 1, gdal.GDT_Byte )
+        dataset.SetGeoTransform(( 0.0, 30.0, 0.0, 240.0, 0.0, -30.0 ))
+        dataset.SetProjection( reference.ExportToWkt() )
+        mask = SplitBlockData.rasterizeBoundary( boundarySource.GetLayer( 0 ), dataset )
+        self.assertEqual( int( mask.sum() ), 16 )
+        self.assertTrue( mask[ 4:, :4 ].all() )
+        boundarySource = None
+        SplitBlockData.closeBoundary( copyFolder )
+        self.assertFalse( os.path.exists( copyFolder ))
+
+if __name__ == '__main__':
+    unittest.main()
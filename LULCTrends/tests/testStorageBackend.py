@@ -0,0 +1,115 @@
+# File testStorageBackend.py
+#
+# Round trips through the SQLite storage backends (database.StorageBackend),
+#  the table rows and the array blobs: inserts, upserts that keep the
+#  records they don't replace, updates of existing records only, and
+#  deletes, which must read back the same from both formats.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, shutil, tempfile
+import unittest
+import numpy
+from LULCTrends.database import StorageBackend, TrendsSchema
+
+def valueFields( table ):
+    fields = TrendsSchema.tableFields( table )
+    return [ name for ( name, fieldType, length ) in fields[ StorageBackend.indexEnd( fields ): ]]
+
+statsTable = "TrendsChangeStats"
+dataTable = "TrendsChangeData"
+statsKeys = { 'AnalysisNum': 5, 'EcoLevel3ID': 7, 'ChangePeriod': '1973to1980', 'Resolution': '60m' }
+otherKeys = { 'AnalysisNum': 5, 'EcoLevel3ID': 9, 'ChangePeriod': '1973to1980', 'Resolution': '60m' }
+
+class backendRoundTrip:
+    #The tests for one backend class, run for each format below
+
+    def setUp( self ):
+        self.folder = tempfile.mkdtemp()
+        self.store = self.backend( os.path.join( self.folder, "trends.sqlite" ), 2 )
+        self.random = numpy.random.RandomState( 0 )
+        self.statFields = valueFields( statsTable )
+        self.dataFields = valueFields( dataTable )
+
+    def tearDown( self ):
+        self.store.pool.closeAll()
+        shutil.rmtree( self.folder )
+
+    def statValues( self, count ):
+        return self.random.rand( count, len( self.statFields ))
+
+    def readStats( self, keyValues ):
+        return self.store.readRows( None, statsTable, keyValues, "Statistic", self.statFields, [ "Statistic" ] )
+
+    def testInsert( self ):
+        labels = [ 'EstChange', 'EstVar', 'Mean' ]
+        values = self.statValues( 3 )
+        other = self.statValues( 3 )
+        self.store.writeRows( None, statsTable, [ ( statsKeys, "Statistic", labels, values ),
+                                                  ( otherKeys, "Statistic", labels, other ) ], self.statFields )
+        readLabels, readValues = self.readStats( statsKeys )
+        self.assertEqual( readLabels, labels )
+        self.assertTrue( numpy.array_equal( readValues, values ))
+
+        #Both ecoregions in one read, and the data table's integer labels
+        keys, block = self.store.readBlock( None, statsTable, { 'AnalysisNum': 5, 'EcoLevel3ID': [ 7, 9 ] },
+                                            [ "EcoLevel3ID", "Statistic" ], self.statFields,
+                                            [ "EcoLevel3ID", "Statistic" ] )
+        self.assertEqual( list( keys[0] ), [ 7, 7, 7, 9, 9, 9 ] )
+        self.assertTrue( numpy.array_equal( block.T, numpy.concatenate(( values, other ))))
+
+        counts = self.random.randint( 0, 1000, ( 4, len( self.dataFields )))
+        self.store.writeRows( None, dataTable, [ ( statsKeys, "BlkLabel", [ 30, 4, 12, 8 ], counts ) ],
+                              self.dataFields )
+        blocks, readCounts = self.store.readRows( None, dataTable, statsKeys, "BlkLabel", self.dataFields,
+                                                  [ "BlkLabel" ] )
+        self.assertEqual( blocks, [ 4, 8, 12, 30 ] )
+        self.assertTrue( numpy.array_equal( readCounts, counts[[ 1, 3, 2, 0 ]] ))
+
+    def testUpsert( self ):
+        values = self.statValues( 3 )
+        self.store.writeRows( None, statsTable, [ ( statsKeys, "Statistic", [ 'EstChange', 'EstVar', 'Mean' ], values ) ],
+                              self.statFields )
+        newValues = self.statValues( 2 )
+        self.store.writeRows( None, statsTable, [ ( statsKeys, "Statistic", [ 'EstVar', 'StdError' ], newValues ) ],
+                              self.statFields, update = True )
+        readLabels, readValues = self.readStats( statsKeys )
+        self.assertEqual( readLabels, [ 'EstChange', 'EstVar', 'Mean', 'StdError' ] )
+        self.assertTrue( numpy.array_equal( readValues, numpy.array([ values[0], newValues[0], values[2], newValues[1] ])))
+
+    def testUpdate( self ):
+        values = self.statValues( 2 )
+        self.store.writeRows( None, statsTable, [ ( statsKeys, "Statistic", [ 'EstChange', 'Mean' ], values ) ],
+                              self.statFields )
+        #Only the records already stored are rewritten
+        newValues = self.statValues( 2 )
+        updated = self.store.updateRows( None, statsTable, statsKeys, "Statistic", [ 'Mean', 'EstVar' ],
+                                         newValues, self.statFields )
+        self.assertEqual( updated, 1 )
+        readLabels, readValues = self.readStats( statsKeys )
+        self.assertEqual( readLabels, [ 'EstChange', 'Mean' ] )
+        self.assertTrue( numpy.array_equal( readValues, numpy.array([ values[0], newValues[0] ])))
+        self.assertEqual( self.store.updateRows( None, statsTable, otherKeys, "Statistic", [ 'Mean' ],
+                                                 newValues[ :1 ], self.statFields ), 0 )
+
+    def testDeleteAnalysis( self ):
+        self.store.writeRows( None, statsTable, [ ( statsKeys, "Statistic", [ 'Mean' ], self.statValues( 1 )) ],
+                              self.statFields )
+        self.assertTrue( self.store.deleteAnalysis( None, statsTable, 5 ) > 0 )
+        readLabels, readValues = self.readStats( statsKeys )
+        self.assertEqual( readLabels, [] )
+        self.assertEqual( readValues.shape, ( 0, len( self.statFields )))
+
+class rowsTest( backendRoundTrip, unittest.TestCase ):
+    backend = StorageBackend.sqliteBackend
+
+class blobsTest( backendRoundTrip, unittest.TestCase ):
+    backend = StorageBackend.blobBackend
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# File testStudentT.py
+#
+# Checks the Student's t and normal distributions (trendutil.StudentT)
+#  against R's qt, pt and pnorm, i.e. the values of a t table to six places.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import unittest
+from LULCTrends.trendutil import StudentT
+
+#qt( c(.925, .95, .975, .995), df ) in R, format = { df: [ t values ], ...}
+tTable = { 1: [ 4.165300, 6.313752, 12.706205, 63.656741 ],
+           5: [ 1.699363, 2.015048, 2.570582, 4.032143 ],
+           10: [ 1.559236, 1.812461, 2.228139, 3.169273 ],
+           30: [ 1.477365, 1.697261, 2.042272, 2.749996 ],
+           120: [ 1.448806, 1.657651, 1.979930, 2.617421 ] }
+
+class studentTTest( unittest.TestCase ):
+
+    def testStudentTValues( self ):
+        for df in tTable:
+            values = StudentT.studentTValues( df )
+            self.assertEqual( len( values ), 4 )
+            for ( value, expected ) in zip( values, tTable[ df ] ):
+                self.assertAlmostEqual( value, expected, 5 )
+
+    def testQuantileSymmetry( self ):
+        #qt( 1 - p, df ) = -qt( p, df )
+        for df in tTable:
+            self.assertAlmostEqual( StudentT.tQuantile( .025, df ), -tTable[ df ][2], 5 )
+
+    def testDistribution( self ):
+        #pt( -2.5, 4 ), pt( 1, 12 ) and pt( -.3, 1 ) in R
+        self.assertAlmostEqual( StudentT.tDistribution( -2.5, 4 ), 0.03338327, 7 )
+        self.assertAlmostEqual( StudentT.tDistribution( 1.0, 12 ), 0.83147547, 7 )
+        self.assertAlmostEqual( StudentT.tDistribution( -0.3, 1 ), 0.40722642, 7 )
+        for df in tTable:
+            self.assertAlmostEqual( StudentT.tDistribution( tTable[ df ][3], df ), .995, 6 )
+
+    def testNormalDistribution( self ):
+        #pnorm( 1.96 ) and pnorm( -3 ) in R
+        self.assertAlmostEqual( StudentT.normalDistribution( 1.96 ), 0.97500210, 7 )
+        self.assertAlmostEqual( StudentT.normalDistribution( -3.0 ), 0.00134990, 7 )
+
+    def testFilledTable( self ):
+        #Every level of each degree of freedom is memoized with its table value
+        StudentT.quantileCache.clear()
+        StudentT.fillStudentTTable( 12 )
+        self.assertEqual( len( StudentT.quantileCache ), 12 * len( StudentT.confidenceLevels ))
+        for df in ( 1, 5, 10 ):
+            for ( p, expected ) in zip( StudentT.confidenceLevels, tTable[ df ] ):
+                self.assertAlmostEqual( StudentT.quantileCache[( p, df )], expected, 5 )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+# File testStudentWilcoxon.py
+#
+# Checks the trend tests of the workbooks (xcel.student_wilcoxon) against
+#  R's t.test and wilcox.test p-values.  The paired example is the one in
+#  R's wilcox.test help page, where V = 40 and the one-sided p-value is
+#  0.01953; the tied and large samples use the normal approximation with
+#  continuity correction, as wilcox.test does for them.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import unittest
+import numpy
+from LULCTrends.trendutil import TrendsUtilities
+from LULCTrends.xcel import student_wilcoxon
+
+#x - y of the wilcox.test help page example
+pairedX = [ 1.83, 0.50, 1.62, 2.48, 1.68, 1.88, 1.55, 3.06, 1.30 ]
+pairedY = [ 0.878, 0.647, 0.598, 2.05, 1.06, 1.29, 1.06, 3.14, 1.29 ]
+differences = numpy.array( pairedX ) - numpy.array( pairedY )
+
+#Slopes with tied ranks, and 60 slopes, both past the exact distribution
+tiedSlopes = numpy.array([ 1.5, -0.5, 2.0, 2.0, -1.0, 3.0, 0.5, 1.5, -2.0, 2.5, 1.0, 1.5 ])
+manySlopes = numpy.arange( 1, 61 ) * 0.1 * numpy.where( numpy.arange( 60 ) % 3 == 0, -1, 1 )
+
+years = [ 1973, 1980, 1986, 1992, 2000 ]
+
+class trendTestsTest( unittest.TestCase ):
+
+    def testExactWilcoxon( self ):
+        #wilcox.test( x, y, paired = TRUE ): V = 40, p-value = 0.03906
+        self.assertAlmostEqual( student_wilcoxon.wilcoxonTest( differences ), 0.0390625, 10 )
+
+    def testTiedWilcoxon( self ):
+        #wilcox.test( tied ): V = 64, p-value = 0.05368 with a warning about ties
+        self.assertAlmostEqual( student_wilcoxon.wilcoxonTest( tiedSlopes ), 0.05368456, 7 )
+
+    def testLargeWilcoxon( self ):
+        #wilcox.test( many ): V = 1240, p-value = 0.0169
+        self.assertAlmostEqual( student_wilcoxon.wilcoxonTest( manySlopes ), 0.01690165, 7 )
+
+    def testTrendTests( self ):
+        #Blocks that change by the paired differences each year have those slopes.
+        # The second type has no change, so neither test can be run on it.
+        data = numpy.zeros(( 2, len( years ), len( differences )), float )
+        data[0] = numpy.outer( years, differences )
+        slopes_mean, nonzeroCount, p_student, p_wilcox = \
+                     student_wilcoxon.trendTests( TrendsUtilities.getGP(), data, years )
+        self.assertAlmostEqual( slopes_mean[0], numpy.mean( differences ), 10 )
+        #t.test( x, y, paired = TRUE ): t = 3.0354, df = 8, p-value = 0.01618
+        self.assertAlmostEqual( p_student[0], 0.01617663, 7 )
+        self.assertAlmostEqual( p_wilcox[0], 0.0390625, 10 )
+        self.assertEqual( list( nonzeroCount ), [ len( differences ), 0 ] )
+        self.assertEqual( p_student[1], student_wilcoxon.noTestValue )
+        self.assertEqual( p_wilcox[1], student_wilcoxon.noTestValue )
+
+    def testSingleArray( self ):
+        #t.test( many ): t = 2.4945, df = 59, p-value = 0.01543
+        data = numpy.outer( years, manySlopes )
+        slopeMean, pairs, p_student, p_wilcox = \
+                   student_wilcoxon.studentWilcoxon( TrendsUtilities.getGP(), data, years )
+        self.assertEqual( pairs, 60 )
+        self.assertAlmostEqual( p_student, 0.01543474, 7 )
+        self.assertAlmostEqual( p_wilcox, 0.01690165, 7 )
+
+if __name__ == '__main__':
+    unittest.main()
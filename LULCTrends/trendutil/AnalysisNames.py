@@ -11,8 +11,9 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
-import arcgisscripting, os, sys, traceback
-from . import TrendsNames, TrendsUtilities
+import os, sys, traceback
+from . import TrendsNames, TrendsUtilities, deleteAnalysisName
+from ..database import StorageBackend
 
 def updateAnalysisNames( gp, name ):
     try:
@@ -25,30 +26,17 @@ def updateAnalysisNames( gp, name ):
         #Table is initialized with Trends number = 1
         if name == TrendsNames.name:
             raise TrendsUtilities.JustExit()
-        inUse = []
-        rows = gp.SearchCursor( sourceTable )
-        row = rows.Next()
-        while row:
-            inUse.append( row.AnalysisNum )
-            row = rows.Next()
+        store = StorageBackend.getBackend()
+        inUse = [ row[0] for row in store.selectRows( gp, sourceTable, {}, [ "AnalysisNum" ] )]
 
         inUse.sort()
         validNum = inUse[-1] + 1
-        del row, rows
 
-        tableLoc = TrendsNames.dbLocation + "AnalysisNames"
-        where_clause = "AnalysisName = \'" + name.upper() + "\'"
-        rows = gp.SearchCursor( tableLoc, where_clause )
-        row = rows.Next()
-        if row is None:
-            rows = gp.InsertCursor( tableLoc )
-            row = rows.NewRow()
-            row.AnalysisName = name.upper()
-            row.AnalysisNum = validNum
-            rows.InsertRow( row )
+        if not store.selectRows( gp, sourceTable, { 'AnalysisName': name.upper() }, [ "AnalysisNum" ] ):
+            store.insertRecords( gp, sourceTable, [ { 'AnalysisName': name.upper(), 'AnalysisNum': validNum } ] )
             gp.AddMessage("Analysis name: " + name + " added to AnalysisNames table in database")
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddError(msgs)
@@ -61,28 +49,21 @@ def updateAnalysisNames( gp, name ):
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         gp.AddError(pymsg)
         raise
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
 
 def getAnalysisNum( gp, name ):
     try:
         gp.OverWriteOutput = True
 
         tableLoc = TrendsNames.dbLocation + "AnalysisNames"
-        where_clause = "AnalysisName = \'" + name.upper() + "\'"
-
-        rows = gp.SearchCursor( tableLoc, where_clause )
-        row = rows.Next()
-        if row is None:
+        rows = StorageBackend.getBackend().selectRows( gp, tableLoc, { 'AnalysisName': name.upper() },
+                                                       [ "AnalysisNum" ] )
+        if not rows:
             analysisNum = None
         else:            
-            analysisNum = row.AnalysisNum
+            analysisNum = rows[0][0]
         return analysisNum
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddError(msgs)
@@ -93,27 +74,17 @@ def getAnalysisNum( gp, name ):
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         gp.AddError(pymsg)
         raise
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
 
 def isInAnalysisNames( gp, name ):
     try:
         gp.OverWriteOutput = True
 
         tableLoc = TrendsNames.dbLocation + "AnalysisNames"
-        where_clause = "AnalysisName = \'" + name.upper() + "\'"
-        rows = gp.SearchCursor( tableLoc, where_clause )
-        row = rows.Next()
-        if row is None:
-            result = False
-        else:
-            result = True
-        return result
+        rows = StorageBackend.getBackend().selectRows( gp, tableLoc, { 'AnalysisName': name.upper() },
+                                                       [ "AnalysisNum" ] )
+        return len( rows ) > 0
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddError(msgs)
@@ -124,10 +95,12 @@ def isInAnalysisNames( gp, name ):
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         gp.AddError(pymsg)
         raise
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
     
 
+def resetAnalysisName( gp, name ):
+    #Clear out any results stored under the name, register it again,
+    # and return its analysis number
+    if isInAnalysisNames( gp, name ):
+        deleteAnalysisName.deleteAnalysisName( name )
+    updateAnalysisNames( gp, name )
+    return getAnalysisNum( gp, name )
@@ -0,0 +1,130 @@
+# File RunJournal.py
+#
+# Checkpoint journal for the tools that run many boundaries or summaries
+#
+# Each completed stage of a boundary (e.g. "access", "statistics", "workbook",
+#  "cleanup") is appended to a JSON-lines file in the output folder and
+#  flushed to disk right away, along with anything needed to pick the
+#  boundary up again, such as its analysis number and sample blocks.  When
+#  the tool is rerun with the same settings after a failure, the journal is
+#  read back so the completed stages are skipped and only the failed stage
+#  onward is run.  "cleanup" is the last stage of a boundary, recorded once
+#  whatever the tool removes for it (its in_memory selection, or its results
+#  when they are not kept) is gone.  A journal written with different
+#  settings is set aside (renamed .old) and a new one started.  Once a run
+#  completes, the journal is removed.
+#
+#       journal = runJournal( outFolder, "startAllStates", settings )
+#       if not journal.isDone( name, "statistics" ): ...
+#       journal.markDone( name, "statistics", { 'analysisNum': 12 } )
+#       journal.getInfo( name, "access" ) - the info stored with the stage
+#       journal.close( complete = True )
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, sys, traceback
+import json
+from . import TrendsNames, TrendsUtilities
+
+class runJournal:
+
+    def __init__( self, folder, toolName, settings ):
+        try:
+            trlog = TrendsUtilities.trLogger()
+            self.filename = os.path.join( folder, toolName + TrendsNames.journalSuffix )
+            #Completed stages, format = { boundary: { stage: info, ...}, ...}
+            self.done = {}
+            #Compare the settings as they come back from the file
+            settings = json.loads( json.dumps( settings ))
+
+            if os.path.isfile( self.filename ):
+                records = self.readRecords()
+                if records and records[0].get( 'settings' ) == settings:
+                    for record in records[1:]:
+                        self.done.setdefault( record['boundary'], {} )[ record['stage'] ] = record.get( 'info', {} )
+                else:
+                    trlog.trwrite("Journal settings changed, starting a new journal: " + self.filename)
+                    if os.path.isfile( self.filename + ".old" ):
+                        os.remove( self.filename + ".old" )
+                    os.rename( self.filename, self.filename + ".old" )
+
+            #A journal with completed stages means this run picks up a failed one
+            self.resumed = len( self.done ) > 0
+            if self.resumed:
+                trlog.trwrite("Resuming from journal " + self.filename + " with " + \
+                              str(len( self.done )) + " boundaries started")
+                self.journal = open( self.filename, 'a+' )
+                #End a line cut off by the failure, so the next record starts on its own line
+                self.journal.seek( -1, 2 )
+                if self.journal.read( 1 ) != "\n":
+                    self.journal.write( "\n" )
+            else:
+                self.journal = open( self.filename, 'w' )
+                self.writeRecord( { 'settings': settings } )
+
+        except Exception:
+            tb = sys.exc_info()[2]
+            tbinfo = traceback.format_tb(tb)[0]
+            pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+            trlog.trwrite(pymsg)
+            raise
+
+    def readRecords( self ):
+        #A line cut off by a failure during the write is skipped
+        records = []
+        journal = open( self.filename, 'r' )
+        try:
+            for line in journal:
+                try:
+                    records.append( json.loads( line ))
+                except ValueError:
+                    pass
+        finally:
+            journal.close()
+        return records
+
+    def writeRecord( self, record ):
+        #Each record is on disk before the next stage starts
+        self.journal.write( json.dumps( record ) + "\n" )
+        self.journal.flush()
+        os.fsync( self.journal.fileno() )
+
+    def isDone( self, boundary, stage ):
+        return stage in self.done.get( boundary, {} )
+
+    def getInfo( self, boundary, stage ):
+        return self.done[ boundary ][ stage ]
+
+    def markDone( self, boundary, stage, info = None ):
+        if info is None:
+            info = {}
+        self.writeRecord( { 'boundary': boundary, 'stage': stage, 'info': info } )
+        self.done.setdefault( boundary, {} )[ stage ] = json.loads( json.dumps( info ))
+
+    def close( self, complete = False ):
+        #Only a complete run removes the journal
+        self.journal.close()
+        if complete and os.path.isfile( self.filename ):
+            os.remove( self.filename )
+
+def saveBlocks( ecos, strats, splits ):
+    #The access results of a boundary in a form the journal can hold;
+    # JSON only has string keys, so the dictionaries become lists
+    return { 'ecos': [ [ region ] + list( ecos[ region ] ) for region in sorted( ecos ) ],
+             'strats': [ [ region, strats[ region ] ] for region in sorted( strats ) ],
+             'splits': [ [ region, splits[ region ] ] for region in sorted( splits ) ] }
+
+def restoreBlocks( info ):
+    #The ecos, strats and splits dictionaries saved by saveBlocks
+    ecos = {}
+    for entry in info['ecos']:
+        total, sample, res, runType = entry[1:]
+        ecos[ entry[0] ] = ( total, sample, str( res ), str( runType ))
+    strats = dict( [ ( region, blocks ) for ( region, blocks ) in info['strats'] ] )
+    splits = dict( [ ( region, blocks ) for ( region, blocks ) in info['splits'] ] )
+    return ecos, strats, splits
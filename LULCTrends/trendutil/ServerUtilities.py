@@ -12,16 +12,17 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
-import arcgisscripting, os, traceback
+import os, traceback
 import time, smtplib
 
 from email.MIMEMultipart import MIMEMultipart
 from email.MIMEText import MIMEText
 from email.Utils import formatdate
+from . import TrendsUtilities
 
 #output directory for tool results
 server_results_path = r"\\REMOVED\Trendsresults"  #server location removed
-gp = arcgisscripting.create(9.3)
+gp = TrendsUtilities.getGP()
 
 def send_mail(send_from, send_to, subject, text, server, smtpUser="", smtpPwd=""):
     try:
@@ -0,0 +1,200 @@
+# File StudentT.py
+#
+# Student's t and normal distributions without R
+#
+# tDistribution( t, df ) - cumulative probability P(T <= t)
+# tQuantile( p, df ) - the t value with P(T <= t) = p, matching R's qt( p, df )
+# studentTValues( df ) - the two-tailed 85, 90, 95 and 99% t values used for
+#       the confidence intervals, i.e. qt( [.925, .95, .975, .995], df )
+# normalDistribution( z ) - standard normal cumulative probability, R's pnorm( z )
+#
+# The distribution is evaluated through the regularized incomplete beta
+#  function (continued fraction), and quantiles are found with Newton steps
+#  kept inside a bisection bracket, which converges well past the 1e-6
+#  agreement needed with R.  Quantiles are memoized by (p, df), so batch
+#  runs that build many ecoregion objects with the same number of sample
+#  blocks only solve for each set of t values once per process.
+#  fillStudentTTable precomputes a range of degrees of freedom up front.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import math
+
+#One-tailed probabilities for the 85, 90, 95 and 99% two-tailed intervals
+confidenceLevels = (.925, .95, .975, .995)
+
+#Memoized quantiles, format = { (p, df): t, ...}
+quantileCache = {}
+
+#Lanczos approximation coefficients (g = 7) for the log gamma function,
+# since math.lgamma is not in every Python version ArcGIS ships with
+lanczosCoef = ( 0.99999999999980993, 676.5203681218851, -1259.1392167224028,
+                771.32342877765313, -176.61502916214059, 12.507343278686905,
+                -0.13857109526572012, 9.9843695780195716e-6, 1.5056327351493116e-7 )
+
+def logGamma( x ):
+    if x < 0.5:
+        #reflection formula
+        return math.log( math.pi / abs( math.sin( math.pi * x ))) - logGamma( 1.0 - x )
+    x -= 1.0
+    sum = lanczosCoef[0]
+    for ptr in range( 1, len( lanczosCoef )):
+        sum += lanczosCoef[ ptr ] / ( x + ptr )
+    t = x + 7.5
+    return 0.5 * math.log( 2.0 * math.pi ) + ( x + 0.5 ) * math.log( t ) - t + math.log( sum )
+
+def betaContinuedFraction( a, b, x ):
+    #Continued fraction for the incomplete beta function (modified Lentz)
+    tiny = 1.0e-300
+    qab = a + b
+    qap = a + 1.0
+    qam = a - 1.0
+    c = 1.0
+    d = 1.0 - qab * x / qap
+    if abs( d ) < tiny:
+        d = tiny
+    d = 1.0 / d
+    h = d
+    for m in range( 1, 1000 ):
+        m2 = 2 * m
+        aa = m * ( b - m ) * x / (( qam + m2 ) * ( a + m2 ))
+        d = 1.0 + aa * d
+        if abs( d ) < tiny:
+            d = tiny
+        c = 1.0 + aa / c
+        if abs( c ) < tiny:
+            c = tiny
+        d = 1.0 / d
+        h *= d * c
+        aa = -( a + m ) * ( qab + m ) * x / (( a + m2 ) * ( qap + m2 ))
+        d = 1.0 + aa * d
+        if abs( d ) < tiny:
+            d = tiny
+        c = 1.0 + aa / c
+        if abs( c ) < tiny:
+            c = tiny
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs( delta - 1.0 ) < 1.0e-15:
+            break
+    return h
+
+def incompleteBeta( a, b, x ):
+    #Regularized incomplete beta function I_x( a, b )
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    front = math.exp( logGamma( a + b ) - logGamma( a ) - logGamma( b ) +
+                      a * math.log( x ) + b * math.log( 1.0 - x ))
+    if x < ( a + 1.0 ) / ( a + b + 2.0 ):
+        return front * betaContinuedFraction( a, b, x ) / a
+    return 1.0 - front * betaContinuedFraction( b, a, 1.0 - x ) / b
+
+def tDistribution( t, df ):
+    #Cumulative probability P(T <= t) for df degrees of freedom
+    tail = 0.5 * incompleteBeta( 0.5 * df, 0.5, df / ( df + t * t ))
+    if t > 0.0:
+        return 1.0 - tail
+    return tail
+
+def incompleteGammaUpper( a, x ):
+    #Regularized upper incomplete gamma function Q( a, x ), by series below
+    # a + 1 and by continued fraction above
+    if x <= 0.0:
+        return 1.0
+    front = math.exp( -x + a * math.log( x ) - logGamma( a ))
+    if x < a + 1.0:
+        term = 1.0 / a
+        sum = term
+        ap = a
+        for n in range( 1000 ):
+            ap += 1.0
+            term *= x / ap
+            sum += term
+            if abs( term ) < abs( sum ) * 1.0e-16:
+                break
+        return 1.0 - front * sum
+    tiny = 1.0e-300
+    b = x + 1.0 - a
+    c = 1.0 / tiny
+    d = 1.0 / b
+    h = d
+    for n in range( 1, 1000 ):
+        an = -n * ( n - a )
+        b += 2.0
+        d = an * d + b
+        if abs( d ) < tiny:
+            d = tiny
+        c = b + an / c
+        if abs( c ) < tiny:
+            c = tiny
+        d = 1.0 / d
+        delta = d * c
+        h *= delta
+        if abs( delta - 1.0 ) < 1.0e-15:
+            break
+    return front * h
+
+def normalDistribution( z ):
+    #Standard normal P(Z <= z), through erfc( x ) = Q( 1/2, x^2 )
+    tail = 0.5 * incompleteGammaUpper( 0.5, 0.5 * z * z )
+    if z > 0.0:
+        return 1.0 - tail
+    return tail
+
+def tDensity( t, df ):
+    return math.exp( logGamma( 0.5 * ( df + 1.0 )) - logGamma( 0.5 * df ) -
+                     0.5 * math.log( df * math.pi ) - 0.5 * ( df + 1.0 ) * math.log( 1.0 + t * t / df ))
+
+def solveQuantile( p, df ):
+    #Bracket the quantile, then take Newton steps, falling back to
+    # bisection whenever a step would leave the bracket
+    if p < 0.5:
+        return -solveQuantile( 1.0 - p, df )
+    if p == 0.5:
+        return 0.0
+    low = 0.0
+    high = 1.0
+    while tDistribution( high, df ) < p:
+        low = high
+        high *= 2.0
+    t = 0.5 * ( low + high )
+    for iteration in range( 200 ):
+        diff = tDistribution( t, df ) - p
+        if diff > 0.0:
+            high = t
+        else:
+            low = t
+        step = diff / tDensity( t, df )
+        newT = t - step
+        if not ( low < newT < high ):
+            newT = 0.5 * ( low + high )
+        if abs( newT - t ) <= 1.0e-13 * max( 1.0, abs( newT )):
+            return newT
+        t = newT
+    return t
+
+def tQuantile( p, df ):
+    #Same as R's qt( p, df ) for 0 < p < 1 and df > 0
+    if not ( 0.0 < p < 1.0 ) or df <= 0:
+        raise ValueError( "Student t quantile needs 0 < p < 1 and df > 0" )
+    key = ( float( p ), float( df ))
+    if key not in quantileCache:
+        quantileCache[ key ] = solveQuantile( key[0], key[1] )
+    return quantileCache[ key ]
+
+def studentTValues( df ):
+    #t values for the 85, 90, 95 and 99% confidence intervals
+    return [ tQuantile( p, df ) for p in confidenceLevels ]
+
+def fillStudentTTable( maxDf = 1000 ):
+    #Precompute the confidence interval t values for df = 1..maxDf
+    for df in range( 1, maxDf + 1 ):
+        studentTValues( df )
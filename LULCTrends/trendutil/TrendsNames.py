@@ -21,6 +21,20 @@ dbName = "Database Connections/Connection to REMOVED_TrendsStats.sde/DEVELOP.dbo
 #Set the database location for the workstations to either DEVELOP (on XXXX) or ANALYSIS (on XXXX)
 dbLocation = "Database Connections/Connection to REMOVED_TrendsStats.sde/DEVELOP.dbo."
 
+#Storage for the data and statistics tables: "arcgis" for the database above
+# through geoprocessor cursors, or "sqlite" for a local SQLite database file,
+# e.g. on a worker without ArcGIS.  The SQLite tables are created on first use.
+dbBackend = "arcgis"
+sqliteDatabase = ""
+
+#How the SQLite database holds the tables: "rows" for the same tables and rows
+# as the database above, or "blobs" for one row of compressed arrays per
+# ecoregion, period, resolution, source and glgn type of each table
+sqliteFormat = "rows"
+
+#Number of open SQLite connections kept for reuse by the process
+sqlitePoolSize = 4
+
 #Point to template db for table creation.  Tables are then copied to db server.
 dbTemplate = "REMOVED/Trends/Database/TrendsTemplate.gdb/"
 
@@ -29,6 +43,44 @@ dbTemplate = "REMOVED/Trends/Database/TrendsTemplate.gdb/"
 changeImageFolders = r"\\REMOVED\REMOVED\LULCTrends\TestData\Change_Images" 
 multichangeFolders = r"\\REMOVED\REMOVED\LULCTrends\TestData\Multichange_Images"
 
+#Folder for the persistent cache of change image pixel counts, shared by all
+# processes.  Set to "" to always read the attribute tables.
+pixelCountCache = r"\\REMOVED\REMOVED\LULCTrends\TestData\Pixel_Count_Cache"
+
+#Change and multichange intervals whose pixel counts are taken directly from the
+# image pixels instead of from the raster attribute tables, e.g. newly delivered
+# intervals that have no attribute tables built yet.  Needs GDAL.
+pixelCountIntervals = []
+
+#Number of worker threads used to read the change image attribute tables for
+# an ecoregion and interval.  Set to 1 to read the blocks one at a time.
+loadThreads = 8
+
+#Number of worker processes used to load and calculate the ecoregions of a
+# study area at the same time.  Results are written to the database by the
+# main process only.  Set to 1 to run the ecoregions one at a time.
+ecoProcesses = 1
+
+#Python interpreter the worker processes are started with.  Inside ArcGIS the
+# running executable is the ArcGIS application rather than python, so the
+# interpreter must be named here, e.g. r'C:\Python26\ArcGIS10.0\pythonw.exe'.
+# If it is empty or not found, the ecoregions are run one at a time.
+workerExecutable = ""
+
+#Streaming study area runs: store each ecoregion and fold it into running summary
+# totals instead of keeping all ecoregions in memory until the summary is done.
+streamEcoregions = False
+
+#Custom boundaries: clip the sample blocks crossed by the boundary line to the
+# boundary (split blocks) instead of using them whole.  Tools pass the boundary
+# on to the statistics so the split blocks can be clipped when they are loaded.
+clipSplitBlocks = False
+
+#Checkpoint journal kept in the output folder by the multi-boundary tools, so a
+# rerun after a failure skips the boundaries and stages already completed.
+# The file name is the tool name followed by this suffix.
+journalSuffix = "_journal.jsonl"
+
 #Set the number of Level 3 ecoregions
 numEcoregions = 84
 
@@ -13,9 +13,16 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 import os, sys, traceback
-import arcgisscripting
 from . import TrendsNames
 
+#The modules catch ExecuteError from here, so they import without ArcGIS,
+# e.g. on a Linux worker using the SQLite storage backend.  It's only raised
+# by the geoprocessor, which is made on first use by getGP.
+try:
+    from arcgisscripting import ExecuteError
+except ImportError:
+    class ExecuteError( Exception ): pass
+
 TrendsLogFile = "TrendsStatisticsLogFile.txt"
 
 #This function extracts the desired value from the first position
@@ -30,11 +37,58 @@ class TrendsErrors( Exception ):
 
 class JustExit( Exception ): pass
 
+#One geoprocessor for the whole process.  Creating a geoprocessor is slow, and
+# the field lists of the database tables don't change during a run, so both
+# are kept here and shared by every module:
+#       gp = getGP() - the geoprocessor, created on first use
+#       fields = describeFields( gp, table ) - gp.Describe( table ).Fields,
+#                described once per table
+#       forgetFields( table ) - describe the table again on the next lookup,
+#                e.g. after fields are added to it (all tables if none given)
+# Where ArcGIS isn't installed getGP returns a messageGP, which prints the
+#  messages and raises a TrendsErrors for any geoprocessing.
+class gpContext:
+    gp = None
+    #Field lists of the tables described so far, format = { table: fields }
+    fields = {}
+
+class messageGP:
+    def AddMessage( self, msg ):
+        print msg
+
+    AddWarning = AddMessage
+    AddError = AddMessage
+
+    def __getattr__( self, name ):
+        if name.startswith( "__" ):
+            raise AttributeError( name )
+        raise TrendsErrors( "ArcGIS is needed for the geoprocessor's " + name )
+
+def getGP():
+    if gpContext.gp is None:
+        try:
+            import arcgisscripting
+        except ImportError:
+            gpContext.gp = messageGP()
+        else:
+            gpContext.gp = arcgisscripting.create(9.3)
+    return gpContext.gp
+
+def describeFields( gp, table ):
+    if table not in gpContext.fields:
+        gpContext.fields[ table ] = gp.Describe( table ).Fields
+    return gpContext.fields[ table ]
+
+def forgetFields( table = None ):
+    if table is None:
+        gpContext.fields.clear()
+    elif table in gpContext.fields:
+        del gpContext.fields[ table ]
+
 #This function is used to centralize a logging function, so it can be
 #  more easily switched between logging and printing.
 class trLogger:
     trLogfile = None
-    gp = arcgisscripting.create(9.3)
     try:
         def __init__(self, folder=""):
             if folder:
@@ -45,7 +99,7 @@ class trLogger:
             if trLogger.trLogfile:
                 trLogger.trLogfile.write( msg + "\n" )
             else:
-                trLogger.gp.AddMessage( msg )
+                getGP().AddMessage( msg )
             
         def trclose (self):
             trLogger.trLogfile.close()
@@ -78,18 +132,20 @@ def getYearsFromIntervals( gp, folderList ):
         gp.AddMessage(pymsg)
         raise
 
-def getIntervalList(gp, tableLoc, where_clause, field):
+def getIntervalList(gp, tableLoc, keyValues, field):
+    #keyValues - the key fields of the rows to search, format = { field: value }
+    #The statistics tables are kept by the storage backend, which imports this module
+    from ..database import StorageBackend
     try:
         intervals = []
-        rows = gp.SearchCursor( tableLoc, where_clause, "", field )
-        row = rows.Next()
-        while row:
-            if not (row.ChangePeriod in intervals):
-                intervals.append( row.ChangePeriod.encode('utf-8' ))
-            row = rows.Next()
+        rows = StorageBackend.getBackend().selectRows( gp, tableLoc, keyValues, [ field ] )
+        for row in rows:
+            interval = row[0].encode('utf-8')
+            if not (interval in intervals):
+                intervals.append( interval )
         years = getYearsFromIntervals( gp, intervals )
         return intervals, years
-    except arcgisscripting.ExecuteError:
+    except ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddMessage(msgs)
@@ -100,11 +156,6 @@ def getIntervalList(gp, tableLoc, where_clause, field):
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         gp.AddMessage(pymsg)
         raise
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
 
 def FindTimesChanged(gp, multiInterval, changeIntervals):
     try:
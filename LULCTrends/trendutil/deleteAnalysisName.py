@@ -16,8 +16,8 @@
 
 #Import modules
 import os, sys, traceback
-import arcgisscripting
 from . import TrendsNames, TrendsUtilities
+from ..database import StorageBackend
 
 def deleteAnalysisName( name ):
 
@@ -47,7 +47,7 @@ def deleteAnalysisName( name ):
                   "SummaryEcoregions" ]
 
     try:
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
         gp.AddMessage("Deleting name from database: " + TrendsNames.dbLocation)
 
@@ -58,35 +58,24 @@ def deleteAnalysisName( name ):
             gp.AddError("The analysis name \'Trends\' is reserved and cannot be deleted with this tool")
             raise TrendsUtilities.JustExit()
 
-        where_clause = "AnalysisName = \'" + name.upper() + "\'"
-        
         #Delete name from AnalysisNames table
-        rows = gp.UpdateCursor( tableLoc, where_clause )
-        row = rows.Next()
-        if row is not None:
-            num = row.AnalysisNum
-            rows.DeleteRow(row)
+        store = StorageBackend.getBackend()
+        found = store.selectRows( gp, tableLoc, { 'AnalysisName': name.upper() }, [ "AnalysisNum" ] )
+        if found:
+            num = found[0][0]
+            store.deleteRecords( gp, tableLoc, { 'AnalysisName': name.upper() } )
             gp.AddMessage("Deleted " + name + " from " + tableName)
         else:
             gp.AddWarning("Name not found in AnalysisNames database")
             raise TrendsUtilities.JustExit()
-        del row, rows
 
         #Look for any data or stats for this name in intermediate, custom, supplemental or summary tables
         for tableName in allTables:
             tableLoc = TrendsNames.dbLocation + tableName
-        
-            where_clause = "AnalysisNum = " + str(num)
-            rows = gp.UpdateCursor( tableLoc, where_clause )
-            row = rows.Next()
-            if row is not None:
-                gp.AddMessage("Deleting " + name + " from " + tableName)
-                while row:
-                    rows.DeleteRow(row)
-                    row = rows.Next()
-            del row, rows
+            if store.deleteAnalysis( gp, tableLoc, num ):
+                gp.AddMessage("Deleted " + name + " from " + tableName)
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddMessage(msgs)
@@ -97,11 +86,6 @@ def deleteAnalysisName( name ):
         tbinfo = traceback.format_tb(tb)[0]
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         gp.AddMessage(pymsg)
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
 
 if __name__ == '__main__':
     name = sys.argv[1]
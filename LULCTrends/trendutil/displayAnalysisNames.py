@@ -15,12 +15,12 @@
 
 #Import modules
 import os, sys, traceback
-import arcgisscripting
-from . import TrendsNames
+from . import TrendsNames, TrendsUtilities
+from ..database import StorageBackend
 
 def displayAnalysisNames():
     try:
-        gp = arcgisscripting.create(9.3)
+        gp = TrendsUtilities.getGP()
         gp.OverwriteOutput = True
 
         tableName = "AnalysisNames"
@@ -30,15 +30,12 @@ def displayAnalysisNames():
         gp.AddMessage("Analysis names currently in use:")
 
         #get name from AnalysisNames table
-        rows = gp.SearchCursor( tableLoc, "","","", sortField)
-        row = rows.Next()
-        while row:
-            num = row.AnalysisNum
-            name = row.AnalysisName
+        rows = StorageBackend.getBackend().selectRows( gp, tableLoc, {}, [ "AnalysisNum", "AnalysisName" ],
+                                                       [ sortField ] )
+        for ( num, name ) in rows:
             gp.AddMessage("Analysis name: " + name + " and number: " + str(num))
-            row = rows.Next()
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddMessage(msgs)
@@ -47,11 +44,6 @@ def displayAnalysisNames():
         tbinfo = traceback.format_tb(tb)[0]
         pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
         gp.AddMessage(pymsg)
-    finally:
-        try:
-            del row, rows
-        except Exception:
-            pass
 
 if __name__ == '__main__':
     try:
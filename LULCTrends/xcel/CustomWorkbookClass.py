@@ -13,11 +13,11 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 from .TrendsWorkbookClass import TrendsWorkbook
 from .ExcelWorkbookClass import ExcelWorkbook
 from ..trendutil import TrendsNames, TrendsUtilities
+from ..database import StorageBackend
 from . import ExcelSaveFix, createExcelEcoregion
 
 class CustomWorkbook (TrendsWorkbook):
@@ -34,7 +34,7 @@ class CustomWorkbook (TrendsWorkbook):
             self.ecoHolder = createExcelEcoregion.EcoExcel( gp, eco, self.ecoData[1],
                                 self.ecoData[2], res, self.intervals, self.years, self.multiIntervals,
                                 analysisNum)
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -49,15 +49,13 @@ class CustomWorkbook (TrendsWorkbook):
     def get_ecoregions(self, gp, runNum, eco ):
         try:
             dataset = TrendsNames.dbLocation + "SummaryEcoregions"
-            where_clause = "AnalysisNum = " + str( runNum ) + \
-                           " and Ecoregion = " + str( eco)
-            rows = gp.SearchCursor( dataset, where_clause )
-            row = rows.Next()
-            ecoData = (row.Ecoregion, row.TotalBlks, row.SampleBlks,
-                        row.TotalPixels, row.StudentT_85, row.StudentT_90,
-                        row.StudentT_95, row.StudentT_99 )
+            rows = StorageBackend.getBackend().selectRows( gp, dataset, { 'AnalysisNum': runNum, 'Ecoregion': eco },
+                                                           [ "Ecoregion", "TotalBlks", "SampleBlks",
+                                                             "TotalPixels", "StudentT_85", "StudentT_90",
+                                                             "StudentT_95", "StudentT_99" ] )
+            ecoData = tuple( rows[0] )
             return ecoData
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -68,11 +66,6 @@ class CustomWorkbook (TrendsWorkbook):
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             gp.AddMessage(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
     def get_intervals_and_years(self, gp):
         #When Trends expands to more intervals in some ecos but not others, this will
@@ -80,20 +73,18 @@ class CustomWorkbook (TrendsWorkbook):
         #  for the given eco/summary and use that list instead.
         try:
             tableLoc = TrendsNames.dbLocation + "CustomChangeData"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and EcoLevel3ID = " + str(self.eco) + \
-                           " and Resolution = '" + str(self.resolution) + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'EcoLevel3ID': self.eco,
+                         'Resolution': str(self.resolution) }
             field = "ChangePeriod"
-            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
             incyears = [(years[x]+'to'+years[x+1]) for x in range(len(years)) if years[x] != years[-1]]
             bookends = [inc for inc in intervals if inc not in incyears]
 
             tableLoc = TrendsNames.dbLocation + "CustomMultichangeData"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and EcoLevel3ID = " + str(self.eco) + \
-                           " and Resolution = '" + str(self.resolution) + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'EcoLevel3ID': self.eco,
+                         'Resolution': str(self.resolution) }
             field = "ChangePeriod"
-            multiIntervals, noyears = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            multiIntervals, noyears = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
             return intervals, years, incyears, bookends, multiIntervals
         except Exception:
             tb = sys.exc_info()[2]
@@ -107,12 +98,10 @@ class CustomWorkbook (TrendsWorkbook):
         #check for the intervals of each type.  Right now it only looks for 'gross'
         try:
             tableLoc = TrendsNames.dbLocation + "CustomAggregateData"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and EcoLevel3ID = " + str(self.eco) + \
-                           " and Resolution = '" + str(self.resolution) + "'" + \
-                           " and Source = '" + 'gross' + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'EcoLevel3ID': self.eco,
+                         'Resolution': str(self.resolution), 'Source': 'gross' }
             field = "ChangePeriod"
-            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
             return intervals
         except Exception:
             tb = sys.exc_info()[2]
@@ -22,7 +22,6 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 # info on xlwt:
 # Author: John Machin <sjmachin at lexicon net>
@@ -77,7 +76,7 @@ class ExcelWorkbook:
                     yield [getattr(row, col) for col in fieldnames]
                     row = cursor.next()
             return fieldnames, iterator_for_feature()
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -538,28 +537,26 @@ class ExcelWorkbook:
             student85 = self.ecoData[4]
             special_style = xlwt.easyxf('font: height 200, bold on; align: horiz center')
             
-            #Create an array for each LC type, then step through
-            # each year and add its data to the LC
+            #Create one array for all LC types, then step through
+            # each year and add its data
             samples = self.ecoData[2]
+            #set up data structure to hold calculations.  The data
+            # array is a numpy array with a plane for each LC type, and in
+            # each plane a column for each sample block and a row for each
+            # composition year.
+            lcdata = numpy.zeros((len(self.types), len(self.years), samples), int)
+            for yearctr, year in enumerate(self.years):
+                lcdata[ :,yearctr,: ] = self.ecoHolder.ecoComp[year][0][ :len(self.types),: ]
+
+            #get the stats of slope mean, Wilcoxon N pairs, student's T p-value,
+            # and Wilcoxon p-value for all LC types at once
             lcstats = {}
-            lcstats['mean'] = [0.0 for x in range(len(self.types))]
-            lcstats['student'] = [0.0 for x in range(len(self.types))]
-            lcstats['wilcox'] = [0.0 for x in range(len(self.types))]
-            lcstats['Ncount'] = [0 for x in range(len(self.types))]
-            for lc in range(len(self.types)):
-                #set up data structure to hold calculations.  The data
-                # array is a numpy array with a column for each sample block
-                # and a row for each composition year.
-                lcdata = numpy.zeros((len(self.years), samples), int)
-
-                #build the data array for the current land cover type
-                for yearctr, year in enumerate(self.years):
-                    lcdata[ yearctr,: ] = self.ecoHolder.ecoComp[year][0][ lc,: ]
-
-                #get the stats of slope mean, Wilcoxon N pairs, student's T p-value,
-                # and Wilcoxon p-value
-                lcstats['mean'][lc],lcstats['Ncount'][lc],lcstats['student'][lc],lcstats['wilcox'][lc]= \
-                                student_wilcoxon.studentWilcoxon( gp, lcdata, self.years )
+            slopes_mean, Ncount, p_student, p_wilcox = \
+                            student_wilcoxon.trendTests( gp, lcdata, self.years )
+            lcstats['mean'] = slopes_mean.tolist()
+            lcstats['student'] = p_student.tolist()
+            lcstats['wilcox'] = p_wilcox.tolist()
+            lcstats['Ncount'] = Ncount.tolist()
 
             #Put on the header row
             worksheet.write(0,1, "Land Cover Trends", header_style)
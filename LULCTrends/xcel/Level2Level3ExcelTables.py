@@ -19,12 +19,12 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback, time
 import xlwt
-from ..trendutil import TrendsNames, AnalysisNames
+from ..trendutil import TrendsNames, AnalysisNames, TrendsUtilities
 
-gp = arcgisscripting.create(9.3)
+gp = TrendsUtilities.getGP()
 header_style = xlwt.easyxf("font: bold on; align: horiz center")
 stat_style = xlwt.easyxf(num_format_str="#0.00000000")
 
@@ -36,7 +36,7 @@ def extractDBStatistics(gp, sourceName, localName, where_clause ):
         gp.Overwriteoutput = True
         gp.MakeQueryTable_management( sourceTable, localName, "USE_KEY_FIELDS","","",where_clause )
 
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         gp.AddMessage(msgs)
@@ -67,7 +67,7 @@ def getLevel3ChangeStats( resolution ):
                 offset = counter + 1
         
         return localTable, fields, offset
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         print(msgs)
@@ -97,7 +97,7 @@ def getLevel2ChangeStats():
                 offset = counter + 1
         
         return localTable, fields, offset
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         print(msgs)
@@ -119,7 +119,7 @@ def Map2to3():
         localTable = "Map2to3"
         extractDBStatistics( gp, "EcoregionHierarchy", localTable, where_clause )
         return localTable
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         print(msgs)
@@ -208,7 +208,7 @@ def create_a_workbook( entry, level3values, eco3fields, eco3offset,
         filename = os.path.join(outfolder, entry[0] + "_RATIO_OF_ECO3s_" + justdate + ".xls")
         print("Storing workbook: " + filename)
         workbook.save( filename )
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         print(msgs)
@@ -244,7 +244,7 @@ def Eco2Eco3ToExcel( res, outfolder ):
                                level2values, eco2fields, eco2offset,
                                map2to3, folderList, outfolder, justdate )
         return True
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         print(msgs)
@@ -262,7 +262,7 @@ if __name__ == '__main__':
     try:
         Eco2Eco3ToExcel( res, outfolder )
         print "Complete"
-    except arcgisscripting.ExecuteError:
+    except TrendsUtilities.ExecuteError:
         msgs = gp.GetMessage(0)
         msgs += gp.GetMessages(2)
         print(msgs)
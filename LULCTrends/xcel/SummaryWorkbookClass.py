@@ -13,7 +13,6 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 import numpy
 from .ExcelWorkbookClass import ExcelWorkbook
@@ -22,13 +21,16 @@ from .ExcelStyleNames import header_style, stat_style, bold_italic_style, plain_
 from .ExcelStyleNames import bold_stat_style, short_style
 from .ExcelStyleNames import plain_2dig_style, italic_2dig_style, bold_2dig_style
 from ..trendutil import TrendsNames, TrendsUtilities
+from ..database import StorageBackend
 from ..analysis import StudyAreaClass
 from ..analysis.setUpCalcStructures import setUpSummaryArrays
 from ..analysis.restoreSummaryFromDB import loadSummary, loadEcosForSummary
 
 class SummaryWorkbook (ExcelWorkbook):
 
-    def __init__(self, gp, analysisName, analysisNum, res, outfolder):
+    def __init__(self, gp, analysisName, analysisNum, res, outfolder, summary = None):
+        #summary - a study area already holding the summary statistics, such as one
+        # from SummaryEngine, instead of reading the summary tables for analysisNum
         try:
             ExcelWorkbook.__init__(self, gp, analysisName, analysisNum, res, outfolder)
             self.reportType = "Summary"
@@ -36,25 +38,42 @@ class SummaryWorkbook (ExcelWorkbook):
             # Reading:  Total_Blocks, num_samples, TotalPixels, Resolution,
             #         StudentT_85, StudentT_90, StudentT_95, StudentT_99
             
-            self.params = self.ParamRead( gp, self.analysisNum )
-            self.resolution = self.params[3]
-            self.totalPix['standardconversion'] = self.params[2]
-            self.ecoData = self.get_ecoregions( gp, analysisNum )
-            self.ecoList = [x[0] for x in self.ecoData]
-            self.ecoList.sort()
-            self.intervals,self.years,self.incyears,self.bookends,self.multiIntervals = self.get_intervals_and_years(gp)
-            self.cumulativeintervals = self.get_aggregate_intervals_and_years(gp, 'gross')
-            self.summary = StudyAreaClass.studyArea( gp, analysisName, analysisNum)
-            self.summary.resolution = self.params[3]
-            self.summary.intervals = self.intervals
-            self.summary.aggIntervals = self.cumulativeintervals #expand for more agg types
-            self.summary.years = self.years
-            self.summary.multiIntervals = self.multiIntervals
-            self.summary.sumEstPixels = self.params[2]
-            self.summary.summarySamples = self.params[1]
-            self.summary.totalBlocks = self.params[0]
-            self.summary.studentT = [self.params[4],self.params[5],
-                                     self.params[6],self.params[7]]
+            if summary is not None:
+                self.preloaded = True
+                self.params = (summary.totalBlocks, summary.summarySamples, summary.sumEstPixels,
+                               summary.resolution) + tuple( summary.studentT )
+                self.resolution = self.params[3]
+                self.totalPix['standardconversion'] = self.params[2]
+                self.ecoData = list( summary.ecoData )
+                self.ecoList = [x[0] for x in self.ecoData]
+                self.ecoList.sort()
+                self.intervals = list( summary.intervals )
+                self.years = list( summary.years )
+                self.incyears, self.bookends = self.split_intervals( self.intervals, self.years )
+                self.multiIntervals = list( summary.multiIntervals )
+                self.cumulativeintervals = list( summary.aggIntervals )
+                self.summary = summary
+            else:
+                self.preloaded = False
+                self.params = self.ParamRead( gp, self.analysisNum )
+                self.resolution = self.params[3]
+                self.totalPix['standardconversion'] = self.params[2]
+                self.ecoData = self.get_ecoregions( gp, analysisNum )
+                self.ecoList = [x[0] for x in self.ecoData]
+                self.ecoList.sort()
+                self.intervals,self.years,self.incyears,self.bookends,self.multiIntervals = self.get_intervals_and_years(gp)
+                self.cumulativeintervals = self.get_aggregate_intervals_and_years(gp, 'gross')
+                self.summary = StudyAreaClass.studyArea( gp, analysisName, analysisNum)
+                self.summary.resolution = self.params[3]
+                self.summary.intervals = self.intervals
+                self.summary.aggIntervals = self.cumulativeintervals #expand for more agg types
+                self.summary.years = self.years
+                self.summary.multiIntervals = self.multiIntervals
+                self.summary.sumEstPixels = self.params[2]
+                self.summary.summarySamples = self.params[1]
+                self.summary.totalBlocks = self.params[0]
+                self.summary.studentT = [self.params[4],self.params[5],
+                                         self.params[6],self.params[7]]
             self.sheader = TrendsNames.sumprintNames
         except Exception:
             tb = sys.exc_info()[2]
@@ -66,18 +85,14 @@ class SummaryWorkbook (ExcelWorkbook):
     def get_ecoregions(self, gp, runNum ):
         try:
             dataset = TrendsNames.dbLocation + "SummaryEcoregions"
-            where_clause = "AnalysisNum = " + str( runNum )
-            rows = gp.SearchCursor( dataset, where_clause )
-            row = rows.Next()
-            ecoData = []
-            while row:
-                ecoData.append((row.Ecoregion, row.TotalBlks, row.SampleBlks,
-                                row.TotalPixels, row.StudentT_85, row.StudentT_90,
-                                row.StudentT_95, row.StudentT_99, row.Resolution,
-                                row.RunType))
-                row = rows.Next()
+            rows = StorageBackend.getBackend().selectRows( gp, dataset, { 'AnalysisNum': runNum },
+                                                           [ "Ecoregion", "TotalBlks", "SampleBlks",
+                                                             "TotalPixels", "StudentT_85", "StudentT_90",
+                                                             "StudentT_95", "StudentT_99", "Resolution",
+                                                             "RunType" ] )
+            ecoData = [ tuple( row ) for row in rows ]
             return ecoData
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -88,28 +103,20 @@ class SummaryWorkbook (ExcelWorkbook):
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             gp.AddMessage(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
     def get_intervals_and_years(self, gp):
         #Get number of intervals for this study
         try:
             tableLoc = TrendsNames.dbLocation + "SummaryChangeStats"
             field = "ChangePeriod"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and Resolution = '" + str(self.resolution) + "'"
-            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
-            incyears = [(years[x]+'to'+years[x+1]) for x in range(len(years)) if years[x] != years[-1]]
-            bookends = [inc for inc in intervals if inc not in incyears]
+            keyValues = { 'AnalysisNum': self.analysisNum, 'Resolution': str(self.resolution) }
+            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
+            incyears, bookends = self.split_intervals( intervals, years )
 
             tableLoc = TrendsNames.dbLocation + "SummaryMultichangeStats"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and Resolution = '" + str(self.resolution) + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'Resolution': str(self.resolution) }
             field = "ChangePeriod"
-            multiIntervals, noyears = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            multiIntervals, noyears = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
 
             return intervals, years, incyears, bookends, multiIntervals
         except Exception:
@@ -119,15 +126,20 @@ class SummaryWorkbook (ExcelWorkbook):
             gp.AddMessage(pymsg)
             raise
 
+    def split_intervals(self, intervals, years):
+        #Intervals between consecutive years, and the rest of the intervals
+        incyears = [(years[x]+'to'+years[x+1]) for x in range(len(years)) if years[x] != years[-1]]
+        bookends = [inc for inc in intervals if inc not in incyears]
+        return incyears, bookends
+
     def get_aggregate_intervals_and_years(self, gp, source):
         #Upgrade: expand this to first check for different types of aggregation and then
         #check for the intervals of each type.  Right now it only looks for 'gross'
         try:
             tableLoc = TrendsNames.dbLocation + "SummaryAggregateStats"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and Source = '" + source + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'Source': source }
             field = "ChangePeriod"
-            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
             return intervals
         except Exception:
             tb = sys.exc_info()[2]
@@ -140,9 +152,10 @@ class SummaryWorkbook (ExcelWorkbook):
         try:
             #Set up the summary object arrays and load from the database.  These
             # modules are really methods of the summary object.
-            setUpSummaryArrays( self.summary )
-            loadSummary( self.summary )
-            loadEcosForSummary( self.summary, self.ecoData )
+            if not self.preloaded:
+                setUpSummaryArrays( self.summary )
+                loadSummary( self.summary )
+                loadEcosForSummary( self.summary, self.ecoData )
             
             ExcelWorkbook.build_workbook( self, gp )
             #write workbook to file
@@ -161,12 +174,11 @@ class SummaryWorkbook (ExcelWorkbook):
     def ParamRead( self, gp, runNum ):
         try:
             tableName = TrendsNames.dbLocation + "SummaryAnalysisParams"
-            where_clause = "AnalysisNum = " + str(runNum)
-            rows = gp.SearchCursor( tableName, where_clause )
-            row = rows.Next()
-            return (row.Total_Blocks, row.num_samples, row.TotalPixels, row.Resolution,
-                      row.StudentT_85, row.StudentT_90, row.StudentT_95, row.StudentT_99)
-        except arcgisscripting.ExecuteError:
+            rows = StorageBackend.getBackend().selectRows( gp, tableName, { 'AnalysisNum': runNum },
+                                                           [ "Total_Blocks", "num_samples", "TotalPixels", "Resolution",
+                                                             "StudentT_85", "StudentT_90", "StudentT_95", "StudentT_99" ] )
+            return tuple( rows[0] )
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -177,11 +189,6 @@ class SummaryWorkbook (ExcelWorkbook):
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             gp.AddMessage(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
             
     def add_front_page( self, gp ):
         try:
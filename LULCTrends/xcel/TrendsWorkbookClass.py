@@ -13,9 +13,9 @@
 # USGS copyright policy at 
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
-import arcgisscripting
 import os, sys, traceback, time
 from ..trendutil import TrendsNames, TrendsUtilities
+from ..database import StorageBackend
 from .ExcelWorkbookClass import ExcelWorkbook
 from . import ExcelSaveFix, createExcelEcoregion
 
@@ -43,14 +43,13 @@ class TrendsWorkbook (ExcelWorkbook):
     def get_ecoregions(self, gp, eco ):
         try:
             dataset = TrendsNames.dbLocation + "Ecoregions"
-            where_clause = "Ecoregion = " + str( eco )
-            rows = gp.SearchCursor( dataset, where_clause )
-            row = rows.Next()
-            ecoData = (row.Ecoregion, row.Total_Blocks, row.num_samples,
-                            row.TotalPixels, row.StudentT_85, row.StudentT_90,
-                            row.StudentT_95, row.StudentT_99 )
+            rows = StorageBackend.getBackend().selectRows( gp, dataset, { 'Ecoregion': eco },
+                                                           [ "Ecoregion", "Total_Blocks", "num_samples",
+                                                             "TotalPixels", "StudentT_85", "StudentT_90",
+                                                             "StudentT_95", "StudentT_99" ] )
+            ecoData = tuple( rows[0] )
             return ecoData
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             msgs = gp.GetMessage(0)
             msgs += gp.GetMessages(2)
             gp.AddMessage(msgs)
@@ -61,29 +60,22 @@ class TrendsWorkbook (ExcelWorkbook):
             pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
             gp.AddMessage(pymsg)
             raise
-        finally:
-            try:
-                del row, rows
-            except Exception:
-                pass
 
     def get_intervals_and_years(self, gp):
         try:
             tableLoc = TrendsNames.dbLocation + "TrendsChangeData"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and EcoLevel3ID = " + str(self.eco) + \
-                           " and Resolution = '" + str(self.resolution) + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'EcoLevel3ID': self.eco,
+                         'Resolution': str(self.resolution) }
             field = "ChangePeriod"
-            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
             incyears = [(years[x]+'to'+years[x+1]) for x in range(len(years)) if years[x] != years[-1]]
             bookends = [inc for inc in intervals if inc not in incyears]
 
             tableLoc = TrendsNames.dbLocation + "TrendsMultichangeData"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and EcoLevel3ID = " + str(self.eco) + \
-                           " and Resolution = '" + str(self.resolution) + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'EcoLevel3ID': self.eco,
+                         'Resolution': str(self.resolution) }
             field = "ChangePeriod"
-            multiIntervals, noyears = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            multiIntervals, noyears = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
             
             return intervals, years, incyears, bookends, multiIntervals
         except Exception:
@@ -98,12 +90,10 @@ class TrendsWorkbook (ExcelWorkbook):
         #check for the intervals of each type.  Right now it only looks for 'gross'
         try:
             tableLoc = TrendsNames.dbLocation + "TrendsAggregateData"
-            where_clause = "AnalysisNum = " + str(self.analysisNum) + \
-                           " and EcoLevel3ID = " + str(self.eco) + \
-                           " and Resolution = '" + str(self.resolution) + "'" + \
-                           " and Source = '" + source + "'"
+            keyValues = { 'AnalysisNum': self.analysisNum, 'EcoLevel3ID': self.eco,
+                         'Resolution': str(self.resolution), 'Source': source }
             field = "ChangePeriod"
-            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, where_clause, field)
+            intervals, years = TrendsUtilities.getIntervalList( gp, tableLoc, keyValues, field)
             return intervals
         except Exception:
             tb = sys.exc_info()[2]
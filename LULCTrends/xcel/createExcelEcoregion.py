@@ -15,11 +15,13 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 #Import modules
-import arcgisscripting, numpy
+import numpy
 import os, sys, traceback
 from ..trendutil import TrendsUtilities, TrendsNames
+from ..database import StorageBackend
 from ..analysis.restoreEcoFromDB import loadEcoregion
 from ..analysis import createRegionStats
+from ..analysis.IntervalCube import intervalCube
 
 STATS = createRegionStats.EcoStats
 
@@ -32,29 +34,18 @@ class EcoExcel( createRegionStats.EcoStats ):
             self.totalBlks = N
             self.sampleBlks = n
             self.resolution = res
-            self.ecoData = {}
             self.ecoGlgn = {}
-            self.ecoComp = {}
             self.allChange = {}
             self.aggregate = {}
             self.aggGlgn = {}
-            self.ecoMulti = {}
-            self.aggregate_gross_keys = TrendsNames.aggregate_gross_interval
+            self.aggregate_gross_keys = list( TrendsNames.aggregate_gross_interval )
             self.column = self.getBlockNumbers( gp, ecoNum, analysisNum, years )
 
-            for folder in intervals:
-                self.ecoData[ folder ] = ( numpy.zeros(( STATS.numCon, self.sampleBlks ), int),
-                                        numpy.zeros(( STATS.numCon, STATS.numStats ), float))
+            self.ecoData = intervalCube( intervals, STATS.numCon, self.sampleBlks, STATS.numStats )
+            self.ecoComp = intervalCube( years, TrendsNames.LCTypecntr, self.sampleBlks, self.numStats )
+            self.ecoMulti = intervalCube( multiIntervals, TrendsNames.numMulti, self.sampleBlks, STATS.numStats )
 
-            for date in years:
-                self.ecoComp[ date ] = ( numpy.zeros(( TrendsNames.LCTypecntr, self.sampleBlks ), int),
-                                        numpy.zeros(( TrendsNames.LCTypecntr, self.numStats ), float))
-
-            for interval in multiIntervals:
-                self.ecoMulti[ interval ] = ( numpy.zeros(( TrendsNames.numMulti, self.sampleBlks ), int),
-                                            numpy.zeros(( TrendsNames.numMulti, STATS.numStats ), float))
-
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             raise            
         except Exception:
             tb = sys.exc_info()[2]
@@ -73,21 +64,13 @@ class EcoExcel( createRegionStats.EcoStats ):
                 tableName = TrendsNames.dbLocation + "TrendsCompData"
             else:
                 tableName = TrendsNames.dbLocation + "CustomCompData"
-            where_clause = "AnalysisNum = " + str(analysisNum) + \
-                           " and EcoLevel3ID = " + str(self.ecoNum) + \
-                           " and CompYear = '" + str(years[0]) + "'" + \
-                           " and Resolution = '" + str(self.resolution) + "'"
+            keyValues = { 'AnalysisNum': analysisNum, 'EcoLevel3ID': self.ecoNum,
+                          'CompYear': str(years[0]), 'Resolution': str(self.resolution) }
             field = "BlkLabel"
-            sortFields = "BlkLabel A"
-            samples = []
-            rows = gp.SearchCursor( tableName, where_clause, "", field, sortFields )
-            row = rows.Next()
-            while row:
-                samples.append( row.BlkLabel )
-                row = rows.Next()
-            del row, rows
+            rows = StorageBackend.getBackend().selectRows( gp, tableName, keyValues, [ field ], [ field ] )
+            samples = [ row[0] for row in rows ]
             return dict( zip( samples, [x for x in range( len(samples))]))
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             raise            
         except Exception:
             tb = sys.exc_info()[2]
@@ -101,7 +84,7 @@ class EcoExcel( createRegionStats.EcoStats ):
             #Set up a log object
             dataFound = loadEcoregion( self )
             return dataFound
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             raise            
         except Exception:
             tb = sys.exc_info()[2]
@@ -117,7 +100,7 @@ class EcoExcel( createRegionStats.EcoStats ):
             samples.sort()
             dheader = [ str(self.ecoNum) + "-" + str(block) for block in samples ]
             return dheader,sheader
-        except arcgisscripting.ExecuteError:
+        except TrendsUtilities.ExecuteError:
             raise            
         except Exception:
             tb = sys.exc_info()[2]
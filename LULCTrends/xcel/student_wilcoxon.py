@@ -1,19 +1,23 @@
 #student_wilcoxon.py
 #
-# Perform Student's T and Wilcoxon Signed Rank tests with R
+# Perform Student's T and Wilcoxon Signed Rank tests
 #
-# The expected input data is a numpy array (data) containing the
-#  dependent variables and a list (inyears) of the independent variables.
-#  The data should be structured such that each column in the data array
-#  contains a set of dependent values corresponding to the independent
-#  values in the list.
+# The expected input data for trendTests is a 3-D numpy array (data) with
+#  a plane for each land cover type, a row for each year and a column for
+#  each sample block, and a list (inyears) of the independent variables,
+#  one for each row.  studentWilcoxon takes a single 2-D (year x block)
+#  array, as it always has.
 
 # First, linear regression is performed on each column of the array and
 #  the resulting slopes of the regression lines extracted into a separate
-#  vector.  This vector is input to R's t.test function to find the
-#  p value for the Student T test.  Nonzero values are extracted from the
-#  slope vector and this new vector is input to R's Wilcox.test function to
-#  find the p value for the Wilcoxon Signed Rank test with only one dataset.
+#  vector.  The slopes for all land cover types and blocks come from the
+#  closed form least squares formula in one step.  The slope vectors go
+#  through the one sample t test (as R's t.test) to find the p value for
+#  the Student T test.  Nonzero values are extracted from each slope vector
+#  and given the one sample Wilcoxon Signed Rank test (as R's wilcox.test):
+#  the exact signed rank distribution when there are fewer than 50 slopes
+#  and no tied ranks, otherwise the normal approximation with tie and
+#  continuity corrections.
 #
 # Written:         Aug 2011
 # Release date:    Mar 2012
@@ -28,56 +32,117 @@
 #Import modules
 import numpy
 import traceback
-import rpy2.robjects as robjects
-import rpy2.robjects.numpy2ri
+from ..trendutil.StudentT import tDistribution, normalDistribution
 
-def studentWilcoxon( gp, data, inyears ):
-    try:
-        #Define the independent variable 'years' in R's workspace
-        # to make it easier to access results from the model
-        years = robjects.IntVector( inyears )
-        globalEnv = robjects.globalEnv
-        robjects.r.ls(globalEnv)
-        globalEnv["years"] = years
-
-        #Apply R's lm (linear model - linear regression) to each column
-        # of the data array.
-        getLine = robjects.r('function(x) {lm(x ~ years)}')
-        r_apply = robjects.r['apply']
-        lines = r_apply( data, MARGIN=2, FUN=getLine )
-
-        #Extract just the slope of the regression lines into another vector
-        # and apply the t.test to the slopes.
-        r_sapply = robjects.r['sapply']
-        r_mean = robjects.r['mean']
-        r_ttest = robjects.r['t.test']
-        r_wilcox = robjects.r['wilcox.test']
-        getSlopes = robjects.r('function(s) {coef(s)["years"]}')
-        justSlopes = r_sapply( lines, getSlopes )
-        meanval = r_mean( justSlopes )
-        slopes_mean = meanval[0]
-
-        if len(justSlopes) > 2:
-            resultStudent = r_ttest( justSlopes )
-            p_student = resultStudent.r['p.value'][0][0]
-        else:
-            p_student = -9999.9
-
-        #Extract just the nonzero slopes for the Wilcoxon test and
-        # call the test to get the p value.
-        nonzeroSlopes = [x for x in justSlopes if x>0.0001 or x<-0.0001]
-        if len( nonzeroSlopes ) > 0:
-            validSlopes = robjects.FloatVector( nonzeroSlopes )
-            resultWilcox = r_wilcox( validSlopes )
-            p_wilcox = resultWilcox.r['p.value'][0][0]
+#Value written when a test can't be run
+noTestValue = -9999.9
+
+#Slopes closer to zero than this are left out of the Wilcoxon test
+zeroSlope = 0.0001
+
+#Largest sample size that uses the exact signed rank distribution
+exactWilcoxonLimit = 50
+
+#Signed rank frequency tables, format = { n: counts of each rank sum 0..n(n+1)/2 }
+signRankCounts = {}
+
+def regressionSlopes( data, inyears ):
+    #Least squares slope of each (type, block) column against the years,
+    # slope = (n*sum(xy) - sum(x)*sum(y)) / (n*sum(x^2) - sum(x)^2)
+    # The pixel counts and years are integers, so the numerator and
+    # denominator are exact and slopes that are equal (or equal in size)
+    # come out exactly equal, which keeps the tied Wilcoxon ranks tied.
+    years = numpy.asarray( inyears, float )
+    n = len( years )
+    values = numpy.asarray( data, float )
+    sumY = numpy.sum( values, axis=1 )
+    sumXY = numpy.sum( values * years[numpy.newaxis, :, numpy.newaxis], axis=1 )
+    return ( n * sumXY - numpy.sum( years ) * sumY ) / ( n * numpy.sum( years * years ) - numpy.sum( years )**2 )
+
+def getSignRankCounts( n ):
+    #Number of subsets of the ranks 1..n with each possible rank sum
+    if n not in signRankCounts:
+        counts = numpy.zeros( n * (n + 1) // 2 + 1, float )
+        counts[0] = 1.0
+        for rank in range( 1, n + 1 ):
+            counts[ rank: ] = counts[ rank: ] + counts[ :-rank ].copy()
+        signRankCounts[ n ] = counts
+    return signRankCounts[ n ]
+
+def averageRanks( values ):
+    #Ranks of the values, with ties given their average rank, and the
+    # sizes of the groups of tied values
+    order = numpy.argsort( values, kind='mergesort' )
+    ordered = values[ order ]
+    newGroup = numpy.concatenate(( [True], ordered[1:] != ordered[:-1] ))
+    starts = numpy.nonzero( newGroup )[0]
+    ends = numpy.concatenate(( starts[1:], [len( values )] ))
+    ranks = numpy.zeros( len( values ), float )
+    ranks[ order ] = (( starts + 1 + ends ) / 2.0 )[ numpy.cumsum( newGroup ) - 1 ]
+    return ranks, ends - starts
+
+def wilcoxonTest( slopes ):
+    #Two-sided one sample signed rank test against zero, as R's wilcox.test
+    n = len( slopes )
+    ranks, tieSizes = averageRanks( numpy.abs( slopes ))
+    statistic = numpy.sum( ranks[ slopes > 0.0 ] )
+    if n < exactWilcoxonLimit and numpy.all( tieSizes == 1 ):
+        counts = getSignRankCounts( n )
+        v = int( round( statistic ))
+        if statistic > n * (n + 1) / 4.0:
+            p = numpy.sum( counts[ v: ] ) / numpy.sum( counts )
         else:
-            p_wilcox = -9999.9
+            p = numpy.sum( counts[ :v + 1 ] ) / numpy.sum( counts )
+        return min( 2.0 * p, 1.0 )
+    z = statistic - n * (n + 1) / 4.0
+    sigma = numpy.sqrt( n * (n + 1) * (2 * n + 1) / 24.0 -
+                        numpy.sum( tieSizes**3 - tieSizes ) / 48.0 )
+    z = ( z - numpy.sign( z ) * 0.5 ) / sigma
+    return 2.0 * min( normalDistribution( z ), 1.0 - normalDistribution( z ))
+
+def trendTests( gp, data, inyears ):
+    #
+    # In:   data - array of (type, year, block) values
+    #       inyears - the years for the rows of each type
+    # Out:  arrays, one entry per type, of slope mean, Wilcoxon N pairs,
+    #       Student's T p-value, and Wilcoxon p-value
+    #
+    try:
+        slopes = regressionSlopes( data, inyears )
+        numTypes, numSlopes = slopes.shape
+        slopes_mean = numpy.mean( slopes, axis=1 )
 
-        return slopes_mean, len(nonzeroSlopes), p_student, p_wilcox
+        #One sample t test of the slopes for every type at once.  The test
+        # needs more than 2 slopes, and can't be run on constant slopes.
+        p_student = numpy.zeros( numTypes, float ) + noTestValue
+        if numSlopes > 2:
+            stderr = numpy.sqrt( numpy.var( slopes, axis=1, ddof=1 ) / numSlopes )
+            testable = stderr > 10.0 * numpy.finfo( float ).eps * numpy.abs( slopes_mean )
+            testable &= stderr > 0.0
+            tstat = numpy.zeros( numTypes, float )
+            tstat[ testable ] = slopes_mean[ testable ] / stderr[ testable ]
+            for lc in numpy.nonzero( testable )[0]:
+                p_student[ lc ] = 2.0 * tDistribution( -abs( tstat[ lc ] ), numSlopes - 1 )
+
+        #Extract just the nonzero slopes for the Wilcoxon test.  The
+        # number of nonzero slopes differs by type.
+        nonzero = numpy.abs( slopes ) > zeroSlope
+        nonzeroCount = numpy.sum( nonzero, axis=1 )
+        p_wilcox = numpy.zeros( numTypes, float ) + noTestValue
+        for lc in numpy.nonzero( nonzeroCount )[0]:
+            p_wilcox[ lc ] = wilcoxonTest( slopes[ lc, nonzero[ lc ] ] )
+
+        return slopes_mean, nonzeroCount, p_student, p_wilcox
     except Exception:
         gp.AddMessage(traceback.format_exc())
         raise
 
+def studentWilcoxon( gp, data, inyears ):
+    #Tests for a single (year, block) array
+    slopes_mean, nonzeroCount, p_student, p_wilcox = \
+                 trendTests( gp, numpy.asarray( data )[ numpy.newaxis, :, : ], inyears )
+    return slopes_mean[0], int( nonzeroCount[0] ), p_student[0], p_wilcox[0]
+
 if __name__ == '__main__':
     values = "waterEco1.csv"
     try:
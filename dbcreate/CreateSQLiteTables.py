@@ -0,0 +1,58 @@
+# File CreateSQLiteTables.py
+#
+#   Creates the data and statistics tables, with their search indexes, and
+#   the analysis names and parameters tables in a local SQLite database for
+#   the "sqlite" storage backend.  The tables are the same as the ones made
+#   by the other Create...Tables scripts, see
+#   LULCTrends/database/TrendsSchema.py.  With TrendsNames.sqliteFormat set
+#   to "blobs" it creates the array blob key table instead of the data and
+#   statistics tables.  The Ecoregions table still has to be loaded with
+#   the Trends ecoregion parameters.
+#
+#   Usage: CreateSQLiteTables.py [database file]
+#       defaults to TrendsNames.sqliteDatabase
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os, sys, traceback
+import sqlite3
+from LULCTrends.trendutil import TrendsNames
+from LULCTrends.database import StorageBackend, TrendsSchema
+
+def makeSQLiteTables( database ):
+    try:
+        connection = sqlite3.connect( database )
+        try:
+            connection.execute( "PRAGMA journal_mode = WAL" )
+            if TrendsNames.sqliteFormat == "blobs":
+                StorageBackend.createBlobTable( connection )
+                StorageBackend.createTables( connection, sorted( TrendsSchema.recordTables ))
+                print "Created table " + TrendsSchema.blobTable + " and " + \
+                      str(len( TrendsSchema.recordTables )) + " parameter tables in " + database
+            else:
+                StorageBackend.createTables( connection )
+                print "Created " + str(len( TrendsSchema.tableNames() ) + len( TrendsSchema.recordTables )) + \
+                      " tables in " + database
+        finally:
+            connection.close()
+
+    except Exception:
+        #print out the system error traceback
+        tb = sys.exc_info()[2]
+        tbinfo = traceback.format_tb(tb)[0]
+        pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+        print(pymsg)
+        raise     #push the error up to exit
+
+if __name__ == '__main__':
+    if len( sys.argv ) > 1:
+        database = sys.argv[1]
+    else:
+        database = TrendsNames.sqliteDatabase
+    makeSQLiteTables( database )
+    print "Complete"
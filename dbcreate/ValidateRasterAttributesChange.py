@@ -0,0 +1,50 @@
+# File ValidateRasterAttributesChange.py
+#
+# Checks the raster attribute table of each change image against the
+#  pixel counts taken directly from the image.  Images whose tables
+#  are missing or out of date are listed with the values that differ,
+#  so only those need BuildRasterAttributeTable_management run again.
+#  Needs GDAL to read the image pixels.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+
+#Import modules
+import os
+import sys, traceback
+from LULCTrends.analysis.ChangeImageReader import compareValueCounts
+
+#Set the topmost workspace folder
+folderPath = "REMOVED/Data/Change_Images/"
+
+try:
+    folderList = os.listdir( folderPath )
+    badImages = 0
+    checked = 0
+    for folder in folderList:
+        path = os.path.join( folderPath, folder )
+        print "Checking images in " + path
+        for dirpath, dirnames, filenames in os.walk( path ):
+            for filename in filenames:
+                if filename.split('.')[-1] != "img":
+                    continue
+                image = os.path.join( dirpath, filename )
+                checked += 1
+                differences = compareValueCounts( image )
+                if differences:
+                    badImages += 1
+                    print "Attribute table does not match pixels for " + image
+                    for value, tableCount, pixelCount in differences:
+                        print "   value %3d: table %d  pixels %d" % (value, tableCount, pixelCount)
+
+    print "Checked " + str(checked) + " images, " + str(badImages) + " need new attribute tables"
+
+except Exception:
+    # Get the traceback object
+    tb = sys.exc_info()[2]
+    tbinfo = traceback.format_tb(tb)[0]
+    pymsg = tbinfo + "\n" + str(sys.exc_type)+ ": " + str(sys.exc_value)
+    print pymsg
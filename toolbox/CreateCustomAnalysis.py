@@ -57,7 +57,7 @@ def startOneCustom(Input_Features, newname, resolution, outFolder):
         newEcos, strats, splits = CustomDataAccess.accessCustomData( Input_Features, resolution, newname, subFolder )
 
         if len(newEcos) > 0:
-            testStudyAreaStats.buildStudyAreaStats( newname, analysisNum, newEcos, strats, splits )
+            testStudyAreaStats.buildStudyAreaStats( newname, analysisNum, newEcos, strats, splits, Input_Features )
 
             for eco in newEcos:
                 newExcel = CustomWorkbook( gp, newname, analysisNum, resolution, subFolder, eco )
@@ -18,8 +18,8 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 
 import arcgisscripting, os, sys, traceback
-from LULCTrends.trendutil import TrendsNames, AnalysisNames, TrendsUtilities, deleteAnalysisName
-from LULCTrends.analysis import TrendsDataAccess, testStudyAreaStats
+from LULCTrends.trendutil import TrendsNames, TrendsUtilities
+from LULCTrends.analysis import SummaryEngine
 from LULCTrends.xcel.SummaryWorkbookClass import SummaryWorkbook
 
 def startOneSummary(ecoString, newname, resolution, outFolder):
@@ -52,25 +52,14 @@ def startOneSummary(ecoString, newname, resolution, outFolder):
             gp.AddError(msg)
             raise TrendsUtilities.JustExit()
                 
-        if AnalysisNames.isInAnalysisNames( gp, newname):
-            msg = "The name \'" + newname + "\' is already in use in the database.  Please choose another."
-            if statusfile:
-                statusfile.write( msg + "\n" )
-            gp.AddError(msg)
-            raise TrendsUtilities.JustExit
-                
-        AnalysisNames.updateAnalysisNames( gp, newname )
-        analysisNum = AnalysisNames.getAnalysisNum( gp, newname )
-
-        newEcos, strats, splits = TrendsDataAccess.accessTrendsData( ecoList, analysisNum, resolution )
-
-        testStudyAreaStats.buildStudyAreaStats( newname, analysisNum, newEcos, strats, splits )
-        newExcel = SummaryWorkbook( gp, newname, analysisNum, resolution, outFolder )
+        #The summary is built in memory from the stored Trends ecoregion estimates,
+        # so nothing is written to the database for it
+        engine = SummaryEngine.summaryEngine( resolution )
+        summary = engine.summarize( ecoList, newname )
+        newExcel = SummaryWorkbook( gp, newname, 0, resolution, outFolder, summary )
         newExcel.build_workbook( gp )
         del newExcel
 
-        #clean out name from database
-        deleteAnalysisName.deleteAnalysisName( newname )
         statusfile.write("Create Summary Analysis tool execution is complete.\n")
 
     except arcgisscripting.ExecuteError:
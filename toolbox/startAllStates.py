@@ -16,7 +16,7 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
 import arcgisscripting, os, sys, traceback
-from LULCTrends.trendutil import AnalysisNames, TrendsUtilities, deleteAnalysisName
+from LULCTrends.trendutil import AnalysisNames, TrendsNames, TrendsUtilities, deleteAnalysisName, RunJournal
 from LULCTrends.analysis import CustomDataAccess, testStudyAreaStats
 from LULCTrends.xcel.CustomWorkbookClass import CustomWorkbook
 from LULCTrends.xcel.SummaryWorkbookClass import SummaryWorkbook
@@ -31,41 +31,88 @@ def startStates( tempList, resolution, outFolder ):
             gp.AddMessage(state)
 
         infeatures = "//REMOVE/REMOVE/LULCTrends/Vectors/States/states_generalized_Albers.shp"
-        test = r'in_memory\teststates'
             
-        for state in stateList:
-            stateabbrev = 'usa_' + state.replace(" ","",10)
-            if AnalysisNames.isInAnalysisNames( gp, stateabbrev):
-                deleteAnalysisName.deleteAnalysisName( stateabbrev)
-                
-            AnalysisNames.updateAnalysisNames( gp, stateabbrev )
-            analysisNum = AnalysisNames.getAnalysisNum( gp, stateabbrev )
-            gp.AddMessage("startStratified: state = " + state + "  analysisNum = " + str(analysisNum))
-
-            #create a folder for the results
-            subFolder = os.path.join(outFolder, state)
-            if not os.path.isdir(subFolder):
-                os.mkdir( subFolder )
+        #Completed stages of an earlier, failed run with the same settings are skipped
+        journal = RunJournal.runJournal( outFolder, "startAllStates",
+                                         { 'states': stateList, 'resolution': resolution,
+                                           'clipBlocks': TrendsNames.clipSplitBlocks } )
 
-            where_clause = "NAME10 = " + "'" + state + "'"
-            gp.Select_analysis( infeatures, test, where_clause )
-            newEcos, strats, splits = CustomDataAccess.accessCustomData( test, resolution, stateabbrev, subFolder )
-
-            if len(newEcos) > 0:
-                testStudyAreaStats.buildStudyAreaStats( stateabbrev, analysisNum, newEcos, strats, splits )
+        def cleanUp( stateabbrev ):
+            #Each state keeps its own selection until its statistics are done, since
+            # they clip any split blocks to it
+            test = 'in_memory\\' + stateabbrev
+            if gp.Exists( test ):
+                gp.delete_management( test )
+            journal.markDone( stateabbrev, "cleanup" )
 
-                for eco in newEcos:
+        def finishState( stateabbrev, analysisNum ):
+            #Build the workbooks and remove the selection of a state once its
+            # statistics are stored
+            if not journal.isDone( stateabbrev, "workbook" ):
+                subFolder = folders[ stateabbrev ]
+                for eco in ecoLists[ stateabbrev ]:
                     newExcel = CustomWorkbook( gp, stateabbrev, analysisNum, resolution, subFolder, eco )
                     newExcel.build_workbook( gp )
 
                 newExcel = SummaryWorkbook( gp, stateabbrev, analysisNum, resolution, subFolder )
                 newExcel.build_workbook( gp )
                 del newExcel
+                journal.markDone( stateabbrev, "workbook" )
+            if not journal.isDone( stateabbrev, "cleanup" ):
+                cleanUp( stateabbrev )
+
+        #Find the sample blocks for every state first, so the ecoregions the
+        # states share are loaded once for the whole batch
+        finished = []
+        pending = []
+        folders = {}
+        ecoLists = {}
+        for state in stateList:
+            stateabbrev = 'usa_' + state.replace(" ","",10)
+            #create a folder for the results
+            subFolder = os.path.join(outFolder, state)
+            test = 'in_memory\\' + stateabbrev
+            where_clause = "NAME10 = " + "'" + state + "'"
+
+            if journal.isDone( stateabbrev, "access" ):
+                newEcos, strats, splits = RunJournal.restoreBlocks( journal.getInfo( stateabbrev, "access" ))
+                if journal.isDone( stateabbrev, "statistics" ):
+                    analysisNum = journal.getInfo( stateabbrev, "statistics" )['analysisNum']
+                elif len(newEcos) > 0:
+                    #clear out anything the failed run stored for this state
+                    analysisNum = AnalysisNames.resetAnalysisName( gp, stateabbrev )
+                gp.AddMessage("resuming: state = " + state)
             else:
-                deleteAnalysisName.deleteAnalysisName( stateabbrev )
+                analysisNum = AnalysisNames.resetAnalysisName( gp, stateabbrev )
+                gp.AddMessage("startStratified: state = " + state + "  analysisNum = " + str(analysisNum))
+
+                if not os.path.isdir(subFolder):
+                    os.mkdir( subFolder )
+
+                gp.Select_analysis( infeatures, test, where_clause )
+                newEcos, strats, splits = CustomDataAccess.accessCustomData( test, resolution, stateabbrev, subFolder )
+                if len(newEcos) == 0:
+                    deleteAnalysisName.deleteAnalysisName( stateabbrev )
+                journal.markDone( stateabbrev, "access", RunJournal.saveBlocks( newEcos, strats, splits ))
+
+            if len(newEcos) > 0:
+                folders[ stateabbrev ] = subFolder
+                ecoLists[ stateabbrev ] = newEcos
+                if journal.isDone( stateabbrev, "statistics" ):
+                    finished.append(( stateabbrev, analysisNum ))
+                else:
+                    if not gp.Exists( test ):
+                        gp.Select_analysis( infeatures, test, where_clause )
+                    pending.append(( stateabbrev, analysisNum, newEcos, strats, splits, test ))
+            elif not journal.isDone( stateabbrev, "cleanup" ):
+                cleanUp( stateabbrev )
 
-        if gp.Exists( test ):
-            gp.delete_management( test )
+        #States finished by an earlier run only need what is left of their workbooks
+        # and cleanup; the others are finished as the batch stores each one
+        for stateabbrev, analysisNum in finished:
+            finishState( stateabbrev, analysisNum )
+        testStudyAreaStats.buildBatchStudyAreaStats( pending, journal = journal, finish = finishState )
+        journal.close( complete = True )
 
     except arcgisscripting.ExecuteError:
         msgs = gp.GetMessage(0)
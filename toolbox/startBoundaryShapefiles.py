@@ -16,7 +16,7 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
 import arcgisscripting, os, sys, traceback, glob
-from LULCTrends.trendutil import AnalysisNames, TrendsUtilities, deleteAnalysisName
+from LULCTrends.trendutil import AnalysisNames, TrendsNames, TrendsUtilities, deleteAnalysisName, RunJournal
 from LULCTrends.analysis import CustomDataAccess, testStudyAreaStats
 from LULCTrends.xcel.CustomWorkbookClass import CustomWorkbook
 from LULCTrends.xcel.SummaryWorkbookClass import SummaryWorkbook
@@ -29,39 +29,79 @@ def startBoundaries( infolder, prefix, resolution, outFolder, deleteResults ):
         os.chdir( infolder )
         fileList = glob.glob( "*.shp" )
             
-        for boundary in fileList:
-            temp = boundary.split(".")
-            newname = prefix + "_" + temp[0]
-            if AnalysisNames.isInAnalysisNames( gp, newname):
-                deleteAnalysisName.deleteAnalysisName( newname)
-                
-            AnalysisNames.updateAnalysisNames( gp, newname )
-            analysisNum = AnalysisNames.getAnalysisNum( gp, newname )
-            gp.AddMessage("startStratified: boundary = " + boundary + " and analysis name = " + newname)
-
-            subFolder = os.path.join(outFolder, newname)
-            if not os.path.isdir( subFolder ):
-                os.mkdir( subFolder )
-
-            newEcos, strats, splits = CustomDataAccess.accessCustomData( boundary, resolution, newname, subFolder )
+        #Completed stages of an earlier, failed run with the same settings are skipped
+        journal = RunJournal.runJournal( outFolder, "startBoundaryShapefiles",
+                                         { 'infolder': infolder, 'boundaries': fileList, 'prefix': prefix,
+                                           'resolution': resolution, 'deleteResults': deleteResults,
+                                           'clipBlocks': TrendsNames.clipSplitBlocks } )
 
-            if len(newEcos) > 0:
-                testStudyAreaStats.buildStudyAreaStats( newname, analysisNum, newEcos, strats, splits )
-
-                for eco in newEcos:
+        def finishBoundary( newname, analysisNum ):
+            #Build the workbooks of a boundary once its statistics are stored, and
+            # delete its results right away if they are not kept
+            if not journal.isDone( newname, "workbook" ):
+                subFolder = folders[ newname ]
+                for eco in ecoLists[ newname ]:
                     newExcel = CustomWorkbook( gp, newname, analysisNum, resolution, subFolder, eco )
                     newExcel.build_workbook( gp )
 
                 newExcel = SummaryWorkbook( gp, newname, analysisNum, resolution, subFolder )
                 newExcel.build_workbook( gp )
                 del newExcel
-            else:
-                gp.AddError("No sample blocks are within the custom boundary " + boundary + ". No Trends processing done.")
-                deleteResults = 'Yes'
+                journal.markDone( newname, "workbook" )
 
-            if deleteResults == "Yes":
+            if deleteResults == "Yes" and not journal.isDone( newname, "cleanup" ):
                 #clean out name from database
                 deleteAnalysisName.deleteAnalysisName( newname )
+                journal.markDone( newname, "cleanup" )
+
+        #Find the sample blocks for every boundary first, so the ecoregions the
+        # boundaries share are loaded once for the whole batch
+        finished = []
+        pending = []
+        folders = {}
+        ecoLists = {}
+        for boundary in fileList:
+            temp = boundary.split(".")
+            newname = prefix + "_" + temp[0]
+            subFolder = os.path.join(outFolder, newname)
+
+            if journal.isDone( newname, "access" ):
+                newEcos, strats, splits = RunJournal.restoreBlocks( journal.getInfo( newname, "access" ))
+                if journal.isDone( newname, "statistics" ):
+                    analysisNum = journal.getInfo( newname, "statistics" )['analysisNum']
+                elif len(newEcos) > 0:
+                    #clear out anything the failed run stored for this boundary
+                    analysisNum = AnalysisNames.resetAnalysisName( gp, newname )
+                gp.AddMessage("resuming: boundary = " + boundary)
+            else:
+                analysisNum = AnalysisNames.resetAnalysisName( gp, newname )
+                gp.AddMessage("startStratified: boundary = " + boundary + " and analysis name = " + newname)
+
+                if not os.path.isdir( subFolder ):
+                    os.mkdir( subFolder )
+
+                newEcos, strats, splits = CustomDataAccess.accessCustomData( boundary, resolution, newname, subFolder )
+                if len(newEcos) == 0:
+                    gp.AddError("No sample blocks are within the custom boundary " + boundary + ". No Trends processing done.")
+                    #clean out name from database
+                    deleteAnalysisName.deleteAnalysisName( newname )
+                journal.markDone( newname, "access", RunJournal.saveBlocks( newEcos, strats, splits ))
+
+            if len(newEcos) > 0:
+                folders[ newname ] = subFolder
+                ecoLists[ newname ] = newEcos
+                if journal.isDone( newname, "statistics" ):
+                    finished.append(( newname, analysisNum ))
+                else:
+                    pending.append(( newname, analysisNum, newEcos, strats, splits, os.path.join( infolder, boundary )))
+
+        #Boundaries finished by an earlier run only need what is left of their
+        # workbooks and cleanup; the others are finished as the batch stores each one
+        for newname, analysisNum in finished:
+            finishBoundary( newname, analysisNum )
+        testStudyAreaStats.buildBatchStudyAreaStats( pending, journal = journal, finish = finishBoundary )
+
+        journal.close( complete = True )
 
     except arcgisscripting.ExecuteError:
         msgs = gp.GetMessage(0)
@@ -16,8 +16,8 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
 import arcgisscripting, os, sys, traceback
-from LULCTrends.trendutil import AnalysisNames, TrendsUtilities, deleteAnalysisName
-from LULCTrends.analysis import TrendsDataAccess, testStudyAreaStats
+from LULCTrends.trendutil import AnalysisNames, TrendsUtilities, RunJournal
+from LULCTrends.analysis import TrendsDataAccess, testStudyAreaStats, SummaryEngine
 from LULCTrends.xcel.SummaryWorkbookClass import SummaryWorkbook
 
 def startFromFile( filename, resolution, outFolder, deleteResults ): 
@@ -33,6 +33,12 @@ def startFromFile( filename, resolution, outFolder, deleteResults ):
             raise Exception
                 
         numlines = len(contents)
+        engine = None
+
+        #Completed stages of an earlier, failed run with the same list are skipped
+        journal = RunJournal.runJournal( outFolder, "startFromListFile",
+                                         { 'contents': contents, 'resolution': resolution,
+                                           'deleteResults': deleteResults } )
 
         for line in range(0, numlines, 2):
             newname = contents[line].rstrip()
@@ -48,23 +54,47 @@ def startFromFile( filename, resolution, outFolder, deleteResults ):
                 gp.AddError( "Ecoregion list for " +newname+ " contains invalid values.  Accepted range is 1-84.")
                 continue
 
-            if AnalysisNames.isInAnalysisNames( gp, newname):
-                deleteAnalysisName.deleteAnalysisName( newname)
-                
-            AnalysisNames.updateAnalysisNames( gp, newname )
-            analysisNum = AnalysisNames.getAnalysisNum( gp, newname )
-            gp.AddMessage("starting summary: analysis name = " + newname)
+            if deleteResults == "Yes":
+                #Results are not kept, so build the summary in memory from the
+                # stored Trends ecoregion estimates instead of running the analysis.
+                # Nothing is written to the database, so there is no cleanup stage.
+                if journal.isDone( newname, "workbook" ):
+                    continue
+                gp.AddMessage("starting summary: analysis name = " + newname)
+                if engine is None:
+                    engine = SummaryEngine.summaryEngine( resolution )
+                summary = engine.summarize( ecoList, newname )
+                newExcel = SummaryWorkbook( gp, newname, 0, resolution, outFolder, summary )
+                newExcel.build_workbook( gp )
+                del newExcel
+                journal.markDone( newname, "workbook" )
+                continue
 
-            newEcos, strats, splits = TrendsDataAccess.accessTrendsData( ecoList, analysisNum, resolution )
+            if journal.isDone( newname, "statistics" ):
+                analysisNum = journal.getInfo( newname, "statistics" )['analysisNum']
+            else:
+                if journal.isDone( newname, "access" ):
+                    newEcos, strats, splits = RunJournal.restoreBlocks( journal.getInfo( newname, "access" ))
+                    #clear out anything the failed run stored for this summary
+                    analysisNum = AnalysisNames.resetAnalysisName( gp, newname )
+                    gp.AddMessage("resuming summary: analysis name = " + newname)
+                else:
+                    analysisNum = AnalysisNames.resetAnalysisName( gp, newname )
+                    gp.AddMessage("starting summary: analysis name = " + newname)
 
-            testStudyAreaStats.buildStudyAreaStats( newname, analysisNum, newEcos, strats, splits )
-            newExcel = SummaryWorkbook( gp, newname, analysisNum, resolution, outFolder )
-            newExcel.build_workbook( gp )
-            del newExcel
+                    newEcos, strats, splits = TrendsDataAccess.accessTrendsData( ecoList, analysisNum, resolution )
+                    journal.markDone( newname, "access", RunJournal.saveBlocks( newEcos, strats, splits ))
 
-            if deleteResults == "Yes":
-                #clean out name from database
-                deleteAnalysisName.deleteAnalysisName( newname )
+                testStudyAreaStats.buildStudyAreaStats( newname, analysisNum, newEcos, strats, splits )
+                journal.markDone( newname, "statistics", { 'analysisNum': analysisNum } )
+
+            if not journal.isDone( newname, "workbook" ):
+                newExcel = SummaryWorkbook( gp, newname, analysisNum, resolution, outFolder )
+                newExcel.build_workbook( gp )
+                del newExcel
+                journal.markDone( newname, "workbook" )
+
+        journal.close( complete = True )
             
     except arcgisscripting.ExecuteError:
         msgs = gp.GetMessage(0)
@@ -12,7 +12,7 @@
 # http://www.usgs.gov/visual-id/credit_usgs.html#copyright
 #
 import arcgisscripting, os, sys, traceback
-from LULCTrends.trendutil import AnalysisNames, TrendsUtilities, deleteAnalysisName
+from LULCTrends.trendutil import AnalysisNames, TrendsNames, TrendsUtilities, deleteAnalysisName, RunJournal
 from LULCTrends.analysis import CustomDataAccess, testStudyAreaStats
 from LULCTrends.xcel.CustomWorkbookClass import CustomWorkbook
 from LULCTrends.xcel.SummaryWorkbookClass import SummaryWorkbook
@@ -44,40 +44,87 @@ def startLCCs( tempList, resolution, outFolder ):
             gp.AddMessage(lcc)
 
         infeatures = "//REMOVE/REMOVE/LULCTrends/Vectors/LCCs/LCC_areas_US_alb_areas.shp"
-        test = r'in_memory\testlccs'
             
-        for lcc in lccList:
-            lccname = 'lcc_' + lcc
-            if AnalysisNames.isInAnalysisNames( gp, lccname):
-                deleteAnalysisName.deleteAnalysisName( lccname)
-                
-            AnalysisNames.updateAnalysisNames( gp, lccname )
-            analysisNum = AnalysisNames.getAnalysisNum( gp, lccname )
-            gp.AddMessage("startStratified: lcc = " + lccname + "  analysisNum = " + str(analysisNum))
+        #Completed stages of an earlier, failed run with the same settings are skipped
+        journal = RunJournal.runJournal( outFolder, "startTheLCCs",
+                                         { 'lccs': lccList, 'resolution': resolution,
+                                           'clipBlocks': TrendsNames.clipSplitBlocks } )
 
-            subfolder = os.path.join( outFolder, lccname )
-            if not os.path.isdir( subfolder ):
-                os.mkdir( subfolder )
-
-            where_clause = "Area_Num = " +  str(lccnamelist[ lcc.encode('utf-8') ])
-            gp.Select_analysis( infeatures, test, where_clause )
-            newEcos, strats, splits = CustomDataAccess.accessCustomData( test, resolution, lccname, subfolder)
+        def cleanUp( lccname ):
+            #Each LCC keeps its own selection until its statistics are done, since
+            # they clip any split blocks to it
+            test = 'in_memory\\' + lccname
+            if gp.Exists( test ):
+                gp.delete_management( test )
+            journal.markDone( lccname, "cleanup" )
 
-            if len(newEcos) > 0:
-                testStudyAreaStats.buildStudyAreaStats( lccname, analysisNum, newEcos, strats, splits )
-
-                for eco in newEcos:
+        def finishLCC( lccname, analysisNum ):
+            #Build the workbooks and remove the selection of an LCC once its
+            # statistics are stored
+            if not journal.isDone( lccname, "workbook" ):
+                subfolder = folders[ lccname ]
+                for eco in ecoLists[ lccname ]:
                     newExcel = CustomWorkbook( gp, lccname, analysisNum, resolution, subfolder, eco )
                     newExcel.build_workbook( gp )
 
                 newExcel = SummaryWorkbook( gp, lccname, analysisNum, resolution, subfolder )
                 newExcel.build_workbook( gp )
                 del newExcel
+                journal.markDone( lccname, "workbook" )
+            if not journal.isDone( lccname, "cleanup" ):
+                cleanUp( lccname )
+
+        #Find the sample blocks for every LCC first, so the ecoregions the
+        # LCCs share are loaded once for the whole batch
+        finished = []
+        pending = []
+        folders = {}
+        ecoLists = {}
+        for lcc in lccList:
+            lccname = 'lcc_' + lcc
+            subfolder = os.path.join( outFolder, lccname )
+            test = 'in_memory\\' + lccname
+            where_clause = "Area_Num = " +  str(lccnamelist[ lcc.encode('utf-8') ])
+
+            if journal.isDone( lccname, "access" ):
+                newEcos, strats, splits = RunJournal.restoreBlocks( journal.getInfo( lccname, "access" ))
+                if journal.isDone( lccname, "statistics" ):
+                    analysisNum = journal.getInfo( lccname, "statistics" )['analysisNum']
+                elif len(newEcos) > 0:
+                    #clear out anything the failed run stored for this LCC
+                    analysisNum = AnalysisNames.resetAnalysisName( gp, lccname )
+                gp.AddMessage("resuming: lcc = " + lccname)
             else:
-                deleteAnalysisName.deleteAnalysisName( lccname)
+                analysisNum = AnalysisNames.resetAnalysisName( gp, lccname )
+                gp.AddMessage("startStratified: lcc = " + lccname + "  analysisNum = " + str(analysisNum))
+
+                if not os.path.isdir( subfolder ):
+                    os.mkdir( subfolder )
+
+                gp.Select_analysis( infeatures, test, where_clause )
+                newEcos, strats, splits = CustomDataAccess.accessCustomData( test, resolution, lccname, subfolder)
+                if len(newEcos) == 0:
+                    deleteAnalysisName.deleteAnalysisName( lccname)
+                journal.markDone( lccname, "access", RunJournal.saveBlocks( newEcos, strats, splits ))
+
+            if len(newEcos) > 0:
+                folders[ lccname ] = subfolder
+                ecoLists[ lccname ] = newEcos
+                if journal.isDone( lccname, "statistics" ):
+                    finished.append(( lccname, analysisNum ))
+                else:
+                    if not gp.Exists( test ):
+                        gp.Select_analysis( infeatures, test, where_clause )
+                    pending.append(( lccname, analysisNum, newEcos, strats, splits, test ))
+            elif not journal.isDone( lccname, "cleanup" ):
+                cleanUp( lccname )
 
-        if gp.Exists( test ):
-            gp.delete_management( test )
+        #LCCs finished by an earlier run only need what is left of their workbooks
+        # and cleanup; the others are finished as the batch stores each one
+        for lccname, analysisNum in finished:
+            finishLCC( lccname, analysisNum )
+        testStudyAreaStats.buildBatchStudyAreaStats( pending, journal = journal, finish = finishLCC )
+        journal.close( complete = True )
 
     except arcgisscripting.ExecuteError:
         msgs = gp.GetMessage(0)
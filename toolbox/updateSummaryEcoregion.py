@@ -0,0 +1,84 @@
+# File updateSummaryEcoregion.py
+#
+# In:   list of stored summary names that include the ecoregion
+#       ecoregion number
+#
+# Out:  the Trends statistics of the ecoregion, recalculated from the
+#       change images, and the summaries updated in the database
+#
+#       Reruns one Trends ecoregion and updates the named summaries in place
+#       (studyArea.updateEcoregion) instead of rerunning every ecoregion of
+#       each summary.  Each summary is read back from the database first,
+#       since the ecoregion's old estimates are replaced when it is stored.
+#       Summaries built from custom (partial stratified) ecoregions must be
+#       rerun with their boundary.
+#
+# This software is in the public domain because it contains materials that
+# originally came from the United States Geological Survey, an agency of the
+# United States Department of Interior. For more information, see the official
+# USGS copyright policy at
+# http://www.usgs.gov/visual-id/credit_usgs.html#copyright
+#
+import arcgisscripting, os, sys, traceback
+from LULCTrends.trendutil import AnalysisNames, TrendsNames, TrendsUtilities
+from LULCTrends.analysis import TrendsDataAccess, createRegionStats
+from LULCTrends.analysis.restoreSummaryFromDB import loadStoredSummary
+
+def updateSummaries( tempList, ecoNum ):
+    try:
+        gp = arcgisscripting.create(9.3)
+        gp.overwriteOutput = True
+
+        nameList = [ name.strip("\'") for name in tempList if name ]
+        summaries = []
+        for name in nameList:
+            analysisNum = AnalysisNames.getAnalysisNum( gp, name )
+            if analysisNum is None:
+                gp.AddError("No analysis named " + name + " in the database.")
+                raise TrendsUtilities.JustExit()
+            sa = loadStoredSummary( name, analysisNum )
+            if ecoNum not in sa.study:
+                gp.AddError("Ecoregion " + str(ecoNum) + " is not in summary " + name + ".")
+                raise TrendsUtilities.JustExit()
+            if sa.study[ ecoNum ].runType != "Full stratified":
+                gp.AddError("Summary " + name + " uses a custom ecoregion " + str(ecoNum) + \
+                            ". Rerun the custom analysis instead.")
+                raise TrendsUtilities.JustExit()
+            summaries.append( sa )
+
+        resolutions = set([ sa.resolution for sa in summaries ])
+        if len( resolutions ) != 1:
+            gp.AddError("The summaries must all have the same resolution.")
+            raise TrendsUtilities.JustExit()
+        resolution = resolutions.pop()
+
+        #Recalculate the ecoregion, update each summary, then store the ecoregion
+        newEcos, strats, splits = TrendsDataAccess.accessTrendsData( [ ecoNum ], TrendsNames.TrendsNum, resolution )
+        total, sample, res, runType = newEcos[ ecoNum ]
+        eco = createRegionStats.EcoStats( ecoNum, total, sample, res, runType, strats[ ecoNum ] )
+        if not eco.loadData():
+            gp.AddError("No change data found for ecoregion " + str(ecoNum) + ".")
+            raise TrendsUtilities.JustExit()
+        eco.calculateStatistics()
+        for sa in summaries:
+            rowCount = sa.updateEcoregion( eco )
+            gp.AddMessage("Summary " + sa.analysisName + ": " + str(rowCount) + " statistic rows rewritten")
+        eco.storeStatistics( TrendsNames.TrendsNum )
+
+    except arcgisscripting.ExecuteError:
+        msgs = gp.GetMessage(0)
+        msgs += gp.GetMessages(2)
+        gp.AddMessage(msgs)
+    except TrendsUtilities.JustExit:
+        pass
+    except Exception:
+        gp.AddMessage(traceback.format_exc())
+
+if __name__ == "__main__":
+    try:
+        gp = arcgisscripting.create(9.3)
+        tempList = gp.GetParameterAsText(0).split(';')
+        ecoNum = int( gp.GetParameterAsText(1) )
+        updateSummaries( tempList, ecoNum )
+    except Exception:
+        gp.AddMessage(traceback.format_exc())